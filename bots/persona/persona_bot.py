@@ -44,6 +44,8 @@ from interactions.api.events import MessageCreate, TypingStart
 # RAG (Retrieval Augmented Generation) - optional, graceful fallback if not available
 try:
     from rag.retriever import get_formatted_context, get_formatted_context_rich, get_smart_context, get_user_context, get_random_memory_samples, embed_live_message
+    from rag.retriever import get_smart_context_async, get_relevant_messages_async, get_cache_stats
+    from rag.retriever import get_live_embedding_stats
     from rag.config import PERSONA_AUTHOR_IDS
     RAG_AVAILABLE = True
 except ImportError:
@@ -57,6 +59,14 @@ except ImportError:
         return False
     def get_smart_context(query: str, top_k: int = 5) -> str:
         return ""
+    async def get_smart_context_async(query: str, top_k: int = 5) -> str:
+        return ""
+    async def get_relevant_messages_async(query: str, top_k: int = 5) -> list[str]:
+        return []
+    def get_cache_stats():
+        return None
+    def get_live_embedding_stats():
+        return None
 
 # Vision (CLIP Interrogator) - optional, graceful fallback if not available
 try:
@@ -154,6 +164,10 @@ POSTS_PER_DAY = 10
 CLAUDE_MODEL = "claude-sonnet-4-20250514"
 MAX_TOKENS = 250  # Keep responses short and natural
 TEMPERATURE = 0.9  # Higher = more creative/varied
+CLAUDE_MAX_CONCURRENT = 2    # Claude requests in flight at once (others wait for a slot)
+CLAUDE_TIMEOUT = 30.0        # Seconds per response/diva read request, including the wait for a slot
+CLAUDE_TRIAGE_TIMEOUT = 8.0  # Seconds per Haiku continuation triage
+STREAM_RESPONSES = True      # Stream replies: multi-message parts are sent as soon as each is complete
 
 # ---------- Continuation Detection ----------
 
@@ -164,6 +178,7 @@ CONTINUATION_TRIAGE_THRESHOLD = 0.20  # Heuristic score → ask Haiku triage
 
 RAG_ENABLED = True       # Set False to disable RAG even if available
 RAG_TOP_K = 5            # Number of similar messages to retrieve
+RAG_PREFETCH_MAX = 4     # Speculative retrievals kept per session (conversation keywords + likely reply targets)
 
 # ---------- Vision Settings ----------
 
@@ -268,6 +283,7 @@ client = Client(
 )
 
 anthropic_client = None
+claude_semaphore = None  # Bounds concurrent Claude requests, created with the client
 SYSTEM_PROMPT = ""
 
 # Rate limiting
@@ -640,6 +656,25 @@ class ChannelSession:
     # start generating responses before the first one finishes and sets cooldown
     is_processing: bool = False
 
+    # In-flight reply (typing wait, generation, sending), run as a task so the
+    # presence loop keeps observing meanwhile. Cancelled by reset().
+    response_task: Optional[asyncio.Task] = None
+
+    # Serializes moving pending_messages into the buffer (Stage 1 and the
+    # response task's post-typing-wait flush both do it)
+    observe_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    # Stage 1 took in messages while a response was in flight; the next idle
+    # tick runs Stage 2 for them even if nothing new arrives
+    observed_while_busy: bool = False
+
+    # Set by wake_tick() to end wait_for_tick() early
+    tick_wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+
+    # Speculative RAG retrievals started by Stage 1, (query, top_k) -> task
+    # resolving to get_smart_context() output (see prefetch_rag)
+    rag_prefetches: Dict[tuple, asyncio.Task] = field(default_factory=dict)
+
     # Responded-to tracking - prevents re-engaging the same message on subsequent ticks
     responded_to_message_ids: set = field(default_factory=set)
 
@@ -704,20 +739,32 @@ class ChannelSession:
         self.engagement_focus_user_id = None
         self.engagement_focus_started = 0
         self.post_response_suppress_until = 0
+        if self.response_task and not self.response_task.done():
+            self.response_task.cancel()
+        self.response_task = None
         self.is_processing = False
+        self.observed_while_busy = False
+        self.tick_wakeup.clear()
         self.responded_to_message_ids.clear()
         self.last_response_to_user.clear()
         for task in self.pending_image_tasks.values():
             task.cancel()
         self.pending_image_tasks.clear()
+        for task in self.rag_prefetches.values():
+            task.cancel()
+        self.rag_prefetches.clear()
         self.session_start = datetime.now().timestamp()
         self.last_activity = datetime.now().timestamp()
         logger.info(f"Session reset for channel {self.channel_id}")
 
+    def wake_tick(self):
+        """Tick now rather than at the next threshold (a finished response left work queued)."""
+        self.tick_wakeup.set()
+
     async def wait_for_tick(self) -> bool:
         """
         Wait until tick conditions are met.
-        Returns True if triggered by messages, False if by time.
+        Returns True if triggered by messages, False if by time or wake_tick().
         """
         while True:
             now = datetime.now().timestamp()
@@ -737,7 +784,15 @@ class ChannelSession:
                 self.messages_since_tick = 0
                 return False
 
-            await asyncio.sleep(0.5)
+            try:
+                await asyncio.wait_for(self.tick_wakeup.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            self.tick_wakeup.clear()
+            self.last_tick_time = datetime.now().timestamp()
+            self.tick_count += 1
+            self.messages_since_tick = 0
+            return False
 
     def add_message(self, msg: BufferedMessage):
         """Add a message to the buffer and update state."""
@@ -957,14 +1012,176 @@ def load_system_prompt() -> str:
 
 def init_anthropic():
     """Initialize the Anthropic client."""
-    global anthropic_client
+    global anthropic_client, claude_semaphore
     if ANTHROPIC_API_KEY and ANTHROPIC_API_KEY != "YOUR_API_KEY_HERE":
-        anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        logger.info("Anthropic client initialized")
+        # Async client: a multi-second completion must not block the event loop
+        # (typing events, message buffering, live RAG embedding, heartbeats)
+        anthropic_client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+        claude_semaphore = asyncio.Semaphore(CLAUDE_MAX_CONCURRENT)
+        logger.info(f"Anthropic client initialized (max {CLAUDE_MAX_CONCURRENT} concurrent requests)")
     else:
         logger.error("No Anthropic API key configured!")
 
 
+class ClaudeCallStats:
+    """Outcome counts and recent latencies of Claude requests, per purpose."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.in_flight = 0
+        self.waiting = 0
+        self._purposes: Dict[str, dict] = {}
+
+    def _entry(self, purpose: str) -> dict:
+        entry = self._purposes.get(purpose)
+        if entry is None:
+            entry = self._purposes[purpose] = {
+                "ok": 0, "timeouts": 0, "errors": 0, "cancelled": 0,
+                "stopped": 0,  # streams the caller stopped early (all parts sent, or plan invalidated)
+                "latencies": deque(maxlen=self.window),  # seconds, successful calls
+                "first_text": deque(maxlen=self.window),  # seconds to first streamed text
+                "queue_waits": deque(maxlen=self.window),  # seconds waiting for a slot
+            }
+        return entry
+
+    def record(self, purpose: str, outcome: str, latency: float = None,
+               queue_wait: float = None, first_text: float = None):
+        entry = self._entry(purpose)
+        entry[outcome] += 1
+        if latency is not None:
+            entry["latencies"].append(latency)
+        if queue_wait is not None:
+            entry["queue_waits"].append(queue_wait)
+        if first_text is not None:
+            entry["first_text"].append(first_text)
+
+    def snapshot(self) -> dict:
+        result = {"in_flight": self.in_flight, "waiting": self.waiting, "purposes": {}}
+        for purpose, entry in self._purposes.items():
+            latencies = sorted(entry["latencies"])
+            first_text = sorted(entry["first_text"])
+            waits = entry["queue_waits"]
+            result["purposes"][purpose] = {
+                "ok": entry["ok"],
+                "timeouts": entry["timeouts"],
+                "errors": entry["errors"],
+                "cancelled": entry["cancelled"],
+                "stopped": entry["stopped"],
+                "p50_s": latencies[len(latencies) // 2] if latencies else 0.0,
+                "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+                "max_s": latencies[-1] if latencies else 0.0,
+                "first_text_p50_s": first_text[len(first_text) // 2] if first_text else None,
+                "avg_wait_s": sum(waits) / len(waits) if waits else 0.0,
+            }
+        return result
+
+    def format(self) -> str:
+        """A few lines for the /persona_status embed."""
+        snap = self.snapshot()
+        lines = [f"In flight: {snap['in_flight']}/{CLAUDE_MAX_CONCURRENT}, waiting: {snap['waiting']}"]
+        for purpose, s in snap["purposes"].items():
+            line = f"`{purpose}`: {s['ok']} ok, p50 {s['p50_s']:.1f}s, p95 {s['p95_s']:.1f}s"
+            if s["first_text_p50_s"] is not None:
+                line += f", first text p50 {s['first_text_p50_s']:.1f}s"
+            line += f", wait {s['avg_wait_s']:.2f}s"
+            failures = [f"{s[k]} {k}" for k in ("timeouts", "errors", "cancelled", "stopped") if s[k]]
+            if failures:
+                line += f" ({', '.join(failures)})"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+claude_stats = ClaudeCallStats()
+
+
+async def _claude_request(purpose: str, timeout: float, call):
+    """
+    Run `await call(timing)` in a claude_semaphore slot, within `timeout`
+    seconds counting the wait for the slot, and record the outcome.
+
+    `timing` is a dict the call may add "first_text" (loop time) and
+    "stopped" (bool) to.
+    """
+    loop = asyncio.get_running_loop()
+    queued_at = loop.time()
+    timing = {}
+
+    async def _in_slot():
+        claude_stats.waiting += 1
+        try:
+            await claude_semaphore.acquire()
+        finally:
+            claude_stats.waiting -= 1
+        timing["started"] = loop.time()
+        claude_stats.in_flight += 1
+        try:
+            return await call(timing)
+        finally:
+            claude_stats.in_flight -= 1
+            claude_semaphore.release()
+
+    try:
+        result = await asyncio.wait_for(_in_slot(), timeout)
+    except asyncio.TimeoutError:
+        claude_stats.record(purpose, "timeouts")
+        logger.warning(f"Claude {purpose} request timed out after {timeout:g}s")
+        raise
+    except asyncio.CancelledError:
+        claude_stats.record(purpose, "cancelled")
+        logger.info(f"Claude {purpose} request cancelled")
+        raise
+    except Exception:
+        claude_stats.record(purpose, "errors")
+        raise
+
+    started = timing["started"]
+    first_text = timing.get("first_text")
+    claude_stats.record(
+        purpose, "stopped" if timing.get("stopped") else "ok",
+        latency=None if timing.get("stopped") else loop.time() - started,
+        queue_wait=started - queued_at,
+        first_text=first_text - started if first_text is not None else None,
+    )
+    return result
+
+
+async def claude_create(purpose: str, timeout: float = CLAUDE_TIMEOUT, **kwargs):
+    """
+    anthropic_client.messages.create(**kwargs) with bounded concurrency.
+
+    At most CLAUDE_MAX_CONCURRENT requests run at once; `timeout` covers
+    the wait for a slot plus the request. Raises asyncio.TimeoutError on
+    timeout and API errors as-is, so callers keep their own fallbacks.
+    Cancelling the awaiting task (session reset) cancels the request.
+    Outcome and latency are recorded in claude_stats under `purpose`.
+    """
+    async def call(timing):
+        return await anthropic_client.messages.create(**kwargs)
+    return await _claude_request(purpose, timeout, call)
+
+
+async def claude_stream(purpose: str, on_text, timeout: float = CLAUDE_TIMEOUT, **kwargs) -> str:
+    """
+    Streaming claude_create(): calls on_text(chunk) for each text delta as
+    it arrives and returns the text received.
+
+    If on_text returns True the stream is closed there (the rest of the
+    completion isn't generated) and the text so far is returned.
+    """
+    async def call(timing):
+        chunks = []
+        async with anthropic_client.messages.stream(**kwargs) as stream:
+            async for text in stream.text_stream:
+                if not chunks:
+                    timing["first_text"] = asyncio.get_running_loop().time()
+                chunks.append(text)
+                if on_text(text):
+                    timing["stopped"] = True
+                    break
+        return "".join(chunks)
+    return await _claude_request(purpose, timeout, call)
+
+
 # ============== DIVA READ FUNCTIONS ==============
 
 def detect_ai_accusation(content: str, bot_spoke_recently: bool = False) -> bool:
@@ -1147,7 +1364,8 @@ DO:
                 "cache_control": {"type": "ephemeral"}
             }
         ]
-        response = anthropic_client.messages.create(
+        response = await claude_create(
+            "diva_read",
             model=CLAUDE_MODEL,
             max_tokens=150,
             temperature=1.0,  # Maximum creativity for the read
@@ -1156,7 +1374,7 @@ DO:
         )
         return response.content[0].text
     except Exception as e:
-        logger.error(f"Error generating diva read: {e}")
+        logger.error(f"Error generating diva read: {e!r}")
         return "ur so boring i cant even be bothered to read u properly"
 
 
@@ -1331,6 +1549,78 @@ def buffered_to_context_messages(buffer: list) -> list[ContextMessage]:
     ]
 
 
+def _build_user_lookup(context_messages: list[ContextMessage]) -> dict[str, ContextMessage]:
+    """Lowercased (and simplified) display name -> that user's latest ContextMessage."""
+    user_messages = {}
+    for ctx_msg in reversed(context_messages):
+        name_lower = ctx_msg.author_name.lower()
+        if name_lower not in user_messages:
+            user_messages[name_lower] = ctx_msg
+        simple = simplify_display_name(ctx_msg.author_name).lower()
+        if simple and simple != name_lower and simple not in user_messages:
+            user_messages[simple] = ctx_msg
+    return user_messages
+
+
+def _match_user_prefix(line: str, user_messages: dict[str, ContextMessage]):
+    """
+    Try to match @username: or username: at the start of a line.
+    Returns (target_user_display_name, target_ctx_msg, cleaned_content)
+    or (None, None, original_line) if no match.
+    """
+    check = line
+    had_at = check.startswith('@')
+    if had_at:
+        check = check[1:]
+    check_lower = check.lower()
+
+    candidates = sorted(user_messages.keys(), key=len, reverse=True)
+    for name_lower in candidates:
+        for sep in [':', ' :']:
+            prefix = name_lower + sep
+            if check_lower.startswith(prefix):
+                content = check[len(prefix):].strip()
+                if content:
+                    ctx_msg = user_messages[name_lower]
+                    return (ctx_msg.author_name, ctx_msg, content)
+
+        if had_at:
+            prefix = name_lower + ' '
+            if check_lower.startswith(prefix):
+                content = check[len(prefix):].strip()
+                if content:
+                    ctx_msg = user_messages[name_lower]
+                    return (ctx_msg.author_name, ctx_msg, content)
+
+    return (None, None, line)
+
+
+def _parse_response_lines(lines: list[str], user_messages: dict[str, ContextMessage]) -> list[ResponsePart]:
+    """One ResponsePart per line, with its @username: target if it has one."""
+    parts = []
+    for line in lines:
+        # Strip any [REPLY_TO:id] tags from individual lines too
+        line, _ = strip_reply_tags(line)
+        target_user, target_msg, content = _match_user_prefix(line, user_messages)
+        parts.append(ResponsePart(
+            content=content,
+            target_user=target_user,
+            target_message=target_msg
+        ))
+    return parts
+
+
+def _merge_targeted_parts(parts: list[ResponsePart]) -> list[ResponsePart]:
+    """Merge consecutive parts aimed at the same user into one."""
+    merged = []
+    for part in parts:
+        if merged and merged[-1].target_user == part.target_user:
+            merged[-1].content += " " + part.content
+        else:
+            merged.append(part)
+    return merged
+
+
 def parse_structured_response(response: str, context_messages: list[ContextMessage]) -> list[ResponsePart]:
     """
     Parse a response that may contain multiple parts directed at different users.
@@ -1349,14 +1639,7 @@ def parse_structured_response(response: str, context_messages: list[ContextMessa
     id_to_message = {str(ctx_msg.message_id): ctx_msg for ctx_msg in context_messages}
     
     # username -> ContextMessage (for @username: targeting)  
-    user_messages = {}
-    for ctx_msg in reversed(context_messages):
-        name_lower = ctx_msg.author_name.lower()
-        if name_lower not in user_messages:
-            user_messages[name_lower] = ctx_msg
-        simple = simplify_display_name(ctx_msg.author_name).lower()
-        if simple and simple != name_lower and simple not in user_messages:
-            user_messages[simple] = ctx_msg
+    user_messages = _build_user_lookup(context_messages)
 
     # === FIRST: Check for [REPLY_TO:id] tags and strip them ===
     # This is the priority targeting method - if present, use it
@@ -1368,38 +1651,6 @@ def parse_structured_response(response: str, context_messages: list[ContextMessa
     # Use cleaned response (tags stripped) for all further processing
     response = cleaned_response
 
-    def try_match_user_prefix(line: str):
-        """
-        Try to match @username: or username: at the start of a line.
-        Returns (target_user_display_name, target_ctx_msg, cleaned_content)
-        or (None, None, original_line) if no match.
-        """
-        check = line
-        had_at = check.startswith('@')
-        if had_at:
-            check = check[1:]
-        check_lower = check.lower()
-
-        candidates = sorted(user_messages.keys(), key=len, reverse=True)
-        for name_lower in candidates:
-            for sep in [':', ' :']:
-                prefix = name_lower + sep
-                if check_lower.startswith(prefix):
-                    content = check[len(prefix):].strip()
-                    if content:
-                        ctx_msg = user_messages[name_lower]
-                        return (ctx_msg.author_name, ctx_msg, content)
-
-            if had_at:
-                prefix = name_lower + ' '
-                if check_lower.startswith(prefix):
-                    content = check[len(prefix):].strip()
-                    if content:
-                        ctx_msg = user_messages[name_lower]
-                        return (ctx_msg.author_name, ctx_msg, content)
-
-        return (None, None, line)
-
     # Split response on newlines
     lines = [line.strip() for line in response.split('\n') if line.strip()]
 
@@ -1408,7 +1659,7 @@ def parse_structured_response(response: str, context_messages: list[ContextMessa
 
     # Single line - check for user prefix
     if len(lines) == 1:
-        target_user, target_msg, content = try_match_user_prefix(lines[0])
+        target_user, target_msg, content = _match_user_prefix(lines[0], user_messages)
         # If we found target from [REPLY_TO:id], use that instead
         if target_from_id and not target_msg:
             target_msg = target_from_id
@@ -1416,26 +1667,11 @@ def parse_structured_response(response: str, context_messages: list[ContextMessa
         return [ResponsePart(content=content, target_user=target_user, target_message=target_msg)]
 
     # Multiple lines - check each for user targeting
-    current_parts = []
-    for line in lines:
-        # Strip any [REPLY_TO:id] tags from individual lines too
-        line, _ = strip_reply_tags(line)
-        target_user, target_msg, content = try_match_user_prefix(line)
-        current_parts.append(ResponsePart(
-            content=content,
-            target_user=target_user,
-            target_message=target_msg
-        ))
+    current_parts = _parse_response_lines(lines, user_messages)
 
     # If we found explicit targets, merge consecutive same-target parts
     if any(p.target_user for p in current_parts):
-        merged = []
-        for part in current_parts:
-            if merged and merged[-1].target_user == part.target_user:
-                merged[-1].content += " " + part.content
-            else:
-                merged.append(part)
-        return merged[:MAX_RESPONSE_MESSAGES]
+        return _merge_targeted_parts(current_parts)[:MAX_RESPONSE_MESSAGES]
 
     # No explicit targets - try to detect implicit targeting by name in content
     for i, part in enumerate(current_parts):
@@ -1461,6 +1697,67 @@ def parse_structured_response(response: str, context_messages: list[ContextMessa
     return current_parts[:MAX_RESPONSE_MESSAGES]
 
 
+class StreamingResponseParser:
+    """
+    parse_structured_response() for a completion that is still streaming.
+
+    feed() takes text as it arrives and returns the parts that are already
+    final; finish() returns the rest once the completion is done. Together
+    they return what parse_structured_response(full_text)[:limit] would.
+
+    A part is final once a later line is aimed at someone else. The line
+    being written counts as soon as it is long enough that its @Username:
+    prefix can't turn out differently. Only responses with explicit
+    targets can be split early: without them the lines are combined (or
+    targeted by name) at the end.
+    """
+
+    def __init__(self, context_messages: list[ContextMessage], limit: int):
+        self.context_messages = context_messages
+        # parse_structured_response never returns more than this either
+        self.limit = min(limit, MAX_RESPONSE_MESSAGES)
+        self.text = ""
+        self.emitted = 0
+        self._user_messages = _build_user_lookup(context_messages)
+        # Longest possible prefix: "@" + name + " :"
+        self._prefix_len = max((len(name) for name in self._user_messages), default=0) + 3
+
+    @property
+    def done(self) -> bool:
+        """True once every part the response can have has been returned."""
+        return self.emitted >= self.limit
+
+    def feed(self, chunk: str) -> list[ResponsePart]:
+        self.text += chunk
+        newline = self.text.rfind('\n')
+        if self.done or newline < 0:
+            return []
+        # Complete lines, tags stripped the way parse_structured_response
+        # does. A tag can swallow the newline after it, so the last complete
+        # line may still join the next one; it's never emitted from here.
+        head, tail = self.text[:newline], self.text[newline + 1:].strip()
+        complete, _ = strip_reply_tags(head)
+        lines = [line.strip() for line in complete.split('\n') if line.strip()]
+        # The line being written decides its target once it is longer than
+        # any prefix (unless tags are involved)
+        if len(tail) > self._prefix_len and '[' not in tail and not head.rstrip().endswith(']'):
+            lines.append(tail)
+        parts = _parse_response_lines(lines, self._user_messages)
+        if not any(p.target_user for p in parts):
+            return []
+        final = _merge_targeted_parts(parts)[:-1][:self.limit]
+        new = final[self.emitted:]
+        self.emitted += len(new)
+        return new
+
+    def finish(self, text: str) -> list[ResponsePart]:
+        """The parts not returned yet, given the whole completion (or all of it that was generated)."""
+        parts = parse_structured_response(text, self.context_messages)[:self.limit]
+        new = parts[self.emitted:]
+        self.emitted += len(new)
+        return new
+
+
 def build_emoji_map(context_messages: list[ContextMessage]) -> dict[str, str]:
     """
     Build a map of emoji shortcodes to their full Discord format from context messages.
@@ -1551,7 +1848,9 @@ async def generate_response(
     context_messages: list = None,  # list[ContextMessage]
     trigger_author: str = "",
     max_tokens: int = None,
-    skip_rag: bool = False  # Skip main RAG when caller already injected its own context
+    skip_rag: bool = False,  # Skip main RAG when caller already injected its own context
+    on_text=None,  # Stream: called with each text chunk, returning True stops generation
+    session: Optional[ChannelSession] = None  # Use Stage 1's RAG prefetch for `message` if there is one
 ) -> str:
     """Generate a response using Claude."""
     if not anthropic_client:
@@ -1585,7 +1884,10 @@ async def generate_response(
     # Skip when caller already injected its own targeted RAG context (e.g. bored_interjection)
     if RAG_ENABLED and RAG_AVAILABLE and not skip_rag:
         try:
-            rag_context = get_smart_context(message, top_k=RAG_TOP_K)
+            if session is not None:
+                rag_context = await retrieve_rag_context(session, message, top_k=RAG_TOP_K)
+            else:
+                rag_context = await get_smart_context_async(message, top_k=RAG_TOP_K)
             if rag_context:
                 system_blocks.append({"type": "text", "text": rag_context})
                 rag_lines = [l for l in rag_context.split('\n') if l.strip().startswith(('1.', '2.', '3.', '4.', '5.'))]
@@ -1634,15 +1936,20 @@ RULES:
     effective_max_tokens = max_tokens if max_tokens is not None else MAX_TOKENS
 
     try:
-        response = anthropic_client.messages.create(
+        request = dict(
             model=CLAUDE_MODEL,
             max_tokens=effective_max_tokens,  # CHANGED: Use effective_max_tokens
             temperature=TEMPERATURE,
             system=system_blocks,
             messages=messages
         )
+        if on_text:
+            return await claude_stream("response", on_text, **request)
+        response = await claude_create("response", **request)
         return response.content[0].text
 
+    except asyncio.TimeoutError:
+        return None  # Already logged by claude_create
     except anthropic.APIError as e:
         logger.error(f"Claude API error: {e}")
         return None
@@ -1746,12 +2053,12 @@ async def _triage_continuation_haiku(session: ChannelSession, msg: BufferedMessa
         "Reply YES or NO only."
     )
     try:
-        response = await asyncio.to_thread(
-            lambda: anthropic_client.messages.create(
-                model="claude-haiku-4-5-20251001",
-                max_tokens=5,
-                messages=[{"role": "user", "content": prompt}]
-            )
+        response = await claude_create(
+            "triage",
+            timeout=CLAUDE_TRIAGE_TIMEOUT,
+            model="claude-haiku-4-5-20251001",
+            max_tokens=5,
+            messages=[{"role": "user", "content": prompt}]
         )
         result = response.content[0].text.strip().upper()
         logger.debug(f"Haiku continuation triage for {msg.author_name}: {result}")
@@ -1807,9 +2114,7 @@ async def stage1_observe(session: ChannelSession) -> StateDelta:
                                     }
                                     # Image-only messages: use description as searchable text
                                     embed_text = buf_msg.content.strip() or description
-                                    asyncio.create_task(
-                                        embed_live_message(str(buf_msg.message_id), embed_text, img_meta)
-                                    )
+                                    await embed_live_message(str(buf_msg.message_id), embed_text, img_meta)
                                 except Exception as _e:
                                     logger.debug(f"Image RAG upsert failed for msg {msg_id}: {_e}")
                             break
@@ -2104,6 +2409,11 @@ async def stage1_observe(session: ChannelSession) -> StateDelta:
     # Store priority triggers
     session.priority_triggers.extend(delta.priority_triggers)
 
+    # Start the RAG retrievals a reply is likely to need, so they run during
+    # the tick window instead of on Stage 3's critical path
+    if delta.new_messages:
+        prefetch_rag(session)
+
     # IMPROVED LOGGING: Always log state after processing messages
     if delta.new_messages:
         user_msgs = [m for m in delta.new_messages if not m.is_bot]
@@ -2298,7 +2608,7 @@ async def stage2_select_action(session: ChannelSession, delta: StateDelta) -> Ne
         return plan
 
     # Opportunity scanning
-    opportunities = _scan_for_opportunities(session, delta)
+    opportunities = await _scan_for_opportunities(session, delta)
 
     if not opportunities:
         logger.debug(f"Stage 2: No opportunities found")
@@ -2401,6 +2711,29 @@ async def _handle_ai_accusation_trigger(session: ChannelSession, trigger_msg: Bu
     return plan
 
 
+def build_target_user_message(session: ChannelSession, target: BufferedMessage, target_user_name: str) -> str:
+    """
+    The user turn Stage 3 sends Claude for a reply to `target` (also the RAG
+    query for it, so Stage 1 can prefetch retrieval for likely targets).
+    """
+    msg_content = target.content
+    if not msg_content and target.image_description:
+        msg_content = "[posted an image with no text]"
+
+    # Include reply context if target is replying to something outside the buffer
+    if target.reply_context and target.reply_to_id:
+        buffer_ids = {m.message_id for m in session.message_buffer}
+        if target.reply_to_id not in buffer_ids:
+            quote = target.reply_context[:200]
+            if len(target.reply_context) > 200:
+                quote += "..."
+            return (
+                f'{target_user_name} (replying to '
+                f'{target.reply_context_author}: "{quote}"): {msg_content}'
+            )
+    return f"{target_user_name}: {msg_content}"
+
+
 def extract_buffer_keywords(session: ChannelSession, max_messages: int = 6) -> list[str]:
     """
     Extract meaningful keywords/nouns from recent buffer messages for RAG query.
@@ -2448,12 +2781,73 @@ def extract_buffer_keywords(session: ChannelSession, max_messages: int = 6) -> l
     return [word for word, _ in word_freq.most_common(8)]
 
 
-def get_rag_for_conversation(session: ChannelSession) -> tuple[str, str]:
+def conversation_rag_query(session: ChannelSession) -> str:
+    """RAG query built from the buffer's top keywords, or "" if there's too little to go on."""
+    keywords = extract_buffer_keywords(session)
+    if len(keywords) < 2:
+        # Not enough substance to query on
+        return ""
+    # Build a natural query from top keywords for better semantic matching
+    return " ".join(keywords[:5])
+
+
+def prefetch_rag(session: ChannelSession):
+    """
+    Start retrievals Stage 3 will probably need, while the tick window runs.
+
+    Called by Stage 1 after new messages. Prefetches the conversation
+    keyword query (bored interjections) and the reply query for each
+    pending priority trigger (the likely reply targets). Prefetches no
+    longer wanted for the current buffer are cancelled; if one hasn't
+    reached the retrieval thread yet it never runs.
+    """
+    if not RAG_ENABLED or not RAG_AVAILABLE:
+        return
+
+    wanted = []
+    for _, trigger_msg in reversed(session.priority_triggers):
+        wanted.append((build_target_user_message(session, trigger_msg, trigger_msg.author_name), RAG_TOP_K))
+    query = conversation_rag_query(session)
+    if query:
+        wanted.append((query, RAG_TOP_K))
+    wanted = list(dict.fromkeys(wanted))[:RAG_PREFETCH_MAX]
+
+    for key in [k for k in session.rag_prefetches if k not in wanted]:
+        session.rag_prefetches.pop(key).cancel()
+    for key in wanted:
+        if key not in session.rag_prefetches:
+            task = asyncio.create_task(get_smart_context_async(*key))
+            task.add_done_callback(_discard_prefetch_error)
+            session.rag_prefetches[key] = task
+            logger.debug(f"RAG prefetch started: '{key[0][:60]}'")
+
+
+def _discard_prefetch_error(task: asyncio.Task):
+    """Mark a failed prefetch's exception as seen (it's re-raised if the prefetch is used)."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"RAG prefetch failed: {task.exception()}")
+
+
+async def retrieve_rag_context(session: ChannelSession, query: str, top_k: int = RAG_TOP_K) -> str:
+    """
+    get_smart_context(query) for Stage 2/3, off the event loop: the
+    prefetched result when Stage 1 already started it, a fresh retrieval
+    otherwise. Raises what the retrieval raised.
+    """
+    task = session.rag_prefetches.pop((query, top_k), None)
+    if task is not None and not task.cancelled():
+        logger.debug(f"RAG prefetch {'hit' if task.done() else 'pending'}: '{query[:60]}'")
+        return await task
+    return await get_smart_context_async(query, top_k=top_k)
+
+
+async def get_rag_for_conversation(session: ChannelSession) -> tuple[str, str]:
     """
     Query RAG using keywords from current conversation buffer.
     
     Extracts keywords from recent chat, builds a semantic query,
-    and retrieves relevant past messages from the RAG database.
+    and retrieves relevant past messages from the RAG database
+    (usually already prefetched by Stage 1).
     
     Returns:
         (rag_context, query_used) - the formatted RAG context string
@@ -2462,16 +2856,12 @@ def get_rag_for_conversation(session: ChannelSession) -> tuple[str, str]:
     if not RAG_ENABLED or not RAG_AVAILABLE:
         return "", ""
     
-    keywords = extract_buffer_keywords(session)
-    if len(keywords) < 2:
-        # Not enough substance to query on
+    query = conversation_rag_query(session)
+    if not query:
         return "", ""
     
-    # Build a natural query from top keywords for better semantic matching
-    query = " ".join(keywords[:5])
-    
     try:
-        rag_context = get_smart_context(query, top_k=5)
+        rag_context = await retrieve_rag_context(session, query, top_k=RAG_TOP_K)
         if rag_context:
             logger.info(f"RAG interjection: query='{query}' returned context")
             rag_lines = [l for l in rag_context.split('\n') if l.strip().startswith(('1.', '2.', '3.', '4.', '5.'))]
@@ -2489,7 +2879,7 @@ def get_rag_for_conversation(session: ChannelSession) -> tuple[str, str]:
         return "", ""
 
 
-def _scan_for_opportunities(session: ChannelSession, delta: StateDelta) -> list[ActionOpportunity]:
+async def _scan_for_opportunities(session: ChannelSession, delta: StateDelta) -> list[ActionOpportunity]:
     """
     Scan session state for action opportunities.
     
@@ -2591,8 +2981,7 @@ def _scan_for_opportunities(session: ChannelSession, delta: StateDelta) -> list[
                 rag_context = ""
                 if RAG_ENABLED and RAG_AVAILABLE:
                     try:
-                        from rag.retriever import get_relevant_messages
-                        rag_msgs = get_relevant_messages(msg.image_description[:200], top_k=3)
+                        rag_msgs = await get_relevant_messages_async(msg.image_description[:200], top_k=3)
                         if rag_msgs:
                             rag_context = "## Relevant past messages about this topic:\n"
                             for i, rm in enumerate(rag_msgs, 1):
@@ -2613,8 +3002,7 @@ def _scan_for_opportunities(session: ChannelSession, delta: StateDelta) -> list[
                 rag_context = ""
                 if _is_interesting_topic(msg.image_description) and RAG_ENABLED and RAG_AVAILABLE:
                     try:
-                        from rag.retriever import get_relevant_messages
-                        rag_msgs = get_relevant_messages(msg.image_description[:200], top_k=3)
+                        rag_msgs = await get_relevant_messages_async(msg.image_description[:200], top_k=3)
                         if rag_msgs:
                             rag_context = "## Relevant past messages about this topic:\n"
                             for i, rm in enumerate(rag_msgs, 1):
@@ -2649,8 +3037,7 @@ def _scan_for_opportunities(session: ChannelSession, delta: StateDelta) -> list[
                 rag_context = ""
                 if _is_interesting_topic(msg.image_description) and RAG_ENABLED and RAG_AVAILABLE:
                     try:
-                        from rag.retriever import get_relevant_messages
-                        rag_msgs = get_relevant_messages(msg.image_description[:200], top_k=3)
+                        rag_msgs = await get_relevant_messages_async(msg.image_description[:200], top_k=3)
                         if rag_msgs:
                             rag_context = "## Relevant past messages about this topic:\n"
                             for i, rm in enumerate(rag_msgs, 1):
@@ -2674,7 +3061,7 @@ def _scan_for_opportunities(session: ChannelSession, delta: StateDelta) -> list[
             and len(session.message_buffer) > 3
             and bored_cooldown_elapsed):
         # Try to pull RAG context for a more grounded take; fall back to plain quip
-        rag_context, _ = get_rag_for_conversation(session)
+        rag_context, _ = await get_rag_for_conversation(session)
         reply_target = None
         if rag_context:
             for msg in reversed(list(session.message_buffer)):
@@ -2997,11 +3384,12 @@ def _apply_user_treatment_new(session: ChannelSession, user_id: int, plan: NewAc
     return plan
 
 
-async def stage3_generate_content(session: ChannelSession, plan: NewActionPlan) -> str:
+async def stage3_generate_content(session: ChannelSession, plan: NewActionPlan, on_text=None) -> str:
     """
     STAGE 3: CONTENT GENERATION
 
     Generate response content using Claude API with mood-based length limits.
+    on_text streams the completion (see generate_response); diva reads aren't streamed.
     """
     if not plan.should_act:
         return ""
@@ -3117,26 +3505,7 @@ async def stage3_generate_content(session: ChannelSession, plan: NewActionPlan)
 
     # Build user message
     if plan.target_message:
-        msg_content = plan.target_message.content
-        if not msg_content and plan.target_message.image_description:
-            msg_content = "[posted an image with no text]"
-
-        # Include reply context if target is replying to something outside the buffer
-        if (plan.target_message.reply_context
-                and plan.target_message.reply_to_id):
-            buffer_ids = {m.message_id for m in session.message_buffer}
-            if plan.target_message.reply_to_id not in buffer_ids:
-                quote = plan.target_message.reply_context[:200]
-                if len(plan.target_message.reply_context) > 200:
-                    quote += "..."
-                user_message = (
-                    f'{plan.target_user_name} (replying to '
-                    f'{plan.target_message.reply_context_author}: "{quote}"): {msg_content}'
-                )
-            else:
-                user_message = f"{plan.target_user_name}: {msg_content}"
-        else:
-            user_message = f"{plan.target_user_name}: {msg_content}"
+        user_message = build_target_user_message(session, plan.target_message, plan.target_user_name)
     else:
         user_message = "The chat has been active. Join in naturally with a brief comment."
 
@@ -3210,7 +3579,9 @@ async def stage3_generate_content(session: ChannelSession, plan: NewActionPlan)
         context_messages=heated_context_msgs,
         trigger_author=plan.target_user_name,
         max_tokens=mood_max_tokens,
-        skip_rag=(plan.reason == "bored_interjection" and bool(plan.rag_context))
+        skip_rag=(plan.reason == "bored_interjection" and bool(plan.rag_context)),
+        on_text=on_text,
+        session=session
     )
 
     logger.info(f"Stage 3: Generated {len(response) if response else 0} chars for {plan.reason}")
@@ -3542,6 +3913,166 @@ async def stage4_execute(
         return None
 
 
+def _plan_invalidated(session: ChannelSession, plan: NewActionPlan) -> Optional[str]:
+    """
+    Why a plan made on an earlier tick shouldn't be delivered any more, or None.
+
+    Checked while the reply streams and before each part is sent: the
+    presence loop keeps observing meanwhile, so the chat may have moved on.
+    """
+    if not bot_posting_enabled:
+        return "posting disabled"
+    target = plan.target_message
+    if (target and not plan.execute_diva_mute
+            and target.message_id not in session.responded_to_message_ids  # a part was already sent
+            and not any(m.message_id == target.message_id for m in session.message_buffer)):
+        return "target message scrolled out of the buffer"
+    return None
+
+
+async def _send_response_parts(session: ChannelSession, plan: NewActionPlan, parts: asyncio.Queue):
+    """Send ResponseParts from `parts` with stage4_execute as they arrive, until None."""
+    sent = 0
+    while True:
+        part = await parts.get()
+        if part is None:
+            break
+        if not part.content:
+            continue
+        invalidated = _plan_invalidated(session, plan)
+        if invalidated:
+            logger.info(f"Stage 4: Dropping remaining parts ({plan.reason}): {invalidated}")
+            break
+        # Brief delay between messages (heated = rapid-fire)
+        if sent:
+            await asyncio.sleep(0.5)
+        await stage4_execute(
+            session, plan, part.content,
+            override_target=part.target_message
+        )
+        sent += 1
+    logger.info(f"Multi-message ({session.mood.value}): sent {sent} parts")
+
+
+async def respond_to_plan(session: ChannelSession, plan: NewActionPlan):
+    """
+    Stages 3 and 4 for a plan from Stage 2, run as session.response_task.
+
+    Runs alongside the presence loop, which keeps observing (typing events,
+    new messages, triggers) while Claude generates. session.reset() cancels
+    it, which cancels the Claude request in flight.
+    """
+    try:
+        # Wait if target user is still typing (avoid responding to partial message blocks)
+        if plan.target_user_id and plan.target_user_id in session.users_typing:
+            wait_start = datetime.now().timestamp()
+            while (datetime.now().timestamp() - wait_start) < session.TYPING_WAIT_MAX_SECONDS:
+                now = datetime.now().timestamp()
+                last_typed = session.users_typing.get(plan.target_user_id)
+                if last_typed is None or (now - last_typed) > session.TYPING_STALE_SECONDS:
+                    break
+                await asyncio.sleep(0.5)
+            waited = datetime.now().timestamp() - wait_start
+            if waited > 0.5:
+                logger.info(f"Typing wait: {waited:.1f}s for {plan.target_user_name}")
+            # Flush any new messages that arrived during the wait into the buffer
+            # (the lock keeps this from interleaving with a Stage 1 still running)
+            async with session.observe_lock:
+                bot_id = client.user.id
+                now = datetime.now().timestamp()
+                for msg in session.pending_messages:
+                    buffered = BufferedMessage(
+                        message_id=msg.id,
+                        author_id=msg.author.id,
+                        author_name=msg.author.display_name,
+                        content=msg.content,
+                        timestamp=msg.created_at.timestamp() if hasattr(msg.created_at, 'timestamp') else now,
+                        is_bot=(msg.author.id == bot_id),
+                        reply_to_id=msg.message_reference.message_id if msg.message_reference else None,
+                        message_obj=msg
+                    )
+                    if buffered.reply_to_id:
+                        _resolve_reply_context(buffered, session, msg)
+                    session.add_message(buffered)
+                session.pending_messages.clear()
+
+        # Check if heated multi-message mode
+        unique_users = set(m.author_name for m in session.message_buffer if not m.is_bot)
+        use_heated_multi = (
+            session.mood in (MoodState.HEATED, MoodState.ENGAGED) and
+            len(unique_users) > 1
+        )
+
+        # Multi-message parts go through a queue to a sender task, so with
+        # streaming the first part is typed and sent while Claude is still
+        # writing the rest
+        parser = None
+        parts: asyncio.Queue = asyncio.Queue()
+        sender = None
+        if use_heated_multi:
+            max_msgs = MOOD_MAX_RESPONSE_MESSAGES.get(session.mood.value, 1)
+            parser = StreamingResponseParser(buffered_to_context_messages(session.message_buffer), max_msgs)
+            sender = asyncio.create_task(_send_response_parts(session, plan, parts))
+
+        invalidated = None
+
+        def on_text(chunk: str) -> bool:
+            """Streamed text: queue finished parts; True stops the stream."""
+            nonlocal invalidated
+            invalidated = _plan_invalidated(session, plan)
+            if invalidated:
+                return True
+            if parser:
+                for part in parser.feed(chunk):
+                    parts.put_nowait(part)
+                return parser.done
+            return False
+
+        try:
+            # Stage 3: Content Generation
+            content = await stage3_generate_content(
+                session, plan, on_text=on_text if STREAM_RESPONSES else None
+            )
+
+            # Stage 4: Execution
+            invalidated = invalidated or _plan_invalidated(session, plan)
+            if invalidated:
+                logger.info(f"Stage 4: Dropping response ({plan.reason}): {invalidated}")
+            elif content:
+                if parser:
+                    for part in parser.finish(content):
+                        parts.put_nowait(part)
+                else:
+                    # Normal single-message path
+                    await stage4_execute(session, plan, content)
+
+                # Track bored interjection timing for rate limiting
+                if plan.reason == "bored_interjection":
+                    session.last_bored_interjection_time = datetime.now().timestamp()
+
+            if sender:
+                parts.put_nowait(None)
+                await sender
+        finally:
+            if sender and not sender.done():
+                sender.cancel()
+    except asyncio.CancelledError:
+        logger.info(f"Response to {plan.target_user_name or plan.reason} cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Response task error: {e}", exc_info=True)
+    finally:
+        # Always clear the lock, even on error or cancellation (unless a
+        # reset already handed the session to a newer response)
+        if session.response_task is None or session.response_task is asyncio.current_task():
+            session.is_processing = False
+            session.response_task = None
+            # Triggers that arrived during the response shouldn't wait for
+            # the next message to be looked at
+            if session.priority_triggers or session.observed_while_busy:
+                session.wake_tick()
+
+
 async def presence_loop():
     """
     Main presence loop - runs continuously while bot is active.
@@ -3577,97 +4108,38 @@ async def presence_loop():
                 active_session.reset()
                 continue
 
-            # Skip if no pending messages and time-triggered
-            if not triggered_by_messages and not active_session.pending_messages:
+            # Skip if time-triggered and nothing is waiting: no pending messages,
+            # no queued triggers, nothing observed during a response left for Stage 2
+            if (not triggered_by_messages and not active_session.pending_messages
+                    and not active_session.priority_triggers
+                    and not active_session.observed_while_busy):
                 continue
 
+            # Stage 1: Observation - keeps running while a response is in flight,
+            # so triggers seen meanwhile wait in session.priority_triggers; the
+            # response task wakes the loop for them when it finishes
+            async with active_session.observe_lock:
+                delta = await stage1_observe(active_session)
+
             # Skip action selection if already processing a response
             # (prevents race condition where new tick starts before previous response sends)
             if active_session.is_processing:
-                logger.debug("Tick skipped: already processing a response")
+                logger.debug("Tick observed only: already processing a response")
+                if delta.new_messages:
+                    active_session.observed_while_busy = True
                 continue
-
-            # Stage 1: Observation
-            delta = await stage1_observe(active_session)
+            active_session.observed_while_busy = False
 
             # Stage 2: Action Selection
             plan = await stage2_select_action(active_session, delta)
 
             if plan.should_act:
-                # Set processing lock before generation starts
+                # Set processing lock before generation starts; the response
+                # task clears it when it finishes
                 active_session.is_processing = True
-                try:
-                    # Wait if target user is still typing (avoid responding to partial message blocks)
-                    if plan.target_user_id and plan.target_user_id in active_session.users_typing:
-                        wait_start = datetime.now().timestamp()
-                        while (datetime.now().timestamp() - wait_start) < active_session.TYPING_WAIT_MAX_SECONDS:
-                            now = datetime.now().timestamp()
-                            last_typed = active_session.users_typing.get(plan.target_user_id)
-                            if last_typed is None or (now - last_typed) > active_session.TYPING_STALE_SECONDS:
-                                break
-                            await asyncio.sleep(0.5)
-                        waited = datetime.now().timestamp() - wait_start
-                        if waited > 0.5:
-                            logger.info(f"Typing wait: {waited:.1f}s for {plan.target_user_name}")
-                        # Flush any new messages that arrived during the wait into the buffer
-                        if active_session.pending_messages:
-                            bot_id = client.user.id
-                            now = datetime.now().timestamp()
-                            for msg in active_session.pending_messages:
-                                buffered = BufferedMessage(
-                                    message_id=msg.id,
-                                    author_id=msg.author.id,
-                                    author_name=msg.author.display_name,
-                                    content=msg.content,
-                                    timestamp=msg.created_at.timestamp() if hasattr(msg.created_at, 'timestamp') else now,
-                                    is_bot=(msg.author.id == bot_id),
-                                    reply_to_id=msg.message_reference.message_id if msg.message_reference else None,
-                                    message_obj=msg
-                                )
-                                if buffered.reply_to_id:
-                                    _resolve_reply_context(buffered, active_session, msg)
-                                active_session.add_message(buffered)
-                            active_session.pending_messages.clear()
-
-                    # Stage 3: Content Generation
-                    content = await stage3_generate_content(active_session, plan)
-
-                    # Stage 4: Execution
-                    if content:
-                        # Check if heated multi-message mode
-                        unique_users = set(m.author_name for m in active_session.message_buffer if not m.is_bot)
-                        use_heated_multi = (
-                            active_session.mood in (MoodState.HEATED, MoodState.ENGAGED) and
-                            len(unique_users) > 1
-                        )
-
-                        if use_heated_multi:
-                            # Parse into multiple parts and send sequentially
-                            max_msgs = MOOD_MAX_RESPONSE_MESSAGES.get(active_session.mood.value, 1)
-                            context_msgs = buffered_to_context_messages(active_session.message_buffer)
-                            response_parts = parse_structured_response(content, context_msgs)[:max_msgs]
-
-                            logger.info(f"Multi-message ({active_session.mood.value}): {len(response_parts)} parts from response")
-
-                            for i, part in enumerate(response_parts):
-                                if part.content:
-                                    await stage4_execute(
-                                        active_session, plan, part.content,
-                                        override_target=part.target_message
-                                    )
-                                    # Brief delay between messages (heated = rapid-fire)
-                                    if i < len(response_parts) - 1:
-                                        await asyncio.sleep(0.5)
-                        else:
-                            # Normal single-message path
-                            await stage4_execute(active_session, plan, content)
-
-                        # Track bored interjection timing for rate limiting
-                        if plan.reason == "bored_interjection":
-                            active_session.last_bored_interjection_time = datetime.now().timestamp()
-                finally:
-                    # Always clear the lock, even on error
-                    active_session.is_processing = False
+                active_session.response_task = asyncio.create_task(
+                    respond_to_plan(active_session, plan)
+                )
 
         except Exception as e:
             logger.error(f"Presence loop error: {e}", exc_info=True)
@@ -3789,9 +4261,9 @@ async def on_message_create(event: MessageCreate):
                 'char_length': len(message.content),
                 'word_count': len(message.content.split()),
             }
-            asyncio.create_task(embed_live_message(str(message.id), message.content, metadata))
+            await embed_live_message(str(message.id), message.content, metadata)
         except Exception as e:
-            logger.debug(f"Live embed scheduling failed: {e}")
+            logger.debug(f"Live embed queueing failed: {e}")
 
     if not bot_posting_enabled:
         return
@@ -3866,7 +4338,40 @@ async def status_cmd(ctx: SlashContext):
               f"Model: RAG+Vader+Claude",
         inline=True
     )
-    
+
+    embed.add_field(
+        name="Claude Requests",
+        value=claude_stats.format(),
+        inline=False
+    )
+
+    rag_cache = get_cache_stats()
+    if rag_cache is not None:
+        def _hit_rate(hits, misses):
+            return f"{hits / (hits + misses):.0%}" if hits + misses else "n/a"
+        embed.add_field(
+            name="RAG Cache",
+            value=f"Embeddings: {_hit_rate(rag_cache['embedding_hits'], rag_cache['embedding_misses'])} hits "
+                  f"({rag_cache['embedding_hits']}/{rag_cache['embedding_hits'] + rag_cache['embedding_misses']}), "
+                  f"{rag_cache['embedding_cache_size']} cached\n"
+                  f"Results: {_hit_rate(rag_cache['result_hits'], rag_cache['result_misses'])} hits "
+                  f"({rag_cache['result_hits']}/{rag_cache['result_hits'] + rag_cache['result_misses']}), "
+                  f"{rag_cache['result_cache_size']} cached\n"
+                  f"Expired: {rag_cache['result_expired']} | Invalidated: {rag_cache['result_invalidated']}",
+            inline=False
+        )
+
+    live_embed = get_live_embedding_stats()
+    if live_embed is not None and (live_embed['queued'] or live_embed['dropped']):
+        embed.add_field(
+            name="Live Embedding",
+            value=f"Embedded: {live_embed['embedded']} in {live_embed['batches']} batches "
+                  f"(avg {live_embed['avg_batch']}, last {live_embed['last_batch_ms']:.0f}ms)\n"
+                  f"Pending: {live_embed['pending']} | Coalesced: {live_embed['coalesced']} | "
+                  f"Dropped: {live_embed['dropped']} | Failed: {live_embed['failed']}",
+            inline=False
+        )
+
     await ctx.send(embed=embed, ephemeral=True)
 
 
@@ -3,15 +3,24 @@ Bad Word Scanner Module
 Searches the analytics database for messages containing specified bad words
 and exports message IDs for targeted deletion.
 
+Candidates come from the messages_fts index and are checked by several
+processes in parallel; results are streamed to a JSONL file. Years moved
+to archive/messages_<year>.db partitions (scripts/archive_messages.py)
+are scanned too, each with its own index.
+
 Enhanced to integrate with the moderation database for pattern learning.
 """
 
-import sqlite3
-import json
+import os
 import re
-from datetime import datetime
+import json
+import time
+import sqlite3
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+from itertools import islice
 from pathlib import Path
-from typing import Optional, List
+from typing import Iterator, Optional, List
 
 # Import from your existing analytics module
 DB_PATH = "discord_analytics.db"
@@ -32,8 +41,8 @@ BAD_WORDS = [
     # "another_phrase",
 ]
 
-# Output file for flagged message IDs
-OUTPUT_FILE = "flagged_messages.json"
+# Output file for flagged messages (JSON Lines, one message per line)
+OUTPUT_FILE = "flagged_messages.jsonl"
 
 
 def sync_bad_words_to_moderation_db(words: List[str], severity: int = 3):
@@ -47,13 +56,213 @@ def sync_bad_words_to_moderation_db(words: List[str], severity: int = 3):
     print(f"Synced {added} new words to moderation database")
 
 
-def get_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DB_PATH)
+def get_connection(db_path: str = None):
+    """Get a read-only database connection."""
+    path = Path(db_path or DB_PATH).resolve()
+    conn = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True)
     conn.row_factory = sqlite3.Row
     return conn
 
 
+# ============== CANDIDATE PREFILTER ==============
+# Checking every message against every word in Python is what made the
+# old scan slow. Instead, messages_fts (the full-text index common/db.py
+# keeps on `messages`) narrows the archive down to messages that could
+# contain a word, and only those are checked with the regex.
+#
+# The index stores whole tokens, but words are matched as substrings
+# ("ass" also flags "class"). So each token of a word is looked up in the
+# index vocabulary, and the candidates are messages containing some
+# indexed token that has it inside. That finds every message the regex
+# would flag. Tokens shorter than MIN_INDEX_TOKEN, or found inside more
+# than MAX_INDEX_TERMS indexed tokens, narrow nothing down and are not
+# used; if a word has no usable token, every message is checked.
+
+MIN_INDEX_TOKEN = 3
+MAX_INDEX_TERMS = 2000
+
+# Rows of `messages` (by id) per unit of work handed to a scanner process
+SCAN_CHUNK_ROWS = 50_000
+
+
+def _fts_tokenizer(conn, schema: str = 'main') -> Optional[str]:
+    """The tokenize= option of schema.messages_fts, or None if the index can't be used yet."""
+    if schema == 'main':
+        # Partition files get their index before any rows; only the hot
+        # file's index has to be backfilled before it's complete
+        try:
+            backfilled = conn.execute(
+                "SELECT value FROM db_meta WHERE key = 'fts_backfilled'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        if not backfilled:
+            return None
+    row = conn.execute(
+        f"SELECT sql FROM {schema}.sqlite_master WHERE type = 'table' AND name = 'messages_fts'"
+    ).fetchone()
+    if not row:
+        return None
+    match = re.search(r"tokenize\s*=\s*'([^']*)'", row[0])
+    return match.group(1) if match else 'unicode61'
+
+
+def _index_tokens(text: str, tokenizer: str) -> List[str]:
+    """`text` split into tokens the same way messages_fts tokenizes content."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE t USING fts5(content, tokenize='{tokenizer}')")
+        conn.execute("CREATE VIRTUAL TABLE v USING fts5vocab(t, instance)")
+        conn.execute("INSERT INTO t (content) VALUES (?)", (text,))
+        return [row[0] for row in conn.execute("SELECT term FROM v ORDER BY offset")]
+    finally:
+        conn.close()
+
+
+def build_candidate_query(conn, words: List[str], schema: str = 'main') -> Optional[str]:
+    """
+    FTS5 MATCH expression for messages in schema.messages that may
+    contain any of `words`.
+
+    Returns:
+        The expression; '' if no indexed message can contain any word;
+        None if the index can't narrow the search (check every message).
+    """
+    tokenizer = _fts_tokenizer(conn, schema)
+    if tokenizer is None:
+        return None
+    try:
+        word_tokens = {word: [t for t in _index_tokens(word, tokenizer) if len(t) >= MIN_INDEX_TOKEN]
+                       for word in words}
+    except sqlite3.OperationalError:
+        return None  # no FTS5 in this sqlite build
+    if not all(word_tokens.values()):
+        return None
+
+    # One pass over the index vocabulary for all tokens at once
+    needles = {t for tokens in word_tokens.values() for t in tokens}
+    containing = {t: [] for t in needles}
+    vocab = f"bws_vocab_{schema}"
+    conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS temp.{vocab} USING fts5vocab({schema}, messages_fts, row)")
+    for (term,) in conn.execute(f"SELECT term FROM temp.{vocab}"):
+        for needle in needles:
+            if needle in term:
+                containing[needle].append(term)
+
+    clauses = []
+    for word, tokens in word_tokens.items():
+        if any(not containing[t] for t in tokens):
+            continue  # some token of the word appears nowhere
+        groups = [containing[t] for t in tokens if len(containing[t]) <= MAX_INDEX_TERMS]
+        if not groups:
+            return None
+        clauses.append(' AND '.join(
+            '(' + ' OR '.join(f'"{term}"' for term in group) + ')' for group in groups
+        ))
+    return ' OR '.join(f'({clause})' for clause in clauses)
+
+
+def _date_bounds(date_after: str = None, date_before: str = None):
+    """YYYY-MM-DD bounds (both days included, UTC) as a [since, until) unix range."""
+    since = until = None
+    if date_after:
+        since = datetime.strptime(date_after, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    if date_before:
+        day = datetime.strptime(date_before, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        until = (day + timedelta(days=1)).timestamp()
+    return since, until
+
+
+# ============== ARCHIVE PARTITIONS ==============
+# common/db.py can move old years out of the hot file into
+# archive/messages_<year>.db next to it, listed in `archive_partitions`.
+# Each partition has its own `messages` and messages_fts and is scanned
+# as a schema of its own, attached read-only like common/db.py does.
+
+def _archive_partitions(conn, db_path: str, since: float = None, until: float = None) -> List[tuple]:
+    """(schema, file path) of the partitions overlapping [since, until), oldest first."""
+    try:
+        rows = conn.execute("""
+            SELECT year, file_name FROM archive_partitions
+            WHERE (? IS NULL OR max_ts >= ?) AND (? IS NULL OR min_ts < ?)
+            ORDER BY year
+        """, (since, since, until, until)).fetchall()
+    except sqlite3.OperationalError:
+        return []  # never archived
+    partitions = []
+    for year, file_name in rows:
+        path = Path(db_path).parent / "archive" / file_name
+        if not path.exists():
+            print(f"⚠️  Archive partition {path} is missing, its messages are not scanned")
+            continue
+        partitions.append((f"cold_{year}", str(path)))
+    return partitions
+
+
+def _attach(conn, partitions: List[tuple]):
+    for schema, path in partitions:
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"file:{Path(path).as_posix()}?mode=ro",))
+
+
+# ============== PARALLEL VERIFICATION ==============
+# Scanner processes each take a range of `messages` ids in one database
+# (the hot file or a partition), fetch the candidates in it and check
+# them against the words. This process writes the results to the JSONL
+# file as ranges finish.
+
+_worker = {}
+
+
+def _scan_worker_init(db_path: str, partitions: List[tuple], words: List[str], matches: dict,
+                      filters: str, params: list):
+    conn = get_connection(db_path)
+    _attach(conn, partitions)
+    columns = ("m.message_id, m.channel_id, m.channel_name, m.author_id, "
+               "m.author_name, m.content, m.timestamp")
+    queries = {}
+    for schema, match in matches.items():
+        if match is None:
+            sql = f"SELECT {columns} FROM {schema}.messages m WHERE m.id BETWEEN ? AND ? AND {filters}"
+            head = []
+        else:
+            sql = f"""
+                SELECT {columns}
+                FROM {schema}.messages_fts JOIN {schema}.messages m ON m.id = messages_fts.rowid
+                WHERE messages_fts MATCH ? AND messages_fts.rowid BETWEEN ? AND ? AND {filters}
+            """
+            head = [match]
+        queries[schema] = (sql, head)
+    _worker.update(
+        conn=conn, queries=queries, params=params,
+        # One pass to rule a message out, then one per word for the counts
+        any_word=re.compile('|'.join(re.escape(w) for w in words), re.IGNORECASE),
+        patterns=[(w, re.compile(re.escape(w), re.IGNORECASE)) for w in words],
+    )
+
+
+def _scan_range(id_range) -> tuple:
+    """Check the candidates in schema with ids in [lo, hi]. Returns (checked, flagged records)."""
+    schema, lo, hi = id_range
+    sql, head = _worker['queries'][schema]
+    checked, flagged = 0, []
+    for row in _worker['conn'].execute(sql, [*head, lo, hi, *_worker['params']]):
+        checked += 1
+        content = row["content"]
+        if not _worker['any_word'].search(content):
+            continue
+        flagged.append({
+            "message_id": str(row["message_id"]),
+            "channel_id": str(row["channel_id"]),
+            "channel_name": row["channel_name"],
+            "author_id": str(row["author_id"]),
+            "author_name": row["author_name"],
+            "content": content[:500],  # Truncate long messages
+            "timestamp": row["timestamp"],
+            "matched_words": [w for w, pattern in _worker['patterns'] if pattern.search(content)],
+        })
+    return checked, flagged
+
+
 def search_bad_words(
     bad_words: list = None,
     output_file: str = None,
@@ -62,179 +271,195 @@ def search_bad_words(
     author_filter: list = None,
     date_after: str = None,
     date_before: str = None,
+    workers: int = None,
 ) -> dict:
     """
     Search for messages containing any of the specified bad words.
-    
+
+    Flagged messages are written to output_file as JSON Lines (one
+    message per line) while the scan runs; read them back with
+    iter_flagged_messages() or the helpers below.
+
     Args:
         bad_words: List of words/phrases to search for (uses BAD_WORDS if None)
-        output_file: Path to output JSON file (uses OUTPUT_FILE if None)
+        output_file: Path to output JSONL file (uses OUTPUT_FILE if None)
         include_bots: Whether to include bot messages
         channel_filter: List of channel IDs to limit search to
         author_filter: List of author IDs to limit search to
-        date_after: Only include messages after this date (YYYY-MM-DD)
-        date_before: Only include messages before this date (YYYY-MM-DD)
-    
+        date_after: Only include messages on or after this date (YYYY-MM-DD, UTC)
+        date_before: Only include messages on or before this date (YYYY-MM-DD, UTC)
+        workers: Scanner processes (default: CPU count)
+
     Returns:
-        Dictionary with statistics and flagged message details
+        Dictionary with scan statistics (the messages are in output_file)
     """
     words = bad_words or BAD_WORDS
     output = output_file or OUTPUT_FILE
-    
+
     if not words:
         print("⚠️  No bad words configured. Add words to BAD_WORDS list or pass them as argument.")
         return {"error": "No bad words configured"}
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Build the base query
-    conditions = []
+
+    # Build the filters
+    conditions = ["m.content != ''"]
     params = []
-    
+
     # Bot filter
     if not include_bots:
-        conditions.append("author_bot = 0")
-    
+        conditions.append("m.author_bot = 0")
+
     # Channel filter
     if channel_filter:
         placeholders = ','.join('?' * len(channel_filter))
-        conditions.append(f"channel_id IN ({placeholders})")
-        params.extend(channel_filter)
-    
+        conditions.append(f"m.channel_id IN ({placeholders})")
+        params.extend(str(c) for c in channel_filter)
+
     # Author filter
     if author_filter:
         placeholders = ','.join('?' * len(author_filter))
-        conditions.append(f"author_id IN ({placeholders})")
-        params.extend(author_filter)
-    
-    # Date filters
-    if date_after:
-        conditions.append("DATE(timestamp) >= ?")
-        params.append(date_after)
-    
-    if date_before:
-        conditions.append("DATE(timestamp) <= ?")
-        params.append(date_before)
-    
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
-    
-    query = f"""
-        SELECT 
-            message_id,
-            channel_id,
-            channel_name,
-            author_id,
-            author_name,
-            content,
-            timestamp
-        FROM messages
-        WHERE {where_clause} AND content != ''
-    """
-    
-    cursor.execute(query, params)
-    
-    # Process results
+        conditions.append(f"m.author_id IN ({placeholders})")
+        params.extend(str(a) for a in author_filter)
+
+    # Date filters, on the indexed unix timestamp
+    since, until = _date_bounds(date_after, date_before)
+    if since is not None:
+        conditions.append("m.timestamp_unix >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("m.timestamp_unix < ?")
+        params.append(until)
+
+    db_path = str(Path(DB_PATH).resolve())
+    conn = get_connection(db_path)
+    try:
+        partitions = _archive_partitions(conn, db_path, since, until)
+        _attach(conn, partitions)
+        # Each database is narrowed down with its own index
+        matches, ranges = {}, []
+        for schema in ['main', *(schema for schema, _ in partitions)]:
+            match = matches[schema] = build_candidate_query(conn, words, schema)
+            min_id, max_id = conn.execute(f"SELECT MIN(id), MAX(id) FROM {schema}.messages").fetchone()
+            if min_id is not None and match != '':
+                ranges.extend((schema, lo, min(lo + SCAN_CHUNK_ROWS - 1, max_id))
+                              for lo in range(min_id, max_id + 1, SCAN_CHUNK_ROWS))
+    finally:
+        conn.close()
+
+    prefilters = {"full scan" if match is None else "messages_fts" for match in matches.values()}
     results = {
         "scan_time": datetime.now().isoformat(),
         "bad_words_searched": words,
+        "prefilter": " + ".join(sorted(prefilters, reverse=True)),
+        "archive_partitions": [schema for schema, _ in partitions],
         "total_messages_scanned": 0,
         "total_flagged": 0,
-        "flagged_by_word": {},
-        "flagged_messages": []
+        "flagged_by_word": {word: 0 for word in words},
+        "output_file": output,
     }
-    
-    # Initialize word counters
-    for word in words:
-        results["flagged_by_word"][word] = 0
-    
-    # Create case-insensitive patterns for each word
-    patterns = {word: re.compile(re.escape(word), re.IGNORECASE) for word in words}
-    
-    seen_message_ids = set()  # Avoid duplicates
-    
-    for row in cursor:
-        results["total_messages_scanned"] += 1
-        content = row["content"]
-        message_id = row["message_id"]
-        
-        # Check each bad word
-        matched_words = []
-        for word, pattern in patterns.items():
-            if pattern.search(content):
-                matched_words.append(word)
-                results["flagged_by_word"][word] += 1
-        
-        # If any matches and not already seen
-        if matched_words and message_id not in seen_message_ids:
-            seen_message_ids.add(message_id)
-            results["total_flagged"] += 1
-            
-            results["flagged_messages"].append({
-                "message_id": message_id,
-                "channel_id": row["channel_id"],
-                "channel_name": row["channel_name"],
-                "author_id": row["author_id"],
-                "author_name": row["author_name"],
-                "content": content[:500],  # Truncate long messages
-                "timestamp": row["timestamp"],
-                "matched_words": matched_words
-            })
-    
-    conn.close()
-    
-    # Save results to file
-    with open(output, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
-    
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ranges) or 1))
+    initargs = (db_path, partitions, words, matches, " AND ".join(conditions), params)
+
+    started = time.time()
+    with open(output, 'w', encoding='utf-8') as out:
+        if workers == 1:
+            _scan_worker_init(*initargs)
+            chunks = map(_scan_range, ranges)
+            pool = None
+        else:
+            # Spawn, not fork, so this also works when called from the bot process
+            ctx = multiprocessing.get_context('spawn')
+            pool = ctx.Pool(workers, initializer=_scan_worker_init, initargs=initargs)
+            chunks = pool.imap(_scan_range, ranges)
+        try:
+            for checked, flagged in chunks:
+                results["total_messages_scanned"] += checked
+                results["total_flagged"] += len(flagged)
+                for record in flagged:
+                    for word in record["matched_words"]:
+                        results["flagged_by_word"][word] += 1
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            elif _worker:
+                _worker.pop('conn').close()
+
     print(f"\n{'='*50}")
     print(f"BAD WORD SCAN RESULTS")
     print(f"{'='*50}")
+    print(f"Candidates: {results['prefilter']} ({workers} process{'es' if workers > 1 else ''}, "
+          f"{time.time() - started:.1f}s)")
+    if partitions:
+        print(f"Archive partitions: {len(partitions)}")
     print(f"Total messages scanned: {results['total_messages_scanned']:,}")
     print(f"Total flagged: {results['total_flagged']:,}")
     print(f"\nBreakdown by word:")
     for word, count in results["flagged_by_word"].items():
         print(f"  • '{word}': {count:,} matches")
     print(f"\nResults saved to: {output}")
-    
+
     return results
 
 
+# ============== READING RESULTS ==============
+
+def iter_flagged_messages(input_file: str = None) -> Iterator[dict]:
+    """
+    Yield the flagged messages from a scan results file, one at a time.
+
+    Reads the JSONL written by search_bad_words(); a .json file from an
+    older scan (one document with a "flagged_messages" list) also works.
+
+    Args:
+        input_file: Path to the scan results file (uses OUTPUT_FILE if None)
+    """
+    input_path = input_file or OUTPUT_FILE
+
+    with open(input_path, 'r', encoding='utf-8') as f:
+        if Path(input_path).suffix == '.json':
+            yield from json.load(f).get("flagged_messages", [])
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
 def get_message_ids_only(input_file: str = None) -> list:
     """
     Extract just the message IDs from a scan results file.
     Useful for passing to deletion commands.
     
     Args:
-        input_file: Path to the scan results JSON file
+        input_file: Path to the scan results file
     
     Returns:
         List of message ID strings
     """
-    input_path = input_file or OUTPUT_FILE
-    
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    return [msg["message_id"] for msg in data.get("flagged_messages", [])]
+    return [msg["message_id"] for msg in iter_flagged_messages(input_file)]
 
 
-def export_message_ids_txt(input_file: str = None, output_file: str = "message_ids.txt"):
+def export_message_ids_txt(input_file: str = None, output_file: str = "message_ids.txt") -> int:
     """
     Export just the message IDs to a simple text file (one per line).
     
     Args:
-        input_file: Path to the scan results JSON file
+        input_file: Path to the scan results file
         output_file: Path to output text file
+
+    Returns:
+        Number of IDs written
     """
-    message_ids = get_message_ids_only(input_file)
-    
+    count = 0
     with open(output_file, 'w') as f:
-        for msg_id in message_ids:
-            f.write(msg_id + '\n')
+        for msg in iter_flagged_messages(input_file):
+            f.write(msg["message_id"] + '\n')
+            count += 1
     
-    print(f"Exported {len(message_ids)} message IDs to {output_file}")
-    return message_ids
+    print(f"Exported {count} message IDs to {output_file}")
+    return count
 
 
 def group_by_channel(input_file: str = None) -> dict:
@@ -244,13 +469,8 @@ def group_by_channel(input_file: str = None) -> dict:
     Returns:
         Dictionary mapping channel_id -> list of message_ids
     """
-    input_path = input_file or OUTPUT_FILE
-    
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
     by_channel = {}
-    for msg in data.get("flagged_messages", []):
+    for msg in iter_flagged_messages(input_file):
         channel_id = msg["channel_id"]
         if channel_id not in by_channel:
             by_channel[channel_id] = {
@@ -272,21 +492,16 @@ def preview_flagged(input_file: str = None, limit: int = 10):
     Preview flagged messages before deletion.
     
     Args:
-        input_file: Path to the scan results JSON file
+        input_file: Path to the scan results file
         limit: Number of messages to preview
     """
-    input_path = input_file or OUTPUT_FILE
-    
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    messages = data.get("flagged_messages", [])
+    messages = list(islice(iter_flagged_messages(input_file), limit))
     
     print(f"\n{'='*60}")
-    print(f"PREVIEW: First {min(limit, len(messages))} flagged messages")
+    print(f"PREVIEW: First {len(messages)} flagged messages")
     print(f"{'='*60}\n")
     
-    for i, msg in enumerate(messages[:limit], 1):
+    for i, msg in enumerate(messages, 1):
         print(f"[{i}] #{msg['channel_name']} | {msg['author_name']} | {msg['timestamp'][:10]}")
         print(f"    Words: {', '.join(msg['matched_words'])}")
         print(f"    Content: {msg['content'][:100]}...")
@@ -302,7 +517,7 @@ def export_as_training_samples(input_file: str = None, label: str = "bad"):
     This helps the content analyzer learn patterns from historical bad messages.
     
     Args:
-        input_file: Path to flagged messages JSON
+        input_file: Path to the scan results file
         label: Label for training ('bad' or 'good')
     """
     if not MDB_AVAILABLE:
@@ -315,13 +530,9 @@ def export_as_training_samples(input_file: str = None, label: str = "bad"):
         print(f"❌ File not found: {input_path}")
         return 0
     
-    with open(input_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    messages = data.get('flagged_messages', [])
     imported = 0
     
-    for msg in messages:
+    for msg in iter_flagged_messages(input_path):
         content = msg.get('content', '')
         if content and len(content) > 10:  # Skip very short messages
             mdb.add_training_sample(content, label, 'scanner_export')
@@ -336,7 +547,8 @@ def full_workflow(
     export_dir: str = None,
     sync_to_moderation: bool = True,
     export_training: bool = True,
-    preview_count: int = 5
+    preview_count: int = 5,
+    workers: int = None
 ):
     """
     Run the complete bad word scanning workflow:
@@ -352,6 +564,7 @@ def full_workflow(
         sync_to_moderation: Whether to sync words to moderation DB
         export_training: Whether to export results as training samples
         preview_count: Number of messages to preview
+        workers: Scanner processes (default: CPU count)
     """
     print("="*60)
     print("BAD WORD SCANNER - FULL WORKFLOW")
@@ -378,7 +591,7 @@ def full_workflow(
     
     # Step 3: Scan for bad words
     print("\n[3/5] Scanning for bad words...")
-    results = search_bad_words(bad_words=bad_words)
+    results = search_bad_words(bad_words=bad_words, workers=workers)
     
     # Step 4: Export as training samples
     if export_training and results.get('total_flagged', 0) > 0:
@@ -404,7 +617,7 @@ Results:
   • Saved to: {OUTPUT_FILE}
   
 Next steps:
-  • Review flagged_messages.json
+  • Review {OUTPUT_FILE}
   • Use /purge_flagged in Discord to delete
   • Or run: python -c "from bad_word_scanner import group_by_channel; group_by_channel()"
 """)
@@ -426,6 +639,7 @@ if __name__ == "__main__":
     parser.add_argument("--preview", type=int, default=5, help="Number of results to preview")
     parser.add_argument("--no-sync", action="store_true", help="Skip syncing to moderation DB")
     parser.add_argument("--no-training", action="store_true", help="Skip exporting as training samples")
+    parser.add_argument("--workers", type=int, help="Scanner processes (default: CPU count)")
     
     args = parser.parse_args()
     
@@ -462,5 +676,6 @@ if __name__ == "__main__":
         export_dir=args.import_dir,
         sync_to_moderation=not args.no_sync,
         export_training=not args.no_training,
-        preview_count=args.preview
+        preview_count=args.preview,
+        workers=args.workers
     )
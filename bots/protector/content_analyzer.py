@@ -9,9 +9,10 @@ Analyzes message content using:
 
 import re
 import json
-from typing import Dict, List, Tuple, Optional
+import threading
+from typing import Callable, Dict, List, Tuple, Optional
 from collections import Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 # Try to import VADER for sentiment analysis
@@ -23,6 +24,10 @@ except ImportError:
     print("⚠️  vaderSentiment not installed. Run: pip install vaderSentiment")
 
 import common.moderation_db as mdb
+from common.analysis_pipeline import AnalysisPipeline, Stage, any_match
+from common.config import MODERATION_RULES_POLL_SECONDS
+from common.offense_tracker import get_offense_tracker
+from common.term_matcher import TermMatcher
 
 
 @dataclass
@@ -38,11 +43,87 @@ class AnalysisResult:
     should_delete: bool
     should_timeout: bool
     censored_content: str
+    # Learned patterns that matched (also in matched_patterns); pass them
+    # to mdb.moderation_event(counted_patterns=...) to update their stats
+    learned_patterns: List[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class RuleSnapshot:
+    """
+    Bad words and learned patterns from moderation.db, compiled once.
+
+    Never modified after it is built: the analyzer swaps in a whole new
+    snapshot when the rules change, so an analyze() call that is already
+    running keeps a consistent view.
+    """
+    version: int
+    bad_words: Dict[str, int]                          # word -> severity
+    word_matcher: TermMatcher
+    patterns: Tuple[Tuple[re.Pattern, str, float], ...]  # (compiled, pattern, confidence)
+    any_pattern: Callable[[str], bool]                 # whether any of `patterns` matches
+
+    @classmethod
+    def load(cls) -> 'RuleSnapshot':
+        """Read and compile the current rules. Raises if the database can't be read."""
+        # Version first: a change committed while we read is picked up next poll
+        version = mdb.get_rules_version()
+        bad_words = {w['word']: w['severity'] for w in mdb.get_bad_words()}
+        patterns = []
+        for pattern_data in mdb.get_learned_patterns(min_confidence=0.3):
+            try:
+                compiled = re.compile(pattern_data['pattern'], re.IGNORECASE)
+            except re.error:
+                # Invalid regex pattern
+                continue
+            patterns.append((compiled, pattern_data['pattern'], pattern_data['confidence']))
+        return cls(version, bad_words, TermMatcher(bad_words), tuple(patterns),
+                   any_match([p for _, p, _ in patterns], re.IGNORECASE))
+
+    @classmethod
+    def empty(cls) -> 'RuleSnapshot':
+        # version -1 never matches the database, so the watcher retries
+        return cls(-1, {}, TermMatcher([]), (), any_match([]))
+
+
+@dataclass
+class _MessageAnalysis:
+    """One message's working state as it goes through ContentAnalyzer.pipeline."""
+    content: str
+    rules: RuleSnapshot
+    author_id: Optional[str] = None
+    offense_count: Optional[int] = None
+    content_lower: str = ""
+    # Set by the prefilter
+    word_score: float = 0.0
+    word_matches: List[str] = field(default_factory=list)
+    toxicity_hit: bool = False
+    learned_hit: bool = False
+    # Result
+    reasons: List[str] = field(default_factory=list)
+    matched_words: List[str] = field(default_factory=list)
+    matched_patterns: List[str] = field(default_factory=list)
+    learned_patterns: List[str] = field(default_factory=list)
+    toxicity_score: float = 0.0
+    sentiment_score: float = 0.0
+    censored_content: str = None
+
+    def __post_init__(self):
+        # Unchanged unless the censor stage runs
+        self.censored_content = self.content
 
 
 class ContentAnalyzer:
     """
     Analyzes message content for ToS violations using multiple methods.
+
+    Rules come from a RuleSnapshot. The shared instance from get_analyzer()
+    watches moderation.db and swaps in a fresh snapshot when bad words or
+    learned patterns change in any process, so /reload_filter is only
+    needed to apply a change immediately.
+
+    The checks run as stages of self.pipeline, cheapest first, so clean
+    messages stop after the prefilter.
     """
     
     # Severity thresholds
@@ -60,13 +141,11 @@ class ContentAnalyzer:
         if VADER_AVAILABLE:
             self.sentiment_analyzer = SentimentIntensityAnalyzer()
         
-        # Load bad words from database
-        self.bad_words = {}
-        self.load_bad_words()
-        
-        # Load learned patterns
-        self.patterns = []
-        self.load_patterns()
+        # Load bad words and learned patterns from database
+        self._snapshot = RuleSnapshot.empty()
+        self.reload()
+        self._watcher = None
+        self._stop_watching = threading.Event()
         
         # Toxicity indicators (supplementary patterns)
         self.toxicity_patterns = [
@@ -95,38 +174,89 @@ class ContentAnalyzer:
             (re.compile(pattern, re.IGNORECASE), score, category)
             for pattern, score, category in self.toxicity_patterns
         ]
+        self.any_toxicity_pattern = any_match([p for p, _, _ in self.toxicity_patterns], re.IGNORECASE)
+        
+        # Cheap checks first; the rest only run for messages they apply to
+        self.pipeline = AnalysisPipeline([
+            Stage('prefilter', self._stage_prefilter),
+            Stage('bad_words', self._stage_bad_words, when=lambda s: bool(s.word_matches)),
+            Stage('toxicity_patterns', self._stage_toxicity_patterns, when=lambda s: s.toxicity_hit),
+            Stage('learned_patterns', self._stage_learned_patterns, when=lambda s: s.learned_hit),
+            Stage('sentiment', self._stage_sentiment),
+            Stage('repeat_offender', self._stage_repeat_offender),
+            Stage('censor', self._stage_censor, when=lambda s: bool(s.matched_words or s.matched_patterns)),
+        ])
     
-    def load_bad_words(self):
-        """Load bad words from the moderation database."""
-        try:
-            words = mdb.get_bad_words()
-            self.bad_words = {w['word']: w['severity'] for w in words}
-            print(f"Loaded {len(self.bad_words)} bad words")
-        except Exception as e:
-            print(f"⚠️  Could not load bad words: {e}")
-            self.bad_words = {}
+    @property
+    def bad_words(self) -> Dict[str, int]:
+        return self._snapshot.bad_words
+    
+    @property
+    def patterns(self) -> Tuple[Tuple[re.Pattern, str, float], ...]:
+        return self._snapshot.patterns
     
-    def load_patterns(self):
-        """Load learned patterns from database."""
+    def reload(self):
+        """Reload bad words and patterns from database now."""
         try:
-            self.patterns = mdb.get_learned_patterns(min_confidence=0.3)
-            print(f"Loaded {len(self.patterns)} learned patterns")
+            snapshot = RuleSnapshot.load()
         except Exception as e:
-            print(f"⚠️  Could not load patterns: {e}")
-            self.patterns = []
+            # Keep matching with the rules we already have
+            print(f"⚠️  Could not load bad words/patterns: {e}")
+            return
+        self._snapshot = snapshot
+        print(f"Loaded {len(snapshot.bad_words)} bad words, "
+              f"{len(snapshot.patterns)} learned patterns (rules v{snapshot.version})")
     
-    def reload(self):
-        """Reload bad words and patterns from database."""
-        self.load_bad_words()
-        self.load_patterns()
+    def start_watching(self, interval: float = MODERATION_RULES_POLL_SECONDS):
+        """Reload automatically when the rules in moderation.db change."""
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="rules-watcher", daemon=True
+        )
+        self._watcher.start()
+    
+    def stop_watching(self):
+        self._stop_watching.set()
+        self._watcher = None
     
-    def analyze(self, content: str, author_id: str = None) -> AnalysisResult:
+    def _watch(self, interval: float):
+        # Own connection: PRAGMA data_version only changes when *other*
+        # connections commit, and it costs no I/O, so an idle database
+        # is never queried. Any moderation.db write changes it; the
+        # rules_version row then tells whether the rules did.
+        conn = None
+        last_data_version = None
+        while not self._stop_watching.wait(interval):
+            try:
+                if conn is None:
+                    conn = mdb.get_connection()
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == last_data_version:
+                    continue
+                last_data_version = data_version
+                if mdb.get_rules_version() != self._snapshot.version:
+                    self.reload()
+            except Exception as e:
+                print(f"⚠️  Rule watcher: {e}")
+        if conn is not None:
+            conn.close()
+    
+    def analyze(self, content: str, author_id: str = None, offense_count: int = None,
+                full: bool = False) -> AnalysisResult:
         """
         Analyze message content for violations.
+
+        Runs self.pipeline: messages the prefilter finds nothing in come
+        back clean without sentiment, the offense lookup or censoring.
         
         Args:
             content: The message text to analyze
             author_id: Optional user ID for repeat offender checking
+            offense_count: The author's offenses in the last 24h, if the caller
+                tracks them (skips the database lookup for author_id)
+            full: Run every stage even for clean messages (for diagnostics)
         
         Returns:
             AnalysisResult with all analysis details
@@ -138,47 +268,10 @@ class ContentAnalyzer:
                 should_delete=False, should_timeout=False, censored_content=content
             )
         
-        content_lower = content.lower()
-        reasons = []
-        matched_words = []
-        matched_patterns = []
-        toxicity_score = 0.0
-        
-        # 1. Check bad words
-        word_score, word_matches = self._check_bad_words(content_lower)
-        if word_matches:
-            matched_words = word_matches
-            toxicity_score = max(toxicity_score, word_score)
-            reasons.append(f"bad_words:{','.join(word_matches[:3])}")
-        
-        # 2. Check toxicity patterns
-        pattern_score, pattern_matches, pattern_categories = self._check_toxicity_patterns(content)
-        if pattern_matches:
-            matched_patterns.extend(pattern_matches)
-            toxicity_score = max(toxicity_score, pattern_score)
-            for cat in set(pattern_categories):
-                reasons.append(f"pattern:{cat}")
-        
-        # 3. Check learned patterns
-        learned_score, learned_matches = self._check_learned_patterns(content_lower)
-        if learned_matches:
-            matched_patterns.extend(learned_matches)
-            toxicity_score = max(toxicity_score, learned_score * 0.8)  # Slightly lower weight
-            reasons.append("learned_pattern")
-        
-        # 4. Sentiment analysis
-        sentiment_score = self._analyze_sentiment(content)
-        if sentiment_score < self.SENTIMENT_THRESHOLD:
-            # Very negative sentiment adds to toxicity
-            toxicity_score = max(toxicity_score, toxicity_score + abs(sentiment_score) * 0.3)
-            reasons.append("negative_sentiment")
-        
-        # 5. Check for repeat offender
-        if author_id:
-            offense_count = mdb.get_user_offense_count(author_id, hours=24)
-            if offense_count >= 3:
-                toxicity_score = min(1.0, toxicity_score + 0.2)
-                reasons.append(f"repeat_offender:{offense_count}")
+        # One consistent rule set for this message
+        state = self.pipeline.run(_MessageAnalysis(content, self._snapshot, author_id, offense_count), full)
+        toxicity_score = state.toxicity_score
+        matched_words = state.matched_words
         
         # Determine actions
         is_flagged = toxicity_score >= self.TOXICITY_THRESHOLD or len(matched_words) > 0
@@ -188,35 +281,85 @@ class ContentAnalyzer:
         # Calculate confidence
         confidence = min(1.0, toxicity_score)
         
-        # Generate censored content
-        censored_content = self._censor_content(content, matched_words, matched_patterns)
-        
         return AnalysisResult(
             is_flagged=is_flagged,
             confidence=confidence,
-            reasons=reasons,
+            reasons=state.reasons,
             matched_words=matched_words,
-            matched_patterns=matched_patterns,
-            sentiment_score=sentiment_score,
+            matched_patterns=state.matched_patterns,
+            sentiment_score=state.sentiment_score,
             toxicity_score=toxicity_score,
             should_delete=should_delete,
             should_timeout=should_timeout,
-            censored_content=censored_content
+            censored_content=state.censored_content,
+            learned_patterns=state.learned_patterns
         )
     
-    def _check_bad_words(self, content_lower: str) -> Tuple[float, List[str]]:
+    # ---------- Pipeline stages ----------
+    
+    def _stage_prefilter(self, state: '_MessageAnalysis') -> bool:
+        """One pass per rule set; ends the pipeline if nothing can match."""
+        state.content_lower = state.content.lower()
+        state.word_score, state.word_matches = self._check_bad_words(state.content_lower, state.rules)
+        state.toxicity_hit = self.any_toxicity_pattern(state.content)
+        state.learned_hit = state.rules.any_pattern(state.content_lower)
+        return not (state.word_matches or state.toxicity_hit or state.learned_hit)
+    
+    def _stage_bad_words(self, state: '_MessageAnalysis'):
+        # 1. Bad words (found by the prefilter)
+        if state.word_matches:
+            state.matched_words = state.word_matches
+            state.toxicity_score = max(state.toxicity_score, state.word_score)
+            state.reasons.append(f"bad_words:{','.join(state.word_matches[:3])}")
+    
+    def _stage_toxicity_patterns(self, state: '_MessageAnalysis'):
+        # 2. Check toxicity patterns
+        pattern_score, pattern_matches, pattern_categories = self._check_toxicity_patterns(state.content)
+        if pattern_matches:
+            state.matched_patterns.extend(pattern_matches)
+            state.toxicity_score = max(state.toxicity_score, pattern_score)
+            for cat in set(pattern_categories):
+                state.reasons.append(f"pattern:{cat}")
+    
+    def _stage_learned_patterns(self, state: '_MessageAnalysis'):
+        # 3. Check learned patterns
+        learned_score, learned_matches = self._check_learned_patterns(state.content_lower, state.rules)
+        if learned_matches:
+            state.matched_patterns.extend(learned_matches)
+            state.learned_patterns = learned_matches
+            state.toxicity_score = max(state.toxicity_score, learned_score * 0.8)  # Slightly lower weight
+            state.reasons.append("learned_pattern")
+    
+    def _stage_sentiment(self, state: '_MessageAnalysis'):
+        # 4. Sentiment analysis
+        state.sentiment_score = self._analyze_sentiment(state.content)
+        if state.sentiment_score < self.SENTIMENT_THRESHOLD:
+            # Very negative sentiment adds to toxicity
+            state.toxicity_score = max(state.toxicity_score,
+                                       state.toxicity_score + abs(state.sentiment_score) * 0.3)
+            state.reasons.append("negative_sentiment")
+    
+    def _stage_repeat_offender(self, state: '_MessageAnalysis'):
+        # 5. Check for repeat offender
+        offense_count = state.offense_count
+        if offense_count is None and state.author_id:
+            offense_count = get_offense_tracker().count(state.author_id, hours=24)
+        if offense_count is not None and offense_count >= 3:
+            state.toxicity_score = min(1.0, state.toxicity_score + 0.2)
+            state.reasons.append(f"repeat_offender:{offense_count}")
+    
+    def _stage_censor(self, state: '_MessageAnalysis'):
+        state.censored_content = self._censor_content(state.content, state.matched_words, state.matched_patterns)
+    
+    def _check_bad_words(self, content_lower: str, rules: RuleSnapshot) -> Tuple[float, List[str]]:
         """Check for bad words and return max severity and matches."""
         matches = []
         max_severity = 0
         
-        for word, severity in self.bad_words.items():
-            # Use word boundary matching
-            pattern = r'\b' + re.escape(word) + r'\b'
-            if re.search(pattern, content_lower):
-                matches.append(word)
-                max_severity = max(max_severity, severity)
-                # Update match count in database
-                mdb.increment_word_match(word)
+        # Word boundary matching, all words in one pass
+        for word, _ in rules.word_matcher.find_all(content_lower):
+            matches.append(word)
+            max_severity = max(max_severity, rules.bad_words[word])
         
         # Normalize severity to 0-1 scale (assuming max severity is 5)
         normalized_score = min(1.0, max_severity / 5.0) if max_severity > 0 else 0
@@ -237,23 +380,18 @@ class ContentAnalyzer:
         
         return max_score, matches, categories
     
-    def _check_learned_patterns(self, content_lower: str) -> Tuple[float, List[str]]:
-        """Check learned patterns."""
+    def _check_learned_patterns(self, content_lower: str, rules: RuleSnapshot) -> Tuple[float, List[str]]:
+        """
+        Check learned patterns. Their match stats are written with the
+        flag's moderation event (counted_patterns), not here.
+        """
         max_score = 0
         matches = []
         
-        for pattern_data in self.patterns:
-            pattern = pattern_data['pattern']
-            confidence = pattern_data['confidence']
-            
-            try:
-                if re.search(pattern, content_lower, re.IGNORECASE):
-                    max_score = max(max_score, confidence)
-                    matches.append(pattern)
-                    mdb.update_pattern_stats(pattern, matched=True)
-            except re.error:
-                # Invalid regex pattern
-                continue
+        for compiled, pattern, confidence in rules.patterns:
+            if compiled.search(content_lower):
+                max_score = max(max_score, confidence)
+                matches.append(pattern)
         
         return max_score, matches
     
@@ -392,7 +530,7 @@ def quick_check(content: str) -> bool:
 def analyze_and_print(content: str):
     """Analyze content and print detailed results."""
     analyzer = ContentAnalyzer()
-    result = analyzer.analyze(content)
+    result = analyzer.analyze(content, full=True)
     
     print(f"\n{'='*50}")
     print(f"Content: {content[:100]}...")
@@ -415,10 +553,11 @@ def analyze_and_print(content: str):
 _analyzer_instance = None
 
 def get_analyzer() -> ContentAnalyzer:
-    """Get the singleton analyzer instance."""
+    """Get the singleton analyzer instance (kept in sync with moderation.db)."""
     global _analyzer_instance
     if _analyzer_instance is None:
         _analyzer_instance = ContentAnalyzer()
+        _analyzer_instance.start_watching()
     return _analyzer_instance
 
 
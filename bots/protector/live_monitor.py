@@ -15,9 +15,12 @@ Add to your bot1.py:
 """
 
 import asyncio
+import atexit
 import logging
+import time
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from typing import Optional, Set
+from typing import Dict, FrozenSet, Optional, Set
 
 import interactions
 from interactions import (
@@ -35,6 +38,9 @@ from interactions.api.events import MessageCreate
 
 # Local imports
 import common.moderation_db as mdb
+from common import async_db as adb
+from common.analysis_pipeline import format_stats
+from common.offense_tracker import get_offense_tracker
 from content_analyzer import ContentAnalyzer, get_analyzer
 
 # Import your constants - adjust path as needed
@@ -80,6 +86,17 @@ class MonitorConfig:
     
     # Cooldown between processing same user's messages (seconds)
     USER_COOLDOWN = 1.0
+    
+    # Per-query timeout for database calls made while handling a message (seconds)
+    DB_TIMEOUT = 5.0
+    
+    # How long the cached monitored-channel list is trusted before it is
+    # re-read (seconds). /monitor_add and /monitor_remove refresh it at once;
+    # this only bounds how late changes made by another process show up.
+    SETTINGS_TTL = 60.0
+    
+    # Offenses older than this don't count toward auto-timeout (hours)
+    OFFENSE_WINDOW_HOURS = 24
 
 
 # Track recently processed messages to avoid double-processing
@@ -87,6 +104,78 @@ _recently_processed: Set[str] = set()
 _user_cooldowns: dict = {}
 
 
+# ============== CACHED STATE ==============
+
+@dataclass(frozen=True)
+class MonitorSettings:
+    """Which channels are monitored and who is exempt, as of one refresh."""
+    channels: Dict[str, int]  # channel_id -> level; empty = monitor all
+    ignored_channels: FrozenSet[str]
+    immune_roles: FrozenSet[int]
+    loaded_at: float
+
+
+class _SettingsCache:
+    """
+    MonitorSettings shared by every message, so checking a message never
+    touches the database. Re-read when a monitor command changes them or
+    after config.SETTINGS_TTL. A failed re-read keeps the last good
+    settings; if there are none yet, MonitorConfig alone applies
+    (every channel not ignored is monitored).
+    """
+    
+    def __init__(self):
+        self._settings: Optional[MonitorSettings] = None
+        self._lock: Optional[asyncio.Lock] = None
+    
+    def invalidate(self):
+        """Re-read on the next get(), still serving these settings if that fails."""
+        if self._settings is not None:
+            self._settings = replace(self._settings, loaded_at=float('-inf'))
+    
+    async def get(self, config: MonitorConfig) -> MonitorSettings:
+        """Current settings, refreshed first if stale."""
+        settings = self._settings
+        if settings is not None and time.monotonic() - settings.loaded_at < config.SETTINGS_TTL:
+            return settings
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._settings is settings:  # nobody refreshed while we waited
+                await self.refresh(config)
+        return self._settings
+    
+    async def refresh(self, config: MonitorConfig):
+        try:
+            channels = await adb.get_monitored_channels(timeout=config.DB_TIMEOUT)
+        except Exception as e:
+            # Timed out, locked database, no pool connection...: serve the
+            # old list (or the config-only fallback) for another TTL rather
+            # than retrying per message
+            problem = "timed out" if isinstance(e, adb.QueryTimeout) else f"failed ({type(e).__name__}: {e})"
+            if self._settings is not None:
+                logger.warning(f"Monitored channel lookup {problem}, keeping cached settings")
+                self._settings = replace(self._settings, loaded_at=time.monotonic())
+            else:
+                logger.warning(f"Monitored channel lookup {problem}, monitoring all channels until it loads")
+                self._settings = MonitorSettings(
+                    channels={},
+                    ignored_channels=frozenset(config.IGNORED_CHANNELS),
+                    immune_roles=frozenset(config.IMMUNE_ROLES),
+                    loaded_at=time.monotonic(),
+                )
+            return
+        self._settings = MonitorSettings(
+            channels=dict(channels),
+            ignored_channels=frozenset(config.IGNORED_CHANNELS),
+            immune_roles=frozenset(config.IMMUNE_ROLES),
+            loaded_at=time.monotonic(),
+        )
+
+
+_settings = _SettingsCache()
+
+
 # ============== CORE MONITOR FUNCTION ==============
 
 async def process_message(
@@ -115,13 +204,14 @@ async def process_message(
     if str(message.id) in _recently_processed:
         return False
     
+    settings = await _settings.get(config)
+    
     # Skip ignored channels
-    if str(message.channel.id) in config.IGNORED_CHANNELS:
+    if str(message.channel.id) in settings.ignored_channels:
         return False
     
     # Check if channel is monitored (if monitoring is selective)
-    monitored_channels = mdb.get_monitored_channels()
-    if monitored_channels and str(message.channel.id) not in monitored_channels:
+    if settings.channels and str(message.channel.id) not in settings.channels:
         return False
     
     # Check user cooldown
@@ -135,7 +225,7 @@ async def process_message(
     # Check immune roles
     if hasattr(message.author, 'roles'):
         for role in message.author.roles:
-            if role.id in config.IMMUNE_ROLES:
+            if role.id in settings.immune_roles:
                 return False
     
     # Mark as processed
@@ -147,7 +237,10 @@ async def process_message(
     
     # Analyze the message
     analyzer = get_analyzer()
-    result = analyzer.analyze(message.content, author_id=user_id)
+    offenses = get_offense_tracker()
+    result = analyzer.analyze(
+        message.content, offense_count=offenses.count(user_id, hours=config.OFFENSE_WINDOW_HOURS)
+    )
     
     if not result.is_flagged:
         return False
@@ -156,8 +249,9 @@ async def process_message(
     logger.info(f"Flagged message from {message.author.display_name}: {result.reasons}")
     
     try:
-        # Log to database
-        mdb.log_flagged_message(
+        # Log the flag, the offense and the word and pattern counts as one queued write
+        offenses.record(user_id)
+        mdb.queue_moderation_event(
             message_id=str(message.id),
             channel_id=str(message.channel.id),
             channel_name=getattr(message.channel, 'name', 'Unknown'),
@@ -170,15 +264,10 @@ async def process_message(
             sentiment_score=result.sentiment_score,
             toxicity_score=result.toxicity_score,
             action_taken='deleted' if result.should_delete else 'flagged',
-            auto_deleted=result.should_delete
-        )
-        
-        # Log user offense
-        mdb.log_user_offense(
-            user_id=user_id,
+            auto_deleted=result.should_delete,
             offense_type=result.reasons[0] if result.reasons else 'unknown',
-            message_id=str(message.id),
-            channel_id=str(message.channel.id)
+            counted_words=result.matched_words,
+            counted_patterns=result.learned_patterns
         )
         
         # Delete if needed
@@ -207,7 +296,7 @@ async def process_message(
             
             # Check for auto-timeout
             if config.AUTO_TIMEOUT_ENABLED:
-                offense_count = mdb.get_user_offense_count(user_id, hours=24)
+                offense_count = offenses.count(user_id, hours=config.OFFENSE_WINDOW_HOURS)
                 if offense_count >= config.OFFENSES_BEFORE_TIMEOUT or result.should_timeout:
                     try:
                         # Calculate timeout end time
@@ -283,6 +372,12 @@ def setup_live_monitor(client: Client, config: MonitorConfig = None):
     # Initialize database
     mdb.init_moderation_db()
     
+    # Load recent offenses now, so repeat-offender checks never hit the database
+    get_offense_tracker()
+    
+    # Commit flags still in the write queue when the bot exits
+    atexit.register(mdb.stop_event_writer)
+    
     @listen(MessageCreate)
     async def on_monitored_message(event: MessageCreate):
         """Listen for new messages and process them."""
@@ -325,8 +420,8 @@ async def on_monitored_message(event: MessageCreate):
     if not result.is_flagged:
         return
     
-    # Log to database
-    mdb.log_flagged_message(
+    # Log flag + offense + word and pattern counts in one (queued) transaction
+    mdb.queue_moderation_event(
         message_id=str(message.id),
         channel_id=str(message.channel.id),
         channel_name=message.channel.name,
@@ -338,12 +433,10 @@ async def on_monitored_message(event: MessageCreate):
         matched_patterns=result.matched_words + result.matched_patterns,
         sentiment_score=result.sentiment_score,
         toxicity_score=result.toxicity_score,
-        action_taken='deleted' if result.should_delete else 'flagged'
-    )
-    
-    mdb.log_user_offense(
-        str(message.author.id), result.reasons[0] if result.reasons else 'unknown',
-        str(message.id), str(message.channel.id)
+        action_taken='deleted' if result.should_delete else 'flagged',
+        offense_type=result.reasons[0] if result.reasons else 'unknown',
+        counted_words=result.matched_words,
+        counted_patterns=result.learned_patterns
     )
     
     if result.should_delete:
@@ -394,7 +487,8 @@ async def monitor_add_cmd(ctx: SlashContext, channel: interactions.GuildText, le
         await ctx.send("❌ Permission denied.", ephemeral=True)
         return
     
-    mdb.add_monitored_channel(str(channel.id), channel.name, level)
+    await adb.add_monitored_channel(str(channel.id), channel.name, level)
+    _settings.invalidate()
     await ctx.send(f"✅ Now monitoring {channel.mention} at level {level}", ephemeral=True)
 
 
@@ -411,7 +505,8 @@ async def monitor_remove_cmd(ctx: SlashContext, channel: interactions.GuildText)
         await ctx.send("❌ Permission denied.", ephemeral=True)
         return
     
-    mdb.remove_monitored_channel(str(channel.id))
+    await adb.remove_monitored_channel(str(channel.id))
+    _settings.invalidate()
     await ctx.send(f"✅ Stopped monitoring {channel.mention}", ephemeral=True)
 
 
@@ -427,7 +522,7 @@ async def monitor_list_cmd(ctx: SlashContext):
         await ctx.send("❌ Permission denied.", ephemeral=True)
         return
     
-    channels = mdb.get_monitored_channels()
+    channels = await adb.get_monitored_channels()
     
     if not channels:
         await ctx.send("No channels being monitored (monitoring all channels by default).", ephemeral=True)
@@ -454,7 +549,7 @@ async def badword_add_cmd(ctx: SlashContext, word: str, severity: int = 3, categ
     
     severity = max(1, min(5, severity))  # Clamp to 1-5
     
-    if mdb.add_bad_word(word, severity, category):
+    if await adb.add_bad_word(word, severity, category):
         # Reload analyzer
         get_analyzer().reload()
         await ctx.send(f"✅ Added `{word}` (severity: {severity}, category: {category})", ephemeral=True)
@@ -475,7 +570,7 @@ async def badword_list_cmd(ctx: SlashContext, category: str = None):
         await ctx.send("❌ Permission denied.", ephemeral=True)
         return
     
-    words = mdb.get_bad_words()
+    words = await adb.get_bad_words()
     
     if category:
         words = [w for w in words if w.get('category') == category]
@@ -516,7 +611,7 @@ async def modstats_cmd(ctx: SlashContext, days: int = 7):
         await ctx.send("❌ Permission denied.", ephemeral=True)
         return
     
-    stats = mdb.get_moderation_stats(days)
+    stats = await adb.get_moderation_stats(days)
     
     embed = Embed(title=f"📊 Moderation Stats (Last {days} Days)", color=0x9c92d1)
     embed.add_field(name="Total Flagged", value=str(stats.get('total_flagged', 0)), inline=True)
@@ -531,11 +626,13 @@ async def modstats_cmd(ctx: SlashContext, days: int = 7):
         embed.add_field(name="Most Triggered Words", value="\n".join(words) or "None", inline=False)
     
     # Repeat offenders
-    offenders = mdb.get_repeat_offenders(min_offenses=3, days=days)
+    offenders = await adb.get_repeat_offenders(min_offenses=3, days=days)
     if offenders:
         offender_list = [f"<@{o['user_id']}>: {o['offense_count']} offenses" for o in offenders[:5]]
         embed.add_field(name="Repeat Offenders", value="\n".join(offender_list), inline=False)
     
+    embed.add_field(name="Analysis Pipeline", value=format_stats(get_analyzer().pipeline.stats()), inline=False)
+    
     await ctx.send(embed=embed, ephemeral=True)
 
 
@@ -20,13 +20,16 @@ Setup:
 import os
 import re
 import json
+import queue
+import time
+import codecs
 import asyncio
 import logging
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional, List, Dict, Tuple, Set
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 load_dotenv()
 PROTECTOR_BOT_TOKEN = os.environ['PROTECTOR_BOT_TOKEN']
@@ -322,6 +325,15 @@ except ImportError:
     MDB_AVAILABLE = False
     logger.warning("moderation_db not found - using in-memory tracking only")
 
+from common.term_matcher import TermMatcher
+from common.offense_tracker import get_offense_tracker
+from common.text_normalizer import TextNormalizer
+from common.analysis_pipeline import AnalysisPipeline, Stage, any_match, format_stats
+
+# Homoglyphs back to Latin before analysis, so "kуs" with a Cyrillic у
+# doesn't slip past the word lists (the reverse of _homoglyph_replace)
+HOMOGLYPH_FOLD = TextNormalizer(HOMOGLYPHS)
+
 # Initialize client
 client = Client(
     token=PROTECTOR_BOT_TOKEN,
@@ -330,9 +342,11 @@ client = Client(
 
 # In-memory tracking (fallback if no database)
 flagged_messages_cache: Dict[str, dict] = {}
-user_offenses_cache: Dict[str, List[datetime]] = {}
 recently_processed: Set[str] = set()
 
+# Offenses counted toward "active offenders" in /tos_stats
+ACTIVE_OFFENDER_HOURS = 7 * 24
+
 # Live monitoring state
 MONITORING_ENABLED = True  # Global toggle for live monitoring
 
@@ -353,6 +367,34 @@ class AnalysisResult:
     censored_content: str
 
 
+@dataclass
+class _MessageAnalysis:
+    """One message's working state as it goes through ContentAnalyzer.pipeline."""
+    content: str                  # as sent
+    author_id: Optional[str] = None
+    folded: str = ""              # homoglyph-folded copy of content, what the stages match against
+    content_lower: str = ""       # folded, lowercased
+    # Set by the prefilter
+    hits: Dict[str, List[str]] = field(default_factory=lambda: {'critical': [], 'moderate': [], 'slur': []})
+    has_group: bool = False       # a PROTECTED_GROUPS term appears
+    tos_hit: bool = False         # some TOS_VIOLATION_PATTERNS regex matches
+    phrase_hit: bool = False      # a learned phrase appears
+    hate_combo: Optional[Tuple[bool, List[str]]] = None
+    tos_matches: List[re.Pattern] = field(default_factory=list)
+    # Result
+    severity: int = 0
+    reasons: List[str] = field(default_factory=list)
+    matched_words: List[str] = field(default_factory=list)
+    matched_patterns: List[Tuple[str, str]] = field(default_factory=list)
+    sentiment_score: float = 0.0
+    censored_content: str = None
+
+    def __post_init__(self):
+        self.folded = HOMOGLYPH_FOLD.fold(self.content)
+        # Unchanged unless the censor stage runs
+        self.censored_content = self.content
+
+
 # ============== CONTENT ANALYZER ==============
 
 class ContentAnalyzer:
@@ -362,6 +404,9 @@ class ContentAnalyzer:
     - Keyword matching (critical and moderate lists)
     - Regex pattern matching (ToS violation patterns)
     - Sentiment analysis (negative sentiment as additional signal)
+
+    The checks run as stages of self.pipeline, cheapest first, so clean
+    messages stop after the prefilter.
     """
     
     def __init__(self):
@@ -370,10 +415,40 @@ class ContentAnalyzer:
             (re.compile(pattern, re.IGNORECASE), category)
             for pattern, category in TOS_VIOLATION_PATTERNS
         ]
+        # Whether any of them matches, in one pass (the prefilter)
+        self.any_tos_pattern = any_match([p for p, _ in TOS_VIOLATION_PATTERNS], re.IGNORECASE)
+        self.hate_combination_patterns = self._compile_hate_combinations()
         
         # Load learned patterns from sample deleted messages
         self.learned_phrases = set()
         self._load_sample_deleted_messages()
+        self.rebuild_matchers()
+
+        # Cheap checks first; the rest only run for messages they apply to
+        self.pipeline = AnalysisPipeline([
+            Stage('prefilter', self._stage_prefilter),
+            Stage('critical', self._stage_critical, when=lambda s: bool(s.hits['critical'])),
+            Stage('context', self._stage_context, when=lambda s: bool(s.hits['moderate'] or s.hits['slur'])),
+            Stage('hate_combination', self._stage_hate_combination, when=lambda s: s.has_group),
+            Stage('patterns', self._stage_patterns, when=lambda s: s.tos_hit),
+            Stage('learned', self._stage_learned, when=lambda s: s.phrase_hit),
+            Stage('sentiment', self._stage_sentiment, when=self._is_candidate),
+            Stage('repeat_offender', self._stage_repeat_offender, when=self._is_candidate),
+            Stage('censor', self._stage_censor, when=lambda s: bool(s.matched_words or s.tos_matches)),
+        ])
+
+    def rebuild_matchers(self):
+        """
+        Recompile the word lists and learned phrases into single-pass matchers.
+        Call after changing BAD_WORDS_* / SLUR_WORDS_MODERATE or learned_phrases.
+        """
+        self.word_matcher = TermMatcher(
+            [(w, 'critical') for w in BAD_WORDS_CRITICAL]
+            + [(w, 'moderate') for w in BAD_WORDS_MODERATE]
+            + [(w, 'slur') for w in SLUR_WORDS_MODERATE]
+        )
+        self.phrase_matcher = TermMatcher(self.learned_phrases, word_boundary=False)
+        self.group_matcher = TermMatcher(PROTECTED_GROUPS)
     
     def _load_sample_deleted_messages(self):
         """Load and learn from sample deleted messages."""
@@ -393,9 +468,13 @@ class ContentAnalyzer:
             except Exception as e:
                 logger.error(f"Error loading sample deleted messages: {e}")
     
-    def analyze(self, content: str, author_id: str = None) -> AnalysisResult:
+    def analyze(self, content: str, author_id: str = None, full: bool = False) -> AnalysisResult:
         """
         Analyze message content for ToS violations.
+
+        Runs self.pipeline: messages the prefilter finds nothing in come
+        back clean without the context checks, sentiment or censoring.
+        full=True runs every stage anyway (for /tos_test).
         
         Returns AnalysisResult with all detection details.
         """
@@ -406,96 +485,131 @@ class ContentAnalyzer:
                 should_timeout=False, censored_content=content
             )
         
-        content_lower = content.lower()
-        reasons = []
-        matched_words = []
-        matched_patterns = []
-        severity = 0
+        state = self.pipeline.run(_MessageAnalysis(content, author_id), full)
+        matched_words = state.matched_words
+        matched_patterns = state.matched_patterns
+        severity = state.severity
+
+        # Determine actions
+        is_flagged = severity >= 2 or len(matched_words) > 0 or len(matched_patterns) > 0
+        should_delete = severity >= 3 or len(matched_words) > 0
+        should_timeout = severity >= 5
         
+        return AnalysisResult(
+            is_flagged=is_flagged,
+            severity=severity,
+            reasons=state.reasons,
+            matched_words=matched_words,
+            matched_patterns=matched_patterns,
+            sentiment_score=state.sentiment_score,
+            should_delete=should_delete,
+            should_timeout=should_timeout,
+            censored_content=state.censored_content
+        )
+
+    # ---------- Pipeline stages ----------
+
+    def _stage_prefilter(self, state: '_MessageAnalysis') -> bool:
+        """One pass per matcher; ends the pipeline if nothing can match."""
+        state.content_lower = state.folded.lower()
+        # One pass over the text for every word list
+        for word, category in self.word_matcher.find_all(state.content_lower):
+            state.hits[category].append(word)
+        # Every hate combination names a protected group
+        state.has_group = self.group_matcher.search(state.content_lower) is not None
+        state.tos_hit = self.any_tos_pattern(state.folded)
+        state.phrase_hit = self.phrase_matcher.search(state.content_lower) is not None
+        return not (any(state.hits.values()) or state.has_group or state.tos_hit or state.phrase_hit)
+
+    def _stage_critical(self, state: '_MessageAnalysis'):
         # 1. Check critical bad words (instant flag, severity 5)
-        for word in BAD_WORDS_CRITICAL:
-            pattern = r'\b' + re.escape(word) + r'\b'
-            if re.search(pattern, content_lower):
-                matched_words.append(word)
-                severity = 5
-                reasons.append(f"critical_word:{word}")
-        
+        for word in state.hits['critical']:
+            state.matched_words.append(word)
+            state.severity = 5
+            state.reasons.append(f"critical_word:{word}")
+
+    def _stage_context(self, state: '_MessageAnalysis'):
         # 2. Check moderate bad words (need context, severity 3)
-        for word in BAD_WORDS_MODERATE:
-            pattern = r'\b' + re.escape(word) + r'\b'
-            if re.search(pattern, content_lower):
-                # Context check - is it in a threatening context?
-                if self._is_threatening_context(content_lower, word):
-                    matched_words.append(word)
-                    severity = max(severity, 3)
-                    reasons.append(f"moderate_word:{word}")
+        for word in state.hits['moderate']:
+            # Context check - is it in a threatening context?
+            if self._is_threatening_context(state.content_lower, word, self._hate_combination(state)[0]):
+                state.matched_words.append(word)
+                state.severity = max(state.severity, 3)
+                state.reasons.append(f"moderate_word:{word}")
 
         # 3. Check reclaimed slurs - only flag if used in hateful context
-        for slur in SLUR_WORDS_MODERATE:
-            pattern = r'\b' + re.escape(slur) + r'\b'
-            if re.search(pattern, content_lower):
-                # Only flag if preceded by hateful context indicators
-                if self._is_hateful_slur_context(content_lower, slur):
-                    matched_words.append(slur)
-                    severity = max(severity, 3)
-                    reasons.append(f"hateful_slur:{slur}")
-
+        for slur in state.hits['slur']:
+            # Only flag if preceded by hateful context indicators
+            if self._is_hateful_slur_context(state.content_lower, slur):
+                state.matched_words.append(slur)
+                state.severity = max(state.severity, 3)
+                state.reasons.append(f"hateful_slur:{slur}")
+
+    def _stage_hate_combination(self, state: '_MessageAnalysis'):
         # 4. Check hate verb + protected group combinations
-        is_hate_combo, hate_matches = self._is_hate_combination(content_lower)
+        is_hate_combo, hate_matches = self._hate_combination(state)
         if is_hate_combo:
             for phrase in hate_matches:
-                matched_patterns.append((phrase, 'hate_combination'))
-            severity = max(severity, 4)
-            reasons.append(f"hate_combination:{','.join(hate_matches[:3])}")
+                state.matched_patterns.append((phrase, 'hate_combination'))
+            state.severity = max(state.severity, 4)
+            state.reasons.append(f"hate_combination:{','.join(hate_matches[:3])}")
 
+    def _stage_patterns(self, state: '_MessageAnalysis'):
         # 5. Check ToS violation patterns
         for compiled_pattern, category in self.compiled_patterns:
-            match = compiled_pattern.search(content)
+            match = compiled_pattern.search(state.folded)
             if match:
-                matched_patterns.append((match.group(0), category))
-                severity = max(severity, 4)
-                reasons.append(f"pattern:{category}")
-
-        # 6. Check learned phrases from sample deleted messages
-        for phrase in self.learned_phrases:
-            if phrase in content_lower:
-                severity = max(severity, 2)
-                reasons.append("learned_pattern")
-                break  # One match is enough
+                state.tos_matches.append(compiled_pattern)
+                state.matched_patterns.append((match.group(0), category))
+                state.severity = max(state.severity, 4)
+                state.reasons.append(f"pattern:{category}")
+
+    def _stage_learned(self, state: '_MessageAnalysis'):
+        # 6. Learned phrases from sample deleted messages (found by the prefilter)
+        if not state.phrase_hit:
+            return
+        state.severity = max(state.severity, 2)
+        state.reasons.append("learned_pattern")
 
+    def _stage_sentiment(self, state: '_MessageAnalysis'):
         # 7. Sentiment analysis (supplementary signal)
-        sentiment_score = self._analyze_sentiment(content)
-        if sentiment_score < -0.6 and len(matched_words) > 0:
-            severity = min(5, severity + 1)
-            reasons.append("very_negative_sentiment")
+        state.sentiment_score = self._analyze_sentiment(state.folded)
+        if state.sentiment_score < -0.6 and len(state.matched_words) > 0:
+            state.severity = min(5, state.severity + 1)
+            state.reasons.append("very_negative_sentiment")
 
+    def _stage_repeat_offender(self, state: '_MessageAnalysis'):
         # 8. Check for repeat offender
-        if author_id and self._is_repeat_offender(author_id):
-            severity = min(5, severity + 1)
-            reasons.append("repeat_offender")
-        
-        # Determine actions
-        is_flagged = severity >= 2 or len(matched_words) > 0 or len(matched_patterns) > 0
-        should_delete = severity >= 3 or len(matched_words) > 0
-        should_timeout = severity >= 5
-        
-        # Generate censored content
-        censored_content = self._censor_content(content, matched_words)
-        
-        return AnalysisResult(
-            is_flagged=is_flagged,
-            severity=severity,
-            reasons=reasons,
-            matched_words=matched_words,
-            matched_patterns=matched_patterns,
-            sentiment_score=sentiment_score,
-            should_delete=should_delete,
-            should_timeout=should_timeout,
-            censored_content=censored_content
+        if state.author_id and self._is_repeat_offender(state.author_id):
+            state.severity = min(5, state.severity + 1)
+            state.reasons.append("repeat_offender")
+
+    def _stage_censor(self, state: '_MessageAnalysis'):
+        # Matches were found in the folded copy; fold() keeps length, so
+        # censor that and carry only the censored characters over to the
+        # original, leaving real Cyrillic/Greek text as sent
+        censored = self._censor_content(state.folded, state.matched_words, state.tos_matches)
+        state.censored_content = ''.join(
+            new if new != old else orig
+            for orig, old, new in zip(state.content, state.folded, censored)
         )
+
+    def _hate_combination(self, state: '_MessageAnalysis') -> Tuple[bool, List[str]]:
+        """_is_hate_combination() for this message, run at most once."""
+        if state.hate_combo is None:
+            state.hate_combo = self._is_hate_combination(state.content_lower) if state.has_group else (False, [])
+        return state.hate_combo
+
+    @staticmethod
+    def _is_candidate(state: '_MessageAnalysis') -> bool:
+        """Flagged by the checks so far; sentiment and repeat offenses only adjust those."""
+        return state.severity >= 2 or bool(state.matched_words) or bool(state.matched_patterns)
     
-    def _is_threatening_context(self, content: str, word: str) -> bool:
-        """Check if a moderate word is used in a threatening context."""
+    def _is_threatening_context(self, content: str, word: str, is_hate_combo: bool = None) -> bool:
+        """
+        Check if a moderate word is used in a threatening context.
+        Pass is_hate_combo if _is_hate_combination() already ran on this content.
+        """
         # Gaming context exceptions
         gaming_indicators = ['game', 'gaming', 'player', 'level', 'boss', 'enemy', 'mob', 'npc','points']
         if any(g in content for g in gaming_indicators):
@@ -514,7 +628,8 @@ class ContentAnalyzer:
                 return True
 
         # Check if this word is part of a hate combination (verb + protected group)
-        is_hate_combo, _ = self._is_hate_combination(content)
+        if is_hate_combo is None:
+            is_hate_combo, _ = self._is_hate_combination(content)
         if is_hate_combo:
             return True
 
@@ -545,6 +660,35 @@ class ContentAnalyzer:
 
         return False
 
+    @staticmethod
+    def _compile_hate_combinations() -> List[re.Pattern]:
+        """Compile the hate verb + protected group patterns used by _is_hate_combination()."""
+        # Build group pattern (handles multi-word groups like "white man")
+        # Sort by length descending so "white man" matches before "white"
+        sorted_groups = sorted(PROTECTED_GROUPS, key=len, reverse=True)
+        group_pattern = '|'.join(re.escape(g) for g in sorted_groups)
+
+        # Build verb pattern
+        verb_pattern = '|'.join(re.escape(v) for v in HATE_ACTION_VERBS)
+
+        return [re.compile(p) for p in (
+            # Pattern 1: [verb] (the|all|those|these|every)? [group]
+            # e.g., "kill the jews", "murder all muslims", "hate blacks"
+            rf'\b({verb_pattern})\s+(the\s+|all\s+|those\s+|these\s+|every\s+)?({group_pattern})\b',
+            # Pattern 2: (everyone|we|all|people) (here)? [hate verb] [group]
+            # e.g., "everyone here hates jews", "we all hate muslims"
+            rf'\b(everyone|we|all|people)\s+(here\s+)?({verb_pattern})\s+(the\s+)?({group_pattern})\b',
+            # Pattern 3: [group] (should|must|need to|deserve to|gonna|will) (die|be killed|be eliminated)
+            # e.g., "jews should die", "blacks must be killed"
+            rf'\b({group_pattern})\s+(should|must|need\s+to|deserve\s+to|gonna|will)\s+(die|be\s+killed|be\s+eliminated|be\s+exterminated)\b',
+            # Pattern 4: (admitted|confessed|expressed) [hate verb] (for|of|towards)? [group]
+            # e.g., "admitted hate for jews", "confessed hatred of muslims"
+            rf'\b(admitted|confessed|expressed)\s+(hate|hatred|hating|loathing)\s+(for\s+|of\s+|towards\s+)?({group_pattern})\b',
+            # Pattern 5: [hate verb] (for|of|towards) [group]
+            # e.g., "hate for jews", "hatred of muslims"
+            rf'\b({verb_pattern})\s+(for|of|towards)\s+(the\s+)?({group_pattern})\b',
+        )]
+
     def _is_hate_combination(self, content: str) -> Tuple[bool, List[str]]:
         """
         Check for hate verb + protected group combinations.
@@ -556,47 +700,12 @@ class ContentAnalyzer:
         - "admitted hate for jews"
         - "jews should die", "whites must be killed"
         """
-        matches = []
         content_lower = content.lower()
-
-        # Build group pattern (handles multi-word groups like "white man")
-        # Sort by length descending so "white man" matches before "white"
-        sorted_groups = sorted(PROTECTED_GROUPS, key=len, reverse=True)
-        group_pattern = '|'.join(re.escape(g) for g in sorted_groups)
-
-        # Build verb pattern
-        verb_pattern = '|'.join(re.escape(v) for v in HATE_ACTION_VERBS)
-
-        # Pattern 1: [verb] (the|all|those|these|every)? [group]
-        # e.g., "kill the jews", "murder all muslims", "hate blacks"
-        pattern1 = rf'\b({verb_pattern})\s+(the\s+|all\s+|those\s+|these\s+|every\s+)?({group_pattern})\b'
-        for match in re.finditer(pattern1, content_lower):
-            matches.append(match.group(0))
-
-        # Pattern 2: (everyone|we|all|people) (here)? [hate verb] [group]
-        # e.g., "everyone here hates jews", "we all hate muslims"
-        pattern2 = rf'\b(everyone|we|all|people)\s+(here\s+)?({verb_pattern})\s+(the\s+)?({group_pattern})\b'
-        for match in re.finditer(pattern2, content_lower):
-            matches.append(match.group(0))
-
-        # Pattern 3: [group] (should|must|need to|deserve to|gonna|will) (die|be killed|be eliminated)
-        # e.g., "jews should die", "blacks must be killed"
-        pattern3 = rf'\b({group_pattern})\s+(should|must|need\s+to|deserve\s+to|gonna|will)\s+(die|be\s+killed|be\s+eliminated|be\s+exterminated)\b'
-        for match in re.finditer(pattern3, content_lower):
-            matches.append(match.group(0))
-
-        # Pattern 4: (admitted|confessed|expressed) [hate verb] (for|of|towards)? [group]
-        # e.g., "admitted hate for jews", "confessed hatred of muslims"
-        pattern4 = rf'\b(admitted|confessed|expressed)\s+(hate|hatred|hating|loathing)\s+(for\s+|of\s+|towards\s+)?({group_pattern})\b'
-        for match in re.finditer(pattern4, content_lower):
-            matches.append(match.group(0))
-
-        # Pattern 5: [hate verb] (for|of|towards) [group]
-        # e.g., "hate for jews", "hatred of muslims"
-        pattern5 = rf'\b({verb_pattern})\s+(for|of|towards)\s+(the\s+)?({group_pattern})\b'
-        for match in re.finditer(pattern5, content_lower):
-            matches.append(match.group(0))
-
+        matches = [
+            match.group(0)
+            for pattern in self.hate_combination_patterns
+            for match in pattern.finditer(content_lower)
+        ]
         return (len(matches) > 0, matches)
 
     def _analyze_sentiment(self, content: str) -> float:
@@ -611,21 +720,8 @@ class ContentAnalyzer:
             return 0.0
     
     def _is_repeat_offender(self, author_id: str) -> bool:
-        """Check if user has multiple recent offenses."""
-        if MDB_AVAILABLE:
-            try:
-                count = mdb.get_user_offense_count(author_id, hours=24)
-                return count >= OFFENSES_BEFORE_TIMEOUT
-            except:
-                pass
-        
-        # Fallback to in-memory cache
-        if author_id in user_offenses_cache:
-            recent = [t for t in user_offenses_cache[author_id] 
-                     if datetime.now() - t < timedelta(hours=24)]
-            return len(recent) >= OFFENSES_BEFORE_TIMEOUT
-        
-        return False
+        """Check if user has multiple offenses in the last 24 hours."""
+        return get_offense_tracker().count(author_id, hours=24) >= OFFENSES_BEFORE_TIMEOUT
     
     def _homoglyph_replace(self, text: str, num_replacements=1):
         """
@@ -653,8 +749,11 @@ class ContentAnalyzer:
         
         return result
 
-    def _censor_content(self, content: str, matched_words: List[str]) -> str:
-        """Censor matched bad words in the content."""
+    def _censor_content(self, content: str, matched_words: List[str], patterns: List[re.Pattern] = None) -> str:
+        """
+        Censor matched bad words in the content.
+        Pass the ToS patterns that matched, if known, to skip searching for the others.
+        """
         censored = content
         
         for word in matched_words:
@@ -663,7 +762,9 @@ class ContentAnalyzer:
             censored = pattern.sub(censored_word, censored)
         
         # Also censor pattern matches
-        for compiled_pattern, _ in self.compiled_patterns:
+        if patterns is None:
+            patterns = [compiled_pattern for compiled_pattern, _ in self.compiled_patterns]
+        for compiled_pattern in patterns:
             match = compiled_pattern.search(censored)
             if match:
                 matched_text = match.group(0)
@@ -679,6 +780,12 @@ analyzer = ContentAnalyzer()
 
 # ============== MODERATION FUNCTIONS ==============
 
+def should_repost(result: AnalysisResult, original_content: str) -> bool:
+    """Whether a deleted message is reposted: only if censoring changed something."""
+    censored = result.censored_content
+    return bool(censored and censored.strip() and censored != original_content)
+
+
 def log_flagged_message(
     message_id: str,
     channel_id: str,
@@ -689,7 +796,13 @@ def log_flagged_message(
     censored_content: str,
     result: AnalysisResult
 ):
-    """Log a flagged message to database or cache."""
+    """
+    Log a flagged message to database and cache.
+
+    The database gets the flag, the author's offense and the matched
+    words' counters as one queued moderation event (one transaction,
+    group-committed with other flags).
+    """
     record = {
         'message_id': message_id,
         'channel_id': channel_id,
@@ -706,7 +819,7 @@ def log_flagged_message(
     
     if MDB_AVAILABLE:
         try:
-            mdb.log_flagged_message(
+            mdb.queue_moderation_event(
                 message_id=message_id,
                 channel_id=channel_id,
                 channel_name=channel_name,
@@ -719,33 +832,25 @@ def log_flagged_message(
                 sentiment_score=result.sentiment_score,
                 toxicity_score=result.severity / 5.0,
                 action_taken='deleted' if result.should_delete else 'flagged',
-                auto_deleted=result.should_delete
+                auto_deleted=result.should_delete,
+                offense_type=result.reasons[0] if result.reasons else 'unknown',
+                counted_words=result.matched_words
             )
         except Exception as e:
-            logger.error(f"Database logging failed: {e}")
+            logger.error(f"Database logging failed for message {message_id}: {e}")
     
     # Always cache in memory too
     flagged_messages_cache[message_id] = record
 
 
 def log_user_offense(author_id: str, reason: str):
-    """Track user offense for repeat offender detection."""
-    if MDB_AVAILABLE:
-        try:
-            mdb.log_user_offense(author_id, reason, '', '')
-        except:
-            pass
-    
-    # Also track in memory
-    if author_id not in user_offenses_cache:
-        user_offenses_cache[author_id] = []
-    user_offenses_cache[author_id].append(datetime.now())
-    
-    # Cleanup old offenses
-    user_offenses_cache[author_id] = [
-        t for t in user_offenses_cache[author_id]
-        if datetime.now() - t < timedelta(days=7)
-    ]
+    """
+    Count a user offense for repeat offender detection.
+
+    The database row is written by log_flagged_message(), in the same
+    transaction as the flag.
+    """
+    get_offense_tracker().record(author_id)
 
 
 # ============== HISTORICAL SCANNING ==============
@@ -1082,6 +1187,511 @@ def scan_all_exports_streaming(
     }
 
 
+# ============== PARALLEL SCANNER (Multi-Process, Resumable) ==============
+#
+# scan_exports_parallel() splits the exports into shards - one per file,
+# and byte ranges of about SCAN_SHARD_BYTES for big files - and scans
+# them in a process pool, so a full rescan after a rule change uses
+# every core. Workers only analyze; this process is the one writer.
+# Every SCAN_CHECKPOINT_MESSAGES messages a worker sends its new flags
+# plus its position, which go into flagged_messages and scan_progress
+# in one transaction (and onto flagged_messages.jsonl). After a crash,
+# re-running resumes each shard after its last checkpointed message.
+# Shard progress rows are keyed "<resolved file path>#<n>" for the n-th
+# byte range of a file (n=0 for a whole file), not by channel: one
+# channel can have several export files ("[part N]" splits, re-exports).
+
+SCAN_SHARD_BYTES = 64 * 1024 * 1024
+SCAN_CHECKPOINT_MESSAGES = 2000
+
+# last_message_id of a shard that was scanned to the end
+SCAN_SHARD_DONE = "done"
+
+# Start of a message object in DiscordChatExporter's indented output
+# (messages sit at depth 2; nested objects are indented deeper)
+_EXPORT_MESSAGE_START = re.compile(rb'\r?\n    \{\r?\n      "id": "')
+_EXPORT_MESSAGES_KEY = re.compile(rb'"messages"\s*:\s*\[')
+_SCAN_READ_BYTES = 1024 * 1024
+
+# Set in each pool worker by _scan_worker_init
+_scan_queue = None
+
+
+def _plan_export_shards(json_path: Path, shard_bytes: int = SCAN_SHARD_BYTES) -> List[dict]:
+    """
+    Split one export into shards at message boundaries.
+
+    Returns [{'key', 'path', 'start', 'end', 'channel_id', 'channel_name'}],
+    end=None meaning the end of the messages array. Files without the
+    indented layout are one shard.
+    """
+    size = json_path.stat().st_size
+    with open(json_path, 'rb') as f:
+        head = f.read(_SCAN_READ_BYTES)
+        match = _EXPORT_MESSAGES_KEY.search(head)
+        if not match:
+            raise ValueError("no messages array found")
+
+        # Header = everything before "messages"; close it to read channel info
+        channel = {}
+        try:
+            header = head[:match.start()].rstrip().rstrip(b',') + b'}'
+            channel = json.loads(header).get('channel', {})
+        except ValueError:
+            pass
+
+        starts = [match.end()]
+        cut = match.end() + shard_bytes
+        while cut < size:
+            f.seek(cut)
+            window = f.read(_SCAN_READ_BYTES)
+            boundary = _EXPORT_MESSAGE_START.search(window)
+            if boundary is None:
+                if len(window) < _SCAN_READ_BYTES:
+                    break
+                cut += len(window)
+                continue
+            starts.append(cut + boundary.start())
+            cut = starts[-1] + shard_bytes
+
+    channel_id = str(channel.get('id', '')) or json_path.stem
+    channel_name = channel.get('name', 'unknown')
+    path = str(json_path.resolve())
+    ends = starts[1:] + [None]
+    return [{
+        'key': f"{path}#{n}",
+        'path': path,
+        'start': start,
+        'end': end,
+        'channel_id': channel_id,
+        'channel_name': channel_name,
+    } for n, (start, end) in enumerate(zip(starts, ends))]
+
+
+def _iter_export_messages(f, start: int, end: Optional[int]):
+    """Decode the message objects in a byte range of the messages array."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    f.seek(start)
+    remaining = None if end is None else end - start
+    buf, pos, eof = '', 0, False
+
+    def read_more():
+        nonlocal buf, pos, eof, remaining
+        size = _SCAN_READ_BYTES if remaining is None else min(_SCAN_READ_BYTES, remaining)
+        chunk = f.read(size) if size else b''
+        if remaining is not None:
+            remaining -= len(chunk)
+        eof = not chunk or remaining == 0
+        buf = buf[pos:] + utf8.decode(chunk, final=eof)
+        pos = 0
+
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            read_more()
+        if pos >= len(buf) or buf[pos] == ']':
+            return
+        try:
+            obj, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            read_more()
+            continue
+        yield obj
+
+
+def _scan_worker_init(scan_queue, word_lists):
+    global _scan_queue
+    _scan_queue = scan_queue
+    # Same lists as the parent, including words added with /tos_addword
+    for target, words in zip((BAD_WORDS_CRITICAL, BAD_WORDS_MODERATE, SLUR_WORDS_MODERATE), word_lists):
+        target[:] = words
+    analyzer.rebuild_matchers()
+
+
+def _scan_shard(shard: dict) -> None:
+    """
+    Pool worker: analyze one shard, reporting to the aggregator.
+
+    Puts ('batch', key, {...}) messages followed by exactly one
+    ('done', key, stats) or ('error', key, message).
+    """
+    key = shard['key']
+    resume_after = shard.get('resume_after')
+    scanned, flagged = shard.get('scanned', 0), shard.get('flagged', 0)
+    batch, last_id, since_checkpoint = [], resume_after, 0
+
+    def checkpoint(message_id):
+        _scan_queue.put(('batch', key, {
+            'last_message_id': message_id, 'scanned': scanned,
+            'flagged': flagged, 'records': batch,
+        }))
+
+    try:
+        with open(shard['path'], 'rb') as f:
+            for msg in _iter_export_messages(f, shard['start'], shard['end']):
+                message_id = str(msg.get('id', ''))
+                if resume_after is not None:
+                    # Exports are in message order; skip what the last run finished
+                    if message_id == resume_after:
+                        resume_after = None
+                    continue
+                scanned += 1
+                since_checkpoint += 1
+                last_id = message_id
+
+                content = msg.get('content', '')
+                author = msg.get('author', {})
+                if content and content.strip() and not author.get('isBot', False):
+                    author_id = author.get('id', '')
+                    result = analyzer.analyze(content, author_id)
+                    if result.is_flagged:
+                        flagged += 1
+                        batch.append({
+                            'message_id': message_id,
+                            'channel_id': shard['channel_id'],
+                            'channel_name': shard['channel_name'],
+                            'author_id': author_id,
+                            'author_name': author.get('name', 'Unknown'),
+                            'content': content,
+                            'censored_content': result.censored_content,
+                            'timestamp': msg.get('timestamp', ''),
+                            'reasons': result.reasons,
+                            'matched_words': result.matched_words,
+                            'severity': result.severity,
+                            'sentiment_score': result.sentiment_score,
+                        })
+
+                if since_checkpoint >= SCAN_CHECKPOINT_MESSAGES:
+                    checkpoint(last_id)
+                    batch, since_checkpoint = [], 0
+
+        if resume_after is not None:
+            raise ValueError(f"resume point {resume_after} not found (export changed?)")
+        checkpoint(SCAN_SHARD_DONE)
+        _scan_queue.put(('done', key, {'scanned': scanned, 'flagged': flagged}))
+    except Exception as e:
+        _scan_queue.put(('error', key, f"{type(e).__name__}: {e}"))
+
+
+def _write_scan_results(jsonl_path: Path, output_file: str, summary: dict) -> dict:
+    """Assemble flagged_messages.json (the /tos_purge input) from the JSONL log."""
+    seen = set()
+    by_severity = {}
+    with open(output_file, 'w', encoding='utf-8') as out:
+        out.write('{"flagged_messages": [\n')
+        if jsonl_path.exists():
+            with open(jsonl_path, 'r', encoding='utf-8') as lines:
+                for line in lines:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    # A crash between the log and the checkpoint rescans a few messages
+                    if record['message_id'] in seen:
+                        continue
+                    if seen:
+                        out.write(',\n')
+                    seen.add(record['message_id'])
+                    sev = record.get('severity', 0)
+                    by_severity[sev] = by_severity.get(sev, 0) + 1
+                    out.write(json.dumps(record, ensure_ascii=False))
+        summary = {**summary, 'total_flagged': len(seen), 'by_severity': by_severity}
+        out.write(f'\n],\n"summary": {json.dumps(summary)}\n}}')
+    return summary
+
+
+def scan_exports_parallel(
+    export_dir: str = EXPORT_DIR,
+    output_file: str = "flagged_messages.json",
+    workers: int = None,
+    resume: bool = True,
+    shard_bytes: int = SCAN_SHARD_BYTES,
+) -> dict:
+    """
+    Scan all Discord export files on every core, resuming where a previous
+    run stopped. Flags go to moderation.db, <output_file>l (JSONL, appended
+    as the scan runs) and, at the end, output_file in the usual format.
+
+    Args:
+        export_dir: Directory containing Discord export JSON files
+        output_file: Path to the JSON results file for /tos_purge
+        workers: Scanner processes (default: CPU count)
+        resume: Continue from scan_progress. False starts over (use after
+            changing the rules)
+        shard_bytes: Split files bigger than this into byte ranges
+
+    Returns:
+        dict with summary stats (same keys as scan_all_exports_streaming,
+        plus 'by_severity', 'resumed_shards' and 'failed_shards'; no
+        'flagged_messages' list - read output_file for those)
+    """
+    import multiprocessing
+
+    export_path = Path(export_dir)
+    if not export_path.exists():
+        logger.error(f"Export directory not found: {export_dir}")
+        return {"error": "Directory not found"}
+    json_files = sorted(export_path.rglob("*.json"), key=lambda p: p.stat().st_size, reverse=True)
+    if not json_files:
+        logger.warning(f"No JSON files found in {export_dir}")
+        return {"error": "No JSON files found"}
+    if not MDB_AVAILABLE:
+        return {"error": "moderation_db not available (needed for checkpoints)"}
+
+    started = time.time()
+    mdb.init_moderation_db()
+    jsonl_path = Path(output_file).with_suffix('.jsonl')
+    if not resume:
+        mdb.clear_scan_progress()
+        jsonl_path.unlink(missing_ok=True)
+    progress = {row['channel_id']: row for row in mdb.get_all_scan_progress()}
+
+    shards, failed = [], []
+    for json_file in json_files:
+        try:
+            shards.extend(_plan_export_shards(json_file, shard_bytes))
+        except Exception as e:
+            logger.error(f"Skipping {json_file.name}: {e}")
+            failed.append(str(json_file))
+
+    pending, done_before = [], 0
+    for shard in shards:
+        row = progress.get(shard['key'])
+        mtime = datetime.fromtimestamp(Path(shard['path']).stat().st_mtime).isoformat()
+        if row and row['file_path'] == shard['path'] and row['last_updated'] > mtime:
+            if row['last_message_id'] == SCAN_SHARD_DONE:
+                done_before += 1
+                continue
+            shard.update(resume_after=row['last_message_id'],
+                         scanned=row['messages_scanned'], flagged=row['messages_flagged'])
+        pending.append(shard)
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    total_gb = sum(f.stat().st_size for f in json_files) / (1024**3)
+    logger.info(f"Scanning {len(json_files)} files ({total_gb:.2f} GB) as {len(shards)} shards "
+                f"on {workers} processes; {done_before} shard(s) already done")
+
+    # Spawn, not fork: the bot process has running threads and an event loop
+    ctx = multiprocessing.get_context('spawn')
+    scan_queue = ctx.Queue(maxsize=workers * 4)
+    word_lists = (list(BAD_WORDS_CRITICAL), list(BAD_WORDS_MODERATE), list(SLUR_WORDS_MODERATE))
+    by_key = {shard['key']: shard for shard in pending}
+    finished = 0
+
+    with open(jsonl_path, 'a', encoding='utf-8') as jsonl, \
+            ctx.Pool(workers, initializer=_scan_worker_init, initargs=(scan_queue, word_lists)) as pool:
+        tasks = pool.map_async(_scan_shard, pending, chunksize=1)
+
+        while finished < len(pending):
+            try:
+                kind, key, payload = scan_queue.get(timeout=5)
+            except queue.Empty:
+                if tasks.ready():
+                    logger.error(f"{len(pending) - finished} shard(s) produced no result")
+                    break
+                continue
+
+            shard = by_key[key]
+            if kind == 'batch':
+                records = payload['records']
+                for record in records:
+                    sentiment = record.pop('sentiment_score')
+                    jsonl.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    record['sentiment_score'] = sentiment
+                jsonl.flush()
+                mdb.record_scan_checkpoint(
+                    key, shard['path'], payload['last_message_id'],
+                    payload['scanned'], payload['flagged'],
+                    [{
+                        'message_id': r['message_id'], 'channel_id': r['channel_id'],
+                        'channel_name': r['channel_name'], 'author_id': r['author_id'],
+                        'author_name': r['author_name'], 'original_content': r['content'],
+                        'censored_content': r['censored_content'],
+                        'flag_reason': ','.join(r['reasons']), 'matched_patterns': r['matched_words'],
+                        'sentiment_score': r['sentiment_score'], 'toxicity_score': r['severity'] / 5.0,
+                        'action_taken': 'flagged', 'auto_deleted': False,
+                    } for r in records],
+                )
+                continue
+
+            finished += 1
+            if kind == 'error':
+                failed.append(key)
+                logger.error(f"[{finished}/{len(pending)}] {key}: FAILED ({payload})")
+                continue
+            logger.info(f"[{finished}/{len(pending)}] {shard['channel_name']} ({key}): "
+                        f"{payload['scanned']:,} scanned, {payload['flagged']:,} flagged")
+
+    shards_by_key = {shard['key']: shard for shard in shards}
+    file_stats = {}
+    for row in mdb.get_all_scan_progress():
+        shard = shards_by_key.get(row['channel_id'])
+        if shard is None:
+            continue
+        fs = file_stats.setdefault(shard['path'], {
+            'file': Path(shard['path']).name, 'scanned': 0, 'flagged': 0,
+            'channel': shard['channel_name'],
+        })
+        fs['scanned'] += row['messages_scanned']
+        fs['flagged'] += row['messages_flagged']
+
+    summary = _write_scan_results(jsonl_path, output_file, {
+        'scan_time': datetime.now().isoformat(),
+        'total_files_scanned': len(json_files),
+        'total_messages_scanned': sum(fs['scanned'] for fs in file_stats.values()),
+        'streaming_mode': True,
+    })
+    logger.info(f"Scan complete in {time.time() - started:.1f}s: {summary['total_flagged']:,} flagged "
+                f"out of {summary['total_messages_scanned']:,} messages")
+    return {**summary, 'file_stats': list(file_stats.values()),
+            'resumed_shards': done_before, 'failed_shards': failed}
+
+
+# ============== PURGE ENGINE (Bulk, Concurrent, Resumable) ==============
+#
+# purge_flagged_messages() deletes scan results by ID without fetching
+# them first. Messages younger than 14 days (the age is in the snowflake)
+# go out through bulk-delete, 100 per request; older ones are deleted one
+# by one, which is the only way Discord allows. Channels are purged
+# concurrently (PURGE_CHANNEL_WORKERS at a time): their requests fall in
+# different rate-limit buckets, and interactions' HTTP client already
+# queues each bucket on the X-RateLimit headers of its responses, so no
+# fixed sleeps are needed here. Every deleted ID is recorded in
+# purged_messages, so running /tos_purge again after an interruption
+# picks up where it stopped.
+
+DISCORD_EPOCH_MS = 1420070400000
+
+# Discord rejects bulk-delete for messages older than 14 days; leave a
+# margin for the time between deciding and sending the request
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(hours=1)
+BULK_DELETE_MAX = 100
+
+PURGE_CHANNEL_WORKERS = 4
+
+# Deleted IDs are written to purged_messages in batches of this size
+_PURGE_RECORD_EVERY = 100
+
+
+def snowflake_time(snowflake) -> datetime:
+    """Creation time (UTC) encoded in a Discord snowflake."""
+    return datetime.fromtimestamp(((int(snowflake) >> 22) + DISCORD_EPOCH_MS) / 1000, timezone.utc)
+
+
+async def _purge_channel(channel_id: str, message_ids: List[str], stats: dict, reason: str):
+    """Delete one channel's messages, bulk where allowed, recording progress."""
+    handled = 0
+    unsaved = []
+
+    def mark(ids: List[str], outcome: str):
+        nonlocal handled
+        handled += len(ids)
+        stats[outcome] += len(ids)
+        unsaved.extend(ids)
+        if MDB_AVAILABLE and len(unsaved) >= _PURGE_RECORD_EVERY:
+            mdb.record_purged_messages(channel_id, unsaved)
+            unsaved.clear()
+
+    async def delete_one(msg_id: str):
+        try:
+            await client.http.delete_message(int(channel_id), int(msg_id), reason=reason)
+            mark([msg_id], 'deleted')
+        except interactions.errors.NotFound:
+            mark([msg_id], 'already_gone')
+
+    cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+    recent = [m for m in message_ids if snowflake_time(m) > cutoff]
+    old = [m for m in message_ids if snowflake_time(m) <= cutoff]
+
+    try:
+        for i in range(0, len(recent), BULK_DELETE_MAX):
+            chunk = recent[i:i + BULK_DELETE_MAX]
+            if len(chunk) == 1:
+                old.extend(chunk)
+                continue
+            try:
+                # Unknown IDs are ignored by bulk-delete, so they count as deleted
+                await client.http.bulk_delete_messages(int(channel_id), [int(m) for m in chunk], reason=reason)
+                mark(chunk, 'deleted')
+            except interactions.errors.Forbidden:
+                raise
+            except interactions.errors.HTTPException as e:
+                # e.g. a message crossed the 14-day line while queued
+                logger.warning(f"Bulk delete in {channel_id} failed ({e}), deleting one by one")
+                old.extend(chunk)
+
+        for msg_id in old:
+            try:
+                await delete_one(msg_id)
+            except interactions.errors.Forbidden:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to delete {msg_id}: {e}")
+                handled += 1
+                stats['failed'] += 1
+    except Exception as e:
+        logger.error(f"Giving up on channel {channel_id}: {e}")
+        stats['failed'] += len(message_ids) - handled
+    finally:
+        if MDB_AVAILABLE and unsaved:
+            mdb.record_purged_messages(channel_id, unsaved)
+
+
+async def purge_flagged_messages(messages: List[dict], reason: str = None, on_progress=None) -> dict:
+    """
+    Delete flagged messages from Discord.
+
+    Args:
+        messages: Scan records with 'channel_id' and 'message_id'
+        reason: Audit log reason
+        on_progress: Optional async callback(stats), called every few seconds
+
+    Returns:
+        dict with 'total', 'deleted', 'already_gone' (deleted earlier or
+        by someone else), 'skipped' (done by an earlier purge run) and
+        'failed'
+    """
+    by_channel: Dict[str, List[str]] = {}
+    for msg in messages:
+        by_channel.setdefault(str(msg['channel_id']), []).append(str(msg['message_id']))
+
+    stats = {'total': 0, 'deleted': 0, 'already_gone': 0, 'skipped': 0, 'failed': 0}
+    for channel_id, msg_ids in by_channel.items():
+        unique = set(msg_ids)
+        purged = unique & mdb.get_purged_message_ids(channel_id) if MDB_AVAILABLE else set()
+        stats['total'] += len(unique)
+        stats['skipped'] += len(purged)
+        # Oldest first: bulk-delete chunks then hold messages of similar age
+        by_channel[channel_id] = sorted(unique - purged, key=int)
+
+    workers = asyncio.Semaphore(PURGE_CHANNEL_WORKERS)
+
+    async def run_channel(channel_id: str, msg_ids: List[str]):
+        async with workers:
+            await _purge_channel(channel_id, msg_ids, stats, reason)
+
+    tasks = [asyncio.create_task(run_channel(ch, ids)) for ch, ids in by_channel.items() if ids]
+    if tasks:
+        pending = set(tasks)
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=5)
+            if pending and on_progress:
+                try:
+                    await on_progress(stats)
+                except Exception as e:
+                    logger.warning(f"Purge progress update failed: {e}")
+    return stats
+
+
 # ============== EVENT HANDLERS ==============
 
 @listen()
@@ -1107,6 +1717,9 @@ async def on_ready():
         except Exception as e:
             logger.error(f"Database init failed: {e}")
 
+    # Restore offense counts before the first message needs them
+    get_offense_tracker()
+
 
 @listen()
 async def on_message_create(event: MessageCreate):
@@ -1184,7 +1797,7 @@ async def on_message_create(event: MessageCreate):
             logger.info(f"Deleted message {message.id} from {author_name}")
             
             # Repost censored version with "user said:" prefix
-            if censored and censored.strip() and censored != message.content:                
+            if should_repost(result, message.content):
                 await channel.send(f"**{author_mention}**\n{censored}")
             
             # Auto-timeout if needed
@@ -1262,12 +1875,13 @@ async def tos_scan_cmd(ctx: SlashContext, preview: bool = False):
     
     await ctx.send("🔍 Starting scan of Discord exports... This may take a few minutes.", ephemeral=True)
     
-    # Run scan in a thread pool to avoid blocking the event loop / heartbeat
+    # Run scan in a thread pool to avoid blocking the event loop / heartbeat;
+    # the scan itself fans out to worker processes
     import concurrent.futures
     loop = asyncio.get_event_loop()
     
     with concurrent.futures.ThreadPoolExecutor() as pool:
-        results = await loop.run_in_executor(pool, scan_all_exports)
+        results = await loop.run_in_executor(pool, lambda: scan_exports_parallel(resume=False))
     
     if 'error' in results:
         await ctx.send(f"❌ Error: {results['error']}", ephemeral=True)
@@ -1279,15 +1893,12 @@ async def tos_scan_cmd(ctx: SlashContext, preview: bool = False):
     embed.add_field(name="Flagged", value=f"{results['total_flagged']:,}", inline=True)
     
     if results['total_flagged'] > 0:
-        # Group by severity
-        by_severity = {}
-        for msg in results['flagged_messages']:
-            sev = msg.get('severity', 0)
-            by_severity[sev] = by_severity.get(sev, 0) + 1
-        
-        severity_text = "\n".join([f"Severity {s}: {c}" for s, c in sorted(by_severity.items(), reverse=True)])
+        severity_text = "\n".join([f"Severity {s}: {c}" for s, c in sorted(results['by_severity'].items(), reverse=True)])
         embed.add_field(name="By Severity", value=severity_text or "N/A", inline=False)
     
+    if results.get('failed_shards'):
+        embed.add_field(name="Failed", value=f"{len(results['failed_shards'])} file(s)/shard(s), see log", inline=False)
+    
     embed.set_footer(text=f"Results saved to flagged_messages.json")
     
     await ctx.send(embed=embed, ephemeral=True)
@@ -1329,50 +1940,25 @@ async def tos_purge_cmd(ctx: SlashContext, confirm: str, min_severity: int = 3,
     
     status_msg = await ctx.send(f"🗑️ Deleting {len(messages)} flagged messages...")
     
-    deleted = 0
-    failed = 0
-    
-    # Group by channel for efficiency
-    by_channel = {}
-    for msg in messages:
-        ch_id = msg['channel_id']
-        if ch_id not in by_channel:
-            by_channel[ch_id] = []
-        by_channel[ch_id].append(msg['message_id'])
+    async def show_progress(stats):
+        done = stats['deleted'] + stats['already_gone'] + stats['skipped'] + stats['failed']
+        await status_msg.edit(content=f"🗑️ Progress: {done}/{stats['total']} handled "
+                                      f"({stats['deleted']} deleted, {stats['failed']} failed)...")
     
-    for channel_id, msg_ids in by_channel.items():
-        try:
-            channel = client.get_channel(int(channel_id))
-            if not channel:
-                failed += len(msg_ids)
-                continue
-            
-            for msg_id in msg_ids:
-                try:
-                    message = await channel.fetch_message(int(msg_id))
-                    await message.delete()
-                    deleted += 1
-                    
-                    if deleted % 5 == 0:
-                        await asyncio.sleep(1)  # Rate limiting
-                    
-                    if deleted % 50 == 0:
-                        await status_msg.edit(content=f"🗑️ Progress: {deleted}/{len(messages)} deleted...")
-                        
-                except interactions.errors.NotFound:
-                    deleted += 1  # Already deleted
-                except Exception as e:
-                    logger.error(f"Failed to delete {msg_id}: {e}")
-                    failed += 1
-                    
-        except Exception as e:
-            logger.error(f"Error with channel {channel_id}: {e}")
-            failed += len(msg_ids)
+    stats = await purge_flagged_messages(
+        messages, reason=f"ToS purge by {ctx.author.display_name}", on_progress=show_progress
+    )
+    deleted = stats['deleted'] + stats['already_gone']
+    failed = stats['failed']
     
     embed = Embed(title="🗑️ Purge Complete", color=0x00ff00 if failed == 0 else 0xffaa00)
     embed.add_field(name="Deleted", value=str(deleted), inline=True)
     embed.add_field(name="Failed", value=str(failed), inline=True)
     embed.add_field(name="Min Severity", value=str(min_severity), inline=True)
+    if stats['skipped']:
+        embed.add_field(name="Already Purged", value=f"{stats['skipped']} (earlier run)", inline=True)
+    if failed:
+        embed.set_footer(text="Run /tos_purge again to retry the failed messages")
     
     await status_msg.edit(content="", embed=embed)
     
@@ -1396,7 +1982,7 @@ async def tos_stats_cmd(ctx: SlashContext):
     embed.add_field(name="Flagged (Session)", value=str(len(flagged_messages_cache)), inline=True)
     
     # User offense counts
-    active_offenders = sum(1 for offenses in user_offenses_cache.values() if len(offenses) >= 2)
+    active_offenders = len(get_offense_tracker().users(hours=ACTIVE_OFFENDER_HOURS, min_offenses=2))
     embed.add_field(name="Active Offenders", value=str(active_offenders), inline=True)
     
     # Database stats if available
@@ -1410,6 +1996,17 @@ async def tos_stats_cmd(ctx: SlashContext):
                 embed.add_field(name="Top Triggers", value="\n".join(words) or "None", inline=False)
         except:
             pass
+        
+        writer = mdb.get_event_writer_stats()
+        if writer:
+            embed.add_field(
+                name="Write Queue",
+                value=f"{writer['rows_submitted']:,} events in {writer['batches']:,} commits "
+                      f"(avg {writer['commit_ms_avg']} ms)\n"
+                      f"Queued: {writer['queue_depth']} | Failed: {writer['rows_failed']} | "
+                      f"Dropped: {writer['rows_dropped']}",
+                inline=False
+            )
     
     # Config summary
     embed.add_field(
@@ -1434,7 +2031,7 @@ async def tos_test_cmd(ctx: SlashContext, message: str):
         await ctx.send("❌ Permission denied.", ephemeral=True)
         return
     
-    result = analyzer.analyze(message)
+    result = analyzer.analyze(message, full=True)
     
     status = "🚨 WOULD DELETE" if result.should_delete else ("⚠️ FLAGGED" if result.is_flagged else "✅ CLEAN")
     
@@ -1480,6 +2077,7 @@ async def tos_addword_cmd(ctx: SlashContext, word: str, severity: str = "moderat
         if word not in BAD_WORDS_MODERATE:
             BAD_WORDS_MODERATE.append(word)
         sev_num = 3
+    analyzer.rebuild_matchers()
     
     # Also add to database if available
     if MDB_AVAILABLE:
@@ -1587,33 +2185,29 @@ async def tos_status_cmd(ctx: SlashContext):
     embed.add_field(
         name="Session Stats",
         value=f"Flagged this session: {len(flagged_messages_cache)}\n"
-              f"Active offenders: {sum(1 for o in user_offenses_cache.values() if len(o) >= 2)}",
+              f"Active offenders: {len(get_offense_tracker().users(hours=ACTIVE_OFFENDER_HOURS, min_offenses=2))}",
         inline=False
     )
+
+    embed.add_field(name="Analysis Pipeline", value=format_stats(analyzer.pipeline.stats()), inline=False)
     
     await ctx.send(embed=embed, ephemeral=True)
 
 
 # ============== RUN ==============
 
-def run_cli_scan():
+def run_cli_scan(workers: int = None, resume: bool = True):
     """Run a scan from command line without starting the bot."""
     print("=" * 60)
-    print("ToS SCANNER - Streaming Mode")
+    print("ToS SCANNER - Parallel Mode")
     print("=" * 60)
 
-    # Check for ijson
-    if not IJSON_AVAILABLE:
-        print("❌ Error: ijson not installed")
-        print("   Run: pip install ijson")
+    # Checkpoints live in moderation.db, so the parallel scanner needs it
+    if not MDB_AVAILABLE:
+        print("❌ Error: moderation_db not available")
         return
-
-    # Initialize database
-    if MDB_AVAILABLE:
-        mdb.init_moderation_db()
-        print("✅ Database initialized")
-    else:
-        print("⚠️  Database module not available - using JSON output only")
+    mdb.init_moderation_db()
+    print("✅ Database initialized")
 
     # Import training samples if analytics DB exists
     print(f"\n📚 Importing training samples from {mdb}...")
@@ -1624,14 +2218,15 @@ def run_cli_scan():
     except Exception as e:
         print(f"   Warning: Could not import training samples: {e}")
 
-    print(f"\n🔍 Starting streaming scan...")
+    print(f"\n🔍 Starting parallel scan ({'resuming' if resume else 'from scratch'})...")
     print(f"   Export directory: {EXPORT_DIR}")
+    print(f"   Workers: {workers or os.cpu_count()}")
     print(f"   Critical words: {len(BAD_WORDS_CRITICAL)}")
     print(f"   Moderate words: {len(BAD_WORDS_MODERATE)}")
     print(f"   ToS patterns: {len(TOS_VIOLATION_PATTERNS)}")
     print()
 
-    results = scan_all_exports_streaming()
+    results = scan_exports_parallel(workers=workers, resume=resume)
 
     if 'error' in results:
         print(f"❌ Error: {results['error']}")
@@ -1642,6 +2237,10 @@ def run_cli_scan():
     print(f"   Files scanned: {results['total_files_scanned']}")
     print(f"   Messages scanned: {results['total_messages_scanned']:,}")
     print(f"   Flagged: {results['total_flagged']:,}")
+    if results['resumed_shards']:
+        print(f"   Already done from an earlier run: {results['resumed_shards']} shard(s)")
+    if results['failed_shards']:
+        print(f"   ⚠️  Failed (re-run to retry): {', '.join(results['failed_shards'])}")
 
     # Show per-file breakdown if there are multiple files
     if 'file_stats' in results and len(results['file_stats']) > 1:
@@ -1652,8 +2251,7 @@ def run_cli_scan():
 
     print(f"\n   Results saved to:")
     print(f"     - flagged_messages.json")
-    if MDB_AVAILABLE:
-        print(f"     - moderation.db")
+    print(f"     - moderation.db")
     print("\nNext: Start the bot and use /tos_purge to delete flagged messages")
 
 
@@ -1661,8 +2259,13 @@ if __name__ == "__main__":
     import sys
     
     # Check for CLI mode
+    # python server_helper.py --scan [--workers N] [--fresh]
+    # (--fresh ignores saved progress; use it after changing the word lists)
     if len(sys.argv) > 1 and sys.argv[1] == "--scan":
-        run_cli_scan()
+        workers = None
+        if "--workers" in sys.argv:
+            workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        run_cli_scan(workers=workers, resume="--fresh" not in sys.argv)
         sys.exit(0)
     
     if PROTECTOR_BOT_TOKEN == "BOT_TOKEN_HERE":
@@ -1687,4 +2290,9 @@ if __name__ == "__main__":
     print("\nTip: Run 'python server_helper.py --scan' to scan exports without starting the bot")
     print("")
     
-    client.start()
\ No newline at end of file
+    try:
+        client.start()
+    finally:
+        # Commit flags still waiting in the moderation write queue
+        if MDB_AVAILABLE:
+            mdb.stop_event_writer()
\ No newline at end of file
@@ -17,6 +17,7 @@ from interactions import (
 )
 from datetime import datetime
 from common import db
+from common import async_db as adb
 
 # Import your guild_id and role IDs from consts
 from common.consts import guild_id, admin_role, support_role
@@ -41,12 +42,19 @@ def format_number(n: int) -> str:
     return str(n)
 
 
+TIMEOUT_MESSAGE = "That query took too long and was cancelled. Try again in a bit."
+
+
 # ============== SLASH COMMANDS ==============
 
 """ @slash_command(name="server_stats", description="Show overall server statistics.", scopes=[guild_id])
 @auto_defer(enabled=True, ephemeral=False, time_until_defer=0.0)
 async def server_stats_cmd(ctx: SlashContext):
-    stats = db.get_server_overview()
+    try:
+        stats = await adb.get_server_overview()
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     embed = Embed(
         title="📊 Server Statistics",
@@ -103,7 +111,11 @@ async def server_stats_cmd(ctx: SlashContext):
 @auto_defer(enabled=True, ephemeral=False, time_until_defer=0.0)
 async def channel_stats_cmd(ctx: SlashContext, limit: int = 10):
     """Display channel statistics."""
-    channels = db.get_channel_stats(limit=min(limit, 25))
+    try:
+        channels = await adb.get_channel_stats(limit=min(limit, 25))
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     if not channels:
         await ctx.send("No channel data available yet.", ephemeral=True)
@@ -142,7 +154,11 @@ async def channel_stats_cmd(ctx: SlashContext, limit: int = 10):
 @auto_defer(enabled=True, ephemeral=False, time_until_defer=0.0)
 async def user_stats_cmd(ctx: SlashContext, limit: int = 10):
     """Display user activity statistics."""
-    users = db.get_user_stats(limit=min(limit, 25))
+    try:
+        users = await adb.get_user_stats(limit=min(limit, 25))
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     if not users:
         await ctx.send("No user data available yet.", ephemeral=True)
@@ -175,7 +191,11 @@ async def user_stats_cmd(ctx: SlashContext, limit: int = 10):
 @auto_defer(enabled=True, ephemeral=False, time_until_defer=0.0)
 async def activity_hours_cmd(ctx: SlashContext):
     """Display hourly activity heatmap."""
-    hourly = db.get_hourly_activity()
+    try:
+        hourly = await adb.get_hourly_activity()
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     embed = Embed(
         title="🕐 Hourly Activity (UTC)",
@@ -252,28 +272,28 @@ async def user_profile_cmd(ctx: SlashContext, user: interactions.User):
     """Display detailed statistics for a specific user."""
     user_id = str(user.id)
     
-    # Get user messages for stats
-    messages = db.get_user_messages(user_id)
+    # Totals come from the analytics rollups, not from loading every message
+    try:
+        profile = await adb.get_user_profile(user_id)
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
-    if not messages:
+    if not profile:
         await ctx.send(f"No message data found for {user.mention}.", ephemeral=True)
         return
     
-    # Calculate stats
-    total_msgs = len(messages)
-    total_words = sum(len(m['content'].split()) for m in messages)
-    avg_words = total_words / total_msgs if total_msgs > 0 else 0
+    total_msgs = profile['total_messages']
+    total_words = profile['total_words']
+    avg_words = profile['avg_words_per_msg']
+    top_channels = profile['top_channels']
     
-    # Channel distribution
-    channel_counts = {}
-    for msg in messages:
-        ch = msg['channel_name']
-        channel_counts[ch] = channel_counts.get(ch, 0) + 1
-    
-    top_channels = sorted(channel_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-    
-    # Get vocabulary
-    top_words = db.get_user_vocabulary(user_id, top_n=10)
+    # Get vocabulary (incremental; the first call for a heavy poster builds
+    # their term counts, so allow it longer than the default timeout)
+    try:
+        top_words = await adb.get_user_vocabulary(user_id, top_n=10, timeout=60)
+    except adb.QueryTimeout:
+        top_words = []
     
     embed = Embed(
         title=f"📊 Profile: {user.display_name}",
@@ -292,8 +312,8 @@ async def user_profile_cmd(ctx: SlashContext, user: interactions.User):
     
     embed.add_field(
         name="📅 Active Period",
-        value=f"First: {messages[0]['timestamp'][:10]}\n"
-              f"Last: {messages[-1]['timestamp'][:10]}",
+        value=f"First: {(profile['first_message'] or 'N/A')[:10]}\n"
+              f"Last: {(profile['last_message'] or 'N/A')[:10]}",
         inline=True
     )
     
@@ -326,7 +346,11 @@ async def user_profile_cmd(ctx: SlashContext, user: interactions.User):
 @auto_defer(enabled=True, ephemeral=False, time_until_defer=0.0)
 async def daily_activity_cmd(ctx: SlashContext, days: int = 14):
     """Display daily message activity."""
-    daily = db.get_daily_activity(days=min(days, 30))
+    try:
+        daily = await adb.get_daily_activity(days=min(days, 30))
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     if not daily:
         await ctx.send("No recent activity data available.", ephemeral=True)
@@ -379,7 +403,11 @@ async def export_user_cmd(ctx: SlashContext, user: interactions.User):
     user_id = str(user.id)
     output_path = f"user_corpus_{user_id}.txt"
     
-    count = db.export_user_corpus(user_id, output_path)
+    try:
+        count = await adb.export_user_corpus(user_id, output_path)
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     if count == 0:
         await ctx.send(f"No messages found for {user.mention}.", ephemeral=True)
@@ -407,7 +435,11 @@ async def channel_compare_cmd(
     if channel3:
         channel_ids.append(str(channel3.id))
     
-    channels = db.get_channel_activity_comparison(channel_ids)
+    try:
+        channels = await adb.get_channel_activity_comparison(channel_ids)
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     if not channels:
         await ctx.send("No data found for the specified channels.", ephemeral=True)
@@ -443,7 +475,11 @@ async def search_messages_cmd(ctx: SlashContext, query: str, limit: int = 10):
         await ctx.send("You don't have permission to use this command.", ephemeral=True)
         return
     
-    results = db.search_messages(query, limit=min(limit, 25))
+    try:
+        results = await adb.search_messages(query, limit=min(limit, 25))
+    except adb.QueryTimeout:
+        await ctx.send(TIMEOUT_MESSAGE, ephemeral=True)
+        return
     
     if not results:
         await ctx.send(f"No messages found containing '{query}'.", ephemeral=True)
@@ -2124,9 +2124,9 @@ async def on_message_create(ctx):
     if ctx.message.author.bot:
         return
 
-    # Store message to SQLite if not in excluded channels
+    # Queue message for SQLite if not in excluded channels (committed in batches by a background writer)
     if ctx.message.channel.id not in excluded_highlight_channels:
-        db.insert_live_message({
+        db.queue_live_message({
             'message_id': ctx.message.id,
             'channel_id': ctx.message.channel.id,
             'author_id': ctx.message.author.id,
@@ -2296,6 +2296,8 @@ def write_pid():
 def cleanup():
     """Clean up PID file and resources."""
     logger.info("Cleaning up...")
+    # Commit any live messages still sitting in the write-behind queue
+    db.stop_live_writer()
     PID_FILE.unlink(missing_ok=True)
 
 
@@ -3,6 +3,6 @@ common - Shared library for all server-apps bots.
 
 Quick imports:
     from common.config import DATA_DIR, ANALYTICS_DB_PATH
-    from common.db import get_connection, insert_live_message
+    from common.db import read_session, db_session, insert_live_message
     from common.moderation_db import log_flagged_message
 """
@@ -0,0 +1,193 @@
+"""
+Message analysis as declared stages, with early exit and per-stage timing.
+
+Most chat is clean, but the analyzers used to run every check on every
+message: context regexes, hate-combination patterns, VADER sentiment and
+a censoring pass that re-scanned the text. An AnalysisPipeline runs a
+list of Stage(name, run, when) in order instead:
+
+- run(state) does the stage's work on a per-message state object.
+  Returning True ends the pipeline there; the prefilter does this for
+  messages nothing could match, so a clean message costs the prefilter
+  alone.
+- when(state), if given, says whether the stage has anything to do for
+  this message. Expensive stages only run for candidates.
+- run(state, full=True) ignores both and runs every stage (/tos_test
+  shows sentiment for clean messages too).
+
+Every stage counts how often it ran, was skipped and ended the pipeline,
+and keeps a latency histogram. stats() returns them; format_stats()
+renders them for the status commands.
+
+Used by bots/protector/server_helper.py and
+bots/protector/content_analyzer.py.
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+# Histogram bucket upper bounds, milliseconds (the last bucket is open)
+LATENCY_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100)
+
+
+class LatencyHistogram:
+    """Counts of durations per LATENCY_BUCKETS_MS bucket. Not thread-safe."""
+
+    __slots__ = ('counts', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile (max_ms for the open bucket)."""
+        n = sum(self.counts)
+        if not n:
+            return 0.0
+        rank, seen = p / 100 * n, 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        n = sum(self.counts)
+        labels = [f"<={b}ms" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            'avg_ms': round(self.total_ms / n, 4) if n else 0.0,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 4),
+            'histogram': {label: c for label, c in zip(labels, self.counts) if c},
+        }
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of an AnalysisPipeline."""
+    name: str
+    run: Callable[[Any], Optional[bool]]           # True = stop after this stage
+    when: Optional[Callable[[Any], bool]] = None   # None = always run
+
+
+class _StageStats:
+    __slots__ = ('ran', 'skipped', 'exited', 'latency')
+
+    def __init__(self):
+        self.ran = 0
+        self.skipped = 0
+        self.exited = 0
+        self.latency = LatencyHistogram()
+
+
+class AnalysisPipeline:
+    """Ordered stages run on a per-message state, with counters and latency histograms."""
+
+    def __init__(self, stages: Iterable[Stage]):
+        self.stages = list(stages)
+        self._lock = threading.Lock()
+        self._messages = 0
+        self._total = LatencyHistogram()
+        self._stats = {stage.name: _StageStats() for stage in self.stages}
+
+    def run(self, state, full: bool = False):
+        """Run the stages on `state` and return it."""
+        timings = []  # (stage, ms or None if skipped, exited)
+        started = time.perf_counter()
+        for stage in self.stages:
+            if not full and stage.when is not None and not stage.when(state):
+                timings.append((stage.name, None, False))
+                continue
+            t = time.perf_counter()
+            stop = stage.run(state)
+            timings.append((stage.name, (time.perf_counter() - t) * 1000, bool(stop)))
+            if stop and not full:
+                break
+        total_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self._messages += 1
+            self._total.record(total_ms)
+            for name, ms, exited in timings:
+                stats = self._stats[name]
+                if ms is None:
+                    stats.skipped += 1
+                    continue
+                stats.ran += 1
+                stats.exited += exited
+                stats.latency.record(ms)
+        return state
+
+    def stats(self) -> dict:
+        """Messages analyzed, overall latency, and per stage: ran/skipped/exited plus latency."""
+        with self._lock:
+            return {
+                'messages': self._messages,
+                'total': self._total.snapshot(),
+                'stages': {
+                    name: {'ran': s.ran, 'skipped': s.skipped, 'exited': s.exited,
+                           **s.latency.snapshot()}
+                    for name, s in self._stats.items()
+                },
+            }
+
+
+def format_stats(stats: dict) -> str:
+    """A few lines for a Discord embed field: totals, then one line per stage."""
+    n = stats['messages']
+    if not n:
+        return "No messages analyzed yet"
+    total = stats['total']
+    lines = [f"{n:,} messages, avg {total['avg_ms'] * 1000:.0f} µs, p99 <= {total['p99_ms'] * 1000:.0f} µs"]
+    for name, s in stats['stages'].items():
+        line = f"`{name}`: ran {s['ran'] / n:.1%}"
+        if s['ran']:
+            line += f", avg {s['avg_ms'] * 1000:.0f} µs"
+        if s['exited']:
+            line += f", ended {s['exited']:,}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def any_match(patterns: Iterable[str], flags: int = 0) -> Callable[[str], bool]:
+    """
+    A function telling whether any of `patterns` matches a text, in as
+    few regex passes as possible.
+
+    Patterns are joined into one alternation. Ones with backreferences
+    (group numbers would shift in the alternation) stay separate, and if
+    the alternation doesn't compile each pattern is tried on its own.
+    Patterns that don't compile are ignored.
+    """
+    joinable, separate = [], []
+    for pattern in patterns:
+        try:
+            compiled = re.compile(pattern, flags)
+        except re.error:
+            continue
+        if re.search(r'\\[1-9]|\(\?P=', pattern):
+            separate.append(compiled)
+        else:
+            joinable.append(pattern)
+
+    regexes: List[re.Pattern] = list(separate)
+    if joinable:
+        try:
+            regexes.insert(0, re.compile('|'.join(f'(?:{p})' for p in joinable), flags))
+        except re.error:
+            regexes[:0] = [re.compile(p, flags) for p in joinable]
+
+    def matches(text: str) -> bool:
+        return any(regex.search(text) for regex in regexes)
+    return matches
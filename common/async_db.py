@@ -0,0 +1,227 @@
+"""
+Awaitable facade over common.db and common.moderation_db.
+
+The helpers in common.db / common.moderation_db are synchronous. Calling
+them straight from a slash command or event listener blocks the event
+loop, so one slow aggregate on the analytics archive stalls the gateway
+heartbeat, moderation and message capture along with it.
+
+This module mirrors those helpers as coroutines that run on dedicated,
+bounded thread pools ("lanes"):
+
+- analytics: whole-archive aggregates and per-user scans (/server_stats,
+  /user_profile, search, corpus export). Small pool, so a burst of heavy
+  commands queues up here instead of occupying every worker.
+- default: moderation lookups/logging and single-row reads. Never shares
+  workers with the analytics lane.
+
+Every call takes an optional timeout= (seconds, None to disable). When a
+call times out or the awaiting task is cancelled, the read query the
+worker is running is interrupted (see pool.interrupt_readers()) so the
+worker frees up instead of finishing a result nobody will read. Writes
+are never interrupted; a call that hasn't started yet is skipped.
+
+Usage:
+    from common import async_db as adb
+
+    stats = await adb.get_server_overview()
+    channels = await adb.get_monitored_channels(timeout=2)
+
+    # anything not mirrored here
+    result = await adb.run(db.some_helper, arg, lane="analytics")
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import db
+from . import moderation_db as mdb
+from .config import ASYNC_DB_WORKERS, ASYNC_DB_ANALYTICS_WORKERS, ASYNC_DB_TIMEOUT
+from .pool import interrupt_readers
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS = "analytics"
+DEFAULT = "default"
+
+_LANE_WORKERS = {
+    ANALYTICS: ASYNC_DB_ANALYTICS_WORKERS,
+    DEFAULT: ASYNC_DB_WORKERS,
+}
+
+# Calls admitted per lane (running + waiting for a worker). Beyond this,
+# callers wait on the event loop, and that wait counts toward their timeout.
+_ADMISSION_FACTOR = 4
+
+_executors: dict = {}
+_executors_lock = threading.Lock()
+
+# (event loop, lane) -> asyncio.Semaphore
+_admission: dict = {}
+
+_UNSET = object()
+
+
+class QueryTimeout(TimeoutError):
+    """Raised when an awaited database call exceeds its timeout."""
+
+
+def _executor(lane: str) -> ThreadPoolExecutor:
+    executor = _executors.get(lane)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(lane)
+            if executor is None:
+                executor = ThreadPoolExecutor(
+                    max_workers=max(1, _LANE_WORKERS[lane]),
+                    thread_name_prefix=f"async-db-{lane}",
+                )
+                _executors[lane] = executor
+    return executor
+
+
+def _semaphore(lane: str) -> asyncio.Semaphore:
+    # Semaphores are bound to the loop that first uses them
+    key = (asyncio.get_running_loop(), lane)
+    sem = _admission.get(key)
+    if sem is None:
+        sem = asyncio.Semaphore(max(1, _LANE_WORKERS[lane]) * _ADMISSION_FACTOR)
+        _admission[key] = sem
+    return sem
+
+
+class _Call:
+    """One submitted call; knows which worker thread is running it."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.cancelled = False
+        self.thread_ident = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        with self._lock:
+            if self.cancelled:
+                return None
+            self.thread_ident = threading.get_ident()
+        try:
+            return self.fn()
+        finally:
+            # Held while cancel() interrupts, so the worker can't move on
+            # to another call's queries in between
+            with self._lock:
+                self.thread_ident = None
+
+    def cancel(self) -> int:
+        with self._lock:
+            self.cancelled = True
+            if self.thread_ident is None:
+                return 0
+            return interrupt_readers(self.thread_ident)
+
+
+async def run(fn, *args, lane: str = DEFAULT, timeout=_UNSET, **kwargs):
+    """
+    Run a synchronous DB function on a lane's executor and await it.
+
+    Args:
+        fn: Any blocking callable (normally a common.db / moderation_db helper).
+        lane: "default" or "analytics".
+        timeout: Seconds before giving up (None = no limit). Defaults to
+            ASYNC_DB_TIMEOUT.
+
+    Raises:
+        QueryTimeout: The call didn't finish in time; its read was interrupted.
+    """
+    if timeout is _UNSET:
+        timeout = ASYNC_DB_TIMEOUT
+
+    loop = asyncio.get_running_loop()
+    call = _Call(functools.partial(fn, *args, **kwargs))
+
+    async def submit():
+        async with _semaphore(lane):
+            return await loop.run_in_executor(_executor(lane), call.run)
+
+    try:
+        return await asyncio.wait_for(submit(), timeout)
+    except asyncio.TimeoutError:
+        interrupted = call.cancel()
+        logger.warning(
+            f"{getattr(fn, '__name__', fn)} timed out after {timeout}s "
+            f"on the {lane} lane ({interrupted} read(s) interrupted)"
+        )
+        raise QueryTimeout(f"{getattr(fn, '__name__', fn)} exceeded {timeout}s") from None
+    except asyncio.CancelledError:
+        call.cancel()
+        raise
+
+
+def _wrap(fn, lane: str = DEFAULT):
+    """Build the awaitable mirror of a synchronous helper."""
+
+    @functools.wraps(fn)
+    async def wrapper(*args, timeout=_UNSET, **kwargs):
+        return await run(fn, *args, lane=lane, timeout=timeout, **kwargs)
+
+    return wrapper
+
+
+def shutdown(wait: bool = False):
+    """Stop the lane executors (call from shutdown handlers)."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    _admission.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# ============== ANALYTICS (common.db) ==============
+
+search_messages = _wrap(db.search_messages, ANALYTICS)
+get_user_messages = _wrap(db.get_user_messages, ANALYTICS)
+get_user_stats = _wrap(db.get_user_stats, ANALYTICS)
+get_hourly_activity = _wrap(db.get_hourly_activity, ANALYTICS)
+get_daily_activity = _wrap(db.get_daily_activity, ANALYTICS)
+get_server_overview = _wrap(db.get_server_overview, ANALYTICS)
+get_user_vocabulary = _wrap(db.get_user_vocabulary, ANALYTICS)
+get_user_terms = _wrap(db.get_user_terms, ANALYTICS)
+get_user_profile = _wrap(db.get_user_profile, ANALYTICS)
+get_channel_activity_comparison = _wrap(db.get_channel_activity_comparison, ANALYTICS)
+get_channel_stats = _wrap(db.get_channel_stats, ANALYTICS)
+export_user_corpus = _wrap(db.export_user_corpus, ANALYTICS)
+
+get_live_message_by_id = _wrap(db.get_live_message_by_id)
+get_recent_live_messages = _wrap(db.get_recent_live_messages)
+insert_highlight = _wrap(db.insert_highlight)
+get_highlight_by_original = _wrap(db.get_highlight_by_original)
+insert_reply_tracking = _wrap(db.insert_reply_tracking)
+count_replies_to_message = _wrap(db.count_replies_to_message)
+get_replies_to_message = _wrap(db.get_replies_to_message)
+
+# ============== MODERATION (common.moderation_db) ==============
+
+add_bad_word = _wrap(mdb.add_bad_word)
+add_bad_words_bulk = _wrap(mdb.add_bad_words_bulk)
+get_bad_words = _wrap(mdb.get_bad_words)
+increment_word_match = _wrap(mdb.increment_word_match)
+log_flagged_message = _wrap(mdb.log_flagged_message)
+get_flagged_messages = _wrap(mdb.get_flagged_messages)
+log_user_offense = _wrap(mdb.log_user_offense)
+record_moderation_event = _wrap(mdb.record_moderation_event)
+get_user_offense_count = _wrap(mdb.get_user_offense_count)
+get_repeat_offenders = _wrap(mdb.get_repeat_offenders)
+add_monitored_channel = _wrap(mdb.add_monitored_channel)
+remove_monitored_channel = _wrap(mdb.remove_monitored_channel)
+get_monitored_channels = _wrap(mdb.get_monitored_channels)
+add_training_sample = _wrap(mdb.add_training_sample)
+add_learned_pattern = _wrap(mdb.add_learned_pattern)
+get_learned_patterns = _wrap(mdb.get_learned_patterns)
+update_pattern_stats = _wrap(mdb.update_pattern_stats)
+get_moderation_stats = _wrap(mdb.get_moderation_stats)
+get_scan_progress = _wrap(mdb.get_scan_progress)
+get_all_scan_progress = _wrap(mdb.get_all_scan_progress)
@@ -40,6 +40,14 @@ ANALYTICS_DB_PATH = DATA_DIR / "discord_analytics.db"
 # Moderation database - primarily used by protector bot
 MODERATION_DB_PATH = DATA_DIR / "moderation.db"
 
+# Cold, per-year partitions of the `messages` archive (see
+# "HOT/COLD ARCHIVE PARTITIONS" in common/db.py)
+ARCHIVE_DIR = DATA_DIR / "archive"
+
+# Messages older than this many days are moved out of the hot
+# discord_analytics.db by scripts/archive_messages.py
+ARCHIVE_HORIZON_DAYS = int(os.environ.get("ARCHIVE_HORIZON_DAYS", "365"))
+
 # ---------------------------------------------------------------------------
 # RAG / ChromaDB paths (persona bot only for now)
 # ---------------------------------------------------------------------------
@@ -75,3 +83,70 @@ SQLITE_PRAGMAS = {
     "synchronous": "NORMAL",     # safe with WAL, faster than FULL
     "foreign_keys": "ON",
 }
+
+# ---------------------------------------------------------------------------
+# Connection pool sizing (see common/pool.py)
+# ---------------------------------------------------------------------------
+# Each bot process keeps this many read connections open per database,
+# plus one write connection per thread that writes.
+SQLITE_READ_POOL_SIZE = int(os.environ.get("SQLITE_READ_POOL_SIZE", "4"))
+
+# Prepared statements cached per connection (sqlite3 default is 128)
+SQLITE_STATEMENT_CACHE = int(os.environ.get("SQLITE_STATEMENT_CACHE", "256"))
+
+# ---------------------------------------------------------------------------
+# Live message write-behind queue (see common.db.LiveMessageWriter)
+# ---------------------------------------------------------------------------
+# Live messages are group-committed every N rows or T milliseconds,
+# whichever comes first. If the queue fills up, rows wait in an overflow
+# buffer of the same size; past that they are dropped (rows_dropped).
+LIVE_WRITER_BATCH_SIZE = int(os.environ.get("LIVE_WRITER_BATCH_SIZE", "200"))
+LIVE_WRITER_FLUSH_MS = int(os.environ.get("LIVE_WRITER_FLUSH_MS", "250"))
+LIVE_WRITER_QUEUE_SIZE = int(os.environ.get("LIVE_WRITER_QUEUE_SIZE", "10000"))
+
+# ---------------------------------------------------------------------------
+# Moderation event write-behind queue (see common.moderation_db.ModerationEventWriter)
+# ---------------------------------------------------------------------------
+# A flag's message row, offense row and word counters are one event and
+# one transaction; queued events are group-committed like live messages.
+MOD_WRITER_BATCH_SIZE = int(os.environ.get("MOD_WRITER_BATCH_SIZE", "100"))
+MOD_WRITER_FLUSH_MS = int(os.environ.get("MOD_WRITER_FLUSH_MS", "250"))
+MOD_WRITER_QUEUE_SIZE = int(os.environ.get("MOD_WRITER_QUEUE_SIZE", "5000"))
+
+# ---------------------------------------------------------------------------
+# Async DB facade (see common/async_db.py)
+# ---------------------------------------------------------------------------
+# Worker threads per lane. Heavy analytics aggregates get their own lane
+# so they can't occupy the workers that capture and moderation use.
+ASYNC_DB_WORKERS = int(os.environ.get("ASYNC_DB_WORKERS", "4"))
+ASYNC_DB_ANALYTICS_WORKERS = int(os.environ.get("ASYNC_DB_ANALYTICS_WORKERS", "2"))
+
+# Default per-query timeout in seconds (override per call with timeout=)
+ASYNC_DB_TIMEOUT = float(os.environ.get("ASYNC_DB_TIMEOUT", "15"))
+
+# ---------------------------------------------------------------------------
+# Per-user term statistics (see common/token_stats.py)
+# ---------------------------------------------------------------------------
+# Distinct words / bigrams / trigrams kept per user. Memory and the
+# user_term_counts side table are bounded by this, not by history size.
+USER_TERM_CAPACITY = int(os.environ.get("USER_TERM_CAPACITY", "5000"))
+
+# Persist term counts in user_term_counts and update them incrementally
+# (set to 0 to always recompute by streaming the user's history)
+USER_TERM_CACHE = os.environ.get("USER_TERM_CACHE", "1") == "1"
+
+# ---------------------------------------------------------------------------
+# Analytics storage layout (see "STORAGE SCHEMA" in common/db.py)
+# ---------------------------------------------------------------------------
+# "text" (original, TEXT ids) or "compact" (integer ids, derived
+# timestamps). Only decides the layout of a newly created database;
+# convert an existing one with scripts/migrate_compact_schema.py.
+ANALYTICS_SCHEMA = os.environ.get("ANALYTICS_SCHEMA", "text").lower()
+
+# ---------------------------------------------------------------------------
+# Moderation rules (see bots/protector/content_analyzer.py)
+# ---------------------------------------------------------------------------
+# How often the analyzer checks moderation.db for bad word / learned
+# pattern changes made by any process (seconds). A check that finds
+# nothing new costs one PRAGMA; a change is picked up within this long.
+MODERATION_RULES_POLL_SECONDS = float(os.environ.get("MODERATION_RULES_POLL_SECONDS", "5"))
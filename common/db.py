@@ -12,20 +12,35 @@ All connections use WAL mode for safe concurrent access from
 multiple bot processes. See common/config.py for path configuration.
 
 Usage from any bot:
-    from common.db import get_connection, insert_live_message, search_messages
+    from common.db import db_session, read_session, insert_live_message, search_messages
 """
 
 import sqlite3
 import json
 import os
+import queue
+import threading
+import time
 import logging
 from contextlib import contextmanager
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional
-from collections import Counter
 
-from .config import ANALYTICS_DB_PATH, SQLITE_PRAGMAS
+from .config import (
+    ANALYTICS_DB_PATH,
+    ANALYTICS_SCHEMA,
+    ARCHIVE_DIR,
+    ARCHIVE_HORIZON_DAYS,
+    LIVE_WRITER_BATCH_SIZE,
+    LIVE_WRITER_FLUSH_MS,
+    LIVE_WRITER_QUEUE_SIZE,
+    USER_TERM_CAPACITY,
+    USER_TERM_CACHE,
+)
+from .group_commit import GroupCommitWriter
+from .pool import ConnectionPool, get_pool, open_connection
+from .token_stats import TermStats
 
 # Optional streaming parser for large JSON imports
 try:
@@ -43,27 +58,46 @@ logger = logging.getLogger(__name__)
 
 def get_connection(db_path: Path = None) -> sqlite3.Connection:
     """
-    Get a WAL-enabled database connection with row factory.
+    Open a standalone WAL-enabled database connection with row factory.
 
     Every connection automatically applies the pragmas from config
     (WAL journal, busy timeout, etc.) so multiple bot processes can
     safely read/write concurrently.
 
+    The helpers in this module borrow long-lived connections from the
+    process pool instead (see read_session/db_session). Use this only
+    for one-off scripts that manage the connection themselves, and
+    close it when done.
+
     Args:
         db_path: Override path. Defaults to ANALYTICS_DB_PATH from config.
 
     Returns:
         sqlite3.Connection with Row factory enabled.
     """
-    path = str(db_path or ANALYTICS_DB_PATH)
-    conn = sqlite3.connect(path, timeout=10)
-    conn.row_factory = sqlite3.Row
+    return open_connection(db_path or ANALYTICS_DB_PATH)
 
-    # Apply WAL and other performance/safety pragmas
-    for pragma, value in SQLITE_PRAGMAS.items():
-        conn.execute(f"PRAGMA {pragma} = {value}")
 
-    return conn
+def _pool(db_path: Path = None) -> ConnectionPool:
+    """Process-wide connection pool for the analytics DB (or an override path)."""
+    return get_pool(db_path or ANALYTICS_DB_PATH)
+
+
+@contextmanager
+def read_session(db_path: Path = None):
+    """
+    Borrow a pooled read-only connection for the duration of a with-block.
+
+    Usage:
+        with read_session() as conn:
+            rows = conn.execute("SELECT ...").fetchall()
+        # connection goes back to the pool, it is not closed
+
+    Args:
+        db_path: Override path. Defaults to ANALYTICS_DB_PATH.
+    """
+    with _pool(db_path).reader() as conn:
+        yield conn
 
 
 @contextmanager
@@ -71,24 +105,18 @@ def db_session(db_path: Path = None):
     """
     Context manager for database operations with automatic commit/rollback.
 
+    Runs on this thread's long-lived write connection from the pool.
+
     Usage:
         with db_session() as (conn, cursor):
             cursor.execute("INSERT INTO ...")
-        # auto-commits on success, rolls back on exception, always closes
+        # auto-commits on success, rolls back on exception
 
     Args:
         db_path: Override path. Defaults to ANALYTICS_DB_PATH.
     """
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    try:
+    with _pool(db_path).writer() as (conn, cursor):
         yield conn, cursor
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 # ============================================================================
@@ -105,32 +133,14 @@ def init_database():
     """
     with db_session() as (conn, cursor):
 
-        # ----- Historical messages (bulk imported from DiscordChatExporter) -----
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY,
-                message_id TEXT UNIQUE,
-                channel_id TEXT,
-                channel_name TEXT,
-                author_id TEXT,
-                author_name TEXT,
-                author_discriminator TEXT,
-                author_bot INTEGER DEFAULT 0,
-                content TEXT,
-                timestamp TEXT,
-                timestamp_unix REAL,
-                has_attachments INTEGER DEFAULT 0,
-                has_embeds INTEGER DEFAULT 0,
-                is_reply INTEGER DEFAULT 0,
-                reply_to_id TEXT,
-                word_count INTEGER DEFAULT 0,
-                char_count INTEGER DEFAULT 0
-            )
-        """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_channel_id ON messages(channel_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_author_id ON messages(author_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON messages(timestamp_unix)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_channel_timestamp ON messages(channel_id, timestamp_unix)")
+        # ----- messages, live_messages, highlights, message_reply_tracking -----
+        # Text-keyed (original) or integer-keyed compact layout; an existing
+        # database keeps whichever it has. See STORAGE SCHEMA below.
+        if _table_exists(cursor, 'messages'):
+            compact = _is_compact(cursor)
+        else:
+            compact = ANALYTICS_SCHEMA == 'compact'
+        _create_storage_tables(cursor, compact)
 
         # ----- Channel metadata -----
         cursor.execute("""
@@ -155,61 +165,1222 @@ def init_database():
             )
         """)
 
-        # ----- Live messages (real-time capture from on_message_create) -----
+        # ----- Bulk import checkpoints (resume for bulk_import_exports) -----
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS live_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message_id TEXT UNIQUE NOT NULL,
-                channel_id TEXT NOT NULL,
-                author_id TEXT NOT NULL,
-                author_name TEXT,
-                author_nickname TEXT,
-                author_avatar_url TEXT,
-                content TEXT,
-                timestamp TEXT,
-                timestamp_edited TEXT,
-                is_pinned INTEGER DEFAULT 0,
-                is_reply INTEGER DEFAULT 0,
-                reply_to_message_id TEXT,
-                attachments_json TEXT,
-                embeds_json TEXT,
-                reactions_json TEXT,
-                mentions_json TEXT,
-                created_at REAL
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                file_path TEXT PRIMARY KEY,
+                file_size INTEGER,
+                file_mtime REAL,
+                channel_id TEXT,
+                messages_imported INTEGER,
+                messages_skipped INTEGER,
+                completed_at TEXT
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_live_channel ON live_messages(channel_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_live_author ON live_messages(author_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_live_timestamp ON live_messages(created_at)")
 
-        # ----- Highlights (repost tracking) -----
+        # ----- Schema metadata (feature flags, backfill state) -----
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS highlights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                highlight_id TEXT UNIQUE NOT NULL,
-                original_message_id TEXT NOT NULL,
-                author_id TEXT NOT NULL,
-                created_at REAL
+            CREATE TABLE IF NOT EXISTS db_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_highlight_original ON highlights(original_message_id)")
 
-        # ----- Reply tracking -----
+        # ----- Archive partitions (cold per-year `messages` files) -----
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS message_reply_tracking (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                reply_id TEXT UNIQUE NOT NULL,
-                original_message_id TEXT NOT NULL,
+            CREATE TABLE IF NOT EXISTS archive_partitions (
+                year INTEGER PRIMARY KEY,
+                file_name TEXT NOT NULL,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                min_ts REAL,
+                max_ts REAL,
+                updated_at TEXT
+            )
+        """)
+
+        # ----- Per-user term counts (incremental cache for vocabulary/phrases) -----
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_term_counts (
                 author_id TEXT NOT NULL,
-                reply_content TEXT,
-                created_at REAL
+                kind TEXT NOT NULL,
+                term TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (author_id, kind, term)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_term_state (
+                author_id TEXT PRIMARY KEY,
+                last_message_rowid INTEGER NOT NULL,
+                messages_counted INTEGER NOT NULL,
+                updated_at TEXT
             )
         """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_reply_original ON message_reply_tracking(original_message_id)")
+
+        _init_fts(cursor)
+        _init_rollups(cursor)
 
     logger.info(f"Analytics database initialized at {ANALYTICS_DB_PATH}")
 
 
+def get_meta(key: str, default: str = None, conn: sqlite3.Connection = None) -> Optional[str]:
+    """Read a value from the db_meta table (None/default if unset)."""
+    def _read(c):
+        try:
+            row = c.execute("SELECT value FROM db_meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            # db_meta doesn't exist until init_database() has run
+            return default
+        return row[0] if row else default
+
+    if conn is not None:
+        return _read(conn)
+    with read_session() as c:
+        return _read(c)
+
+
+def set_meta(key: str, value, cursor: sqlite3.Cursor = None):
+    """Write a value to the db_meta table."""
+    sql = "INSERT OR REPLACE INTO db_meta (key, value) VALUES (?, ?)"
+    if cursor is not None:
+        cursor.execute(sql, (key, str(value)))
+        return
+    with db_session() as (conn, cur):
+        cur.execute(sql, (key, str(value)))
+
+
+# ============================================================================
+# STORAGE SCHEMA (text-keyed / compact)
+# ============================================================================
+
+# The four storage tables exist in two layouts:
+#
+#   text     the original one: every Discord ID is a TEXT column and each
+#            message also stores its ISO timestamp string and unix float.
+#   compact  IDs are stored as 8-byte integers and `timestamp` /
+#            `timestamp_unix` are VIRTUAL generated columns computed from
+#            the message snowflake, so they cost nothing on disk.
+#
+# Compact ID columns are declared SNOWFLAKE: NUMERIC affinity turns the
+# decimal strings the bots bind into integers on the way in (anything
+# non-numeric is kept as text), and the SNOWFLAKE converter registered
+# in common.pool turns them back into str on the way out, so callers see
+# exactly what the text layout returns. Queries keep binding str IDs;
+# the column affinity converts them before comparison, so indexes apply.
+#
+# New databases get ANALYTICS_SCHEMA; existing ones keep their layout
+# until migrate_to_compact_schema() (scripts/migrate_compact_schema.py)
+# converts them. The layout is detected per call (_is_compact), so a
+# running bot keeps working across an online migration.
+
+# Discord epoch, ms; a snowflake's top 42 bits are ms since this
+_DISCORD_EPOCH_MS = 1420070400000
+
+_SNOWFLAKE_UNIX = f"(((message_id >> 22) + {_DISCORD_EPOCH_MS}) / 1000.0)"
+_SNOWFLAKE_ISO = f"strftime('%Y-%m-%dT%H:%M:%f+00:00', {_SNOWFLAKE_UNIX}, 'unixepoch')"
+
+_STORAGE_TABLES = ('messages', 'live_messages', 'highlights', 'message_reply_tracking')
+
+_TEXT_TABLES_DDL = {
+    # Historical messages (bulk imported from DiscordChatExporter)
+    'messages': """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            message_id TEXT UNIQUE,
+            channel_id TEXT,
+            channel_name TEXT,
+            author_id TEXT,
+            author_name TEXT,
+            author_discriminator TEXT,
+            author_bot INTEGER DEFAULT 0,
+            content TEXT,
+            timestamp TEXT,
+            timestamp_unix REAL,
+            has_attachments INTEGER DEFAULT 0,
+            has_embeds INTEGER DEFAULT 0,
+            is_reply INTEGER DEFAULT 0,
+            reply_to_id TEXT,
+            word_count INTEGER DEFAULT 0,
+            char_count INTEGER DEFAULT 0
+        )
+    """,
+    # Live messages (real-time capture from on_message_create)
+    'live_messages': """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT UNIQUE NOT NULL,
+            channel_id TEXT NOT NULL,
+            author_id TEXT NOT NULL,
+            author_name TEXT,
+            author_nickname TEXT,
+            author_avatar_url TEXT,
+            content TEXT,
+            timestamp TEXT,
+            timestamp_edited TEXT,
+            is_pinned INTEGER DEFAULT 0,
+            is_reply INTEGER DEFAULT 0,
+            reply_to_message_id TEXT,
+            attachments_json TEXT,
+            embeds_json TEXT,
+            reactions_json TEXT,
+            mentions_json TEXT,
+            created_at REAL
+        )
+    """,
+    # Highlights (repost tracking)
+    'highlights': """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            highlight_id TEXT UNIQUE NOT NULL,
+            original_message_id TEXT NOT NULL,
+            author_id TEXT NOT NULL,
+            created_at REAL
+        )
+    """,
+    # Reply tracking
+    'message_reply_tracking': """
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            reply_id TEXT UNIQUE NOT NULL,
+            original_message_id TEXT NOT NULL,
+            author_id TEXT NOT NULL,
+            reply_content TEXT,
+            created_at REAL
+        )
+    """,
+}
+
+# `messages` and `live_messages` keep an INTEGER PRIMARY KEY: the FTS
+# indexes and user_term_state address rows by it, and their rows are
+# too wide for WITHOUT ROWID to pay off. The two narrow lookup tables
+# are clustered on their snowflake instead.
+_COMPACT_TABLES_DDL = {
+    'messages': f"""
+        CREATE TABLE IF NOT EXISTS {{name}} (
+            id INTEGER PRIMARY KEY,
+            message_id SNOWFLAKE UNIQUE,
+            channel_id SNOWFLAKE,
+            channel_name TEXT,
+            author_id SNOWFLAKE,
+            author_name TEXT,
+            author_discriminator TEXT,
+            author_bot INTEGER DEFAULT 0,
+            content TEXT,
+            has_attachments INTEGER DEFAULT 0,
+            has_embeds INTEGER DEFAULT 0,
+            is_reply INTEGER DEFAULT 0,
+            reply_to_id SNOWFLAKE,
+            word_count INTEGER DEFAULT 0,
+            char_count INTEGER DEFAULT 0,
+            timestamp_unix REAL GENERATED ALWAYS AS {_SNOWFLAKE_UNIX} VIRTUAL,
+            timestamp TEXT GENERATED ALWAYS AS ({_SNOWFLAKE_ISO}) VIRTUAL
+        )
+    """,
+    'live_messages': f"""
+        CREATE TABLE IF NOT EXISTS {{name}} (
+            id INTEGER PRIMARY KEY,
+            message_id SNOWFLAKE UNIQUE NOT NULL,
+            channel_id SNOWFLAKE NOT NULL,
+            author_id SNOWFLAKE NOT NULL,
+            author_name TEXT,
+            author_nickname TEXT,
+            author_avatar_url TEXT,
+            content TEXT,
+            timestamp_edited TEXT,
+            is_pinned INTEGER DEFAULT 0,
+            is_reply INTEGER DEFAULT 0,
+            reply_to_message_id SNOWFLAKE,
+            attachments_json TEXT,
+            embeds_json TEXT,
+            reactions_json TEXT,
+            mentions_json TEXT,
+            created_at REAL,
+            timestamp TEXT GENERATED ALWAYS AS ({_SNOWFLAKE_ISO}) VIRTUAL
+        )
+    """,
+    'highlights': """
+        CREATE TABLE IF NOT EXISTS {name} (
+            highlight_id SNOWFLAKE PRIMARY KEY,
+            original_message_id SNOWFLAKE NOT NULL,
+            author_id SNOWFLAKE NOT NULL,
+            created_at REAL
+        ) WITHOUT ROWID
+    """,
+    'message_reply_tracking': """
+        CREATE TABLE IF NOT EXISTS {name} (
+            reply_id SNOWFLAKE PRIMARY KEY,
+            original_message_id SNOWFLAKE NOT NULL,
+            author_id SNOWFLAKE NOT NULL,
+            reply_content TEXT,
+            created_at REAL
+        ) WITHOUT ROWID
+    """,
+}
+
+# index name: (table, columns). Compact names differ so both layouts can
+# coexist in one file while a migration runs.
+_TEXT_INDEXES = {
+    'idx_channel_id': ('messages', 'channel_id'),
+    'idx_author_id': ('messages', 'author_id'),
+    'idx_timestamp': ('messages', 'timestamp_unix'),
+    'idx_channel_timestamp': ('messages', 'channel_id, timestamp_unix'),
+    'idx_live_channel': ('live_messages', 'channel_id'),
+    'idx_live_author': ('live_messages', 'author_id'),
+    'idx_live_timestamp': ('live_messages', 'created_at'),
+    'idx_highlight_original': ('highlights', 'original_message_id'),
+    'idx_reply_original': ('message_reply_tracking', 'original_message_id'),
+}
+
+_COMPACT_INDEXES = {
+    'idx_c_channel_id': ('messages', 'channel_id'),
+    'idx_c_author_id': ('messages', 'author_id'),
+    'idx_c_timestamp': ('messages', 'timestamp_unix'),
+    'idx_c_channel_timestamp': ('messages', 'channel_id, timestamp_unix'),
+    'idx_c_live_channel': ('live_messages', 'channel_id'),
+    'idx_c_live_author': ('live_messages', 'author_id'),
+    'idx_c_live_timestamp': ('live_messages', 'created_at'),
+    'idx_c_highlight_original': ('highlights', 'original_message_id'),
+    'idx_c_reply_original': ('message_reply_tracking', 'original_message_id'),
+}
+
+
+def _table_exists(conn, name: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+
+def _is_compact(conn) -> bool:
+    """True if `messages` uses the compact layout (generated timestamp column)."""
+    return conn.execute(
+        "SELECT 1 FROM pragma_table_xinfo('messages') WHERE name = 'timestamp' AND hidden != 0"
+    ).fetchone() is not None
+
+
+def _index_sql(index: str, table: str, columns: str, suffix: str = '') -> str:
+    return f"CREATE INDEX IF NOT EXISTS {index} ON {table}{suffix}({columns})"
+
+
+def _create_storage_tables(cursor: sqlite3.Cursor, compact: bool, suffix: str = '',
+                           tables: tuple = _STORAGE_TABLES):
+    """
+    Create storage tables and their indexes in one layout.
+
+    `suffix` is appended to every table name; the migration builds the
+    compact tables as messages_compact etc. next to the live ones.
+    Archive partitions only need `tables=('messages',)`.
+    """
+    ddl = _COMPACT_TABLES_DDL if compact else _TEXT_TABLES_DDL
+    indexes = _COMPACT_INDEXES if compact else _TEXT_INDEXES
+    for table in tables:
+        cursor.execute(ddl[table].format(name=table + suffix))
+    for index, (table, columns) in indexes.items():
+        if table in tables:
+            cursor.execute(_index_sql(index, table, columns, suffix))
+
+
+def _insertable_columns(conn, table: str, schema: str = 'main') -> str:
+    """Comma-separated stored (non-generated) columns of a table."""
+    return ', '.join(
+        row[0] for row in conn.execute(
+            "SELECT name FROM pragma_table_xinfo(?, ?) WHERE hidden = 0", (table, schema)
+        )
+    )
+
+
+# Copy batch for migrate_to_compact_schema(); each batch commits on its own
+_COMPACT_COPY_BATCH = 20000
+
+_COMPACT_SUFFIX = '_compact'
+
+
+def _storage_bytes(conn) -> dict:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {'file': pages * page_size, 'used': (pages - free) * page_size}
+
+
+def _copy_to_compact(conn, table: str, after_id: int, upto_id: int = None) -> int:
+    """Copy rows with after_id < id <= upto_id (no upper bound if None) into the shadow table."""
+    shadow = table + _COMPACT_SUFFIX
+    columns = _insertable_columns(conn, shadow)
+    sql = f"INSERT OR IGNORE INTO {shadow} ({columns}) SELECT {columns} FROM {table} WHERE id > ?"
+    params = [after_id]
+    if upto_id is not None:
+        sql += " AND id <= ?"
+        params.append(upto_id)
+    return conn.execute(sql + " ORDER BY id", params).rowcount
+
+
+def migrate_to_compact_schema(batch_rows: int = _COMPACT_COPY_BATCH, pause: float = 0.05,
+                              vacuum: bool = False) -> dict:
+    """
+    Convert the storage tables to the compact layout while the bots run.
+
+    1. Create messages_compact etc. (with their final indexes) next to
+       the live tables.
+    2. Copy rows across in id order, `batch_rows` per short write
+       transaction, sleeping `pause` seconds between batches so live
+       capture gets the write lock. Progress is stored in db_meta, so an
+       interrupted run resumes where it stopped.
+    3. In one IMMEDIATE transaction: copy whatever arrived since, drop
+       the old tables, rename the shadows into place and recreate the
+       FTS/rollup triggers. Row ids are kept, so the FTS indexes,
+       rollups and user_term_state stay valid without a rebuild.
+
+    The storage tables are append-only, which is what makes the id
+    watermark sufficient. Don't run this alongside bulk_import_exports().
+    Timestamps come from the snowflake afterwards; a row whose stored
+    timestamp disagreed with its ID (hand-inserted test rows, exports
+    that failed to parse) shows up in check_rollups() and is fixed by
+    rebuild_rollups().
+
+    Dropping the old tables only moves their pages to the freelist; pass
+    vacuum=True (needs free disk space about the size of the database
+    and blocks writers while it runs) to shrink the file.
+
+    Returns:
+        {'copied': {table: rows}, 'before': {...}, 'after': {...}}
+        with 'file'/'used' byte counts, or {'already_compact': True}.
+    """
+    init_database()
+    conn = open_connection(ANALYTICS_DB_PATH)
+    conn.isolation_level = None
+    try:
+        if _is_compact(conn):
+            logger.info("Storage tables already use the compact layout")
+            return {'already_compact': True}
+
+        before = _storage_bytes(conn)
+        conn.execute("BEGIN IMMEDIATE")
+        _create_storage_tables(conn.cursor(), compact=True, suffix=_COMPACT_SUFFIX)
+        conn.execute("COMMIT")
+
+        # --- Batched copy (resumable) ---
+        copied = {}
+        watermarks = {}
+        for table in _STORAGE_TABLES:
+            meta_key = f'compact_migration_{table}'
+            last_id = int(get_meta(meta_key, '0', conn=conn))
+            total = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?", (last_id,)).fetchone()[0]
+            copied[table] = 0
+            batches = 0
+            logger.info(f"Copying {table}: {total:,} rows to go")
+            while True:
+                upto = conn.execute(
+                    f"SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+                    (last_id, batch_rows),
+                ).fetchone()[0]
+                if upto is None:
+                    break
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    copied[table] += _copy_to_compact(conn, table, last_id, upto)
+                    set_meta(meta_key, upto, cursor=conn.cursor())
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                last_id = upto
+                batches += 1
+                if batches % 10 == 0:
+                    logger.info(f"  {table}: {copied[table]:,}/{total:,}")
+                if pause:
+                    time.sleep(pause)
+            watermarks[table] = last_id
+
+        # --- Swap ---
+        logger.info("Swapping in the compact tables...")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            for table in _STORAGE_TABLES:
+                copied[table] += _copy_to_compact(conn, table, watermarks[table])
+            for table in _STORAGE_TABLES:
+                cursor.execute(f"DROP TABLE {table}")
+            for table in _STORAGE_TABLES:
+                cursor.execute(f"ALTER TABLE {table}{_COMPACT_SUFFIX} RENAME TO {table}")
+            _init_fts(cursor)
+            _init_rollups(cursor)
+            cursor.execute("DELETE FROM db_meta WHERE key LIKE 'compact_migration_%'")
+            set_meta('compact_schema_migrated', datetime.now().isoformat(), cursor=cursor)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if vacuum:
+            logger.info("Vacuuming...")
+            conn.execute("VACUUM")
+        after = _storage_bytes(conn)
+    finally:
+        conn.close()
+
+    logger.info(
+        f"Compact schema migration done: {sum(copied.values()):,} rows, "
+        f"{before['used'] / 1024**2:,.1f} MB -> {after['used'] / 1024**2:,.1f} MB used"
+    )
+    return {'copied': copied, 'before': before, 'after': after}
+
+
+# ============================================================================
+# FULL-TEXT SEARCH INDEX (FTS5)
+# ============================================================================
+
+# External-content FTS5 tables: the index stores only tokens and reads
+# content back from the base table by rowid, so it adds no second copy
+# of the archive. Triggers keep it in sync with every insert/update/delete.
+_FTS_TABLES = {
+    # fts table: (base table, rowid column)
+    'messages_fts': ('messages', 'id'),
+    'live_messages_fts': ('live_messages', 'id'),
+}
+
+_FTS_TOKENIZER = "unicode61 remove_diacritics 2"
+
+
+def _init_fts(cursor: sqlite3.Cursor):
+    """
+    Create the FTS5 indexes and their sync triggers.
+
+    Triggers only cover rows written from now on. On a database that
+    already holds an archive, run rebuild_fts_index() once (see
+    scripts/build_fts_index.py); search_messages() keeps using the slow
+    LIKE scan until that backfill has been recorded in db_meta.
+    """
+    try:
+        for fts in _FTS_TABLES:
+            _create_fts(cursor, fts)
+    except sqlite3.OperationalError as e:
+        # Python builds without FTS5 keep working on the LIKE fallback
+        logger.warning(f"FTS5 unavailable, search_messages will use LIKE scans: {e}")
+        return
+
+    _mark_built_if_empty(cursor, 'fts_backfilled')
+
+
+def _create_fts(cursor: sqlite3.Cursor, fts: str):
+    """One FTS5 external-content table plus its insert/delete/update triggers."""
+    base, rowid = _FTS_TABLES[fts]
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            content,
+            content='{base}',
+            content_rowid='{rowid}',
+            tokenize='{_FTS_TOKENIZER}'
+        )
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {base} BEGIN
+            INSERT INTO {fts}(rowid, content) VALUES (new.{rowid}, new.content);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {base} BEGIN
+            INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.{rowid}, old.content);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF content ON {base} BEGIN
+            INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.{rowid}, old.content);
+            INSERT INTO {fts}(rowid, content) VALUES (new.{rowid}, new.content);
+        END
+    """)
+
+
+def _mark_built_if_empty(cursor: sqlite3.Cursor, meta_key: str):
+    """
+    Record a derived structure as built when there is no data to derive it from.
+
+    A brand-new database has nothing to backfill, so readers can use the
+    new structure straight away; an existing archive waits for the
+    explicit rebuild command.
+    """
+    if get_meta(meta_key, conn=cursor.connection) is not None:
+        return
+    cursor.execute("SELECT EXISTS(SELECT 1 FROM messages) OR EXISTS(SELECT 1 FROM live_messages)")
+    if not cursor.fetchone()[0]:
+        set_meta(meta_key, datetime.now().isoformat(), cursor=cursor)
+
+
+def rebuild_fts_index() -> dict:
+    """
+    One-shot backfill of the FTS5 indexes from the existing archive.
+
+    Uses FTS5's 'rebuild' command, which re-reads every row of the base
+    table, then merges index segments with 'optimize'. Safe to re-run;
+    also the fix if the index is ever suspected to be out of sync.
+
+    Returns:
+        {fts_table: indexed_row_count}
+    """
+    init_database()
+    counts = {}
+    with db_session() as (conn, cursor):
+        for fts, (base, _) in _FTS_TABLES.items():
+            logger.info(f"Rebuilding {fts} from {base}...")
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+            cursor.execute(f"SELECT COUNT(*) FROM {base}")
+            counts[fts] = cursor.fetchone()[0]
+        set_meta('fts_backfilled', datetime.now().isoformat(), cursor=cursor)
+
+    logger.info(f"FTS index rebuilt: {counts}")
+    return counts
+
+
+def _fts_ready(conn: sqlite3.Connection) -> bool:
+    """True once the FTS tables exist and hold the full archive."""
+    return get_meta('fts_backfilled', conn=conn) is not None
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """
+    Turn free user text into a safe FTS5 MATCH expression.
+
+    The whole input becomes one quoted phrase with a prefix on the last
+    token, the closest token-based equivalent of the old LIKE '%text%'.
+    Quoting keeps FTS5 operators (AND, NEAR, *, :) in user input literal.
+    Returns None if the text has no searchable characters.
+    """
+    if not any(ch.isalnum() for ch in text):
+        return None
+    return '"' + text.replace('"', '""') + '" *'
+
+
+# ============================================================================
+# ANALYTICS ROLLUPS (incrementally maintained aggregates)
+# ============================================================================
+
+# The stats commands used to GROUP BY over the whole archive on every
+# call. These tables hold the same aggregates pre-summed and are kept
+# current by triggers on both `messages` (imports) and `live_messages`
+# (live capture). A message that exists in both tables is counted once,
+# as the imported copy: a live row counts until the same message is
+# imported, then rollup_messages_replace_live takes it back out.
+#
+#   rollup_activity        day x hour x channel x author  (hourly/daily charts)
+#   rollup_author_channel  author x channel totals        (overview, users, channels)
+#
+# Bot messages are excluded, matching the old `author_bot = 0` filters.
+# Deletes/edits on the base tables are not propagated; check_rollups()
+# detects drift and rebuild_rollups() recomputes from scratch.
+
+# Characters str.split() splits on, apart from the space (the common ones)
+_SQL_WHITESPACE = (9, 10, 11, 12, 13)
+
+
+def _sql_word_count(column: str) -> str:
+    """SQL for len(column.split()): whitespace to spaces, runs collapsed, count gaps."""
+    text = f"COALESCE({column}, '')"
+    for code in _SQL_WHITESPACE:
+        text = f"replace({text}, char({code}), ' ')"
+    # 'a   b' -> 'a\x01\x02\x01\x02\x01\x02b' -> 'a\x01\x02b' -> 'a b'
+    text = (f"replace(replace(replace(trim({text}), ' ', char(1) || char(2)), "
+            f"char(2) || char(1), ''), char(1) || char(2), ' ')")
+    return (f"CASE WHEN {text} = '' THEN 0 "
+            f"ELSE length({text}) - length(replace({text}, ' ', '')) + 1 END")
+
+
+# Per-source column expressions. `r` is the row alias (`new` in triggers).
+_ROLLUP_SOURCES = {
+    'messages': {
+        'ts': "COALESCE({r}.timestamp_unix, 0)",
+        'words': "COALESCE({r}.word_count, 0)",
+        'attachments': "{r}.has_attachments",
+        'replies': "{r}.is_reply",
+        'author_name': "{r}.author_name",
+        'channel_name': "{r}.channel_name",
+        # Every human row counts; a live copy counted earlier is taken out
+        # by rollup_messages_replace_live
+        'rebuild_where': "{r}.author_bot = 0",
+        'trigger_when': "{r}.author_bot = 0",
+    },
+    'live_messages': {
+        'ts': "COALESCE({r}.created_at, 0)",
+        # Same as the importer's len(content.split())
+        'words': _sql_word_count("{r}.content"),
+        'attachments': "CASE WHEN COALESCE({r}.attachments_json, '[]') = '[]' THEN 0 ELSE 1 END",
+        'replies': "{r}.is_reply",
+        'author_name': "{r}.author_name",
+        'channel_name': "COALESCE((SELECT c.channel_name FROM channels c "
+                        "WHERE c.channel_id = {r}.channel_id), {r}.channel_id)",
+        # {messages}: the rebuild also looks in archive partitions, triggers can't
+        'rebuild_where': "NOT EXISTS (SELECT 1 FROM {messages} x WHERE x.message_id = {r}.message_id)",
+        'trigger_when': "NOT EXISTS (SELECT 1 FROM messages x WHERE x.message_id = {r}.message_id)",
+    },
+}
+
+# Bump when the trigger SQL changes, so _init_rollups() replaces old triggers
+_ROLLUP_TRIGGERS_VERSION = '2'
+_ROLLUP_TRIGGERS = tuple(f"rollup_{source}_ai" for source in _ROLLUP_SOURCES) + ('rollup_messages_replace_live',)
+
+_ROLLUP_ACTIVITY_UPSERT = """
+    ON CONFLICT (day, hour, channel_id, author_id) DO UPDATE SET
+        message_count = message_count + excluded.message_count,
+        word_count = word_count + excluded.word_count,
+        attachment_count = attachment_count + excluded.attachment_count,
+        reply_count = reply_count + excluded.reply_count
+"""
+
+_ROLLUP_AUTHOR_CHANNEL_UPSERT = """
+    ON CONFLICT (author_id, channel_id) DO UPDATE SET
+        author_name = CASE WHEN excluded.last_ts >= last_ts THEN excluded.author_name ELSE author_name END,
+        channel_name = CASE WHEN excluded.last_ts >= last_ts THEN excluded.channel_name ELSE channel_name END,
+        message_count = message_count + excluded.message_count,
+        word_count = word_count + excluded.word_count,
+        attachment_count = attachment_count + excluded.attachment_count,
+        reply_count = reply_count + excluded.reply_count,
+        first_ts = MIN(first_ts, excluded.first_ts),
+        last_ts = MAX(last_ts, excluded.last_ts)
+"""
+
+
+def _rollup_exprs(source: str, alias: str, messages: str = 'messages') -> dict:
+    """Column expressions for a rollup source, bound to a row alias."""
+    exprs = {k: v.format(r=alias, messages=messages) for k, v in _ROLLUP_SOURCES[source].items()}
+    exprs['day'] = f"strftime('%Y-%m-%d', {exprs['ts']}, 'unixepoch')"
+    exprs['hour'] = f"CAST(strftime('%H', {exprs['ts']}, 'unixepoch') AS INTEGER)"
+    # CAST: compact-layout IDs are integers, the rollup keys are TEXT
+    exprs['channel_id'] = f"CAST(COALESCE({alias}.channel_id, '') AS TEXT)"
+    exprs['author_id'] = f"CAST(COALESCE({alias}.author_id, '') AS TEXT)"
+    return exprs
+
+
+def _init_rollups(cursor: sqlite3.Cursor):
+    """Create the rollup tables and the triggers that keep them current."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_activity (
+            day TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            channel_id TEXT NOT NULL,
+            author_id TEXT NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            word_count INTEGER NOT NULL DEFAULT 0,
+            attachment_count INTEGER NOT NULL DEFAULT 0,
+            reply_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, hour, channel_id, author_id)
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_author_channel (
+            author_id TEXT NOT NULL,
+            channel_id TEXT NOT NULL,
+            author_name TEXT,
+            channel_name TEXT,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            word_count INTEGER NOT NULL DEFAULT 0,
+            attachment_count INTEGER NOT NULL DEFAULT 0,
+            reply_count INTEGER NOT NULL DEFAULT 0,
+            first_ts REAL,
+            last_ts REAL,
+            PRIMARY KEY (author_id, channel_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rollup_ac_channel ON rollup_author_channel(channel_id)")
+
+    # Triggers from an older version count differently; replace them
+    # (existing totals stay as they are until rebuild_rollups())
+    if get_meta('rollup_triggers_version', conn=cursor.connection) != _ROLLUP_TRIGGERS_VERSION:
+        for trigger in _ROLLUP_TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        set_meta('rollup_triggers_version', _ROLLUP_TRIGGERS_VERSION, cursor=cursor)
+
+    for source in _ROLLUP_SOURCES:
+        e = _rollup_exprs(source, 'new')
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS rollup_{source}_ai AFTER INSERT ON {source}
+            WHEN {e['trigger_when']}
+            BEGIN
+                INSERT INTO rollup_activity
+                (day, hour, channel_id, author_id, message_count, word_count, attachment_count, reply_count)
+                VALUES ({e['day']}, {e['hour']}, {e['channel_id']}, {e['author_id']},
+                        1, {e['words']}, {e['attachments']}, {e['replies']})
+                {_ROLLUP_ACTIVITY_UPSERT};
+
+                INSERT INTO rollup_author_channel
+                (author_id, channel_id, author_name, channel_name, message_count, word_count,
+                 attachment_count, reply_count, first_ts, last_ts)
+                VALUES ({e['author_id']}, {e['channel_id']}, {e['author_name']}, {e['channel_name']},
+                        1, {e['words']}, {e['attachments']}, {e['replies']}, {e['ts']}, {e['ts']})
+                {_ROLLUP_AUTHOR_CHANNEL_UPSERT};
+            END
+        """)
+
+    # An import of a message live capture already counted: take the live
+    # contribution back out (rollup_messages_ai adds the imported one).
+    # first_ts/last_ts keep the live timestamp; check_rollups() doesn't
+    # compare them.
+    live = _rollup_exprs('live_messages', 'l')
+    of_live = "FROM live_messages l WHERE l.message_id = new.message_id"
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS rollup_messages_replace_live AFTER INSERT ON messages
+        WHEN EXISTS (SELECT 1 FROM live_messages x WHERE x.message_id = new.message_id)
+        BEGIN
+            INSERT INTO rollup_activity
+            (day, hour, channel_id, author_id, message_count, word_count, attachment_count, reply_count)
+            SELECT {live['day']}, {live['hour']}, {live['channel_id']}, {live['author_id']},
+                   -1, -({live['words']}), -({live['attachments']}), -({live['replies']})
+            {of_live}
+            {_ROLLUP_ACTIVITY_UPSERT};
+
+            DELETE FROM rollup_activity
+            WHERE message_count <= 0 AND (day, hour, channel_id, author_id) IN
+                (SELECT {live['day']}, {live['hour']}, {live['channel_id']}, {live['author_id']} {of_live});
+
+            INSERT INTO rollup_author_channel
+            (author_id, channel_id, author_name, channel_name, message_count, word_count,
+             attachment_count, reply_count, first_ts, last_ts)
+            SELECT {live['author_id']}, {live['channel_id']}, {live['author_name']}, {live['channel_name']},
+                   -1, -({live['words']}), -({live['attachments']}), -({live['replies']}),
+                   {live['ts']}, {live['ts']}
+            {of_live}
+            {_ROLLUP_AUTHOR_CHANNEL_UPSERT};
+
+            DELETE FROM rollup_author_channel
+            WHERE message_count <= 0 AND (author_id, channel_id) IN
+                (SELECT {live['author_id']}, {live['channel_id']} {of_live});
+        END
+    """)
+
+    _mark_built_if_empty(cursor, 'rollups_built')
+
+
+def _rollup_base_sql(source: str, messages: str = 'messages') -> tuple:
+    """
+    SELECTs that aggregate a base table at both rollup grains.
+
+    Used by the rebuild and by the consistency checker, so both agree
+    with the triggers on what gets counted. `messages` is what to read
+    the archive from (see _messages_source).
+    """
+    e = _rollup_exprs(source, 'r', messages)
+    table = messages if source == 'messages' else source
+    activity = f"""
+        SELECT {e['day']} AS day, {e['hour']} AS hour,
+               {e['channel_id']} AS channel_id, {e['author_id']} AS author_id,
+               COUNT(*) AS message_count, SUM({e['words']}) AS word_count,
+               SUM({e['attachments']}) AS attachment_count, SUM({e['replies']}) AS reply_count
+        FROM {table} r
+        WHERE {e['rebuild_where']}
+        GROUP BY 1, 2, 3, 4
+    """
+    author_channel = f"""
+        SELECT {e['author_id']} AS author_id, {e['channel_id']} AS channel_id,
+               {e['author_name']} AS author_name, {e['channel_name']} AS channel_name,
+               COUNT(*) AS message_count, SUM({e['words']}) AS word_count,
+               SUM({e['attachments']}) AS attachment_count, SUM({e['replies']}) AS reply_count,
+               MIN({e['ts']}) AS first_ts, MAX({e['ts']}) AS last_ts
+        FROM {table} r
+        WHERE {e['rebuild_where']}
+        GROUP BY 1, 2
+    """
+    return activity, author_channel
+
+
+def rebuild_rollups() -> dict:
+    """
+    Recompute both rollup tables from `messages` and `live_messages`.
+
+    Runs in one transaction, so readers see either the old or the new
+    totals. Needed once after upgrading an existing database, and any
+    time check_rollups() reports drift.
+
+    Returns:
+        {table: row_count}
+    """
+    init_database()
+    with db_session() as (conn, cursor):
+        messages = _messages_source(conn)
+        cursor.execute("DELETE FROM rollup_activity")
+        cursor.execute("DELETE FROM rollup_author_channel")
+
+        for source in _ROLLUP_SOURCES:
+            logger.info(f"Rolling up {source}...")
+            activity, author_channel = _rollup_base_sql(source, messages)
+            # WHERE true: disambiguates INSERT ... SELECT ... ON CONFLICT for the parser
+            cursor.execute(f"""
+                INSERT INTO rollup_activity
+                (day, hour, channel_id, author_id, message_count, word_count, attachment_count, reply_count)
+                SELECT * FROM ({activity}) WHERE true
+                {_ROLLUP_ACTIVITY_UPSERT}
+            """)
+            cursor.execute(f"""
+                INSERT INTO rollup_author_channel
+                (author_id, channel_id, author_name, channel_name, message_count, word_count,
+                 attachment_count, reply_count, first_ts, last_ts)
+                SELECT * FROM ({author_channel}) WHERE true
+                {_ROLLUP_AUTHOR_CHANNEL_UPSERT}
+            """)
+
+        counts = {}
+        for table in ('rollup_activity', 'rollup_author_channel'):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        set_meta('rollups_built', datetime.now().isoformat(), cursor=cursor)
+
+    logger.info(f"Rollups rebuilt: {counts}")
+    return counts
+
+
+def check_rollups(max_mismatches: int = 20) -> dict:
+    """
+    Compare the rollup tables against a fresh aggregate of the base tables.
+
+    This is a full scan of the archive (the cost the rollups exist to
+    avoid), so run it offline, not from a command handler.
+
+    Returns:
+        {'ok': bool, 'mismatches': {table: [rows that differ]}}
+    """
+    mismatches = {}
+    with read_session() as conn:
+        messages = _messages_source(conn)
+        activity_parts, author_channel_parts = zip(*(_rollup_base_sql(s, messages) for s in _ROLLUP_SOURCES))
+        expected = {
+            'rollup_activity': (
+                ' UNION ALL '.join(activity_parts),
+                "day, hour, channel_id, author_id",
+                "message_count, word_count, attachment_count, reply_count",
+            ),
+            'rollup_author_channel': (
+                ' UNION ALL '.join(author_channel_parts),
+                "author_id, channel_id",
+                "message_count, word_count, attachment_count, reply_count",
+            ),
+        }
+
+        cursor = conn.cursor()
+        for table, (union_sql, keys, measures) in expected.items():
+            sums = ', '.join(f"SUM({m}) AS {m}" for m in measures.split(', '))
+            base = f"SELECT {keys}, {sums} FROM ({union_sql}) GROUP BY {keys}"
+            stored = f"SELECT {keys}, {measures} FROM {table}"
+            cursor.execute(f"""
+                SELECT 'missing_or_stale' AS problem, * FROM ({base} EXCEPT {stored})
+                UNION ALL
+                SELECT 'unexpected' AS problem, * FROM ({stored} EXCEPT {base})
+                LIMIT ?
+            """, (max_mismatches,))
+            rows = [dict(row) for row in cursor.fetchall()]
+            if rows:
+                mismatches[table] = rows
+
+    if mismatches:
+        logger.warning(f"Rollup drift detected in {', '.join(mismatches)}")
+    return {'ok': not mismatches, 'mismatches': mismatches}
+
+
+def _rollups_ready(conn: sqlite3.Connection) -> bool:
+    """True once the rollups cover the full archive."""
+    return get_meta('rollups_built', conn=conn) is not None
+
+
+# ISO-8601 output for rollup timestamps, matching the archive's `timestamp` strings
+_ISO_FROM_UNIX = "strftime('%Y-%m-%dT%H:%M:%S+00:00', {}, 'unixepoch')"
+
+
+# ============================================================================
+# HOT/COLD ARCHIVE PARTITIONS
+# ============================================================================
+
+# Imported history older than ARCHIVE_HORIZON_DAYS can be moved out of
+# discord_analytics.db into one file per calendar year under ARCHIVE_DIR
+# (archive_cold_messages(), scripts/archive_messages.py). The hot file
+# that live capture writes to then stays small, so its checkpoints,
+# backups and index maintenance stop touching the whole archive.
+#
+# A partition file holds a `messages` table in the hot file's layout,
+# with the same indexes and its own messages_fts. Row ids are kept, so
+# the rollups (which already count these rows) and user_term_state stay
+# valid. `archive_partitions` in the hot file lists each partition and
+# the time range it covers.
+#
+# Readers ATTACH partitions read-only, on demand. _messages_source()
+# picks what a query reads FROM for a time range: plain `messages` when
+# no partition overlaps it (recent-only queries never open a cold file),
+# otherwise a UNION ALL of main and the overlapping partitions, which is
+# the per-connection TEMP VIEW `messages_all` when that means all of
+# them. Import paths skip rows a partition already holds.
+#
+# Only `messages` is partitioned. SQLite attaches at most 10 databases
+# per connection, which bounds an unbounded query to 10 partition years.
+
+_ARCHIVE_FILE = "messages_{year}.db"
+
+# Columns of `messages` in both layouts, for UNION ALL across partitions
+_MESSAGE_COLUMNS = (
+    "id, message_id, channel_id, channel_name, author_id, author_name, "
+    "author_discriminator, author_bot, content, timestamp, timestamp_unix, "
+    "has_attachments, has_embeds, is_reply, reply_to_id, word_count, char_count"
+)
+
+
+def _partition_schema(year: int) -> str:
+    return f"cold_{year}"
+
+
+def _year_bounds(year: int) -> tuple:
+    """Unix [start, end) of a UTC calendar year."""
+    return (datetime(year, 1, 1, tzinfo=timezone.utc).timestamp(),
+            datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _archive_partitions(conn, since: float = None, until: float = None) -> list:
+    """Registered partitions overlapping [since, until), oldest first, as dicts."""
+    try:
+        rows = conn.execute("""
+            SELECT year, file_name, min_ts, max_ts FROM archive_partitions
+            WHERE (? IS NULL OR max_ts >= ?) AND (? IS NULL OR min_ts < ?)
+            ORDER BY year
+        """, (since, since, until, until)).fetchall()
+        # Plain tuples on connections without sqlite3.Row (messages_source callers)
+        return [dict(zip(('year', 'file_name', 'min_ts', 'max_ts'), row)) for row in rows]
+    except sqlite3.OperationalError:
+        # archive_partitions doesn't exist until init_database() has run
+        return []
+
+
+def _attach_partitions(conn, partitions) -> dict:
+    """
+    ATTACH partitions read-only (unless already attached).
+
+    ATTACH fails inside a transaction, so call this before writing.
+
+    Returns:
+        {year: schema name} of the partitions now attached.
+    """
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    schemas = {}
+    for partition in partitions:
+        schema = _partition_schema(partition['year'])
+        if schema not in attached:
+            path = ARCHIVE_DIR / partition['file_name']
+            if not path.exists():
+                logger.error(f"Archive partition {path} is missing, its messages are left out")
+                continue
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (f"{path.resolve().as_uri()}?mode=ro",))
+        schemas[partition['year']] = schema
+    return schemas
+
+
+def _union_sql(schemas) -> str:
+    return " UNION ALL ".join(
+        f"SELECT {_MESSAGE_COLUMNS} FROM {schema}.messages" for schema in ['main', *schemas]
+    )
+
+
+def _messages_all_view(conn, schemas) -> str:
+    """(Re)create TEMP VIEW messages_all over main + `schemas` if it doesn't match."""
+    body = _union_sql(schemas)
+    row = conn.execute("SELECT sql FROM sqlite_temp_master WHERE name = 'messages_all'").fetchone()
+    if row is None or not row[0].endswith(body):
+        # Temp objects count as writes on query_only (pooled reader) connections
+        query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+        conn.execute("PRAGMA query_only = OFF")
+        try:
+            conn.execute("DROP VIEW IF EXISTS temp.messages_all")
+            conn.execute(f"CREATE TEMP VIEW messages_all AS {body}")
+        finally:
+            if query_only:
+                conn.execute("PRAGMA query_only = ON")
+    return "messages_all"
+
+
+def _messages_source(conn, since: float = None, until: float = None) -> str:
+    """
+    What to read `messages` FROM for rows in [since, until).
+
+    Attaches the partitions that overlap the range, so call it before
+    starting a write transaction. Callers still filter on timestamp_unix
+    themselves; this only decides which files get read.
+    """
+    schemas = list(_attach_partitions(conn, _archive_partitions(conn, since, until)).values())
+    if not schemas:
+        return "messages"
+    if since is None and until is None:
+        return _messages_all_view(conn, schemas)
+    return f"({_union_sql(schemas)})"
+
+
+def messages_source(conn: sqlite3.Connection, since: float = None, until: float = None) -> str:
+    """
+    What to read `messages` FROM on a connection of your own to the
+    analytics DB, archive partitions included (see _messages_source()).
+
+    The result is a table name or a parenthesized subquery; give it an
+    alias. Call before starting a write transaction.
+    """
+    return _messages_source(conn, since, until)
+
+
+def _archived_filter(conn):
+    """
+    Filter for import batches that drops messages a partition already holds.
+
+    Returns None when nothing has been archived, else a function taking
+    and returning a list of _process_export_message() rows. Only rows
+    dated in a partitioned year cost a (UNIQUE index) lookup. Attaches
+    the partitions, so call it before starting a write transaction.
+    """
+    schemas = _attach_partitions(conn, _archive_partitions(conn))
+    if not schemas:
+        return None
+
+    def keep(rows: list) -> list:
+        kept = []
+        for row in rows:
+            year = datetime.fromtimestamp(row[9] or 0, timezone.utc).year
+            schema = schemas.get(year)
+            if schema and conn.execute(
+                f"SELECT 1 FROM {schema}.messages WHERE message_id = ?", (row[0],)
+            ).fetchone():
+                continue
+            kept.append(row)
+        return kept
+
+    return keep
+
+
+def _init_partition_file(path: Path, compact: bool):
+    """Create a partition file's `messages` table, indexes and FTS (idempotent)."""
+    conn = open_connection(path)
+    try:
+        cursor = conn.cursor()
+        _create_storage_tables(cursor, compact, tables=('messages',))
+        try:
+            _create_fts(cursor, 'messages_fts')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 unavailable, {path.name} can only be LIKE-searched: {e}")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _move_to_partition(conn, schema: str, start: float, end: float, below_id: int,
+                       batch_rows: int, pause: float) -> int:
+    """Move main.messages rows in [start, end) with id < below_id into schema.messages."""
+    # The partition's own columns: an older text-layout partition still
+    # gets timestamp/timestamp_unix stored when the hot file is compact
+    columns = _insertable_columns(conn, 'messages', schema)
+    moved = 0
+    while True:
+        ids = [row[0] for row in conn.execute("""
+            SELECT id FROM main.messages
+            WHERE timestamp_unix >= ? AND timestamp_unix < ? AND id < ?
+            LIMIT ?
+        """, (start, end, below_id, batch_rows))]
+        if not ids:
+            return moved
+        batch = json.dumps(ids)
+
+        # Copy and delete commit separately (WAL commits aren't atomic
+        # across files). Copy first: a crash in between leaves the batch
+        # in both files until the next run, never in neither.
+        for sql in (
+            f"INSERT OR IGNORE INTO {schema}.messages ({columns}) "
+            f"SELECT {columns} FROM main.messages WHERE id IN (SELECT value FROM json_each(?))",
+            "DELETE FROM main.messages WHERE id IN (SELECT value FROM json_each(?))",
+        ):
+            conn.execute("BEGIN")
+            try:
+                conn.execute(sql, (batch,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        moved += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def archive_cold_messages(horizon_days: int = ARCHIVE_HORIZON_DAYS, batch_rows: int = 20000,
+                          pause: float = 0.05) -> dict:
+    """
+    Move `messages` rows older than `horizon_days` into per-year partitions.
+
+    Runs online in small batches (sleeping `pause` seconds between them)
+    and can be re-run at any time; each run moves whatever has aged past
+    the horizon since. A partition is registered before its first batch
+    moves, so readers never miss rows. The newest row always stays hot,
+    so new rowids keep increasing past every archived one.
+
+    Don't run this alongside bulk_import_exports() or the compact
+    schema migration.
+
+    Returns:
+        {year: rows moved}
+    """
+    init_database()
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=horizon_days)).timestamp()
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+
+    conn = open_connection(ANALYTICS_DB_PATH)
+    conn.isolation_level = None
+    moved = {}
+    try:
+        compact = _is_compact(conn)
+        oldest, max_id = conn.execute("SELECT MIN(timestamp_unix), MAX(id) FROM messages").fetchone()
+        if oldest is None or oldest >= cutoff:
+            logger.info("No messages older than the archive horizon")
+            return moved
+
+        first_year = datetime.fromtimestamp(oldest, timezone.utc).year
+        last_year = datetime.fromtimestamp(cutoff, timezone.utc).year
+        for year in range(first_year, last_year + 1):
+            start, end = _year_bounds(year)
+            end = min(end, cutoff)
+            if conn.execute(
+                "SELECT 1 FROM messages WHERE timestamp_unix >= ? AND timestamp_unix < ? AND id < ? LIMIT 1",
+                (start, end, max_id)
+            ).fetchone() is None:
+                continue
+
+            file_name = _ARCHIVE_FILE.format(year=year)
+            _init_partition_file(ARCHIVE_DIR / file_name, compact)
+            year_start, year_end = _year_bounds(year)
+            conn.execute("""
+                INSERT INTO archive_partitions (year, file_name, message_count, min_ts, max_ts, updated_at)
+                VALUES (?, ?, 0, ?, ?, ?)
+                ON CONFLICT (year) DO UPDATE SET min_ts = excluded.min_ts, max_ts = excluded.max_ts
+            """, (year, file_name, year_start, year_end, datetime.now().isoformat()))
+
+            schema = _partition_schema(year)
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(ARCHIVE_DIR / file_name),))
+            try:
+                moved[year] = _move_to_partition(conn, schema, start, end, max_id, batch_rows, pause)
+                count, min_ts, max_ts = conn.execute(
+                    f"SELECT COUNT(*), MIN(timestamp_unix), MAX(timestamp_unix) FROM {schema}.messages"
+                ).fetchone()
+            finally:
+                conn.execute(f"DETACH DATABASE {schema}")
+
+            # Narrow the registered range to what the partition really holds
+            conn.execute("""
+                UPDATE archive_partitions
+                SET message_count = ?, min_ts = ?, max_ts = ?, updated_at = ?
+                WHERE year = ?
+            """, (count, min_ts, max_ts, datetime.now().isoformat(), year))
+            logger.info(f"{file_name}: moved {moved[year]:,} messages, {count:,} in partition")
+
+        set_meta('archive_cutoff', cutoff, cursor=conn.cursor())
+    finally:
+        conn.close()
+    return moved
+
+
+def get_archive_partitions() -> list:
+    """Registered archive partitions (year, file_name, message_count, min_ts, max_ts, updated_at)."""
+    with read_session() as conn:
+        try:
+            rows = conn.execute("SELECT * FROM archive_partitions ORDER BY year").fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [dict(row) for row in rows]
+
+
 # ============================================================================
 # DISCORD EXPORT IMPORT (historical data)
 # ============================================================================
@@ -259,6 +1430,21 @@ _INSERT_MSG_SQL = """
     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
 """
 
+# Same row tuple; the compact layout derives timestamp/timestamp_unix
+# (parameters 9 and 10) from message_id instead of storing them
+_INSERT_MSG_COMPACT_SQL = """
+    INSERT OR IGNORE INTO messages
+    (message_id, channel_id, channel_name, author_id, author_name,
+     author_discriminator, author_bot, content,
+     has_attachments, has_embeds, is_reply, reply_to_id, word_count, char_count)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?11, ?12, ?13, ?14, ?15, ?16)
+"""
+
+
+def _insert_msg_sql(conn) -> str:
+    """INSERT for a _process_export_message() row, in this database's layout."""
+    return _INSERT_MSG_COMPACT_SQL if _is_compact(conn) else _INSERT_MSG_SQL
+
 
 def import_discord_export(json_path: str, channel_name: str = None):
     """
@@ -291,10 +1477,16 @@ def import_discord_export(json_path: str, channel_name: str = None):
     skipped_count = 0
 
     with db_session() as (conn, cursor):
+        insert_sql = _insert_msg_sql(conn)
+        archived = _archived_filter(conn)
+        source = _messages_source(conn)
         for msg in messages:
             try:
                 row = _process_export_message(msg, channel_id, ch_name)
-                cursor.execute(_INSERT_MSG_SQL, row)
+                if archived and not archived([row]):
+                    skipped_count += 1
+                    continue
+                cursor.execute(insert_sql, row)
                 if cursor.rowcount > 0:
                     imported_count += 1
                 else:
@@ -304,11 +1496,11 @@ def import_discord_export(json_path: str, channel_name: str = None):
                 continue
 
         # Update channel metadata
-        cursor.execute("""
+        cursor.execute(f"""
             INSERT OR REPLACE INTO channels
             (channel_id, channel_name, category, message_count, last_updated)
             VALUES (?, ?, ?,
-                    (SELECT COUNT(*) FROM messages WHERE channel_id = ?),
+                    (SELECT COUNT(*) FROM {source} WHERE channel_id = ?),
                     ?)
         """, (channel_id, ch_name, category, channel_id, datetime.now().isoformat()))
 
@@ -316,18 +1508,8 @@ def import_discord_export(json_path: str, channel_name: str = None):
     return imported_count, skipped_count
 
 
-def _import_streaming(json_path: str, channel_name: str = None, batch_size: int = 5000):
-    """
-    Streaming import for large JSON files using ijson.
-
-    Reads the file in two passes:
-    1. Quick scan for channel metadata (stops before messages array)
-    2. Streams messages one at a time, committing in batches
-    """
-    if not IJSON_AVAILABLE:
-        raise ImportError("ijson required for streaming imports: pip install ijson")
-
-    # --- Pass 1: channel metadata ---
+def _read_channel_meta_streaming(json_path: str, channel_name: str = None) -> tuple:
+    """Scan an export's header for (channel_id, channel_name, category), stopping at the messages array."""
     channel_id = ''
     ch_name = channel_name
     category = 'uncategorized'
@@ -342,16 +1524,32 @@ def _import_streaming(json_path: str, channel_name: str = None, batch_size: int
                 category = value
             if prefix == 'messages':
                 break
-    ch_name = ch_name or 'unknown'
+    return channel_id, ch_name or 'unknown', category
+
+
+def _import_streaming(json_path: str, channel_name: str = None, batch_size: int = 5000):
+    """
+    Streaming import for large JSON files using ijson.
+
+    Reads the file in two passes:
+    1. Quick scan for channel metadata (stops before messages array)
+    2. Streams messages one at a time, committing in batches
+    """
+    if not IJSON_AVAILABLE:
+        raise ImportError("ijson required for streaming imports: pip install ijson")
+
+    # --- Pass 1: channel metadata ---
+    channel_id, ch_name, category = _read_channel_meta_streaming(json_path, channel_name)
 
     imported_count = 0
     skipped_count = 0
     batch = []
 
     # --- Pass 2: stream messages ---
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
+    with db_session() as (conn, cursor):
+        insert_sql = _insert_msg_sql(conn)
+        archived = _archived_filter(conn)
+        source = _messages_source(conn)
         with open(json_path, 'rb') as f:
             for msg in ijson.items(f, 'messages.item'):
                 try:
@@ -359,7 +1557,7 @@ def _import_streaming(json_path: str, channel_name: str = None, batch_size: int
                     batch.append(row)
 
                     if len(batch) >= batch_size:
-                        cursor.executemany(_INSERT_MSG_SQL, batch)
+                        cursor.executemany(insert_sql, archived(batch) if archived else batch)
                         imported_count += cursor.rowcount
                         skipped_count += len(batch) - cursor.rowcount
                         conn.commit()
@@ -371,23 +1569,19 @@ def _import_streaming(json_path: str, channel_name: str = None, batch_size: int
 
         # Flush remaining batch
         if batch:
-            cursor.executemany(_INSERT_MSG_SQL, batch)
+            cursor.executemany(insert_sql, archived(batch) if archived else batch)
             imported_count += cursor.rowcount
             skipped_count += len(batch) - cursor.rowcount
 
         # Update channel metadata
-        cursor.execute("""
+        cursor.execute(f"""
             INSERT OR REPLACE INTO channels
             (channel_id, channel_name, category, message_count, last_updated)
             VALUES (?, ?, ?,
-                    (SELECT COUNT(*) FROM messages WHERE channel_id = ?),
+                    (SELECT COUNT(*) FROM {source} WHERE channel_id = ?),
                     ?)
         """, (channel_id, ch_name, category, channel_id, datetime.now().isoformat()))
 
-        conn.commit()
-    finally:
-        conn.close()
-
     logger.info(f"Imported {imported_count}, skipped {skipped_count} from {ch_name}")
     return imported_count, skipped_count
 
@@ -410,17 +1604,370 @@ def import_all_exports(export_dir: str):
     return total_imported, total_skipped
 
 
+# ----------------------------------------------------------------------------
+# Parallel bulk import
+# ----------------------------------------------------------------------------
+#
+# Export files are parsed in a process pool (JSON decoding and
+# _process_export_message are CPU-bound) and the rows are funnelled
+# through a bounded queue to one writer connection in this process.
+# While loading, the writer runs in "bulk mode": secondary indexes and
+# the FTS/rollup triggers on `messages` are dropped, the page cache is
+# enlarged and fsyncs are turned off. Everything derived from `messages`
+# is rebuilt once at the end. A per-file checkpoint table lets an
+# interrupted import resume where it stopped.
+
+
+def _messages_secondary_indexes(conn) -> dict:
+    """
+    Secondary indexes on `messages` dropped during a bulk load, name -> DDL.
+
+    The UNIQUE index on message_id stays, INSERT OR IGNORE depends on it.
+    """
+    indexes = _COMPACT_INDEXES if _is_compact(conn) else _TEXT_INDEXES
+    return {
+        index: _index_sql(index, table, columns)
+        for index, (table, columns) in indexes.items() if table == 'messages'
+    }
+
+
+# Triggers on `messages` whose work is redone in one pass after the load
+_MESSAGES_DERIVED_TRIGGERS = ('messages_fts_ai', 'messages_fts_ad', 'messages_fts_au', 'rollup_messages_ai',
+                              'rollup_messages_replace_live')
+
+_BULK_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": "-1048576",     # 1 GiB page cache (negative = KiB)
+    "temp_store": "MEMORY",
+}
+
+_BULK_CHUNK_ROWS = 5000
+
+# Set in each pool worker by _bulk_worker_init
+_bulk_queue = None
+
+
+def _bulk_worker_init(row_queue):
+    global _bulk_queue
+    _bulk_queue = row_queue
+
+
+def _bulk_parse_file(json_path: str) -> None:
+    """
+    Pool worker: parse one export file and push row chunks to the writer.
+
+    Puts ('rows', path, [row, ...]) messages followed by exactly one
+    ('done', path, meta) or ('error', path, message).
+    """
+    try:
+        if IJSON_AVAILABLE:
+            channel_id, ch_name, category = _read_channel_meta_streaming(json_path)
+            with open(json_path, 'rb') as f:
+                messages = ijson.items(f, 'messages.item')
+                parse_errors = _bulk_emit_rows(json_path, messages, channel_id, ch_name)
+        else:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            channel = data.get('channel', {})
+            channel_id = str(channel.get('id', ''))
+            ch_name = channel.get('name', 'unknown')
+            category = channel.get('category', 'uncategorized')
+            parse_errors = _bulk_emit_rows(json_path, data.get('messages', []), channel_id, ch_name)
+
+        _bulk_queue.put(('done', json_path, {
+            'channel_id': channel_id,
+            'channel_name': ch_name,
+            'category': category,
+            'parse_errors': parse_errors,
+        }))
+    except Exception as e:
+        _bulk_queue.put(('error', json_path, f"{type(e).__name__}: {e}"))
+
+
+def _bulk_emit_rows(json_path, messages, channel_id, ch_name) -> int:
+    chunk = []
+    errors = 0
+    for msg in messages:
+        try:
+            chunk.append(_process_export_message(msg, channel_id, ch_name))
+        except Exception:
+            errors += 1
+            continue
+        if len(chunk) >= _BULK_CHUNK_ROWS:
+            _bulk_queue.put(('rows', json_path, chunk))
+            chunk = []
+    if chunk:
+        _bulk_queue.put(('rows', json_path, chunk))
+    return errors
+
+
+def _file_signature(path: Path) -> tuple:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime
+
+
+def _enter_bulk_mode(conn: sqlite3.Connection):
+    """Drop secondary indexes/derived triggers and relax durability for the load."""
+    for pragma, value in _BULK_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    for index in _messages_secondary_indexes(conn):
+        conn.execute(f"DROP INDEX IF EXISTS {index}")
+    for trigger in _MESSAGES_DERIVED_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    # Readers fall back to base-table scans until the rebuild at the end
+    conn.execute("DELETE FROM db_meta WHERE key IN ('fts_backfilled', 'rollups_built')")
+    conn.commit()
+
+
+def _exit_bulk_mode(conn: sqlite3.Connection, channels: dict):
+    """Recreate indexes and refresh channel counts once, after all rows are in."""
+    conn.execute("PRAGMA synchronous = NORMAL")
+    for index, sql in _messages_secondary_indexes(conn).items():
+        logger.info(f"Rebuilding index {index}...")
+        conn.execute(sql)
+    conn.commit()
+
+    logger.info(f"Refreshing message counts for {len(channels)} channels...")
+    now = datetime.now().isoformat()
+    source = _messages_source(conn)
+    conn.executemany(f"""
+        INSERT OR REPLACE INTO channels
+        (channel_id, channel_name, category, message_count, last_updated)
+        VALUES (?, ?, ?,
+                (SELECT COUNT(*) FROM {source} WHERE channel_id = ?),
+                ?)
+    """, [(cid, meta['channel_name'], meta['category'], cid, now) for cid, meta in channels.items()])
+    conn.commit()
+
+
+def _abort_bulk_mode(conn: sqlite3.Connection):
+    """Recreate the indexes _enter_bulk_mode dropped, after a load that didn't finish."""
+    logger.error(
+        "Bulk import aborted; restoring message indexes. The FTS index and analytics "
+        "rollups are incomplete until rebuild_fts_index() and rebuild_rollups() run "
+        "(or the import is re-run to completion)."
+    )
+    try:
+        conn.rollback()
+        conn.execute("PRAGMA synchronous = NORMAL")
+        for index, sql in _messages_secondary_indexes(conn).items():
+            conn.execute(sql)
+        conn.commit()
+    except sqlite3.Error as e:
+        logger.error(f"Could not restore message indexes: {e}")
+
+
+def bulk_import_exports(export_dir: str, workers: int = None, resume: bool = True,
+                        rebuild_derived: bool = True) -> dict:
+    """
+    Import every DiscordChatExporter JSON file in a directory, in parallel.
+
+    Much faster than import_all_exports() for a full re-import, but
+    while it runs the `messages` table has no secondary indexes, so
+    analytics queries from the bots will be slow. Run it during
+    maintenance. If it stops early (error, Ctrl-C) the indexes and
+    triggers are put back, but the FTS index and rollups stay
+    incomplete until rebuild_fts_index() and rebuild_rollups() run.
+
+    Args:
+        export_dir: Directory of *.json exports.
+        workers: Parser processes (default: CPU count - 1).
+        resume: Skip files already recorded in import_checkpoints with
+            the same size and mtime.
+        rebuild_derived: Rebuild the FTS index and analytics rollups at
+            the end. Pass False to do it later with rebuild_fts_index()
+            and rebuild_rollups().
+
+    Returns:
+        {'files': n, 'skipped_files': n, 'failed_files': [...],
+         'imported': n, 'skipped': n, 'seconds': float}
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    init_database()
+    started = time.time()
+    export_path = Path(export_dir)
+    json_files = sorted(export_path.glob("*.json"))
+
+    conn = open_connection(ANALYTICS_DB_PATH)
+    bulk_mode = False
+    completed = False
+    try:
+        done_before = {}
+        if resume:
+            for row in conn.execute("SELECT file_path, file_size, file_mtime FROM import_checkpoints"):
+                done_before[row['file_path']] = (row['file_size'], row['file_mtime'])
+        pending = [f for f in json_files if done_before.get(str(f.resolve())) != _file_signature(f)]
+        skipped_files = len(json_files) - len(pending)
+        if skipped_files:
+            logger.info(f"Resuming: {skipped_files} file(s) already imported, {len(pending)} to go")
+        if not pending:
+            return {'files': len(json_files), 'skipped_files': skipped_files, 'failed_files': [],
+                    'imported': 0, 'skipped': 0, 'seconds': time.time() - started}
+
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        bulk_mode = True
+        _enter_bulk_mode(conn)
+        insert_sql = _insert_msg_sql(conn)
+        archived = _archived_filter(conn)
+
+        ctx = multiprocessing.get_context()
+        row_queue = ctx.Queue(maxsize=workers * 4)
+        per_file = {str(f): [0, 0] for f in pending}   # [imported, skipped]
+        channels = {}
+        failed = []
+        finished = 0
+        reported = set()
+
+        # One future per file: if a worker dies (OOM, signal) the executor
+        # fails every outstanding future with BrokenProcessPool instead of
+        # waiting forever for a lost task
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_bulk_worker_init,
+                                 initargs=(row_queue,)) as pool:
+            tasks = [pool.submit(_bulk_parse_file, str(f)) for f in pending]
+
+            while finished < len(pending):
+                try:
+                    kind, path, payload = row_queue.get(timeout=5)
+                except queue.Empty:
+                    if all(task.done() for task in tasks):
+                        # Every worker returned (or died) but some file never reported back
+                        errors = {type(e).__name__ for e in (task.exception() for task in tasks) if e}
+                        lost = [str(f) for f in pending if str(f) not in reported]
+                        logger.error(f"{len(lost)} file(s) produced no result"
+                                     + (f" ({', '.join(sorted(errors))})" if errors else ""))
+                        failed.extend(lost)
+                        break
+                    continue
+
+                if kind == 'rows':
+                    cursor = conn.executemany(insert_sql, archived(payload) if archived else payload)
+                    conn.commit()
+                    per_file[path][0] += cursor.rowcount
+                    per_file[path][1] += len(payload) - cursor.rowcount
+                    continue
+
+                finished += 1
+                reported.add(path)
+                imported, skipped = per_file[path]
+                name = Path(path).name
+                if kind == 'error':
+                    failed.append(path)
+                    logger.error(f"[{finished}/{len(pending)}] {name}: FAILED ({payload}), "
+                                 f"{imported} rows written before the error")
+                    continue
+
+                channels[payload['channel_id']] = payload
+                size, mtime = _file_signature(Path(path))
+                conn.execute("""
+                    INSERT OR REPLACE INTO import_checkpoints
+                    (file_path, file_size, file_mtime, channel_id,
+                     messages_imported, messages_skipped, completed_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (str(Path(path).resolve()), size, mtime, payload['channel_id'],
+                      imported, skipped, datetime.now().isoformat()))
+                conn.commit()
+
+                elapsed = time.time() - started
+                total_rows = sum(i + s for i, s in per_file.values())
+                unparseable = f", {payload['parse_errors']} unparseable" if payload['parse_errors'] else ""
+                logger.info(
+                    f"[{finished}/{len(pending)}] {name}: imported {imported}, skipped {skipped}{unparseable} "
+                    f"({total_rows / max(elapsed, 0.001):,.0f} rows/s overall)"
+                )
+
+        _exit_bulk_mode(conn, channels)
+        completed = True
+    finally:
+        if bulk_mode and not completed:
+            _abort_bulk_mode(conn)
+        conn.close()
+        if bulk_mode and not completed:
+            # Restores the triggers dropped by _enter_bulk_mode
+            try:
+                init_database()
+            except sqlite3.Error as e:
+                logger.error(f"Could not restore message triggers, run init_database(): {e}")
+
+    # Restores the triggers dropped by _enter_bulk_mode
+    init_database()
+    if rebuild_derived:
+        rebuild_fts_index()
+        rebuild_rollups()
+
+    result = {
+        'files': len(json_files),
+        'skipped_files': skipped_files,
+        'failed_files': failed,
+        'imported': sum(i for i, _ in per_file.values()),
+        'skipped': sum(s for _, s in per_file.values()),
+        'seconds': round(time.time() - started, 1),
+    }
+    logger.info(f"Bulk import finished: {result}")
+    return result
+
+
 # ============================================================================
 # LIVE MESSAGE STORAGE (real-time from on_message_create)
 # ============================================================================
 
+_INSERT_LIVE_SQL = """
+    INSERT OR IGNORE INTO live_messages
+    (message_id, channel_id, author_id, author_name, author_nickname,
+     author_avatar_url, content, timestamp, timestamp_edited, is_pinned,
+     is_reply, reply_to_message_id, attachments_json, embeds_json,
+     reactions_json, mentions_json, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Compact layout: `timestamp` (parameter 8) is derived from message_id
+_INSERT_LIVE_COMPACT_SQL = """
+    INSERT OR IGNORE INTO live_messages
+    (message_id, channel_id, author_id, author_name, author_nickname,
+     author_avatar_url, content, timestamp_edited, is_pinned,
+     is_reply, reply_to_message_id, attachments_json, embeds_json,
+     reactions_json, mentions_json, created_at)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?9, ?10, ?11, ?12, ?13, ?14, ?15, ?16, ?17)
+"""
+
+
+def _insert_live_sql(conn) -> str:
+    """INSERT for a _live_message_row() row, in this database's layout."""
+    return _INSERT_LIVE_COMPACT_SQL if _is_compact(conn) else _INSERT_LIVE_SQL
+
+
+def _live_message_row(msg_data: dict) -> tuple:
+    """Transform a live message dict into a row tuple for _INSERT_LIVE_SQL."""
+    return (
+        str(msg_data.get('message_id', '')),
+        str(msg_data.get('channel_id', '')),
+        str(msg_data.get('author_id', '')),
+        msg_data.get('author_name'),
+        msg_data.get('author_nickname'),
+        msg_data.get('author_avatar_url'),
+        msg_data.get('content', ''),
+        msg_data.get('timestamp'),
+        msg_data.get('timestamp_edited'),
+        1 if msg_data.get('is_pinned') else 0,
+        1 if msg_data.get('is_reply') else 0,
+        str(msg_data.get('reply_to_message_id', '')) if msg_data.get('reply_to_message_id') else None,
+        json.dumps(msg_data.get('attachments', [])),
+        json.dumps(msg_data.get('embeds', [])),
+        json.dumps(msg_data.get('reactions', [])),
+        json.dumps(msg_data.get('mentions', [])),
+        msg_data.get('created_at', datetime.now().timestamp()),
+    )
+
+
 def insert_live_message(msg_data: dict) -> bool:
     """
     Insert a live message into the database.
 
     Intended to be called from a single writer bot (trannyverse/bot1.py).
     Other bots should read from this table, not write to it, to avoid
-    duplicate storage.
+    duplicate storage. Gateway handlers should prefer queue_live_message(),
+    which doesn't wait for the commit.
 
     Args:
         msg_data: Dict with keys matching the live_messages schema:
@@ -434,42 +1981,98 @@ def insert_live_message(msg_data: dict) -> bool:
     """
     try:
         with db_session() as (conn, cursor):
-            cursor.execute("""
-                INSERT OR IGNORE INTO live_messages
-                (message_id, channel_id, author_id, author_name, author_nickname,
-                 author_avatar_url, content, timestamp, timestamp_edited, is_pinned,
-                 is_reply, reply_to_message_id, attachments_json, embeds_json,
-                 reactions_json, mentions_json, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                str(msg_data.get('message_id', '')),
-                str(msg_data.get('channel_id', '')),
-                str(msg_data.get('author_id', '')),
-                msg_data.get('author_name'),
-                msg_data.get('author_nickname'),
-                msg_data.get('author_avatar_url'),
-                msg_data.get('content', ''),
-                msg_data.get('timestamp'),
-                msg_data.get('timestamp_edited'),
-                1 if msg_data.get('is_pinned') else 0,
-                1 if msg_data.get('is_reply') else 0,
-                str(msg_data.get('reply_to_message_id', '')) if msg_data.get('reply_to_message_id') else None,
-                json.dumps(msg_data.get('attachments', [])),
-                json.dumps(msg_data.get('embeds', [])),
-                json.dumps(msg_data.get('reactions', [])),
-                json.dumps(msg_data.get('mentions', [])),
-                msg_data.get('created_at', datetime.now().timestamp()),
-            ))
+            cursor.execute(_insert_live_sql(conn), _live_message_row(msg_data))
             return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error inserting live message: {e}")
         return False
 
 
+class LiveMessageWriter(GroupCommitWriter):
+    """
+    Write-behind queue for live messages.
+
+    Gateway handlers hand rows to submit() and return immediately. A
+    background thread drains the bounded queue and group-commits with
+    executemany every `batch_size` rows or `flush_ms` milliseconds,
+    whichever comes first, so a burst costs one fsync per batch instead
+    of one per message (see common/group_commit.py).
+
+    The thread uses its own pooled write connection (see common/pool.py).
+    """
+
+    label = "Live message"
+
+    def __init__(self, batch_size: int = LIVE_WRITER_BATCH_SIZE,
+                 flush_ms: int = LIVE_WRITER_FLUSH_MS,
+                 max_queue: int = LIVE_WRITER_QUEUE_SIZE,
+                 db_path: Path = None):
+        super().__init__(batch_size, flush_ms, max_queue)
+        self.db_path = db_path
+
+    def submit(self, msg_data: dict) -> bool:
+        """
+        Queue a live message for the next group commit.
+
+        Never blocks or touches the database. If the queue is full (writer
+        stalled on a locked database), the row waits in the overflow
+        buffer; if that is full too, it is dropped and counted in
+        rows_dropped.
+
+        Returns:
+            True if queued, False if it was dropped.
+        """
+        return super().submit(_live_message_row(msg_data))
+
+    def _commit(self, rows: list) -> int:
+        with db_session(self.db_path) as (conn, cursor):
+            cursor.executemany(_insert_live_sql(conn), rows)
+            return cursor.rowcount
+
+
+_live_writer: Optional[LiveMessageWriter] = None
+_live_writer_lock = threading.Lock()
+
+
+def get_live_writer() -> LiveMessageWriter:
+    """Process-wide live message writer, started on first use."""
+    global _live_writer
+    if _live_writer is None:
+        with _live_writer_lock:
+            if _live_writer is None:
+                writer = LiveMessageWriter()
+                writer.start()
+                _live_writer = writer
+    return _live_writer
+
+
+def queue_live_message(msg_data: dict) -> bool:
+    """
+    Non-blocking insert_live_message() for gateway handlers.
+
+    The row is committed by the background writer within
+    LIVE_WRITER_FLUSH_MS. Same msg_data format as insert_live_message().
+    """
+    return get_live_writer().submit(msg_data)
+
+
+def stop_live_writer(timeout: float = 10.0):
+    """Flush pending live messages and stop the writer. Safe to call if never started."""
+    global _live_writer
+    with _live_writer_lock:
+        writer, _live_writer = _live_writer, None
+    if writer is not None:
+        writer.stop(timeout)
+
+
+def get_live_writer_stats() -> Optional[dict]:
+    """Metrics for the live message writer, or None if it hasn't been started."""
+    return _live_writer.stats() if _live_writer is not None else None
+
+
 def get_live_message_by_id(message_id: str) -> Optional[dict]:
     """Get a live message by its Discord snowflake ID."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM live_messages WHERE message_id = ?", (str(message_id),))
         row = cursor.fetchone()
@@ -482,8 +2085,6 @@ def get_live_message_by_id(message_id: str) -> Optional[dict]:
             if result.get(field):
                 result[field.replace('_json', '')] = json.loads(result[field])
         return result
-    finally:
-        conn.close()
 
 
 def get_recent_live_messages(channel_id: str = None, limit: int = 50) -> list:
@@ -493,8 +2094,7 @@ def get_recent_live_messages(channel_id: str = None, limit: int = 50) -> list:
     Useful for the persona bot to build conversation context from the
     shared database instead of maintaining its own message buffer.
     """
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
         if channel_id:
             cursor.execute("""
@@ -508,8 +2108,6 @@ def get_recent_live_messages(channel_id: str = None, limit: int = 50) -> list:
                 ORDER BY created_at DESC LIMIT ?
             """, (limit,))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
 
 
 # ============================================================================
@@ -538,8 +2136,7 @@ def insert_highlight(highlight_id: str, original_message_id: str, author_id: str
 
 def get_highlight_by_original(original_message_id: str) -> Optional[dict]:
     """Check if a message has already been highlighted."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT * FROM highlights WHERE original_message_id = ?",
@@ -547,8 +2144,6 @@ def get_highlight_by_original(original_message_id: str) -> Optional[dict]:
         )
         row = cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 # ============================================================================
@@ -574,63 +2169,166 @@ def insert_reply_tracking(reply_id: str, original_message_id: str,
 
 def count_replies_to_message(original_message_id: str) -> int:
     """Count how many replies a message has received."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT COUNT(*) FROM message_reply_tracking WHERE original_message_id = ?",
             (str(original_message_id),)
         )
         return cursor.fetchone()[0]
-    finally:
-        conn.close()
 
 
 def get_replies_to_message(original_message_id: str) -> list:
     """Get all tracked replies to a specific message."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT * FROM message_reply_tracking WHERE original_message_id = ? ORDER BY created_at",
             (str(original_message_id),)
         )
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
 
 
 # ============================================================================
 # QUERY FUNCTIONS (analytics, stats, search)
 # ============================================================================
 
-def search_messages(query: str, limit: int = 100, author_id: str = None) -> list:
+def search_messages(query: str, limit: int = 100, author_id: str = None,
+                    channel_id: str = None, since: float = None, until: float = None,
+                    include_live: bool = True) -> list:
     """
-    Full-text keyword search across historical messages.
+    Full-text keyword search across historical and live messages.
+
+    Uses the FTS5 indexes with BM25 ranking (best match first). Falls
+    back to a LIKE scan over `messages` if the index hasn't been
+    backfilled yet (see rebuild_fts_index).
+
+    Used by /search_messages and as a fallback by the RAG hybrid
+    retriever when ChromaDB semantic search returns too few results.
 
-    Used as a fallback by the RAG hybrid retriever when ChromaDB
-    semantic search returns too few results.
+    Args:
+        query: Free text; matched as a phrase, last word as a prefix.
+        limit: Max rows returned.
+        author_id: Only messages by this user.
+        channel_id: Only messages in this channel.
+        since / until: Unix timestamp bounds (inclusive / exclusive).
+        include_live: Also search live_messages captured since the import.
+
+    Returns:
+        List of dicts with message_id, author_name, channel_name, content, timestamp.
     """
-    conn = get_connection()
-    try:
-        cursor = conn.cursor()
+    with read_session() as conn:
+        if not _fts_ready(conn):
+            return _search_messages_like(conn, query, limit, author_id, channel_id, since, until)
+
+        match = _fts_query(query)
+        if match is None:
+            return []
+
+        filters = ["m.author_bot = 0"]
+        params = [match]
         if author_id:
-            cursor.execute("""
-                SELECT message_id, author_name, channel_name, content, timestamp
-                FROM messages
-                WHERE content LIKE ? AND author_id = ? AND author_bot = 0
-                ORDER BY timestamp_unix DESC LIMIT ?
-            """, (f'%{query}%', author_id, limit))
-        else:
-            cursor.execute("""
-                SELECT message_id, author_name, channel_name, content, timestamp
-                FROM messages
-                WHERE content LIKE ? AND author_bot = 0
-                ORDER BY timestamp_unix DESC LIMIT ?
-            """, (f'%{query}%', limit))
-        return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+            filters.append("m.author_id = ?")
+            params.append(str(author_id))
+        if channel_id:
+            filters.append("m.channel_id = ?")
+            params.append(str(channel_id))
+        if since is not None:
+            filters.append("m.timestamp_unix >= ?")
+            params.append(since)
+        if until is not None:
+            filters.append("m.timestamp_unix < ?")
+            params.append(until)
+
+        # Best `limit` from the hot index and each overlapping archive
+        # partition's own index, merged on rank
+        schemas = ['main', *_attach_partitions(conn, _archive_partitions(conn, since, until)).values()]
+        arms = [f"""
+            SELECT * FROM (
+                SELECT m.message_id, m.author_name, m.channel_name, m.content, m.timestamp,
+                       messages_fts.rank AS rank
+                FROM {schema}.messages_fts
+                JOIN {schema}.messages m ON m.id = messages_fts.rowid
+                WHERE messages_fts MATCH ? AND {' AND '.join(filters)}
+                ORDER BY messages_fts.rank
+                LIMIT ?
+            )
+        """ for schema in schemas]
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT message_id, author_name, channel_name, content, timestamp
+            FROM ({' UNION ALL '.join(arms)})
+            ORDER BY rank
+            LIMIT ?
+        """, (params + [limit]) * len(schemas) + [limit])
+        results = [dict(row) for row in cursor.fetchall()]
+
+        if include_live and len(results) < limit:
+            results.extend(_search_live_fts(
+                conn, match, limit, author_id, channel_id, since, until,
+                exclude={r['message_id'] for r in results},
+            ))
+        return results[:limit]
+
+
+def _search_live_fts(conn, match, limit, author_id, channel_id, since, until, exclude) -> list:
+    """BM25 search over live_messages; skips IDs already found in the archive."""
+    filters = []
+    params = [match]
+    if author_id:
+        filters.append("l.author_id = ?")
+        params.append(str(author_id))
+    if channel_id:
+        filters.append("l.channel_id = ?")
+        params.append(str(channel_id))
+    if since is not None:
+        filters.append("l.created_at >= ?")
+        params.append(since)
+    if until is not None:
+        filters.append("l.created_at < ?")
+        params.append(until)
+    where = ''.join(f" AND {f}" for f in filters)
+
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT l.message_id, l.author_name,
+               COALESCE(c.channel_name, l.channel_id) AS channel_name,
+               l.content, l.timestamp
+        FROM live_messages_fts
+        JOIN live_messages l ON l.id = live_messages_fts.rowid
+        LEFT JOIN channels c ON c.channel_id = l.channel_id
+        WHERE live_messages_fts MATCH ?{where}
+        ORDER BY live_messages_fts.rank
+        LIMIT ?
+    """, params + [limit])
+    return [dict(row) for row in cursor.fetchall() if row['message_id'] not in exclude]
+
+
+def _search_messages_like(conn, query, limit, author_id, channel_id, since, until) -> list:
+    """Pre-FTS substring scan over `messages`, newest first."""
+    filters = ["content LIKE ?", "author_bot = 0"]
+    params = [f'%{query}%']
+    if author_id:
+        filters.append("author_id = ?")
+        params.append(str(author_id))
+    if channel_id:
+        filters.append("channel_id = ?")
+        params.append(str(channel_id))
+    if since is not None:
+        filters.append("timestamp_unix >= ?")
+        params.append(since)
+    if until is not None:
+        filters.append("timestamp_unix < ?")
+        params.append(until)
+
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT message_id, author_name, channel_name, content, timestamp
+        FROM {_messages_source(conn, since, until)}
+        WHERE {' AND '.join(filters)}
+        ORDER BY timestamp_unix DESC LIMIT ?
+    """, params + [limit])
+    return [dict(row) for row in cursor.fetchall()]
 
 
 def get_user_messages(user_id: str, limit: int = None) -> list:
@@ -640,12 +2338,11 @@ def get_user_messages(user_id: str, limit: int = None) -> list:
     Used by prepare_chatbot.py to build the persona corpus and by
     the RAG embedder to tag is_persona metadata.
     """
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
-        query = """
+        query = f"""
             SELECT content, timestamp, channel_name
-            FROM messages
+            FROM {_messages_source(conn)}
             WHERE author_id = ? AND author_bot = 0 AND content != ''
             ORDER BY timestamp_unix ASC
         """
@@ -653,101 +2350,227 @@ def get_user_messages(user_id: str, limit: int = None) -> list:
             query += f" LIMIT {limit}"
         cursor.execute(query, (user_id,))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+
+
+def iter_user_messages(user_id: str, chunk_size: int = 2000, after_rowid: int = 0,
+                       chronological: bool = True):
+    """
+    Stream a user's messages without loading them all into memory.
+
+    Same rows as get_user_messages() (plus the `id` rowid), fetched
+    `chunk_size` at a time from one cursor. Holds a pooled read
+    connection until the generator is exhausted or closed.
+
+    Args:
+        user_id: Author ID.
+        chunk_size: Rows per fetchmany().
+        after_rowid: Only messages with id > this (for incremental updates).
+        chronological: Order by timestamp (default) or by rowid, which
+            avoids a sort and is what incremental consumers want.
+    """
+    order = "timestamp_unix ASC" if chronological else "id ASC"
+    with read_session() as conn:
+        cursor = conn.execute(f"""
+            SELECT id, content, timestamp, channel_name
+            FROM {_messages_source(conn)}
+            WHERE author_id = ? AND id > ? AND author_bot = 0 AND content != ''
+            ORDER BY {order}
+        """, (user_id, after_rowid))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
 
 
 def get_user_stats(limit: int = 20) -> list:
     """Get most active users by message count."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
+        if not _rollups_ready(conn):
+            cursor.execute(f"""
+                SELECT
+                    author_id,
+                    author_name,
+                    COUNT(*) as message_count,
+                    SUM(word_count) as total_words,
+                    ROUND(AVG(word_count), 1) as avg_words_per_msg,
+                    COUNT(DISTINCT channel_id) as channels_active,
+                    MIN(timestamp) as first_message,
+                    MAX(timestamp) as last_message
+                FROM {_messages_source(conn)}
+                WHERE author_bot = 0
+                GROUP BY author_id
+                ORDER BY message_count DESC
+                LIMIT ?
+            """, (limit,))
+            return [dict(row) for row in cursor.fetchall()]
+
+        cursor.execute(f"""
             SELECT
-                author_id,
-                author_name,
-                COUNT(*) as message_count,
-                SUM(word_count) as total_words,
-                ROUND(AVG(word_count), 1) as avg_words_per_msg,
-                COUNT(DISTINCT channel_id) as channels_active,
-                MIN(timestamp) as first_message,
-                MAX(timestamp) as last_message
-            FROM messages
-            WHERE author_bot = 0
-            GROUP BY author_id
-            ORDER BY message_count DESC
-            LIMIT ?
+                top.author_id,
+                (SELECT author_name FROM rollup_author_channel n
+                 WHERE n.author_id = top.author_id ORDER BY n.last_ts DESC LIMIT 1) as author_name,
+                top.message_count,
+                top.total_words,
+                ROUND(top.total_words * 1.0 / top.message_count, 1) as avg_words_per_msg,
+                top.channels_active,
+                {_ISO_FROM_UNIX.format('top.first_ts')} as first_message,
+                {_ISO_FROM_UNIX.format('top.last_ts')} as last_message
+            FROM (
+                SELECT
+                    author_id,
+                    SUM(message_count) as message_count,
+                    SUM(word_count) as total_words,
+                    COUNT(*) as channels_active,
+                    MIN(first_ts) as first_ts,
+                    MAX(last_ts) as last_ts
+                FROM rollup_author_channel
+                GROUP BY author_id
+                ORDER BY message_count DESC
+                LIMIT ?
+            ) top
+            ORDER BY top.message_count DESC
         """, (limit,))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+
+
+def get_user_profile(user_id: str, top_channels: int = 5) -> Optional[dict]:
+    """
+    Totals, active period and busiest channels for one user.
+
+    Served from rollup_author_channel (one row per channel the user
+    posted in) when the rollups are built, otherwise aggregated in SQL
+    over the user's rows. Either way no message content is loaded.
+
+    Returns:
+        None if the user has no messages, else {'total_messages',
+        'total_words', 'avg_words_per_msg', 'first_message',
+        'last_message', 'top_channels': [(channel_name, count), ...]}
+    """
+    with read_session() as conn:
+        if _rollups_ready(conn):
+            source = """
+                SELECT channel_name, message_count, word_count, first_ts, last_ts
+                FROM rollup_author_channel WHERE author_id = ?
+            """
+        else:
+            source = f"""
+                SELECT MAX(channel_name) AS channel_name, COUNT(*) AS message_count,
+                       SUM(word_count) AS word_count,
+                       MIN(timestamp_unix) AS first_ts, MAX(timestamp_unix) AS last_ts
+                FROM {_messages_source(conn)}
+                WHERE author_id = ? AND author_bot = 0
+                GROUP BY channel_id
+            """
+        channels = conn.execute(f"""
+            SELECT channel_name, message_count, word_count,
+                   {_ISO_FROM_UNIX.format('first_ts')} AS first_message,
+                   {_ISO_FROM_UNIX.format('last_ts')} AS last_message
+            FROM ({source})
+            ORDER BY message_count DESC
+        """, (user_id,)).fetchall()
+
+    if not channels:
+        return None
+
+    total_messages = sum(c['message_count'] for c in channels)
+    total_words = sum(c['word_count'] or 0 for c in channels)
+    return {
+        'total_messages': total_messages,
+        'total_words': total_words,
+        'avg_words_per_msg': total_words / total_messages if total_messages else 0,
+        'first_message': min((c['first_message'] for c in channels if c['first_message']), default=None),
+        'last_message': max((c['last_message'] for c in channels if c['last_message']), default=None),
+        'top_channels': [(c['channel_name'], c['message_count']) for c in channels[:top_channels]],
+    }
 
 
 def get_hourly_activity() -> dict:
     """Get message distribution by hour of day (UTC)."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                CAST(strftime('%H', timestamp) AS INTEGER) as hour,
-                COUNT(*) as message_count
-            FROM messages
-            WHERE author_bot = 0 AND timestamp IS NOT NULL
-            GROUP BY hour
-            ORDER BY hour
-        """)
+        if _rollups_ready(conn):
+            cursor.execute("""
+                SELECT hour, SUM(message_count) as message_count
+                FROM rollup_activity
+                GROUP BY hour
+                ORDER BY hour
+            """)
+        else:
+            cursor.execute(f"""
+                SELECT
+                    CAST(strftime('%H', timestamp) AS INTEGER) as hour,
+                    COUNT(*) as message_count
+                FROM {_messages_source(conn)}
+                WHERE author_bot = 0 AND timestamp IS NOT NULL
+                GROUP BY hour
+                ORDER BY hour
+            """)
         results = {row['hour']: row['message_count'] for row in cursor.fetchall()}
         return {h: results.get(h, 0) for h in range(24)}
-    finally:
-        conn.close()
 
 
 def get_daily_activity(days: int = 30) -> list:
-    """Get message count per day for the last N days."""
-    conn = get_connection()
-    try:
+    """Get message count per day (UTC) for the last N days."""
+    with read_session() as conn:
         cursor = conn.cursor()
-        cutoff = (datetime.now() - timedelta(days=days)).timestamp()
-        cursor.execute("""
-            SELECT
-                DATE(timestamp) as date,
-                COUNT(*) as message_count,
-                COUNT(DISTINCT author_id) as unique_users
-            FROM messages
-            WHERE author_bot = 0 AND timestamp_unix > ?
-            GROUP BY date
-            ORDER BY date DESC
-        """, (cutoff,))
+        # Whole days from midnight UTC: rollup_activity has no finer
+        # granularity, and both paths must count the same first day
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).replace(
+            hour=0, minute=0, second=0, microsecond=0).timestamp()
+        if _rollups_ready(conn):
+            cursor.execute("""
+                SELECT
+                    day as date,
+                    SUM(message_count) as message_count,
+                    COUNT(DISTINCT author_id) as unique_users
+                FROM rollup_activity
+                WHERE day >= strftime('%Y-%m-%d', ?, 'unixepoch')
+                GROUP BY day
+                ORDER BY day DESC
+            """, (cutoff,))
+        else:
+            cursor.execute(f"""
+                SELECT
+                    DATE(timestamp) as date,
+                    COUNT(*) as message_count,
+                    COUNT(DISTINCT author_id) as unique_users
+                FROM {_messages_source(conn, since=cutoff)}
+                WHERE author_bot = 0 AND timestamp_unix >= ?
+                GROUP BY date
+                ORDER BY date DESC
+            """, (cutoff,))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
 
 
 def get_server_overview() -> dict:
     """Get overall server statistics."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
+        if not _rollups_ready(conn):
+            return _server_overview_scan(cursor)
+
+        cursor.execute(f"""
             SELECT
-                COUNT(*) as total_messages,
+                SUM(message_count) as total_messages,
                 COUNT(DISTINCT author_id) as unique_users,
                 COUNT(DISTINCT channel_id) as active_channels,
                 SUM(word_count) as total_words,
-                SUM(has_attachments) as total_attachments,
-                SUM(is_reply) as total_replies,
-                MIN(timestamp) as earliest_message,
-                MAX(timestamp) as latest_message
-            FROM messages
-            WHERE author_bot = 0
+                SUM(attachment_count) as total_attachments,
+                SUM(reply_count) as total_replies,
+                {_ISO_FROM_UNIX.format('MIN(first_ts)')} as earliest_message,
+                {_ISO_FROM_UNIX.format('MAX(last_ts)')} as latest_message
+            FROM rollup_author_channel
         """)
         result = dict(cursor.fetchone())
+        result['total_messages'] = result['total_messages'] or 0
 
         # Most active channel
         cursor.execute("""
-            SELECT channel_name, COUNT(*) as count
-            FROM messages WHERE author_bot = 0
+            SELECT channel_name, SUM(message_count) as count
+            FROM rollup_author_channel
             GROUP BY channel_id ORDER BY count DESC LIMIT 1
         """)
         top_channel = cursor.fetchone()
@@ -755,80 +2578,206 @@ def get_server_overview() -> dict:
 
         # Most active user
         cursor.execute("""
-            SELECT author_name, COUNT(*) as count
-            FROM messages WHERE author_bot = 0
+            SELECT author_name, SUM(message_count) as count
+            FROM rollup_author_channel
             GROUP BY author_id ORDER BY count DESC LIMIT 1
         """)
         top_user = cursor.fetchone()
         result['top_user'] = dict(top_user) if top_user else None
 
         return result
-    finally:
-        conn.close()
+
+
+def _server_overview_scan(cursor: sqlite3.Cursor) -> dict:
+    """get_server_overview() straight from `messages`, for databases without rollups yet."""
+    source = _messages_source(cursor.connection)
+    cursor.execute(f"""
+        SELECT
+            COUNT(*) as total_messages,
+            COUNT(DISTINCT author_id) as unique_users,
+            COUNT(DISTINCT channel_id) as active_channels,
+            SUM(word_count) as total_words,
+            SUM(has_attachments) as total_attachments,
+            SUM(is_reply) as total_replies,
+            MIN(timestamp) as earliest_message,
+            MAX(timestamp) as latest_message
+        FROM {source}
+        WHERE author_bot = 0
+    """)
+    result = dict(cursor.fetchone())
+
+    cursor.execute(f"""
+        SELECT channel_name, COUNT(*) as count
+        FROM {source} WHERE author_bot = 0
+        GROUP BY channel_id ORDER BY count DESC LIMIT 1
+    """)
+    top_channel = cursor.fetchone()
+    result['top_channel'] = dict(top_channel) if top_channel else None
+
+    cursor.execute(f"""
+        SELECT author_name, COUNT(*) as count
+        FROM {source} WHERE author_bot = 0
+        GROUP BY author_id ORDER BY count DESC LIMIT 1
+    """)
+    top_user = cursor.fetchone()
+    result['top_user'] = dict(top_user) if top_user else None
+
+    return result
 
 
 def get_user_vocabulary(user_id: str, top_n: int = 50) -> list:
-    """Get most common words used by a specific user (minus stopwords)."""
-    messages = get_user_messages(user_id)
-
-    stopwords = {
-        'the', 'a', 'an', 'is', 'it', 'to', 'of', 'and', 'i', 'you',
-        'that', 'in', 'for', 'on', 'with', 'this', 'be', 'are', 'was',
-        'have', 'has', 'my', 'me', 'your', 'but', 'not', 'so', 'just',
-        'like', 'im', "i'm", 'its', "it's", 'do', 'if', 'or', 'at',
-        'as', 'can', 'all', 'what', 'they', 'we', 'he', 'she', 'from',
-        'her', 'his', 'been', 'would', 'there', 'their', 'will', 'when',
-        'who', 'them',
-    }
+    """
+    Get most common words used by a specific user (minus stopwords).
 
-    all_words = []
-    for msg in messages:
-        words = msg['content'].lower().split()
-        words = [
-            w.strip('.,!?()[]{}":;')
-            for w in words
-            if len(w) > 2 and w.lower() not in stopwords and not w.startswith('<')
-        ]
-        all_words.extend(words)
+    Reads the persisted user_term_counts (updated incrementally first)
+    unless USER_TERM_CACHE is off, in which case it streams the history.
+    """
+    return get_user_terms(user_id, 'word', top_n)
 
-    return Counter(all_words).most_common(top_n)
+
+def get_user_terms(user_id: str, kind: str = 'word', top_n: int = 50,
+                   use_cache: bool = USER_TERM_CACHE) -> list:
+    """
+    Top terms for a user as [(term, count), ...].
+
+    Args:
+        user_id: Author ID.
+        kind: 'word', 'bigram' or 'trigram' (see common/token_stats.py).
+        top_n: How many to return.
+        use_cache: Serve from user_term_counts, bringing it up to date
+            first. False streams the user's history into bounded counters.
+    """
+    if use_cache:
+        update_user_term_counts(user_id)
+        with read_session() as conn:
+            rows = conn.execute("""
+                SELECT term, count FROM user_term_counts
+                WHERE author_id = ? AND kind = ?
+                ORDER BY count DESC, term
+                LIMIT ?
+            """, (user_id, kind, top_n)).fetchall()
+        return [(row['term'], row['count']) for row in rows]
+
+    stats = TermStats(USER_TERM_CAPACITY)
+    for msg in iter_user_messages(user_id, chronological=False):
+        stats.add(msg['content'])
+    return stats.top(kind, top_n)
+
+
+def update_user_term_counts(user_id: str) -> int:
+    """
+    Fold a user's messages imported since the last update into user_term_counts.
+
+    Only rows with a rowid above the stored watermark are tokenized, so
+    repeat calls cost one indexed lookup when nothing is new. Counting
+    happens outside the write transaction; if another process moved the
+    watermark in the meantime this update is dropped (theirs already
+    covers the same rows).
+
+    Returns:
+        Number of new messages counted.
+    """
+    with read_session() as conn:
+        state = conn.execute(
+            "SELECT last_message_rowid, messages_counted FROM user_term_state WHERE author_id = ?",
+            (user_id,)
+        ).fetchone()
+        has_new = conn.execute(
+            f"SELECT 1 FROM {_messages_source(conn)} WHERE author_id = ? AND id > ? "
+            "AND author_bot = 0 AND content != '' LIMIT 1",
+            (user_id, state['last_message_rowid'] if state else 0)
+        ).fetchone()
+        if not has_new:
+            return 0
+        initial = {}
+        if state:
+            for row in conn.execute(
+                "SELECT kind, term, count FROM user_term_counts WHERE author_id = ?", (user_id,)
+            ):
+                initial.setdefault(row['kind'], {})[row['term']] = row['count']
+
+    watermark = state['last_message_rowid'] if state else 0
+    stats = TermStats(USER_TERM_CAPACITY, initial)
+    last_rowid = watermark
+    for msg in iter_user_messages(user_id, after_rowid=watermark, chronological=False):
+        stats.add(msg['content'])
+        last_rowid = msg['id']
+
+    with db_session() as (conn, cursor):
+        current = cursor.execute(
+            "SELECT last_message_rowid FROM user_term_state WHERE author_id = ?", (user_id,)
+        ).fetchone()
+        if (current['last_message_rowid'] if current else 0) != watermark:
+            logger.debug(f"Term counts for {user_id} updated concurrently, skipping")
+            return 0
+
+        cursor.execute("DELETE FROM user_term_counts WHERE author_id = ?", (user_id,))
+        for kind, counter in stats.counters.items():
+            cursor.executemany(
+                "INSERT INTO user_term_counts (author_id, kind, term, count) VALUES (?, ?, ?, ?)",
+                ((user_id, kind, term, count) for term, count in counter.items())
+            )
+        cursor.execute("""
+            INSERT OR REPLACE INTO user_term_state
+            (author_id, last_message_rowid, messages_counted, updated_at)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, last_rowid, (state['messages_counted'] if state else 0) + stats.messages,
+              datetime.now().isoformat()))
+
+    logger.info(f"Term counts for {user_id}: +{stats.messages} messages")
+    return stats.messages
 
 
 def get_channel_activity_comparison(channel_ids: list = None) -> list:
     """Compare activity across specified channels or all channels."""
-    conn = get_connection()
-    try:
+    with read_session() as conn:
         cursor = conn.cursor()
-        if channel_ids:
-            placeholders = ','.join('?' * len(channel_ids))
+        params = [str(c) for c in channel_ids] if channel_ids else []
+        placeholders = ','.join('?' * len(params))
+
+        if _rollups_ready(conn):
+            where = f"WHERE channel_id IN ({placeholders})" if params else ""
             cursor.execute(f"""
                 SELECT
                     channel_id, channel_name,
-                    COUNT(*) as total_messages,
-                    COUNT(DISTINCT author_id) as unique_users,
-                    ROUND(AVG(word_count), 1) as avg_msg_length,
-                    SUM(is_reply) * 100.0 / COUNT(*) as reply_percentage
-                FROM messages
-                WHERE author_bot = 0 AND channel_id IN ({placeholders})
+                    SUM(message_count) as total_messages,
+                    COUNT(*) as unique_users,
+                    ROUND(SUM(word_count) * 1.0 / SUM(message_count), 1) as avg_msg_length,
+                    SUM(reply_count) * 100.0 / SUM(message_count) as reply_percentage
+                FROM rollup_author_channel
+                {where}
                 GROUP BY channel_id
                 ORDER BY total_messages DESC
-            """, channel_ids)
+            """, params)
         else:
-            cursor.execute("""
+            where = f"AND channel_id IN ({placeholders})" if params else ""
+            cursor.execute(f"""
                 SELECT
                     channel_id, channel_name,
                     COUNT(*) as total_messages,
                     COUNT(DISTINCT author_id) as unique_users,
                     ROUND(AVG(word_count), 1) as avg_msg_length,
                     SUM(is_reply) * 100.0 / COUNT(*) as reply_percentage
-                FROM messages
-                WHERE author_bot = 0
+                FROM {_messages_source(conn)}
+                WHERE author_bot = 0 {where}
                 GROUP BY channel_id
                 ORDER BY total_messages DESC
-            """)
+            """, params)
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+
+
+def get_channel_stats(limit: int = 20) -> list:
+    """Get most active channels by message count (used by /channel_stats)."""
+    ranked = get_channel_activity_comparison()[:limit]
+    return [
+        {
+            'channel_id': ch['channel_id'],
+            'channel_name': ch['channel_name'],
+            'message_count': ch['total_messages'],
+            'unique_users': ch['unique_users'],
+        }
+        for ch in ranked
+    ]
 
 
 def export_user_corpus(user_id: str, output_path: str) -> int:
@@ -836,16 +2785,18 @@ def export_user_corpus(user_id: str, output_path: str) -> int:
     Export all messages from a user to a plain text file.
 
     Useful for preparing chatbot training data or persona analysis.
+    Streams rows straight to the file, so memory stays flat for any
+    history size.
     """
-    messages = get_user_messages(user_id)
-
+    count = 0
     with open(output_path, 'w', encoding='utf-8') as f:
-        for msg in messages:
+        for msg in iter_user_messages(user_id):
+            count += 1
             if msg['content'].strip():
                 f.write(msg['content'] + '\n')
 
-    logger.info(f"Exported {len(messages)} messages to {output_path}")
-    return len(messages)
+    logger.info(f"Exported {count} messages to {output_path}")
+    return count
 
 
 # ============================================================================
@@ -0,0 +1,309 @@
+"""
+Write-behind queue that group-commits rows on a background thread.
+
+Committing every row on its own costs one fsync per row, which is what
+limits write throughput during a burst (a raid, a busy channel). A
+GroupCommitWriter takes rows from the event loop without waiting and
+commits them from one thread, `batch_size` rows or `flush_ms`
+milliseconds at a time, whichever comes first, so a burst costs one
+fsync per batch.
+
+Subclasses implement _commit(rows) for their table(s):
+
+- common.db.LiveMessageWriter: live_messages
+- common.moderation_db.ModerationEventWriter: flagged_messages,
+  user_offenses and bad_words match counts
+
+submit() never does I/O on the caller's thread. If the queue fills up
+(writer stalled on a locked database), rows wait in an overflow buffer of
+the same size that the writer drains in order once it catches up; only
+past that are rows dropped (counted in rows_dropped). A batch that keeps
+failing because the database is locked or busy is retried a few times,
+then logged and dropped. Any other error from _commit() is taken to be a
+bad row: the batch is split and re-committed in halves until only the
+failing rows are left, and those are dropped. Either way the writer
+thread keeps running.
+
+Usage:
+    class MyWriter(GroupCommitWriter):
+        label = "My row"
+        def _commit(self, rows):
+            with db_session() as (conn, cursor):
+                cursor.executemany(SQL, rows)
+                return cursor.rowcount
+
+    writer = MyWriter(batch_size=100, flush_ms=250, max_queue=5000)
+    writer.start()
+    writer.submit(row)
+    writer.stop()    # on shutdown: commits what is still queued
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter:
+    """Bounded queue drained by one thread that commits rows in batches."""
+
+    # Used in the thread name and log messages
+    label = "Row"
+
+    _STOP = object()
+
+    def __init__(self, batch_size: int, flush_ms: int, max_queue: int, max_overflow: int = None):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_ms) / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        # Items that arrived while the queue was full, oldest first. Once it
+        # holds anything, new items go behind them so order is kept.
+        self._overflow: deque = deque()
+        self._overflow_lock = threading.Lock()
+        self.max_overflow = max_queue if max_overflow is None else max_overflow
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'rows_submitted': 0,
+            'rows_written': 0,
+            'rows_duplicate': 0,
+            'rows_failed': 0,
+            'rows_dropped': 0,
+            'overflowed': 0,
+            'batches': 0,
+            'commit_ms_total': 0.0,
+            'commit_ms_max': 0.0,
+            'commit_ms_last': 0.0,
+        }
+
+    def _commit(self, rows: list) -> int:
+        """Write `rows` in one transaction; return how many were new."""
+        raise NotImplementedError
+
+    # ------------------------------------------------------------------
+    # Producer side (event loop)
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background writer thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        name = f"{self.label.lower().replace(' ', '-')}-writer"
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        logger.info(
+            f"{self.label} writer started (batch {self.batch_size}, "
+            f"{self.flush_interval * 1000:.0f} ms, queue {self._queue.maxsize})"
+        )
+
+    def submit(self, row) -> bool:
+        """
+        Queue a row for the next group commit.
+
+        Never blocks and never touches the database. If the queue is
+        full the row waits in the overflow buffer; if that is full too,
+        the row is dropped and counted in rows_dropped.
+
+        Returns:
+            True if queued, False if it was dropped.
+        """
+        with self._stats_lock:
+            self._stats['rows_submitted'] += 1
+        queued = self._offer(row)
+        if queued is None:
+            with self._stats_lock:
+                self._stats['rows_dropped'] += 1
+                dropped = self._stats['rows_dropped']
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"{self.label} queue and overflow full, {dropped} rows dropped so far")
+            return False
+        if not queued:
+            with self._stats_lock:
+                self._stats['overflowed'] += 1
+        return True
+
+    def _offer(self, item, force: bool = False) -> Optional[bool]:
+        """
+        Add `item` behind everything already waiting.
+
+        Returns True if it went into the queue, False if into the overflow
+        buffer, None if both are full (never with force=True).
+        """
+        with self._overflow_lock:
+            if not self._overflow:
+                try:
+                    self._queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    pass
+            if not force and len(self._overflow) >= self.max_overflow:
+                return None
+            self._overflow.append(item)
+            return False
+
+    def _refill(self) -> bool:
+        """Move overflow items into the queue while it has room. True if any moved."""
+        moved = False
+        with self._overflow_lock:
+            while self._overflow:
+                try:
+                    self._queue.put_nowait(self._overflow[0])
+                except queue.Full:
+                    break
+                self._overflow.popleft()
+                moved = True
+        return moved
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything queued so far is committed. Returns False on timeout."""
+        if not self._thread or not self._thread.is_alive():
+            self._drain_inline()
+            return True
+        done = threading.Event()
+        self._offer(done, force=True)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 10.0):
+        """Flush the queue and stop the writer thread. Called on shutdown."""
+        if self._thread and self._thread.is_alive():
+            self._offer(self._STOP, force=True)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                logger.warning(f"{self.label} writer didn't stop within {timeout}s")
+        else:
+            self._drain_inline()
+        logger.info(f"{self.label} writer stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        """Queue depth, throughput and commit latency metrics."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        batches = stats['batches']
+        stats['queue_depth'] = self._queue.qsize() + len(self._overflow)
+        stats['queue_capacity'] = self._queue.maxsize + self.max_overflow
+        stats['commit_ms_avg'] = round(stats['commit_ms_total'] / batches, 2) if batches else 0.0
+        stats['commit_ms_total'] = round(stats['commit_ms_total'], 2)
+        stats['avg_batch_size'] = round(
+            (stats['rows_written'] + stats['rows_duplicate']) / batches, 1) if batches else 0.0
+        stats['running'] = bool(self._thread and self._thread.is_alive())
+        return stats
+
+    # ------------------------------------------------------------------
+    # Consumer side (writer thread)
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            self._refill()
+            item = self._queue.get()
+            batch, waiters = [], []
+            deadline = time.monotonic() + self.flush_interval
+
+            # Collect until the batch is full, the deadline passes, or a control item arrives
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._refill()
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if stopping:
+                # Drain whatever was queued before the stop marker
+                batch.extend(self._take_all(waiters))
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception:
+                # Never let the writer thread die: rows would pile up until
+                # submit() starts dropping them
+                logger.exception(f"{self.label} writer: unexpected error writing a batch of {len(batch)}")
+            finally:
+                for event in waiters:
+                    event.set()
+
+    def _take_all(self, waiters: list) -> list:
+        rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                if self._refill():
+                    continue
+                return rows
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is not self._STOP:
+                rows.append(item)
+
+    def _drain_inline(self):
+        """Write any leftover rows on the calling thread (writer not running)."""
+        waiters = []
+        rows = self._take_all(waiters)
+        if rows:
+            self._write_batch(rows)
+        for event in waiters:
+            event.set()
+
+    def _write_batch(self, rows: list, attempts: int = 3):
+        """
+        _commit() the batch, retrying if the database stays locked past
+        busy_timeout. Any other error is taken to be a bad row: the batch
+        is split in halves and each half committed on its own, so only
+        the rows that fail alone are dropped.
+        """
+        for attempt in range(1, attempts + 1):
+            start = time.perf_counter()
+            try:
+                inserted = self._commit(rows)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"{self.label} batch of {len(rows)} failed (attempt {attempt}/{attempts}): {e}")
+                if attempt < attempts:
+                    time.sleep(0.5 * attempt)
+                    continue
+                with self._stats_lock:
+                    self._stats['rows_failed'] += len(rows)
+                logger.error(f"Dropped {len(rows)} {self.label.lower()} rows after {attempts} failed commits",
+                             exc_info=True)
+                return
+            except Exception:
+                # Bad rows (IntegrityError, InterfaceError, TypeError, encoding
+                # errors) fail the same way every time; _commit() rolled back
+                if len(rows) == 1:
+                    with self._stats_lock:
+                        self._stats['rows_failed'] += 1
+                    logger.exception(f"Dropped a {self.label.lower()} row: commit failed")
+                    return
+                break
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                self._stats['rows_written'] += inserted
+                self._stats['rows_duplicate'] += len(rows) - inserted
+                self._stats['batches'] += 1
+                self._stats['commit_ms_total'] += elapsed_ms
+                self._stats['commit_ms_last'] = round(elapsed_ms, 2)
+                self._stats['commit_ms_max'] = round(max(self._stats['commit_ms_max'], elapsed_ms), 2)
+            return
+
+        # Some row in here is bad: commit each half on its own
+        mid = len(rows) // 2
+        self._write_batch(rows[:mid], attempts)
+        self._write_batch(rows[mid:], attempts)
@@ -12,18 +12,28 @@ before responding).
 Uses WAL mode for safe concurrent access from multiple processes.
 
 Usage:
-    from common.moderation_db import log_flagged_message, get_bad_words
+    from common.moderation_db import queue_moderation_event, get_bad_words
 """
 
 import sqlite3
 import json
 import logging
+import threading
+from collections import Counter
 from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, List, Dict
-
-from .config import MODERATION_DB_PATH, SQLITE_PRAGMAS, ANALYTICS_DB_PATH
+from typing import Optional, List, Dict, Iterable, Set
+
+from .config import (
+    MODERATION_DB_PATH,
+    ANALYTICS_DB_PATH,
+    MOD_WRITER_BATCH_SIZE,
+    MOD_WRITER_FLUSH_MS,
+    MOD_WRITER_QUEUE_SIZE,
+)
+from .group_commit import GroupCommitWriter
+from .pool import get_pool, open_connection
 
 logger = logging.getLogger(__name__)
 
@@ -33,27 +43,27 @@ logger = logging.getLogger(__name__)
 # ============================================================================
 
 def get_connection() -> sqlite3.Connection:
-    """Get a WAL-enabled connection to the moderation database."""
-    conn = sqlite3.connect(str(MODERATION_DB_PATH), timeout=10)
-    conn.row_factory = sqlite3.Row
-    for pragma, value in SQLITE_PRAGMAS.items():
-        conn.execute(f"PRAGMA {pragma} = {value}")
-    return conn
+    """
+    Open a standalone WAL-enabled connection to the moderation database.
+
+    Module helpers use the pooled mod_read_session/mod_session instead;
+    callers of this must close the connection themselves.
+    """
+    return open_connection(MODERATION_DB_PATH)
+
+
+@contextmanager
+def mod_read_session():
+    """Borrow a pooled read-only connection to the moderation database."""
+    with get_pool(MODERATION_DB_PATH).reader() as conn:
+        yield conn
 
 
 @contextmanager
 def mod_session():
     """Context manager for moderation DB operations with auto commit/rollback."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
+    with get_pool(MODERATION_DB_PATH).writer() as (conn, cursor):
         yield conn, cursor
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 # ============================================================================
@@ -88,6 +98,8 @@ def init_moderation_db():
                 auto_deleted INTEGER DEFAULT 0
             )
         """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_flagged_at ON flagged_messages(flagged_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_flagged_author ON flagged_messages(author_id, flagged_at)")
 
         # ----- Bad word list -----
         cursor.execute("""
@@ -127,6 +139,8 @@ def init_moderation_db():
             )
         """)
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_offenses_user ON user_offenses(user_id)")
+        # Time-range reads (offense tracker restore, repeat offenders)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_offenses_time ON user_offenses(occurred_at)")
 
         # ----- Monitored channels config -----
         cursor.execute("""
@@ -161,9 +175,49 @@ def init_moderation_db():
             )
         """)
 
+        # ----- Purge progress (messages /tos_purge has deleted, for resuming) -----
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS purged_messages (
+                message_id TEXT PRIMARY KEY,
+                channel_id TEXT,
+                purged_at TEXT
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_purged_channel ON purged_messages(channel_id)")
+
+        # ----- Rule version (bumped whenever the filter rules change) -----
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rules_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("INSERT OR IGNORE INTO rules_version (id, version) VALUES (1, 0)")
+        _create_rules_version_triggers(cursor)
+
     logger.info(f"Moderation database initialized at {MODERATION_DB_PATH}")
 
 
+# Changes that alter what the content analyzer matches. Match counters
+# and timestamps are left out so routine stat updates don't count.
+_RULE_CHANGES = {
+    'bad_words': ('INSERT', 'DELETE', 'UPDATE OF word, severity'),
+    'learned_patterns': ('INSERT', 'DELETE', 'UPDATE OF pattern, confidence'),
+}
+
+
+def _create_rules_version_triggers(cursor):
+    for table, events in _RULE_CHANGES.items():
+        for event in events:
+            name = f"trg_rules_version_{table}_{event.split()[0].lower()}"
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE rules_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+
+
 # ============================================================================
 # BAD WORDS MANAGEMENT
 # ============================================================================
@@ -198,8 +252,7 @@ def add_bad_words_bulk(words: List[str], severity: int = 1, category: str = "gen
 
 def get_bad_words(min_severity: int = 0) -> List[Dict]:
     """Get all bad words, optionally filtered by minimum severity."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT word, severity, category, match_count
@@ -208,8 +261,19 @@ def get_bad_words(min_severity: int = 0) -> List[Dict]:
             ORDER BY severity DESC, match_count DESC
         """, (min_severity,))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+
+
+def get_rules_version() -> int:
+    """
+    Counter bumped by triggers on every bad_words / learned_patterns change,
+    from any process. 0 on databases initialized before it existed.
+    """
+    with mod_read_session() as conn:
+        try:
+            row = conn.execute("SELECT version FROM rules_version WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return 0
+        return row[0] if row else 0
 
 
 def increment_word_match(word: str):
@@ -258,8 +322,7 @@ def log_flagged_message(
 
 def get_flagged_messages(limit: int = 100, author_id: str = None) -> List[Dict]:
     """Get recent flagged messages, optionally filtered by user."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         if author_id:
             cursor.execute("""
@@ -273,8 +336,6 @@ def get_flagged_messages(limit: int = 100, author_id: str = None) -> List[Dict]:
                 ORDER BY flagged_at DESC LIMIT ?
             """, (limit,))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
 
 
 # ============================================================================
@@ -291,9 +352,13 @@ def log_user_offense(user_id: str, offense_type: str, message_id: str, channel_i
 
 
 def get_user_offense_count(user_id: str, days: int = 30) -> int:
-    """Get number of offenses for a user in the last N days."""
-    conn = get_connection()
-    try:
+    """
+    Get number of offenses for a user in the last N days.
+
+    Message handlers should use common.offense_tracker instead, which
+    answers from memory.
+    """
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         cursor.execute("""
@@ -301,14 +366,24 @@ def get_user_offense_count(user_id: str, days: int = 30) -> int:
             WHERE user_id = ? AND occurred_at > ?
         """, (user_id, cutoff))
         return cursor.fetchone()[0]
-    finally:
-        conn.close()
+
+
+def get_recent_offenses(hours: int = 24) -> List[Dict]:
+    """All offenses (user_id, occurred_at) in the last N hours, oldest first."""
+    with mod_read_session() as conn:
+        cursor = conn.cursor()
+        cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+        cursor.execute("""
+            SELECT user_id, occurred_at FROM user_offenses
+            WHERE occurred_at > ?
+            ORDER BY occurred_at
+        """, (cutoff,))
+        return [dict(row) for row in cursor.fetchall()]
 
 
 def get_repeat_offenders(min_offenses: int = 3, days: int = 7) -> List[Dict]:
     """Get users with multiple offenses in the given timeframe."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         cursor.execute("""
@@ -320,8 +395,195 @@ def get_repeat_offenders(min_offenses: int = 3, days: int = 7) -> List[Dict]:
             ORDER BY offense_count DESC
         """, (cutoff, min_offenses))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
+
+
+# ============================================================================
+# MODERATION EVENTS
+# ============================================================================
+#
+# Flagging a message used to be two or three separate commits
+# (log_flagged_message, log_user_offense, increment_word_match per
+# word), each its own fsync. A moderation event carries all of it and
+# is written in one transaction: record_moderation_event() commits it
+# now, queue_moderation_event() hands it to a background writer that
+# group-commits whatever arrived in the last MOD_WRITER_FLUSH_MS (many
+# events, one fsync - what matters during a raid).
+
+def moderation_event(
+    message_id: str,
+    channel_id: str,
+    channel_name: str,
+    author_id: str,
+    author_name: str,
+    original_content: str,
+    censored_content: str,
+    flag_reason: str,
+    matched_patterns: List[str],
+    sentiment_score: float = 0.0,
+    toxicity_score: float = 0.0,
+    action_taken: str = "deleted",
+    auto_deleted: bool = True,
+    offense_type: Optional[str] = None,
+    counted_words: Iterable[str] = (),
+    counted_patterns: Iterable[str] = (),
+) -> Dict:
+    """
+    Build an event for record_moderation_events() / the event writer.
+
+    Takes log_flagged_message()'s arguments, plus:
+        offense_type: Also log a user offense of this type (None = don't).
+        counted_words: bad_words entries whose match_count goes up by one.
+        counted_patterns: learned_patterns entries whose match_count goes
+            up by one (and last_matched is set).
+
+    Timestamps are taken now, not when a queued event is committed.
+    """
+    now = datetime.now().isoformat()
+    return {
+        'flagged': (
+            message_id, channel_id, channel_name, author_id, author_name,
+            original_content, censored_content, flag_reason,
+            json.dumps(matched_patterns), sentiment_score, toxicity_score,
+            action_taken, now, 1 if auto_deleted else 0
+        ),
+        'offense': (author_id, offense_type, message_id, channel_id, now) if offense_type else None,
+        'words': [word.lower() for word in counted_words],
+        'patterns': list(counted_patterns),
+        'at': now,
+    }
+
+
+def _write_moderation_events(cursor, events: List[Dict]) -> int:
+    """Insert a batch of events on an open write transaction. Returns new flags."""
+    cursor.executemany("""
+        INSERT OR IGNORE INTO flagged_messages
+        (message_id, channel_id, channel_name, author_id, author_name,
+         original_content, censored_content, flag_reason, matched_patterns,
+         sentiment_score, toxicity_score, action_taken, flagged_at, auto_deleted)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [event['flagged'] for event in events])
+    inserted = cursor.rowcount
+
+    offenses = [event['offense'] for event in events if event['offense']]
+    if offenses:
+        cursor.executemany("""
+            INSERT INTO user_offenses (user_id, offense_type, message_id, channel_id, occurred_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, offenses)
+
+    # One UPDATE per distinct word, however many events matched it
+    word_counts = Counter(word for event in events for word in event['words'])
+    if word_counts:
+        cursor.executemany(
+            "UPDATE bad_words SET match_count = match_count + ? WHERE word = ?",
+            [(count, word) for word, count in word_counts.items()]
+        )
+
+    # Likewise per learned pattern, stamped with its latest match
+    pattern_counts = Counter()
+    last_matched = {}
+    for event in events:
+        for pattern in event['patterns']:
+            pattern_counts[pattern] += 1
+            last_matched[pattern] = max(last_matched.get(pattern, ''), event['at'])
+    if pattern_counts:
+        cursor.executemany(
+            "UPDATE learned_patterns SET match_count = match_count + ?, last_matched = ? WHERE pattern = ?",
+            [(count, last_matched[pattern], pattern) for pattern, count in pattern_counts.items()]
+        )
+    return inserted
+
+
+def record_moderation_events(events: List[Dict]) -> int:
+    """
+    Write events from moderation_event() in one transaction.
+
+    A message that is already in flagged_messages (e.g. seen by both
+    protector entry points) keeps its first row, but its offense and
+    word counts are still recorded.
+
+    Returns:
+        Number of new flagged_messages rows.
+    """
+    if not events:
+        return 0
+    with mod_session() as (conn, cursor):
+        return _write_moderation_events(cursor, events)
+
+
+def record_moderation_event(**kwargs) -> bool:
+    """
+    Log a flagged message, the user's offense and the matched words' and
+    learned patterns' counters in one transaction. Same arguments as moderation_event().
+
+    Returns:
+        True if the flagged message was new.
+    """
+    return record_moderation_events([moderation_event(**kwargs)]) > 0
+
+
+class ModerationEventWriter(GroupCommitWriter):
+    """
+    Write-behind queue for moderation events (see common/group_commit.py).
+
+    Message handlers call submit(moderation_event(...)) and return at
+    once; the writer thread commits every MOD_WRITER_BATCH_SIZE events
+    or MOD_WRITER_FLUSH_MS, whichever comes first.
+    """
+
+    label = "Moderation event"
+
+    def __init__(self, batch_size: int = MOD_WRITER_BATCH_SIZE,
+                 flush_ms: int = MOD_WRITER_FLUSH_MS,
+                 max_queue: int = MOD_WRITER_QUEUE_SIZE):
+        super().__init__(batch_size, flush_ms, max_queue)
+
+    def _commit(self, rows: list) -> int:
+        return record_moderation_events(rows)
+
+
+_event_writer: Optional[ModerationEventWriter] = None
+_event_writer_lock = threading.Lock()
+
+
+def get_event_writer() -> ModerationEventWriter:
+    """Process-wide moderation event writer, started on first use."""
+    global _event_writer
+    if _event_writer is None:
+        with _event_writer_lock:
+            if _event_writer is None:
+                writer = ModerationEventWriter()
+                writer.start()
+                _event_writer = writer
+    return _event_writer
+
+
+def queue_moderation_event(**kwargs) -> bool:
+    """
+    Non-blocking record_moderation_event() for message handlers.
+
+    Committed by the background writer within MOD_WRITER_FLUSH_MS.
+    Call stop_event_writer() on shutdown so queued events aren't lost.
+
+    Returns:
+        True if queued, False if the queue and overflow were full and the
+        event was dropped.
+    """
+    return get_event_writer().submit(moderation_event(**kwargs))
+
+
+def stop_event_writer(timeout: float = 10.0):
+    """Commit queued moderation events and stop the writer. Safe to call if never started."""
+    global _event_writer
+    with _event_writer_lock:
+        writer, _event_writer = _event_writer, None
+    if writer is not None:
+        writer.stop(timeout)
+
+
+def get_event_writer_stats() -> Optional[dict]:
+    """Metrics for the moderation event writer, or None if it hasn't been started."""
+    return _event_writer.stats() if _event_writer is not None else None
 
 
 # ============================================================================
@@ -346,13 +608,10 @@ def remove_monitored_channel(channel_id: str):
 
 def get_monitored_channels() -> Dict[str, int]:
     """Get all monitored channels as {channel_id: monitoring_level}."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT channel_id, monitoring_level FROM monitored_channels")
         return {row['channel_id']: row['monitoring_level'] for row in cursor.fetchall()}
-    finally:
-        conn.close()
 
 
 # ============================================================================
@@ -374,8 +633,11 @@ def import_training_samples_from_analytics(bad_words: List[str]) -> int:
     as training samples for pattern learning.
 
     Uses ANALYTICS_DB_PATH from config so it works regardless of
-    which directory the script is run from.
+    which directory the script is run from. Archived partitions are
+    searched too.
     """
+    from .db import messages_source
+
     analytics_path = ANALYTICS_DB_PATH
     if not analytics_path.exists():
         logger.error(f"Analytics database not found: {analytics_path}")
@@ -387,10 +649,11 @@ def import_training_samples_from_analytics(bad_words: List[str]) -> int:
 
     imported = 0
     try:
+        source = messages_source(analytics_conn)
         analytics_cursor = analytics_conn.cursor()
         for word in bad_words:
-            analytics_cursor.execute("""
-                SELECT content FROM messages
+            analytics_cursor.execute(f"""
+                SELECT content FROM {source} m
                 WHERE content LIKE ? AND author_bot = 0 AND content != ''
                 LIMIT 1000
             """, (f'%{word}%',))
@@ -422,8 +685,7 @@ def add_learned_pattern(pattern: str, pattern_type: str, confidence: float = 0.5
 
 def get_learned_patterns(min_confidence: float = 0.3) -> List[Dict]:
     """Get learned patterns above the confidence threshold."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT pattern, pattern_type, confidence, match_count
@@ -432,8 +694,6 @@ def get_learned_patterns(min_confidence: float = 0.3) -> List[Dict]:
             ORDER BY confidence DESC
         """, (min_confidence,))
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
 
 
 def update_pattern_stats(pattern: str, matched: bool, false_positive: bool = False):
@@ -464,8 +724,7 @@ def update_pattern_stats(pattern: str, matched: bool, false_positive: bool = Fal
 
 def get_moderation_stats(days: int = 7) -> Dict:
     """Get moderation statistics for the last N days."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cutoff = (datetime.now() - timedelta(days=days)).isoformat()
         stats = {}
@@ -495,12 +754,10 @@ def get_moderation_stats(days: int = 7) -> Dict:
         stats['top_triggered_words'] = [dict(row) for row in cursor.fetchall()]
 
         return stats
-    finally:
-        conn.close()
 
 
 # ============================================================================
-# SCAN PROGRESS TRACKING
+# SCAN & PURGE PROGRESS TRACKING
 # ============================================================================
 
 def update_scan_progress(channel_id: str, file_path: str,
@@ -516,16 +773,46 @@ def update_scan_progress(channel_id: str, file_path: str,
               datetime.now().isoformat()))
 
 
+def record_scan_checkpoint(channel_id: str, file_path: str, message_id: str,
+                           scanned: int, flagged: int, flagged_messages: List[Dict] = ()):
+    """
+    Save a batch of historical-scan flags together with the scan's progress.
+
+    One transaction, so a resumed scan can never skip past a message
+    whose flag was lost. channel_id is the progress row's key, which for
+    scan_exports_parallel is a shard key ("<file path>#<n>"). Each dict in
+    flagged_messages takes log_flagged_message()'s keyword arguments.
+    """
+    now = datetime.now().isoformat()
+    with mod_session() as (conn, cursor):
+        cursor.executemany("""
+            INSERT OR REPLACE INTO flagged_messages
+            (message_id, channel_id, channel_name, author_id, author_name,
+             original_content, censored_content, flag_reason, matched_patterns,
+             sentiment_score, toxicity_score, action_taken, flagged_at, auto_deleted)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(
+            m['message_id'], m['channel_id'], m['channel_name'], m['author_id'], m['author_name'],
+            m['original_content'], m['censored_content'], m['flag_reason'],
+            json.dumps(m['matched_patterns']), m.get('sentiment_score', 0.0),
+            m.get('toxicity_score', 0.0), m.get('action_taken', 'flagged'), now,
+            1 if m.get('auto_deleted') else 0,
+        ) for m in flagged_messages])
+        cursor.execute("""
+            INSERT OR REPLACE INTO scan_progress
+            (channel_id, file_path, last_message_id, messages_scanned,
+             messages_flagged, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (channel_id, file_path, message_id, scanned, flagged, now))
+
+
 def get_scan_progress(channel_id: str) -> Optional[Dict]:
     """Get scan progress for a channel (for resume)."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM scan_progress WHERE channel_id = ?", (channel_id,))
         row = cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 def clear_scan_progress():
@@ -534,15 +821,30 @@ def clear_scan_progress():
         cursor.execute("DELETE FROM scan_progress")
 
 
+def record_purged_messages(channel_id: str, message_ids: List[str]):
+    """Remember messages a purge deleted (or found already gone)."""
+    now = datetime.now().isoformat()
+    with mod_session() as (conn, cursor):
+        cursor.executemany(
+            "INSERT OR IGNORE INTO purged_messages (message_id, channel_id, purged_at) VALUES (?, ?, ?)",
+            [(message_id, channel_id, now) for message_id in message_ids]
+        )
+
+
+def get_purged_message_ids(channel_id: str) -> Set[str]:
+    """IDs of messages already purged from a channel (to resume a purge)."""
+    with mod_read_session() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT message_id FROM purged_messages WHERE channel_id = ?", (channel_id,))
+        return {row[0] for row in cursor.fetchall()}
+
+
 def get_all_scan_progress() -> List[Dict]:
     """Get scan progress for all channels."""
-    conn = get_connection()
-    try:
+    with mod_read_session() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM scan_progress ORDER BY last_updated DESC")
         return [dict(row) for row in cursor.fetchall()]
-    finally:
-        conn.close()
 
 
 # ============================================================================
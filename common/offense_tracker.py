@@ -0,0 +1,213 @@
+"""
+Per-user offense counts over sliding time windows, kept in memory.
+
+Repeat-offender checks ("3+ offenses in the last 24 hours") run on every
+flagged message, and /tos_stats asks the same question for every user.
+Keeping a list of offense times per user makes each check rescan the
+list; counting in the database makes it a query per message.
+
+OffenseTracker keeps two small ring buffers of counters per user
+instead: HOURLY_BUCKETS one-hour buckets and DAILY_BUCKETS one-day
+buckets. Recording an offense bumps one counter in each, and
+count(user_id, hours) adds up at most that many counters, so the cost
+doesn't grow with a user's history. Windows are measured in whole
+buckets: "last 24 hours" is the current hour plus the 23 before it, and
+windows longer than HOURLY_BUCKETS hours are rounded up to whole days.
+
+Users whose last offense has left the longest window are dropped the
+next time they are looked at, or by the occasional sweep in record().
+
+Nothing is persisted here: every offense is already a user_offenses row
+(see moderation_db.record_moderation_event), and restore() rebuilds the
+buckets from those rows at startup.
+
+Usage:
+    from common.offense_tracker import get_offense_tracker
+
+    tracker = get_offense_tracker()    # restored from moderation.db on first use
+    tracker.record(user_id)
+    if tracker.count(user_id, hours=24) >= 3:
+        ...
+"""
+
+import math
+import threading
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+HOURLY_BUCKETS = 48
+DAILY_BUCKETS = 30
+
+_HOUR = 3600
+_DAY = 86400
+
+# record() sweeps out idle users once per this many offenses
+_PRUNE_EVERY = 1000
+
+
+class _Ring:
+    """Fixed number of counters for consecutive time buckets, newest at `head`."""
+
+    __slots__ = ('counts', 'head')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.head = None  # absolute bucket number of the newest counter
+
+    def add(self, bucket: int):
+        size = len(self.counts)
+        if self.head is None:
+            self.head = bucket
+        elif bucket > self.head:
+            # Clear the counters being reused for the new buckets
+            if bucket - self.head >= size:
+                self.counts = [0] * size
+            else:
+                for b in range(self.head + 1, bucket + 1):
+                    self.counts[b % size] = 0
+            self.head = bucket
+        elif bucket <= self.head - size:
+            return  # older than the ring reaches back
+        self.counts[bucket % size] += 1
+
+    def total(self, bucket: int, span: int) -> int:
+        """Sum of the `span` buckets ending at `bucket`."""
+        if self.head is None:
+            return 0
+        size = len(self.counts)
+        lo = max(bucket - span + 1, self.head - size + 1)
+        hi = min(bucket, self.head)
+        return sum(self.counts[b % size] for b in range(lo, hi + 1))
+
+
+class _UserOffenses:
+    __slots__ = ('hourly', 'daily', 'last')
+
+    def __init__(self, hourly_buckets: int, daily_buckets: int):
+        self.hourly = _Ring(hourly_buckets)
+        self.daily = _Ring(daily_buckets)
+        self.last = 0.0  # timestamp of the newest offense
+
+
+class OffenseTracker:
+    """Offense counts per user in hourly and daily ring buffers."""
+
+    def __init__(self, hourly_buckets: int = HOURLY_BUCKETS, daily_buckets: int = DAILY_BUCKETS):
+        self.hourly_buckets = hourly_buckets
+        self.daily_buckets = daily_buckets
+        self._users: Dict[str, _UserOffenses] = {}
+        self._lock = threading.Lock()
+        self._since_prune = 0
+
+    @property
+    def max_hours(self) -> int:
+        """Longest window count() can answer."""
+        return self.daily_buckets * 24
+
+    def __len__(self):
+        return len(self._users)
+
+    def record(self, user_id: str, when: float = None):
+        """Count an offense by `user_id` at `when` (Unix time, default now)."""
+        when = time.time() if when is None else when
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = _UserOffenses(self.hourly_buckets, self.daily_buckets)
+            user.hourly.add(int(when // _HOUR))
+            user.daily.add(int(when // _DAY))
+            user.last = max(user.last, when)
+
+            self._since_prune += 1
+            if self._since_prune >= _PRUNE_EVERY:
+                self._prune(time.time())
+
+    def count(self, user_id: str, hours: float = 24) -> int:
+        """Offenses by `user_id` in the last `hours` (capped at max_hours)."""
+        now = time.time()
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return 0
+            if self._expired(user, now):
+                del self._users[user_id]
+                return 0
+            return self._count(user, hours, now)
+
+    def users(self, hours: float = 24, min_offenses: int = 1) -> Dict[str, int]:
+        """Every user with at least `min_offenses` in the last `hours`, with their count."""
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            result = {}
+            for user_id, user in self._users.items():
+                n = self._count(user, hours, now)
+                if n >= min_offenses:
+                    result[user_id] = n
+            return result
+
+    def restore(self, offenses: Iterable[dict]) -> int:
+        """
+        Replace the counts with rows from user_offenses. Returns rows loaded.
+
+        Args:
+            offenses: Dicts with user_id and occurred_at (ISO), such as
+                moderation_db.get_recent_offenses(hours=tracker.max_hours).
+        """
+        with self._lock:
+            self._users.clear()
+        loaded = 0
+        for row in offenses:
+            try:
+                occurred = datetime.fromisoformat(row['occurred_at']).timestamp()
+            except (TypeError, ValueError):
+                continue
+            self.record(row['user_id'], occurred)
+            loaded += 1
+        return loaded
+
+    def _count(self, user: _UserOffenses, hours: float, now: float) -> int:
+        if hours <= self.hourly_buckets:
+            return user.hourly.total(int(now // _HOUR), max(1, math.ceil(hours)))
+        days = min(self.daily_buckets, math.ceil(hours / 24))
+        return user.daily.total(int(now // _DAY), days)
+
+    def _expired(self, user: _UserOffenses, now: float) -> bool:
+        return now - user.last > self.max_hours * _HOUR
+
+    def _prune(self, now: float):
+        """Drop users with nothing left in any window. Caller holds the lock."""
+        self._since_prune = 0
+        idle = [user_id for user_id, user in self._users.items() if self._expired(user, now)]
+        for user_id in idle:
+            del self._users[user_id]
+
+
+_tracker: Optional[OffenseTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_offense_tracker() -> OffenseTracker:
+    """
+    Process-wide tracker, restored from user_offenses on first use.
+
+    If moderation.db can't be read the tracker starts empty (and only
+    counts offenses from this run).
+    """
+    global _tracker
+    if _tracker is None:
+        with _tracker_lock:
+            if _tracker is None:
+                tracker = OffenseTracker()
+                try:
+                    from . import moderation_db as mdb
+                    loaded = tracker.restore(mdb.get_recent_offenses(hours=tracker.max_hours))
+                    logger.info(f"Offense tracker restored {loaded} offenses for {len(tracker)} users")
+                except Exception as e:
+                    logger.error(f"Could not restore offense history, starting empty: {e}")
+                _tracker = tracker
+    return _tracker
@@ -0,0 +1,340 @@
+"""
+Process-wide SQLite connection pool (shared by common.db and common.moderation_db).
+
+Opening a connection and re-running the WAL pragmas on every helper call
+is a large part of per-event latency on the 1.6 GB analytics database,
+so each bot process keeps its connections open for its whole lifetime:
+
+- Write role: one connection per thread (thread-bound). SQLite only allows
+  one writer at a time anyway, so sharing a writer across threads would
+  just serialize on a Python lock instead of SQLite's own busy handler.
+- Read role: a small fixed pool of connections opened with
+  PRAGMA query_only and a large prepared-statement cache. Callers borrow
+  one with checkout() and give it back with checkin(), or use the
+  reader() context manager which does both.
+
+Pools are keyed by database path, so tests and scripts that pass an
+override path get their own pool.
+
+Usage:
+    from common.pool import get_pool
+
+    pool = get_pool(ANALYTICS_DB_PATH)
+    with pool.reader() as conn:
+        conn.execute("SELECT ...")
+    with pool.writer() as (conn, cursor):
+        cursor.execute("INSERT ...")   # commits on exit
+"""
+
+import os
+import queue
+import functools
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+from .config import SQLITE_PRAGMAS, SQLITE_READ_POOL_SIZE, SQLITE_STATEMENT_CACHE
+
+logger = logging.getLogger(__name__)
+
+# How long checkout() waits for a free reader before giving up
+CHECKOUT_TIMEOUT = 30
+
+# Optional callback(db_path, sql) for every statement run on pooled
+# connections; see set_statement_trace()
+_statement_trace = None
+
+
+def _snowflake_to_text(value: bytes) -> str:
+    return value.decode()
+
+
+# Compact-layout ID columns are declared SNOWFLAKE and stored as integers;
+# hand them back as the str IDs the rest of the code uses (see
+# "STORAGE SCHEMA" in common/db.py). Needs detect_types=PARSE_DECLTYPES.
+sqlite3.register_converter("SNOWFLAKE", _snowflake_to_text)
+
+
+def set_statement_trace(callback):
+    """
+    Report every SQL statement executed on connections opened from now on.
+
+    Used by scripts/bench_db.py to EXPLAIN the queries each helper really
+    runs. Call it before the first query; connections that are already
+    open are not affected. Pass None to turn tracing off.
+
+    Args:
+        callback: callback(db_path, sql), sql with parameters expanded.
+    """
+    global _statement_trace
+    _statement_trace = callback
+
+
+class _ReaderConnection(sqlite3.Connection):
+    """
+    Connection that remembers the cursors it hands out.
+
+    A cursor whose result set wasn't read to the end keeps its statement
+    active, and an active statement keeps the connection's read snapshot
+    open. checkin() closes tracked cursors so the next borrower starts
+    from a fresh snapshot and WAL checkpoints aren't held back.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._borrowed_cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cursor = super().cursor(*args, **kwargs)
+        self._borrowed_cursors.append(cursor)
+        return cursor
+
+    def release_cursors(self):
+        for cursor in self._borrowed_cursors:
+            cursor.close()
+        self._borrowed_cursors.clear()
+
+
+def open_connection(db_path, read_only: bool = False,
+                    cached_statements: int = SQLITE_STATEMENT_CACHE,
+                    check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Open a configured connection: Row factory, statement cache, pragmas,
+    SNOWFLAKE columns converted back to str.
+
+    Args:
+        db_path: Database file to open.
+        read_only: Set PRAGMA query_only so accidental writes fail loudly.
+        cached_statements: Size of sqlite3's prepared-statement LRU.
+        check_same_thread: Pass False for connections handed between threads.
+    """
+    conn = sqlite3.connect(
+        str(db_path), timeout=10,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        uri=True,   # lets common.db ATTACH archive partitions with ?mode=ro
+        cached_statements=cached_statements,
+        check_same_thread=check_same_thread,
+        factory=_ReaderConnection if read_only else sqlite3.Connection,
+    )
+    conn.row_factory = sqlite3.Row
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    if _statement_trace is not None:
+        conn.set_trace_callback(functools.partial(_statement_trace, Path(db_path)))
+    return conn
+
+
+class ConnectionPool:
+    """
+    Long-lived read/write connections for a single database file.
+
+    Readers are created lazily up to `readers` and recycled through a
+    queue. Writers live in a threading.local so every thread (event loop,
+    executor workers, background writers) gets its own.
+    """
+
+    def __init__(self, db_path, readers: int = SQLITE_READ_POOL_SIZE,
+                 cached_statements: int = SQLITE_STATEMENT_CACHE):
+        self.db_path = Path(db_path)
+        self.max_readers = max(1, readers)
+        self.cached_statements = cached_statements
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writers: list = []
+        self._pid = os.getpid()
+
+    # ------------------------------------------------------------------
+    # Read role
+    # ------------------------------------------------------------------
+
+    def checkout(self, timeout: float = CHECKOUT_TIMEOUT) -> sqlite3.Connection:
+        """
+        Borrow a read connection. Must be returned with checkin().
+
+        Opens a new connection if the pool hasn't reached its size yet,
+        otherwise blocks until another caller returns one.
+        """
+        conn = self._acquire(timeout)
+        with _borrowed_lock:
+            _borrowed[id(conn)] = (threading.get_ident(), conn)
+        return conn
+
+    def _acquire(self, timeout: float) -> sqlite3.Connection:
+        self._check_pid()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_readers:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return open_connection(
+                    self.db_path, read_only=True,
+                    cached_statements=self.cached_statements,
+                    check_same_thread=False,
+                )
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(
+                f"No read connection available for {self.db_path.name} "
+                f"after {timeout}s ({self.max_readers} in use)"
+            )
+
+    def checkin(self, conn: sqlite3.Connection):
+        """Return a read connection borrowed with checkout()."""
+        with _borrowed_lock:
+            _borrowed.pop(id(conn), None)
+        conn.release_cursors()
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read connection for the duration of a with-block."""
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    # ------------------------------------------------------------------
+    # Write role
+    # ------------------------------------------------------------------
+
+    def write_connection(self) -> sqlite3.Connection:
+        """Get (or open) the write connection bound to the calling thread."""
+        self._check_pid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = open_connection(self.db_path, cached_statements=self.cached_statements)
+            self._local.conn = conn
+            self._local.depth = 0
+            with self._lock:
+                self._writers.append(conn)
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """
+        Transaction on this thread's write connection.
+
+        Commits on success and rolls back on exception. Nested writer()
+        blocks on the same thread join the outermost transaction.
+        """
+        conn = self.write_connection()
+        cursor = conn.cursor()
+        self._local.depth += 1
+        try:
+            yield conn, cursor
+            if self._local.depth == 1:
+                conn.commit()
+        except Exception:
+            if self._local.depth == 1:
+                conn.rollback()
+            raise
+        finally:
+            self._local.depth -= 1
+            cursor.close()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def close_all(self):
+        """Close every idle reader and all writers. Used at shutdown."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            writers, self._writers = self._writers, []
+            self._created = 0
+        for conn in writers:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Closed from a different thread than it was opened on
+                pass
+        self._local = threading.local()
+
+    def _check_pid(self):
+        """Drop inherited connections if this pool was copied into a forked child."""
+        if os.getpid() != self._pid:
+            self._idle = queue.LifoQueue()
+            self._created = 0
+            self._lock = threading.Lock()
+            self._local = threading.local()
+            self._writers = []
+            self._pid = os.getpid()
+
+
+_pools: dict = {}
+_pools_lock = threading.Lock()
+
+# Read connections currently checked out: id(conn) -> (thread ident, conn)
+_borrowed: dict = {}
+_borrowed_lock = threading.Lock()
+
+
+def interrupt_readers(thread_ident: int) -> int:
+    """
+    Abort whatever read queries a thread is running (sqlite3 interrupt()).
+
+    Used by common.async_db to cancel a timed-out query instead of
+    letting it hold an executor worker. The interrupted call raises
+    sqlite3.OperationalError("interrupted") in that thread; the
+    connection itself stays usable. Write connections are never
+    interrupted.
+
+    Returns:
+        Number of connections interrupted.
+    """
+    with _borrowed_lock:
+        targets = [conn for ident, conn in _borrowed.values() if ident == thread_ident]
+    for conn in targets:
+        conn.interrupt()
+    return len(targets)
+
+
+def get_pool(db_path) -> ConnectionPool:
+    """Get the process-wide pool for a database path, creating it on first use."""
+    key = str(Path(db_path).resolve())
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(db_path)
+                _pools[key] = pool
+    return pool
+
+
+def close_all_pools():
+    """Close every pool in this process (call from shutdown handlers)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+    logger.info(f"Closed {len(pools)} SQLite connection pool(s)")
@@ -0,0 +1,142 @@
+"""
+Single-pass matching of many literal terms against message text.
+
+Moderation used to run one `re.search(r'\\b' + word + r'\\b')` per list
+entry per message, so every word added to a list made every message
+slower. TermMatcher compiles a whole list once into one regex whose
+alternation is factored into a character trie ("kill", "kill all" and
+"kys" share their "k" branch), so one scan of the text reports every
+term it contains and the per-position cost depends on how many terms
+share a prefix, not on how many terms there are.
+
+- TermMatcher(terms): `terms` is an iterable of (term, category) pairs
+  (or plain strings). Terms are matched case-sensitively, so pass
+  lowercased text for lowercased lists.
+- word_boundary=True gives each term the `\\b...\\b` semantics of the old
+  per-word searches; False matches plain substrings (learned phrases).
+- find_all(text) returns every matched (term, category), overlapping
+  ones included, in the order the terms were given.
+- search(text) returns the first matched term or None, for callers that
+  only need to know whether anything matches.
+
+Used by bots/protector/server_helper.py.
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple, Union
+
+_END = ''  # trie key marking "a term ends here"
+
+
+def _trie_pattern(node: dict, piece=re.escape) -> str:
+    """
+    Regex source for a trie. Children are keyed by one char by default;
+    `piece` turns a key into its regex (common/text_normalizer.py keys by
+    runs of a repeated char).
+    """
+    if len(node) == 1 and _END in node:
+        return ''
+    optional = _END in node
+    branches = [piece(ch) + _trie_pattern(child, piece)
+                for ch, child in sorted(node.items()) if ch != _END]
+    if len(branches) == 1 and not optional:
+        return branches[0]
+    body = '(?:' + '|'.join(branches) + ')'
+    # A term ending here is the shorter alternative; the regex tries the
+    # longer continuation first and backs off to this one if it fails.
+    return body + '?' if optional else body
+
+
+class TermMatcher:
+    """A fixed set of literal terms compiled into one regex."""
+
+    def __init__(self, terms: Iterable[Union[str, Tuple[str, str]]], word_boundary: bool = True):
+        self.word_boundary = word_boundary
+        # term -> categories, in first-seen order (a term can be in more than one list)
+        self.categories = {}
+        for entry in terms:
+            term, category = (entry, None) if isinstance(entry, str) else entry
+            if not term:
+                continue
+            cats = self.categories.setdefault(term, [])
+            if category not in cats:
+                cats.append(category)
+        self._order = {term: i for i, term in enumerate(self.categories)}
+
+        trie = {}
+        for term in self.categories:
+            node = trie
+            for ch in term:
+                node = node.setdefault(ch, {})
+            node[_END] = {}
+
+        self._regex = None
+        if trie:
+            body = _trie_pattern(trie)
+            if word_boundary:
+                # Lookahead so matches can overlap ("kill all" and "all");
+                # every position is tried, the longest term there captured
+                self._regex = re.compile(rf'(?=\b({body})\b)')
+            else:
+                self._regex = re.compile(body)
+
+        # term -> shorter terms it starts with that would also have matched
+        # at the same position ("kill yourself" implies "kill"): the regex
+        # only captures the longest term per position. As substrings every
+        # such prefix matches; with word boundaries only those ending at one.
+        self._implied = {}
+        for term in self.categories:
+            node, implied = trie, []
+            for i, ch in enumerate(term[:-1]):
+                node = node[ch]
+                if _END in node and (not word_boundary or _boundary(ch, term[i + 1])):
+                    implied.append(term[:i + 1])
+            if implied:
+                self._implied[term] = implied
+
+    def __len__(self):
+        return len(self.categories)
+
+    def find_all(self, text: str) -> List[Tuple[str, Optional[str]]]:
+        """Every (term, category) found in `text`, in term order."""
+        if self._regex is None or not text:
+            return []
+        found = set()
+        if self.word_boundary:
+            for match in self._regex.finditer(text):
+                term = match.group(1)
+                found.add(term)
+                found.update(self._implied.get(term, ()))
+        else:
+            pos = 0
+            while True:
+                match = self._regex.search(text, pos)
+                if match is None:
+                    break
+                term = match.group(0)
+                found.add(term)
+                found.update(self._implied.get(term, ()))
+                pos = match.start() + 1
+        return [
+            (term, category)
+            for term in sorted(found, key=self._order.__getitem__)
+            for category in self.categories[term]
+        ]
+
+    def search(self, text: str) -> Optional[str]:
+        """The first term found in `text`, or None."""
+        if self._regex is None or not text:
+            return None
+        match = self._regex.search(text)
+        if match is None:
+            return None
+        return match.group(1) if self.word_boundary else match.group(0)
+
+
+def _boundary(before: str, after: str) -> bool:
+    """Whether `\\b` holds between two adjacent characters."""
+    return _is_word(before) != _is_word(after)
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
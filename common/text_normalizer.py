@@ -0,0 +1,124 @@
+"""
+Undo common filter-evasion tricks before matching word lists.
+
+People dodge word filters with lookalike characters ("n1gg3r", Cyrillic
+"а" for "a"), accents, zero-width characters and punctuation between
+letters ("k.y.s"), and stretched letters ("kyyys"). The old approach,
+one str.replace per character of the message, was quadratic in message
+length.
+
+- TextNormalizer(variants) precomputes one str.translate table from a
+  {canonical: lookalikes} mapping (profanity.masked_chars,
+  server_helper.HOMOGLYPHS), so normalizing is a single linear pass:
+    fold(text)       lookalikes -> canonical, nothing else (keeps case
+                     and length, so results can be censored in place)
+    normalize(text)  lowercase, split off accents (NFKD), drop accents,
+                     zero-width characters and `strip` characters, fold
+- NormalizedMatcher(terms, normalizer) finds any term in normalized text
+  with one regex pass. Every run of a letter in a term matches a run at
+  least that long in the text, so "kyyys" matches "kys" and "niiigger"
+  matches "nigger", but "niger" does not. Terms are normalized the same
+  way as the text unless normalize_terms=False, in which case they are
+  matched as written (a term with a letter the normalizer folds away,
+  like "l" -> "i", then never matches).
+
+Used by bots/trannyverse/extensions/profanity.py and
+bots/protector/server_helper.py.
+"""
+
+import re
+import unicodedata
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .term_matcher import _END, _trie_pattern
+
+# Invisible characters dropped by normalize()
+ZERO_WIDTH = '\u00ad\u180e\u200b\u200c\u200d\u2060\ufeff'
+
+# Combining marks (accents split off by NFKD), dropped by normalize()
+_COMBINING_RANGES = [(0x0300, 0x036f), (0x1ab0, 0x1aff), (0x1dc0, 0x1dff),
+                     (0x20d0, 0x20ff), (0xfe20, 0xfe2f)]
+
+
+class TextNormalizer:
+    """A {canonical: lookalikes} mapping compiled into str.translate tables."""
+
+    def __init__(self, variants: Dict[str, Iterable[str]], strip: str = ''):
+        """
+        Args:
+            variants: canonical char -> chars that stand in for it. A char
+                listed under several keys maps to the last one. Entries
+                longer than one character are ignored (a letter plus a
+                combining mark is covered by normalize() dropping marks).
+            strip: Extra characters normalize() deletes, e.g. separators
+                people put between letters.
+        """
+        self._fold = {}
+        for canonical, chars in variants.items():
+            for ch in chars:
+                if len(ch) == 1:
+                    self._fold[ord(ch)] = canonical
+
+        self._normalize = dict(self._fold)
+        for lo, hi in _COMBINING_RANGES:
+            for code in range(lo, hi + 1):
+                self._normalize[code] = None
+        for ch in ZERO_WIDTH + strip:
+            self._normalize[ord(ch)] = None
+
+    def fold(self, text: str) -> str:
+        """Replace lookalikes with their canonical char; same length as `text`."""
+        return text.translate(self._fold)
+
+    def normalize(self, text: str) -> str:
+        """Lowercased, accent- and separator-free, folded text for matching."""
+        return unicodedata.normalize('NFKD', text.lower()).translate(self._normalize)
+
+
+def _runs(text: str) -> List[Tuple[str, int]]:
+    return [(ch, len(list(group))) for ch, group in groupby(text)]
+
+
+def _run_pattern(run: str) -> str:
+    """Regex for a trie key of n equal chars: that char at least n times."""
+    ch = re.escape(run[0])
+    return ch + '+' if len(run) == 1 else f'{ch}{{{len(run)},}}'
+
+
+class NormalizedMatcher:
+    """Literal terms matched as substrings of normalized, stretch-tolerant text."""
+
+    def __init__(self, terms: Iterable[str], normalizer: TextNormalizer, normalize_terms: bool = True):
+        self.normalizer = normalizer
+        # collapsed term ("kys") -> [(original term, run lengths)], to tell
+        # which term a match was
+        self._shapes: Dict[str, List[Tuple[str, List[int]]]] = {}
+
+        trie = {}
+        for term in terms:
+            runs = _runs(normalizer.normalize(term) if normalize_terms else term)
+            if not runs:
+                continue
+            shape = ''.join(ch for ch, _ in runs)
+            self._shapes.setdefault(shape, []).append((term, [n for _, n in runs]))
+            node = trie
+            for ch, n in runs:
+                node = node.setdefault(ch * n, {})
+            node[_END] = {}
+
+        self._regex = re.compile(_trie_pattern(trie, _run_pattern)) if trie else None
+
+    def search(self, text: str) -> Optional[str]:
+        """The first term found in `text` (as given to the constructor), or None."""
+        if self._regex is None or not text:
+            return None
+        match = self._regex.search(self.normalizer.normalize(text))
+        if match is None:
+            return None
+        runs = _runs(match.group(0))
+        lengths = [n for _, n in runs]
+        for term, needed in self._shapes.get(''.join(ch for ch, _ in runs), ()):
+            if all(have >= need for have, need in zip(lengths, needed)):
+                return term
+        return None
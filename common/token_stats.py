@@ -0,0 +1,120 @@
+"""
+Streaming token statistics for user message history.
+
+Vocabulary and phrase stats used to be computed by loading a user's
+entire history into a list and building Counters of every word, bigram
+and trigram, which for heavy posters is hundreds of MB. The pieces here
+work on one message at a time with memory bounded by a fixed capacity:
+
+- vocabulary_words(): the tokenizer get_user_vocabulary() has always used
+  (lowercased, punctuation stripped, stopwords/mentions/short words dropped)
+- phrase_words() / ngrams(): raw lowercased words and the n-grams built
+  from them, per message (phrases never span two messages)
+- BoundedCounter: a Counter that prunes itself to its top `capacity`
+  entries, so the long tail of one-off terms can't grow without limit
+- TermStats: word/bigram/trigram counters fed message by message
+
+common.db uses these for get_user_vocabulary() and the persisted
+user_term_counts side table; scripts/prepare_chatbot.py for phrases.
+"""
+
+import heapq
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+STOPWORDS = frozenset({
+    'the', 'a', 'an', 'is', 'it', 'to', 'of', 'and', 'i', 'you',
+    'that', 'in', 'for', 'on', 'with', 'this', 'be', 'are', 'was',
+    'have', 'has', 'my', 'me', 'your', 'but', 'not', 'so', 'just',
+    'like', 'im', "i'm", 'its', "it's", 'do', 'if', 'or', 'at',
+    'as', 'can', 'all', 'what', 'they', 'we', 'he', 'she', 'from',
+    'her', 'his', 'been', 'would', 'there', 'their', 'will', 'when',
+    'who', 'them',
+})
+
+_STRIP_CHARS = '.,!?()[]{}":;'
+
+# Term kinds stored in user_term_counts
+KINDS = ('word', 'bigram', 'trigram')
+
+
+def vocabulary_words(content: str) -> List[str]:
+    """Words that count toward a user's vocabulary."""
+    words = (
+        w.strip(_STRIP_CHARS)
+        for w in content.lower().split()
+        if len(w) > 2 and w not in STOPWORDS and not w.startswith('<')
+    )
+    return [w for w in words if w]
+
+
+def phrase_words(content: str) -> List[str]:
+    """Lowercased whitespace-split words, as used for bigrams/trigrams."""
+    return content.lower().split()
+
+
+def ngrams(words: List[str], n: int) -> List[str]:
+    return [' '.join(words[i:i + n]) for i in range(len(words) - n + 1)]
+
+
+class BoundedCounter:
+    """
+    Counter with at most ~2x `capacity` keys.
+
+    When it grows past twice the capacity it keeps only the `capacity`
+    highest counts. Counts for terms that survive are exact from the
+    point they were last admitted; a term that was pruned and comes back
+    restarts from zero, so it can be undercounted by at most `floor`
+    (the highest count ever pruned). With a capacity well above the
+    top-N being asked for, the top of the ranking is exact in practice.
+    """
+
+    def __init__(self, capacity: int, counts: dict = None):
+        self.capacity = max(1, capacity)
+        self.counts = Counter(counts or {})
+        self.floor = 0
+        if len(self.counts) > self.capacity:
+            self._prune()
+
+    def update(self, terms: Iterable[str]):
+        self.counts.update(terms)
+        if len(self.counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        keep = heapq.nlargest(self.capacity, self.counts.items(), key=lambda kv: kv[1])
+        kept = dict(keep)
+        dropped_max = max((c for t, c in self.counts.items() if t not in kept), default=0)
+        self.floor = max(self.floor, dropped_max)
+        self.counts = Counter(kept)
+
+    def most_common(self, n: int = None) -> List[Tuple[str, int]]:
+        return self.counts.most_common(n)
+
+    def items(self) -> List[Tuple[str, int]]:
+        """The `capacity` top entries (what gets persisted)."""
+        return heapq.nlargest(self.capacity, self.counts.items(), key=lambda kv: kv[1])
+
+    def __len__(self):
+        return len(self.counts)
+
+
+class TermStats:
+    """Word / bigram / trigram counters for one user's messages."""
+
+    def __init__(self, capacity: int, initial: dict = None):
+        initial = initial or {}
+        self.counters = {kind: BoundedCounter(capacity, initial.get(kind)) for kind in KINDS}
+        self.messages = 0
+
+    def add(self, content: str):
+        if not content:
+            return
+        self.messages += 1
+        self.counters['word'].update(vocabulary_words(content))
+        words = phrase_words(content)
+        self.counters['bigram'].update(ngrams(words, 2))
+        self.counters['trigram'].update(ngrams(words, 3))
+
+    def top(self, kind: str, n: int) -> List[Tuple[str, int]]:
+        return self.counters[kind].most_common(n)
@@ -6,9 +6,15 @@ from .retriever import (
     get_formatted_context_rich,
     get_relevant_messages_filtered,
     get_smart_context,
+    get_smart_context_async,
+    get_relevant_messages_async,
+    run_retrieval,
     MessageRetriever,
     get_random_memory_samples,
     embed_live_message,
+    get_cache_stats,
+    get_live_embedding_stats,
+    LiveEmbeddingQueue,
 )
 
 __all__ = [
@@ -17,7 +23,13 @@ __all__ = [
     'get_formatted_context_rich',
     'get_relevant_messages_filtered',
     'get_smart_context',
+    'get_smart_context_async',
+    'get_relevant_messages_async',
+    'run_retrieval',
     'MessageRetriever',
     'get_random_memory_samples',
     'embed_live_message',
+    'get_cache_stats',
+    'get_live_embedding_stats',
+    'LiveEmbeddingQueue',
 ]
@@ -30,5 +30,15 @@ MAX_MESSAGE_LENGTH = 500     # Skip overly long messages (likely pastes)
 SIMILARITY_THRESHOLD = 0.3   # Minimum cosine similarity to include (0-1)
 MIN_RAG_AGE_HOURS = 24       # Exclude messages newer than this (they're already in the buffer)
 
+# Retriever caches (busy channels repeat the same keyword query tick after tick)
+QUERY_EMBEDDING_CACHE_SIZE = 256   # LRU of normalized query -> embedding vector
+RESULT_CACHE_SIZE = 128            # (query, filter, top_k) -> results entries kept
+RESULT_CACHE_TTL_SECONDS = 60      # Results are reused for at most this long
+
 # Batch size for embedding
 EMBEDDING_BATCH_SIZE = 512
+
+# Live embedding queue (embed_live_message)
+LIVE_EMBED_BATCH_SIZE = 32          # Encode + upsert at most this many messages at once
+LIVE_EMBED_BATCH_WINDOW_MS = 250    # Wait this long for a batch to fill up
+LIVE_EMBED_QUEUE_MAX = 1000         # Messages waiting beyond this are dropped
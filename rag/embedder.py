@@ -37,6 +37,21 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _reply_authors(conn: sqlite3.Connection, source: str, reply_ids: set, chunk: int = 500) -> dict:
+    """message_id -> author_name for the messages replied to, looked up by id."""
+    authors = {}
+    ids = list(reply_ids)
+    for i in range(0, len(ids), chunk):
+        batch = ids[i:i + chunk]
+        rows = conn.execute(
+            f"SELECT message_id, author_name FROM {source} p "
+            f"WHERE message_id IN ({','.join('?' * len(batch))})",
+            batch,
+        )
+        authors.update((row[0], row[1]) for row in rows)
+    return authors
+
+
 def load_messages_from_sqlite(since_timestamp: float = 0) -> list[dict]:
     """
     Load persona messages from SQLite with full metadata.
@@ -51,12 +66,18 @@ def load_messages_from_sqlite(since_timestamp: float = 0) -> list[dict]:
         logger.error(f"SQLite database not found: {SQLITE_DB_PATH}")
         return []
 
+    from common.db import messages_source
+
     conn = sqlite3.connect(str(SQLITE_DB_PATH))
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
 
     placeholders = ','.join('?' * len(PERSONA_AUTHOR_IDS))
 
+    # Archived years live in partition files; read them too, or a rebuild
+    # would forget everything older than the archive horizon
+    source = messages_source(conn, since=since_timestamp or None)
+
     cursor.execute(f"""
         SELECT
             m.message_id,
@@ -66,9 +87,8 @@ def load_messages_from_sqlite(since_timestamp: float = 0) -> list[dict]:
             m.channel_name,
             m.timestamp_unix,
             m.is_reply,
-            m2.author_name AS reply_to_author
-        FROM messages m
-        LEFT JOIN messages m2 ON m.reply_to_id = m2.message_id
+            m.reply_to_id
+        FROM {source} m
         WHERE m.author_id IN ({placeholders})
           AND m.char_count >= ?
           AND m.char_count <= ?
@@ -78,8 +98,17 @@ def load_messages_from_sqlite(since_timestamp: float = 0) -> list[dict]:
         ORDER BY m.timestamp_unix ASC
     """, (*PERSONA_AUTHOR_IDS, MIN_MESSAGE_LENGTH, MAX_MESSAGE_LENGTH, since_timestamp))
 
+    rows = cursor.fetchall()
+
+    # Reply authors by id rather than a JOIN: the replied-to message can be
+    # in any partition (or before since_timestamp), and a JOIN against the
+    # UNION ALL would materialize it once per partition
+    reply_authors = _reply_authors(
+        conn, messages_source(conn), {row['reply_to_id'] for row in rows if row['reply_to_id']}
+    )
+
     messages = []
-    for row in cursor:
+    for row in rows:
         text = row['content'].strip()
 
         if not text:
@@ -104,14 +133,14 @@ def load_messages_from_sqlite(since_timestamp: float = 0) -> list[dict]:
             'id': str(row['message_id']),
             'text': text,
             'metadata': {
-                'author_id': row['author_id'],
+                'author_id': str(row['author_id']),
                 'author_name': row['author_name'],
                 'channel_name': row['channel_name'] or 'unknown',
                 'timestamp_unix': float(ts),
                 'year_month': year_month,
                 'is_persona': 1,
                 'is_reply': int(row['is_reply']),
-                'reply_to_author': row['reply_to_author'] or '',
+                'reply_to_author': reply_authors.get(row['reply_to_id']) or '',
                 'char_length': len(text),
                 'word_count': len(text.split()),
             }
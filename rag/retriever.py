@@ -12,12 +12,21 @@ Usage:
 
     # Get formatted string for prompt injection
     context = get_formatted_context("what do you think about NYC")
+
+    # From a coroutine: same retrieval, run on the retrieval thread
+    context = await get_smart_context_async("what do you think about NYC")
 """
 
 import asyncio
+import functools
+import json
 import logging
+import operator
 import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -30,31 +39,106 @@ from .config import (
     MIN_MESSAGE_LENGTH,
     MAX_MESSAGE_LENGTH,
     MIN_RAG_AGE_HOURS,
+    LIVE_EMBED_BATCH_SIZE,
+    LIVE_EMBED_BATCH_WINDOW_MS,
+    LIVE_EMBED_QUEUE_MAX,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RESULT_CACHE_SIZE,
+    RESULT_CACHE_TTL_SECONDS,
 )
 
 logger = logging.getLogger(__name__)
 
 
+# Comparison operators of ChromaDB where clauses, for _where_admits()
+_WHERE_OPS = {
+    '$eq': operator.eq,
+    '$ne': operator.ne,
+    '$gt': operator.gt,
+    '$gte': operator.ge,
+    '$lt': operator.lt,
+    '$lte': operator.le,
+    '$in': lambda value, options: value in options,
+    '$nin': lambda value, options: value not in options,
+}
+
+
+def _where_admits(where: Optional[dict], metadata: dict) -> bool:
+    """
+    Whether a document with `metadata` could pass a ChromaDB where clause.
+
+    Errs towards True: an operator it doesn't know or values it can't
+    compare count as a possible match.
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == '$and':
+            if not all(_where_admits(c, metadata) for c in condition):
+                return False
+        elif key == '$or':
+            if not any(_where_admits(c, metadata) for c in condition):
+                return False
+        elif not key.startswith('$'):
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                try:
+                    if not _WHERE_OPS[op](value, operand):
+                        return False
+                except (KeyError, TypeError):
+                    pass
+    return True
+
+
+def _normalize_query(query: str) -> str:
+    return ' '.join(query.split())
+
+
 class MessageRetriever:
     """
     Retrieves semantically similar messages for RAG.
 
     Uses singleton pattern to ensure model is only loaded once.
+
+    Busy channels ask the same question tick after tick, so retrieve() and
+    retrieve_with_metadata() go through two caches:
+
+    - an LRU of normalized query -> embedding, which skips the encoder
+    - results per (query, where, top_k, min_similarity), reused for up to
+      RESULT_CACHE_TTL_SECONDS, which skips the vector search too
+
+    invalidate_for_document() (called by embed_live_message after an
+    upsert) drops cached results whose where clause the new document could
+    pass; age-floored queries never see live messages, so they stay cached.
+    cache_stats() reports hits and misses.
     """
 
     _instance: Optional['MessageRetriever'] = None
+    # The retrieval thread and the live embedding worker can both be first
+    _instance_lock = threading.Lock()
+    _init_lock = threading.Lock()
 
     def __new__(cls):
         """Singleton pattern - only load model once."""
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
 
     def __init__(self):
         if self._initialized:
             return
+        with self._init_lock:
+            # Another thread may have loaded it while this one waited
+            if not self._initialized:
+                self._load()
 
+    def _load(self):
         try:
             from sentence_transformers import SentenceTransformer
             import chromadb
@@ -77,8 +161,97 @@ class MessageRetriever:
             logger.error("Run 'python -m rag.embedder' first to create embeddings")
             raise
 
+        # Retrievals run on the retrieval thread, live upserts on others
+        self._cache_lock = threading.Lock()
+        self._embedding_cache: OrderedDict = OrderedDict()  # query -> embedding
+        self._result_cache: OrderedDict = OrderedDict()     # key -> (stored_at, where, results)
+        self._cache_generation = 0  # bumped by every invalidation
+        self._cache_counts = {
+            'embedding_hits': 0, 'embedding_misses': 0,
+            'result_hits': 0, 'result_misses': 0,
+            'result_expired': 0, 'result_invalidated': 0,
+        }
+
         self._initialized = True
 
+    # ------------------------------------------------------------------
+    # Caches
+    # ------------------------------------------------------------------
+
+    def _embed_query(self, query: str) -> list:
+        """Embedding of a normalized query, from the LRU when possible."""
+        with self._cache_lock:
+            embedding = self._embedding_cache.get(query)
+            if embedding is not None:
+                self._embedding_cache.move_to_end(query)
+                self._cache_counts['embedding_hits'] += 1
+                return embedding
+            self._cache_counts['embedding_misses'] += 1
+
+        embedding = self.model.encode(query).tolist()
+
+        with self._cache_lock:
+            self._embedding_cache[query] = embedding
+            self._embedding_cache.move_to_end(query)
+            while len(self._embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+                self._embedding_cache.popitem(last=False)
+        return embedding
+
+    def _cached_query(self, kind: str, query: str, top_k: int, min_similarity: float,
+                      where: Optional[dict], run):
+        """
+        run(embedding) -> results, through the result cache.
+
+        Results computed while an invalidation happened aren't stored: the
+        upsert may have landed after the search read the collection.
+        """
+        key = (kind, query, top_k, min_similarity, json.dumps(where, sort_keys=True, default=str))
+        now = time.monotonic()
+        with self._cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is not None:
+                stored_at, _, results = entry
+                if now - stored_at <= RESULT_CACHE_TTL_SECONDS:
+                    self._result_cache.move_to_end(key)
+                    self._cache_counts['result_hits'] += 1
+                    return list(results)
+                del self._result_cache[key]
+                self._cache_counts['result_expired'] += 1
+            self._cache_counts['result_misses'] += 1
+            generation = self._cache_generation
+
+        results = run(self._embed_query(query))
+
+        with self._cache_lock:
+            if generation == self._cache_generation:
+                self._result_cache[key] = (now, where, list(results))
+                while len(self._result_cache) > RESULT_CACHE_SIZE:
+                    self._result_cache.popitem(last=False)
+        return results
+
+    def invalidate_for_document(self, metadata: dict) -> int:
+        """
+        Drop cached results a newly upserted document could change.
+
+        Returns how many entries were dropped.
+        """
+        with self._cache_lock:
+            self._cache_generation += 1
+            stale = [key for key, (_, where, _) in self._result_cache.items()
+                     if _where_admits(where, metadata)]
+            for key in stale:
+                del self._result_cache[key]
+            self._cache_counts['result_invalidated'] += len(stale)
+        return len(stale)
+
+    def cache_stats(self) -> dict:
+        """Hit/miss counters and sizes of the embedding and result caches."""
+        with self._cache_lock:
+            stats = dict(self._cache_counts)
+            stats['embedding_cache_size'] = len(self._embedding_cache)
+            stats['result_cache_size'] = len(self._result_cache)
+        return stats
+
     def retrieve(
         self,
         query: str,
@@ -101,31 +274,30 @@ class MessageRetriever:
         if not query or not query.strip():
             return []
 
-        # Embed the query
-        query_embedding = self.model.encode(query).tolist()
-
-        # Query ChromaDB
-        kwargs = {
-            'query_embeddings': [query_embedding],
-            'n_results': top_k,
-            'include': ['documents', 'distances'],
-        }
-        if where:
-            kwargs['where'] = where
+        def _query(query_embedding):
+            kwargs = {
+                'query_embeddings': [query_embedding],
+                'n_results': top_k,
+                'include': ['documents', 'distances'],
+            }
+            if where:
+                kwargs['where'] = where
 
-        results = self.collection.query(**kwargs)
+            results = self.collection.query(**kwargs)
 
-        # Filter by similarity threshold
-        # ChromaDB with cosine space returns distances where lower = more similar
-        # For cosine: similarity = 1 - distance
-        messages = []
-        if results['documents'] and results['distances']:
-            for doc, distance in zip(results['documents'][0], results['distances'][0]):
-                similarity = 1 - distance
-                if similarity >= min_similarity:
-                    messages.append(doc)
+            # Filter by similarity threshold
+            # ChromaDB with cosine space returns distances where lower = more similar
+            # For cosine: similarity = 1 - distance
+            messages = []
+            if results['documents'] and results['distances']:
+                for doc, distance in zip(results['documents'][0], results['distances'][0]):
+                    similarity = 1 - distance
+                    if similarity >= min_similarity:
+                        messages.append(doc)
+            return messages
 
-        return messages
+        return self._cached_query('documents', _normalize_query(query), top_k,
+                                  min_similarity, where, _query)
 
     def retrieve_with_metadata(
         self,
@@ -142,31 +314,34 @@ class MessageRetriever:
         if not query or not query.strip():
             return []
 
-        query_embedding = self.model.encode(query).tolist()
-
-        kwargs = {
-            'query_embeddings': [query_embedding],
-            'n_results': top_k,
-            'include': ['documents', 'distances', 'metadatas'],
-        }
-        if where:
-            kwargs['where'] = where
+        def _query(query_embedding):
+            kwargs = {
+                'query_embeddings': [query_embedding],
+                'n_results': top_k,
+                'include': ['documents', 'distances', 'metadatas'],
+            }
+            if where:
+                kwargs['where'] = where
 
-        results = self.collection.query(**kwargs)
+            results = self.collection.query(**kwargs)
 
-        messages = []
-        if results['documents'] and results['distances']:
-            metadatas = results.get('metadatas', [[]])[0]
-            for doc, distance, meta in zip(
-                results['documents'][0],
-                results['distances'][0],
-                metadatas,
-            ):
-                similarity = 1 - distance
-                if similarity >= min_similarity:
-                    messages.append((doc, meta or {}))
+            messages = []
+            if results['documents'] and results['distances']:
+                metadatas = results.get('metadatas', [[]])[0]
+                for doc, distance, meta in zip(
+                    results['documents'][0],
+                    results['distances'][0],
+                    metadatas,
+                ):
+                    similarity = 1 - distance
+                    if similarity >= min_similarity:
+                        messages.append((doc, meta or {}))
+            return messages
 
-        return messages
+        messages = self._cached_query('metadata', _normalize_query(query), top_k,
+                                      min_similarity, where, _query)
+        # Callers get their own metadata dicts, not the cached ones
+        return [(doc, dict(meta)) for doc, meta in messages]
 
     def retrieve_formatted(
         self,
@@ -233,7 +408,7 @@ class MessageRetriever:
 
         1. Build a ChromaDB where clause from time_filter and author_name
         2. Run semantic search on ChromaDB
-        3. If results are thin (< top_k // 2), fall back to SQLite LIKE search
+        3. If results are thin (< top_k // 2), fall back to SQLite FTS5 search
         4. Merge, deduplicate, and format
         """
         # --- Build ChromaDB where clause ---
@@ -269,7 +444,7 @@ class MessageRetriever:
                 raw = search_messages(query, limit=20)
 
                 if author_name:
-                    raw = [r for r in raw if author_name in r['author_name'].lower()]
+                    raw = [r for r in raw if author_name in (r['author_name'] or '').lower()]
 
                 for row in raw[:top_k]:
                     content = row.get('content', '').strip()
@@ -277,7 +452,7 @@ class MessageRetriever:
                         continue
                     meta = {
                         'channel_name': row.get('channel_name', '?'),
-                        'year_month': row.get('timestamp', '?')[:7],
+                        'year_month': (row.get('timestamp') or '?')[:7],
                     }
                     sqlite_results.append((content, meta))
             except Exception as e:
@@ -415,6 +590,13 @@ def _get_retriever() -> MessageRetriever:
     return _retriever
 
 
+def get_cache_stats() -> Optional[dict]:
+    """Retriever cache counters, or None if the retriever hasn't been loaded."""
+    if _retriever is None:
+        return None
+    return _retriever.cache_stats()
+
+
 def get_relevant_messages(query: str, top_k: int = TOP_K) -> list[str]:
     """
     Get relevant messages for a query.
@@ -603,6 +785,15 @@ _NOT_NAMES = frozenset({
 })
 
 
+def _filter_now() -> float:
+    """
+    Current time floored to the minute, for where clauses. Clauses built
+    within the same minute come out identical, so the retriever's result
+    cache can match them.
+    """
+    return float(int(time.time()) // 60 * 60)
+
+
 def detect_temporal_filter(query: str) -> Optional[dict]:
     """
     Detect temporal intent from a query and return a ChromaDB where clause.
@@ -615,7 +806,7 @@ def detect_temporal_filter(query: str) -> Optional[dict]:
         "back in 2024"             → {"$and": [year_month >= "2024-01", <= "2024-12"]}
     """
     query_lower = query.lower()
-    now = time.time()
+    now = _filter_now()
 
     # Check recency patterns first (more common)
     for pattern, delta in _RECENCY_PATTERNS:
@@ -693,7 +884,7 @@ def get_smart_context(query: str, top_k: int = TOP_K) -> str:
         logger.info(f"RAG author filter detected: '{author}'")
 
     # Always exclude very recent messages — they're already in the buffer
-    age_filter = {"timestamp_unix": {"$lt": time.time() - MIN_RAG_AGE_HOURS * 3600}}
+    age_filter = {"timestamp_unix": {"$lt": _filter_now() - MIN_RAG_AGE_HOURS * 3600}}
 
     # Merge the age floor with any explicit temporal filter from the query
     if time_filter:
@@ -713,13 +904,183 @@ def get_smart_context(query: str, top_k: int = TOP_K) -> str:
     return retriever.retrieve_formatted_rich(query, top_k, where=effective_time_filter)
 
 
+# ============== ASYNC RETRIEVAL ==============
+
+# Query encoding, the ChromaDB search and the SQLite fallback are blocking
+# CPU/IO work, so coroutines run them on this thread instead of the event
+# loop. A single thread keeps retrievals from competing with each other for
+# the CPU, and a retrieval cancelled while still queued (a stale prefetch)
+# never runs.
+_retrieval_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rag-retrieval")
+
+
+async def run_retrieval(fn, *args, **kwargs):
+    """
+    Await fn(*args, **kwargs) run on the retrieval thread.
+
+    Cancelling the awaiting task drops the call if it hasn't started yet;
+    one already running finishes in the background.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_retrieval_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def get_smart_context_async(query: str, top_k: int = TOP_K) -> str:
+    """get_smart_context() on the retrieval thread."""
+    return await run_retrieval(get_smart_context, query, top_k)
+
+
+async def get_relevant_messages_async(query: str, top_k: int = TOP_K) -> list[str]:
+    """get_relevant_messages() on the retrieval thread."""
+    return await run_retrieval(get_relevant_messages, query, top_k)
+
+
+# ============== LIVE EMBEDDING ==============
+
+class LiveEmbeddingQueue:
+    """
+    Embeds live messages in batches on one background worker.
+
+    embed_live_message() only queues a message. The worker waits up to
+    LIVE_EMBED_BATCH_WINDOW_MS for LIVE_EMBED_BATCH_SIZE messages, then
+    encodes the batch in one model.encode() call and writes it with one
+    collection.upsert(), off the event loop. A chat burst costs a few
+    batches instead of a thread per message competing for the CPU.
+
+    A message queued again before it's embedded (the image description
+    re-upsert) replaces the waiting entry. Past LIVE_EMBED_QUEUE_MAX
+    waiting messages, new ones are dropped. stats() counts both.
+
+    If the retriever can't be loaded (no collection yet, missing
+    dependency) the worker logs it once and stops, and put() returns
+    False from then on, like the old per-message check.
+    """
+
+    def __init__(self, batch_size: int = LIVE_EMBED_BATCH_SIZE,
+                 window_ms: float = LIVE_EMBED_BATCH_WINDOW_MS,
+                 max_pending: int = LIVE_EMBED_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.window = window_ms / 1000
+        self.max_pending = max_pending
+        self._pending: OrderedDict = OrderedDict()  # message_id -> (text, metadata)
+        self._has_items: Optional[asyncio.Event] = None
+        self._batch_full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.unavailable = False
+        self._counts = {
+            'queued': 0, 'coalesced': 0, 'dropped': 0,
+            'embedded': 0, 'failed': 0, 'batches': 0,
+        }
+        self._last_batch_ms = 0.0
+
+    def put(self, message_id: str, text: str, metadata: dict) -> bool:
+        """Queue a message for embedding. False if the queue is full or RAG is unavailable. Call from the event loop."""
+        if self.unavailable:
+            return False
+        self._ensure_worker()
+        if message_id in self._pending:
+            self._pending[message_id] = (text, metadata)
+            self._counts['coalesced'] += 1
+            return True
+        if len(self._pending) >= self.max_pending:
+            self._counts['dropped'] += 1
+            return False
+
+        self._pending[message_id] = (text, metadata)
+        self._counts['queued'] += 1
+        self._has_items.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+        return True
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._has_items = asyncio.Event()
+            self._batch_full = asyncio.Event()
+            if self._pending:
+                self._has_items.set()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            if len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                message_id, (text, metadata) = self._pending.popitem(last=False)
+                batch.append((message_id, text, metadata))
+            if not self._pending:
+                self._has_items.clear()
+            if len(self._pending) < self.batch_size:
+                self._batch_full.clear()
+            if not batch:
+                continue
+
+            try:
+                retriever = await asyncio.to_thread(_get_retriever)
+            except Exception as e:
+                # Not a per-batch failure: nothing can be embedded until restart
+                self.unavailable = True
+                self._counts['dropped'] += len(batch) + len(self._pending)
+                self._pending.clear()
+                logger.warning(f"Live embedding disabled, retriever unavailable: {e}")
+                return
+
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._embed_batch, retriever, batch)
+            except Exception as e:
+                self._counts['failed'] += len(batch)
+                logger.warning(f"Live embedding batch of {len(batch)} failed: {e}")
+                continue
+            self._last_batch_ms = (time.perf_counter() - started) * 1000
+            self._counts['embedded'] += len(batch)
+            self._counts['batches'] += 1
+            logger.debug(f"Live embedded {len(batch)} messages in {self._last_batch_ms:.0f}ms")
+
+    @staticmethod
+    def _embed_batch(retriever: MessageRetriever, batch: list):
+        texts = [text for _, text, _ in batch]
+        embeddings = retriever.model.encode(texts, show_progress_bar=False)
+        retriever.collection.upsert(
+            ids=[message_id for message_id, _, _ in batch],
+            embeddings=embeddings.tolist(),
+            documents=texts,
+            metadatas=[metadata for _, _, metadata in batch],
+        )
+        for _, _, metadata in batch:
+            retriever.invalidate_for_document(metadata)
+
+    def stats(self) -> dict:
+        """Queue counters, current backlog and the last batch's duration."""
+        stats = dict(self._counts)
+        stats['unavailable'] = self.unavailable
+        stats['pending'] = len(self._pending)
+        stats['avg_batch'] = round(stats['embedded'] / stats['batches'], 1) if stats['batches'] else 0.0
+        stats['last_batch_ms'] = round(self._last_batch_ms, 1)
+        return stats
+
+
+_live_queue = LiveEmbeddingQueue()
+
+
+def get_live_embedding_stats() -> dict:
+    """Counters of the live embedding queue (see LiveEmbeddingQueue.stats)."""
+    return _live_queue.stats()
+
+
 async def embed_live_message(message_id: str, content: str, metadata: dict) -> bool:
     """
-    Embed a single message into ChromaDB in real-time.
+    Queue a single message for embedding into ChromaDB in real-time.
     Called from on_message_create after inserting into live_messages.
 
-    Uses asyncio.to_thread to avoid blocking the event loop since
-    sentence-transformers encode() is CPU-bound.
+    Returns right away: LiveEmbeddingQueue encodes and upserts queued
+    messages in batches off the event loop.
 
     Args:
         message_id: Discord message snowflake ID as string
@@ -729,7 +1090,7 @@ async def embed_live_message(message_id: str, content: str, metadata: dict) -> b
                   is_reply, reply_to_author, char_length, word_count)
 
     Returns:
-        True if embedded successfully, False if filtered/skipped
+        True if queued, False if filtered/skipped or the queue is full
     """
     text = content.strip()
 
@@ -747,20 +1108,4 @@ async def embed_live_message(message_id: str, content: str, metadata: dict) -> b
     if re.match(r'^(<@!?\d+>\s*)+$', text):
         return False
 
-    try:
-        retriever = _get_retriever()
-    except Exception:
-        return False
-
-    def _encode_and_upsert():
-        embedding = retriever.model.encode(text).tolist()
-        retriever.collection.upsert(
-            ids=[message_id],
-            embeddings=[embedding],
-            documents=[text],
-            metadatas=[metadata],
-        )
-
-    await asyncio.to_thread(_encode_and_upsert)
-    logger.debug(f"Live embedded message {message_id}")
-    return True
+    return _live_queue.put(message_id, text, metadata)
@@ -122,7 +122,7 @@ def shutdown_all(signum=None, frame=None):
             logger.info(f"Sending SIGTERM to {name} (PID {proc.pid})")
             proc.terminate()
 
-    # Give them a few seconds to clean up
+    # Give them a few seconds to clean up (bots flush queued DB writes on SIGTERM)
     deadline = time.time() + 10
     for name, proc in processes.items():
         remaining = max(0, deadline - time.time())
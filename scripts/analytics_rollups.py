@@ -0,0 +1,58 @@
+"""
+Rebuild or verify the analytics rollup tables.
+
+The stats commands (/server_stats, /user_stats, /activity_hours, ...)
+read pre-aggregated rollups that triggers keep current as messages are
+imported or captured live. On a database that already held the archive
+before the rollups existed, run `rebuild` once; until then the commands
+fall back to full-table scans.
+
+Usage:
+    python scripts/analytics_rollups.py rebuild
+    python scripts/analytics_rollups.py check     # exits 1 on drift
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+# Ensure common/ is importable when running as a standalone script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.config import ANALYTICS_DB_PATH
+from common.db import rebuild_rollups, check_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify analytics rollups")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"Analytics DB: {ANALYTICS_DB_PATH}")
+    start = time.time()
+
+    if args.command == "rebuild":
+        for table, count in rebuild_rollups().items():
+            print(f"  {table:<24} {count:,} rows")
+        print(f"Done in {time.time() - start:.1f}s")
+        return
+
+    result = check_rollups()
+    print(f"Checked in {time.time() - start:.1f}s")
+    if result['ok']:
+        print("Rollups are consistent with the base tables.")
+        return
+
+    for table, rows in result['mismatches'].items():
+        print(f"\n{table}: {len(rows)} mismatched row(s) (showing up to 20)")
+        for row in rows:
+            print(f"  {row}")
+    print("\nRun `python scripts/analytics_rollups.py rebuild` to fix.")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Move old messages out of the hot analytics database into per-year archives.
+
+Messages older than ARCHIVE_HORIZON_DAYS (default 365) are copied to
+data/archive/messages_<year>.db and deleted from discord_analytics.db,
+in small batches so the bots keep capturing while it runs (see
+"HOT/COLD ARCHIVE PARTITIONS" in common/db.py). Search, stats and
+import dedup read the archive files transparently, so no calling code
+changes.
+
+Safe to interrupt and re-run: rows are copied before they are deleted,
+so a crash can at worst leave a batch in both places, and the next run
+finishes it. Run it from cron (e.g. monthly) to keep the hot file small.
+
+Usage:
+    python -m scripts.archive_messages
+    # or from project root:
+    python scripts/archive_messages.py [--horizon-days 365] [--batch-rows 20000] [--pause 0.05]
+    python scripts/archive_messages.py --list
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+# Ensure common/ is importable when running as a standalone script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.config import ANALYTICS_DB_PATH, ARCHIVE_DIR, ARCHIVE_HORIZON_DAYS
+from common.db import archive_cold_messages, get_archive_partitions
+
+
+def _print_partitions():
+    partitions = get_archive_partitions()
+    if not partitions:
+        print("No archive partitions yet.")
+        return
+    for p in partitions:
+        print(f"  {p['year']}  {p['file_name']:<20} {p['message_count']:>12,} messages"
+              f"  (updated {p['updated_at']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old messages into per-year databases")
+    parser.add_argument("--horizon-days", type=int, default=ARCHIVE_HORIZON_DAYS,
+                        help=f"Keep this many days hot (default {ARCHIVE_HORIZON_DAYS})")
+    parser.add_argument("--batch-rows", type=int, default=20000,
+                        help="Rows moved per write transaction (default 20000)")
+    parser.add_argument("--pause", type=float, default=0.05,
+                        help="Seconds to sleep between batches (default 0.05)")
+    parser.add_argument("--list", action="store_true",
+                        help="Show the existing partitions and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"Analytics DB: {ANALYTICS_DB_PATH}")
+    print(f"Archive dir:  {ARCHIVE_DIR}")
+
+    if args.list:
+        _print_partitions()
+        return
+
+    start = time.time()
+    moved = archive_cold_messages(horizon_days=args.horizon_days,
+                                  batch_rows=args.batch_rows, pause=args.pause)
+    print()
+    if not moved:
+        print(f"Nothing older than {args.horizon_days} days to archive.")
+    for year, count in sorted(moved.items()):
+        print(f"  {year}: {count:,} messages moved")
+    print()
+    _print_partitions()
+    print(f"Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
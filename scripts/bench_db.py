@@ -0,0 +1,285 @@
+"""
+Benchmark every public common.db / common.moderation_db query and insert
+helper against a synthetic archive, and check their query plans.
+
+For each helper it reports median and p95 latency, then runs
+EXPLAIN QUERY PLAN on every statement the helper actually executed
+(captured via pool.set_statement_trace). A full table scan with no
+index on one of the large tables counts as a plan regression and makes
+the script exit 1, so it can run as a CI gate after index or rollup
+changes.
+
+Insert benchmarks write extra rows into the synthetic database; never
+point this at the real data/ directory.
+
+Usage:
+    python scripts/gen_synthetic_archive.py --data-dir /tmp/synth --rows 1000000
+    python scripts/bench_db.py --data-dir /tmp/synth
+    python scripts/bench_db.py --data-dir /tmp/synth --only search --iterations 50
+    python scripts/bench_db.py --data-dir /tmp/synth --json bench.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import tempfile
+import itertools
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Tables that grow with the archive. A bare "SCAN <table>" on one of
+# these (no index) is an unindexed query.
+WATCHED_TABLES = {
+    "messages", "live_messages", "message_reply_tracking", "highlights",
+    "flagged_messages", "user_offenses", "training_samples",
+}
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)(.*)$")
+_PLANNABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+class Case:
+    """One benchmarked helper call."""
+
+    def __init__(self, name, fn, iterations=None, allow_scans=()):
+        self.name = name
+        self.fn = fn
+        self.iterations = iterations
+        # Tables this helper scans on purpose (say why next to the Case)
+        self.allow_scans = set(allow_scans)
+
+
+def pick_samples(db):
+    """Look up realistic arguments (heavy/median users, busy channel, ...)."""
+    with db.read_session() as conn:
+        authors = conn.execute(
+            "SELECT author_id FROM rollup_author_channel GROUP BY author_id "
+            "ORDER BY SUM(message_count) DESC"
+        ).fetchall()
+        channels = conn.execute(
+            "SELECT channel_id FROM rollup_author_channel GROUP BY channel_id "
+            "ORDER BY SUM(message_count) DESC"
+        ).fetchall()
+        replied = conn.execute(
+            "SELECT original_message_id FROM message_reply_tracking LIMIT 1"
+        ).fetchone()
+        highlighted = conn.execute("SELECT original_message_id FROM highlights LIMIT 1").fetchone()
+        live = conn.execute("SELECT message_id FROM live_messages ORDER BY id DESC LIMIT 1").fetchone()
+    if not authors:
+        sys.exit("Database is empty or rollups are missing; run gen_synthetic_archive.py first")
+    return {
+        'heavy_user': authors[0][0],
+        'median_user': authors[len(authors) // 2][0],
+        'busy_channel': channels[0][0],
+        'channels': [c[0] for c in channels[:3]],
+        'replied': replied[0] if replied else "0",
+        'highlighted': highlighted[0] if highlighted else "0",
+        'live_id': live[0] if live else "0",
+    }
+
+
+def build_cases(db, mdb, s, tmp_dir):
+    seq = itertools.count()
+
+    def live_row():
+        n = next(seq)
+        return {
+            'message_id': f"bench-live-{time.time_ns()}-{n}", 'channel_id': s['busy_channel'],
+            'author_id': s['median_user'], 'author_name': "bench", 'content': "benchmark message text",
+            'timestamp': None, 'attachments': [], 'embeds': [], 'reactions': [], 'mentions': [],
+            'created_at': time.time(),
+        }
+
+    def writer_batch():
+        writer = db.LiveMessageWriter(batch_size=200, flush_ms=50)
+        writer.start()
+        for _ in range(200):
+            writer.submit(live_row())
+        writer.stop()
+
+    corpus_path = str(Path(tmp_dir) / "corpus.txt")
+
+    return [
+        # ----- common.db: lookups on the event path -----
+        Case("get_live_message_by_id", lambda: db.get_live_message_by_id(s['live_id'])),
+        Case("get_recent_live_messages", lambda: db.get_recent_live_messages(s['busy_channel'], limit=50)),
+        Case("get_recent_live_messages(all)", lambda: db.get_recent_live_messages(limit=50)),
+        Case("get_highlight_by_original", lambda: db.get_highlight_by_original(s['highlighted'])),
+        Case("count_replies_to_message", lambda: db.count_replies_to_message(s['replied'])),
+        Case("get_replies_to_message", lambda: db.get_replies_to_message(s['replied'])),
+
+        # ----- common.db: inserts -----
+        Case("insert_live_message", lambda: db.insert_live_message(live_row())),
+        Case("LiveMessageWriter(200 rows)", writer_batch, iterations=5),
+        Case("insert_highlight", lambda: db.insert_highlight(f"bench-hl-{time.time_ns()}", s['live_id'], s['median_user'])),
+        Case("insert_reply_tracking",
+             lambda: db.insert_reply_tracking(f"bench-rp-{time.time_ns()}", s['replied'], s['median_user'], "reply")),
+
+        # ----- common.db: analytics -----
+        Case("search_messages", lambda: db.search_messages("people really", limit=25)),
+        Case("search_messages(author)", lambda: db.search_messages("game", limit=25, author_id=s['heavy_user'])),
+        Case("get_server_overview", db.get_server_overview),
+        Case("get_user_stats", lambda: db.get_user_stats(limit=20)),
+        Case("get_channel_stats", lambda: db.get_channel_stats(limit=20)),
+        Case("get_hourly_activity", db.get_hourly_activity),
+        Case("get_daily_activity", lambda: db.get_daily_activity(days=30)),
+        Case("get_channel_activity_comparison", lambda: db.get_channel_activity_comparison(s['channels'])),
+        Case("get_user_messages(median)", lambda: db.get_user_messages(s['median_user'])),
+        Case("get_user_messages(heavy)", lambda: db.get_user_messages(s['heavy_user']), iterations=3),
+        Case("get_user_vocabulary(median)", lambda: db.get_user_vocabulary(s['median_user'])),
+        Case("get_user_terms(heavy, bigram)", lambda: db.get_user_terms(s['heavy_user'], 'bigram', 20)),
+        Case("get_user_profile(heavy)", lambda: db.get_user_profile(s['heavy_user'])),
+        Case("export_user_corpus(median)", lambda: db.export_user_corpus(s['median_user'], corpus_path), iterations=3),
+
+        # ----- common.moderation_db -----
+        Case("get_bad_words", mdb.get_bad_words),
+        Case("add_bad_word", lambda: mdb.add_bad_word(f"benchword{time.time_ns()}", 1, "bench")),
+        Case("increment_word_match", lambda: mdb.increment_word_match("benchword")),
+        Case("log_flagged_message", lambda: mdb.log_flagged_message(
+            f"bench-fl-{time.time_ns()}", s['busy_channel'], "general", s['median_user'], "bench",
+            "bad text", "*** text", "bad_word", ["bad"], -0.5, 0.8)),
+        Case("get_flagged_messages", lambda: mdb.get_flagged_messages(limit=100)),
+        Case("get_flagged_messages(author)", lambda: mdb.get_flagged_messages(limit=100, author_id=s['heavy_user'])),
+        Case("log_user_offense", lambda: mdb.log_user_offense(s['median_user'], "bad_word", "m", s['busy_channel'])),
+        Case("record_moderation_event", lambda: mdb.record_moderation_event(
+            message_id=f"bench-ev-{time.time_ns()}", channel_id=s['busy_channel'], channel_name="general",
+            author_id=s['median_user'], author_name="bench", original_content="bad text",
+            censored_content="*** text", flag_reason="bad_word", matched_patterns=["bad"],
+            offense_type="bad_word", counted_words=["benchword"])),
+        Case("get_user_offense_count", lambda: mdb.get_user_offense_count(s['heavy_user'], days=30)),
+        Case("get_repeat_offenders", lambda: mdb.get_repeat_offenders(min_offenses=3, days=7)),
+        Case("get_monitored_channels", mdb.get_monitored_channels),
+        Case("add_monitored_channel", lambda: mdb.add_monitored_channel("bench-channel", "bench", 1)),
+        Case("remove_monitored_channel", lambda: mdb.remove_monitored_channel("bench-channel")),
+        Case("add_training_sample", lambda: mdb.add_training_sample("sample text", "ok", "bench")),
+        Case("add_learned_pattern", lambda: mdb.add_learned_pattern(f"bench {time.time_ns()}", "phrase")),
+        Case("get_learned_patterns", mdb.get_learned_patterns),
+        Case("update_pattern_stats", lambda: mdb.update_pattern_stats("bench", matched=True)),
+        Case("get_moderation_stats", lambda: mdb.get_moderation_stats(days=7)),
+        Case("get_scan_progress", lambda: mdb.get_scan_progress(s['busy_channel'])),
+        Case("get_all_scan_progress", mdb.get_all_scan_progress),
+        Case("update_scan_progress",
+             lambda: mdb.update_scan_progress("bench-channel", "bench.json", "0", 10, 1)),
+    ]
+
+
+def explain(db_path: Path, sql: str) -> list:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    except sqlite3.Error:
+        # Statements that can't be explained outside their context (e.g.
+        # they reference a temp table); nothing to check
+        return []
+    finally:
+        conn.close()
+
+
+def check_plans(case: Case, statements: list) -> list:
+    """Return (table, sql, plan detail) for every unindexed scan."""
+    problems = []
+    seen = set()
+    for db_path, sql in statements:
+        if sql in seen:
+            continue
+        seen.add(sql)
+        for detail in explain(db_path, sql):
+            match = _SCAN_RE.match(detail)
+            if not match or "INDEX" in match.group(2) or "VIRTUAL TABLE" in match.group(2):
+                continue
+            table = match.group(1)
+            if table in WATCHED_TABLES and table not in case.allow_scans:
+                problems.append((table, " ".join(sql.split())[:200], detail))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark common.db / moderation_db helpers")
+    parser.add_argument("--data-dir", required=True, help="DATA_DIR built by gen_synthetic_archive.py")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--only", help="Run only cases whose name contains this text")
+    parser.add_argument("--json", help="Also write results to this file")
+    parser.add_argument("--no-plan-check", action="store_true", help="Report timings only")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir).resolve()
+    if data_dir == (Path(__file__).resolve().parent.parent / "data").resolve():
+        parser.error("refusing to benchmark (and write into) the project data/ directory")
+    if not (data_dir / "discord_analytics.db").exists():
+        parser.error(f"no discord_analytics.db in {data_dir}; run gen_synthetic_archive.py first")
+
+    os.environ["DATA_DIR"] = str(data_dir)
+    from common import db
+    from common import moderation_db as mdb
+    from common.pool import set_statement_trace, close_all_pools
+
+    captured = []
+    set_statement_trace(lambda path, sql: captured.append((path, sql)))
+
+    # Same startup path as the bots, so schema changes (new indexes) apply
+    db.init_database()
+    mdb.init_moderation_db()
+
+    samples = pick_samples(db)
+    tmp_dir = tempfile.mkdtemp(prefix="bench_db_")
+    cases = build_cases(db, mdb, samples, tmp_dir)
+    if args.only:
+        cases = [c for c in cases if args.only in c.name]
+
+    print(f"Benchmark DB: {data_dir / 'discord_analytics.db'}")
+    print(f"{'helper':<36} {'calls':>5} {'median ms':>10} {'p95 ms':>10}")
+
+    results = []
+    regressions = []
+    for case in cases:
+        # First call: warm-up + statement capture for the plan check
+        captured.clear()
+        case.fn()
+        statements = [(path, sql) for path, sql in captured
+                      if sql.lstrip().upper().startswith(_PLANNABLE)]
+
+        iterations = case.iterations or args.iterations
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            case.fn()
+            timings.append((time.perf_counter() - start) * 1000)
+        captured.clear()
+
+        median = statistics.median(timings)
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        print(f"{case.name:<36} {iterations:>5} {median:>10.2f} {p95:>10.2f}")
+
+        problems = [] if args.no_plan_check else check_plans(case, statements)
+        regressions.extend((case.name, *p) for p in problems)
+        results.append({
+            'name': case.name, 'calls': iterations,
+            'median_ms': round(median, 3), 'p95_ms': round(p95, 3),
+            'statements': len({sql for _, sql in statements}),
+            'unindexed_scans': [p[0] for p in problems],
+        })
+
+    set_statement_trace(None)
+    close_all_pools()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'data_dir': str(data_dir), 'results': results}, indent=2))
+        print(f"\nWrote {args.json}")
+
+    if regressions:
+        print(f"\n{len(regressions)} unindexed scan(s):")
+        for name, table, sql, detail in regressions:
+            print(f"  {name}: {detail}\n      {sql}")
+        sys.exit(1)
+    if not args.no_plan_check:
+        print("\nQuery plans OK: no unindexed scans on large tables.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Micro-benchmark: connect-per-call vs. pooled connections for common.db.
+
+Builds a throwaway analytics database, then times the same mix of
+per-event helper calls (highlight lookup, reply count, live insert)
+two ways:
+
+    old    - fresh sqlite3.connect + pragmas for every call (previous behavior)
+    pooled - the long-lived connections from common/pool.py
+
+Usage:
+    python scripts/bench_db_pool.py
+    python scripts/bench_db_pool.py --iterations 5000 --rows 200000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Keep the benchmark DB out of the real data directory
+_tmp = tempfile.mkdtemp(prefix="bench_db_pool_")
+os.environ.setdefault("DATA_DIR", _tmp)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import db
+from common.config import ANALYTICS_DB_PATH
+from common.pool import close_all_pools, open_connection
+
+
+def seed(rows: int):
+    """Fill messages/highlights/reply tracking with synthetic rows."""
+    db.init_database()
+    with db.db_session() as (conn, cursor):
+        cursor.executemany(
+            "INSERT OR IGNORE INTO message_reply_tracking "
+            "(reply_id, original_message_id, author_id, reply_content, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((f"r{i}", f"m{i % 1000}", f"u{i % 50}", "hi", time.time()) for i in range(rows)),
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO highlights (highlight_id, original_message_id, author_id, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            ((f"h{i}", f"m{i}", f"u{i % 50}", time.time()) for i in range(0, 1000, 7)),
+        )
+
+
+def old_path(i: int):
+    """One event's worth of queries, opening a new connection per helper like before."""
+    conn = open_connection(ANALYTICS_DB_PATH)
+    try:
+        conn.execute("SELECT * FROM highlights WHERE original_message_id = ?", (f"m{i % 1000}",)).fetchone()
+    finally:
+        conn.close()
+
+    conn = open_connection(ANALYTICS_DB_PATH)
+    try:
+        conn.execute(
+            "SELECT COUNT(*) FROM message_reply_tracking WHERE original_message_id = ?",
+            (f"m{i % 1000}",),
+        ).fetchone()
+    finally:
+        conn.close()
+
+    conn = open_connection(ANALYTICS_DB_PATH)
+    try:
+        conn.execute(
+            "INSERT OR IGNORE INTO live_messages (message_id, channel_id, author_id, content, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (f"old{i}", "c1", "u1", "benchmark", time.time()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def pooled_path(i: int):
+    """The same queries through the public common.db helpers."""
+    db.get_highlight_by_original(f"m{i % 1000}")
+    db.count_replies_to_message(f"m{i % 1000}")
+    db.insert_live_message({
+        "message_id": f"new{i}", "channel_id": "c1", "author_id": "u1",
+        "content": "benchmark", "created_at": time.time(),
+    })
+
+
+def run(label: str, fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    per_event_us = elapsed / iterations * 1e6
+    print(f"  {label:<8} {elapsed:8.3f}s total  {per_event_us:9.1f} us/event")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"Benchmark DB: {ANALYTICS_DB_PATH}")
+    seed(args.rows)
+
+    # Warm the page cache and the pool before timing
+    old_path(0)
+    pooled_path(0)
+
+    print(f"{args.iterations} events x 3 queries each:")
+    old = run("old", old_path, args.iterations)
+    new = run("pooled", pooled_path, args.iterations)
+    print(f"  speedup  {old / new:.1f}x")
+
+    close_all_pools()
+
+
+if __name__ == "__main__":
+    main()
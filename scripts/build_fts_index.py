@@ -0,0 +1,44 @@
+"""
+Backfill the FTS5 full-text indexes for the analytics database.
+
+init_database() creates messages_fts / live_messages_fts and the triggers
+that keep them in sync, but rows imported before that are not indexed.
+Run this once after upgrading an existing database (takes a few minutes
+on the full archive). Until it has run, search_messages() keeps using
+the old LIKE scan.
+
+Safe to run again at any time; it rebuilds the index from scratch.
+
+Usage:
+    python -m scripts.build_fts_index
+    # or from project root:
+    python scripts/build_fts_index.py
+"""
+
+import sys
+import time
+import logging
+from pathlib import Path
+
+# Ensure common/ is importable when running as a standalone script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.config import ANALYTICS_DB_PATH
+from common.db import rebuild_fts_index
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"Analytics DB: {ANALYTICS_DB_PATH}")
+
+    start = time.time()
+    counts = rebuild_fts_index()
+
+    print()
+    for table, count in counts.items():
+        print(f"  {table:<20} {count:,} rows indexed")
+    print(f"Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
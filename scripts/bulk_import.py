@@ -0,0 +1,65 @@
+"""
+Parallel bulk import of DiscordChatExporter JSON exports.
+
+Parses export files in a process pool and loads them through a single
+writer with secondary indexes dropped, then rebuilds indexes, channel
+counts, the FTS index and the analytics rollups once at the end.
+Re-running skips files that were already imported (same size and
+mtime), so an interrupted import picks up where it stopped.
+
+The bots' analytics queries are slow while this runs (no indexes on
+`messages`), so run it during maintenance.
+
+Usage:
+    python scripts/bulk_import.py                      # DATA_DIR/server_export
+    python scripts/bulk_import.py path/to/exports --workers 6
+    python scripts/bulk_import.py path/to/exports --no-resume
+"""
+
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+# Ensure common/ is importable when running as a standalone script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.config import ANALYTICS_DB_PATH, SERVER_EXPORT_DIR
+from common.db import bulk_import_exports, IJSON_AVAILABLE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel bulk import of Discord exports")
+    parser.add_argument("export_dir", nargs="?", default=str(SERVER_EXPORT_DIR))
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPUs - 1)")
+    parser.add_argument("--no-resume", action="store_true", help="re-import files already checkpointed")
+    parser.add_argument("--skip-derived", action="store_true",
+                        help="don't rebuild FTS/rollups at the end (run build_fts_index.py and analytics_rollups.py later)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"Analytics DB: {ANALYTICS_DB_PATH}")
+    print(f"Exports:      {args.export_dir}")
+    if not IJSON_AVAILABLE:
+        print("ijson not installed: workers will json.load whole files (pip install ijson)")
+
+    result = bulk_import_exports(
+        args.export_dir,
+        workers=args.workers,
+        resume=not args.no_resume,
+        rebuild_derived=not args.skip_derived,
+    )
+
+    print()
+    print(f"Files:    {result['files']} ({result['skipped_files']} already imported)")
+    print(f"Messages: {result['imported']:,} imported, {result['skipped']:,} duplicates skipped")
+    print(f"Time:     {result['seconds']}s")
+    if result['failed_files']:
+        print(f"Failed:   {len(result['failed_files'])} file(s)")
+        for path in result['failed_files']:
+            print(f"  {path}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Build a synthetic discord_analytics.db / moderation.db for benchmarking.
+
+The real archive is private, so this generates one with the same shape:
+skewed (Zipf-like) author and channel activity, a diurnal posting
+pattern, replies, attachments/embeds, a few bot accounts, live-capture
+rows that partly overlap the import, highlights, reply tracking and a
+populated moderation database. Schema, indexes, FTS and rollups come
+from the real init/rebuild code, so the result behaves like production.
+
+The output goes to its own DATA_DIR and never touches data/.
+
+Usage:
+    python scripts/gen_synthetic_archive.py --data-dir /tmp/synth --rows 1000000
+    python scripts/gen_synthetic_archive.py --data-dir /tmp/synth10m --rows 10000000 --force
+    python scripts/gen_synthetic_archive.py --data-dir /tmp/synthc --schema compact
+
+Then run the benchmarks against it:
+    python scripts/bench_db.py --data-dir /tmp/synth
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Discord epoch (2015-01-01) for snowflake-style IDs
+_DISCORD_EPOCH_MS = 1420070400000
+
+_COMMON_WORDS = (
+    "the a to and i you it is that of in for this on my just like so be "
+    "not lol have with but what was me are do its im all if we they he she "
+    "can no yeah get one at your about know up out think people really "
+    "good got time why dont how would more some when there because shit "
+    "going need fucking want well say thing still even make also ok man "
+    "literally actually right now see thats much gonna feel day said any "
+    "new game lmao same way why them back something work thank omg"
+).split()
+
+# Hours (UTC) weighted toward evening/night like the real server
+_HOUR_WEIGHTS = [9, 8, 7, 6, 5, 4, 3, 2, 2, 2, 3, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 12, 11, 10]
+
+_CHANNEL_NAMES = [
+    "general", "memes", "venting", "gaming", "music", "art", "pets", "food",
+    "politics", "selfies", "bot-commands", "serious", "shitposting", "movies",
+    "books", "fashion", "tech", "advice", "introductions", "nsfw-talk",
+]
+
+
+def zipf_cum_weights(n: int, s: float) -> list:
+    """Cumulative weights where item k gets weight 1/(k+1)^s."""
+    return list(itertools.accumulate(1.0 / (k + 1) ** s for k in range(n)))
+
+
+def snowflake(ts: float, seq: int) -> str:
+    """Snowflake-ish ID: timestamp in the high bits, sequence in the low bits."""
+    return str(((int(ts * 1000) - _DISCORD_EPOCH_MS) << 22) | (seq & 0x3FFFFF))
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+        vocab = list(_COMMON_WORDS)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        while len(vocab) < args.vocab:
+            vocab.append("".join(self.rng.choice(letters) for _ in range(self.rng.randint(3, 10))))
+        self.vocab = vocab
+        self.vocab_cum = zipf_cum_weights(len(vocab), 1.07)
+
+        self.channels = []
+        for i in range(args.channels):
+            base = _CHANNEL_NAMES[i % len(_CHANNEL_NAMES)]
+            name = base if i < len(_CHANNEL_NAMES) else f"{base}-{i // len(_CHANNEL_NAMES)}"
+            self.channels.append((str(1158203871554961579 + 1000 + i), name))
+        self.channel_cum = zipf_cum_weights(len(self.channels), 1.2)
+
+        self.authors = []
+        for i in range(args.users):
+            bot = 1 if i in (3, 17) else 0
+            self.authors.append((str(100000000000000000 + i * 7919), f"user{i:05d}", bot))
+        self.author_cum = zipf_cum_weights(len(self.authors), 1.1)
+
+        self.end = time.time() - 3600
+        self.start = self.end - args.days * 86400
+        self.hour_cum = list(itertools.accumulate(_HOUR_WEIGHTS))
+
+    def content(self) -> str:
+        n = max(1, min(120, int(self.rng.lognormvariate(1.9, 0.8))))
+        words = self.rng.choices(self.vocab, cum_weights=self.vocab_cum, k=n)
+        if self.rng.random() < 0.05:
+            words.append(f"<@{self.rng.choice(self.authors)[0]}>")
+        return " ".join(words)
+
+    def timestamp(self, i: int, total: int) -> float:
+        """Roughly increasing with i; hour of day drawn from the diurnal curve."""
+        day = int((self.end - self.start) / 86400 * i / total)
+        hour = self.rng.choices(range(24), cum_weights=self.hour_cum)[0]
+        ts = self.start + day * 86400 + hour * 3600 + self.rng.random() * 3600
+        return min(ts, self.end)
+
+    def message_rows(self, total: int):
+        """Yield rows in _process_export_message() column order."""
+        recent = []
+        for i in range(total):
+            ts = self.timestamp(i, total)
+            channel_id, channel_name = self.rng.choices(self.channels, cum_weights=self.channel_cum)[0]
+            author_id, author_name, bot = self.rng.choices(self.authors, cum_weights=self.author_cum)[0]
+            content = self.content()
+            if self.rng.random() < 0.06:
+                content = ""  # attachment-only / sticker messages
+            message_id = snowflake(ts, i)
+
+            reply_to = None
+            if recent and self.rng.random() < 0.12:
+                reply_to = self.rng.choice(recent)
+            recent.append(message_id)
+            if len(recent) > 500:
+                recent.pop(0)
+
+            iso = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="milliseconds")
+            yield (
+                message_id, channel_id, channel_name, author_id, author_name,
+                "0000", bot, content, iso, ts,
+                1 if self.rng.random() < 0.08 else 0,
+                1 if self.rng.random() < 0.04 else 0,
+                1 if reply_to else 0, reply_to,
+                len(content.split()), len(content),
+            )
+
+    def live_rows(self, total: int, overlap_ids: list):
+        """Yield rows in _live_message_row() column order (recent days only)."""
+        live_start = self.end - min(self.args.days, 30) * 86400
+        for i in range(total):
+            ts = live_start + (self.end - live_start) * i / max(total, 1)
+            author_id, author_name, _bot = self.rng.choices(self.authors, cum_weights=self.author_cum)[0]
+            channel_id, _name = self.rng.choices(self.channels, cum_weights=self.channel_cum)[0]
+            # A slice of live rows duplicates imported messages, like a
+            # re-export that overlaps the capture window
+            if overlap_ids and self.rng.random() < 0.02:
+                message_id = self.rng.choice(overlap_ids)
+            else:
+                message_id = snowflake(ts, 0x200000 + i)
+            content = self.content()
+            attachments = [{"url": "https://cdn.example/x.png"}] if self.rng.random() < 0.08 else []
+            iso = datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+            yield (
+                message_id, channel_id, author_id, author_name, None, None,
+                content, iso, None, 0, 0, None,
+                json.dumps(attachments), "[]", "[]", "[]", ts,
+            )
+
+
+def chunks(rows, size: int):
+    it = iter(rows)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def build_analytics(gen: Generator, db):
+    from common.pool import open_connection
+    from common.config import ANALYTICS_DB_PATH
+
+    args = gen.args
+    db.init_database()
+    conn = open_connection(ANALYTICS_DB_PATH)
+    started = time.time()
+    written = 0
+    sample_ids = []
+    try:
+        db._enter_bulk_mode(conn)
+        insert_msg = db._insert_msg_sql(conn)
+        for batch in chunks(gen.message_rows(args.rows), 20000):
+            conn.executemany(insert_msg, batch)
+            conn.commit()
+            written += len(batch)
+            sample_ids.extend(row[0] for row in batch[:: max(1, len(batch) // 50)])
+            if written % 500000 < 20000:
+                print(f"  messages: {written:,}/{args.rows:,} ({written / (time.time() - started):,.0f} rows/s)")
+
+        channels = {cid: {'channel_name': name, 'category': 'synthetic'} for cid, name in gen.channels}
+        db._exit_bulk_mode(conn, channels)
+
+        live_total = args.live_rows
+        for batch in chunks(gen.live_rows(live_total, sample_ids), 20000):
+            conn.executemany(db._insert_live_sql(conn), batch)
+            conn.commit()
+        print(f"  live_messages: {live_total:,}")
+
+        now = time.time()
+        replies = conn.execute(
+            "SELECT message_id, reply_to_id, author_id, content FROM messages "
+            "WHERE is_reply = 1 ORDER BY id DESC LIMIT ?", (args.rows // 20,)
+        ).fetchall()
+        conn.executemany(
+            "INSERT OR IGNORE INTO message_reply_tracking "
+            "(reply_id, original_message_id, author_id, reply_content, created_at) VALUES (?, ?, ?, ?, ?)",
+            ((r['message_id'], r['reply_to_id'], r['author_id'], r['content'], now) for r in replies),
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO highlights (highlight_id, original_message_id, author_id, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            ((f"hl{i}", mid, gen.rng.choice(gen.authors)[0], now) for i, mid in enumerate(sample_ids[::3])),
+        )
+        conn.commit()
+        print(f"  reply tracking: {len(replies):,}, highlights: {len(sample_ids[::3]):,}")
+    finally:
+        conn.close()
+
+    # Restores the triggers dropped for the load, then builds derived data
+    db.init_database()
+    print("  rebuilding FTS index...")
+    db.rebuild_fts_index()
+    print("  rebuilding rollups...")
+    db.rebuild_rollups()
+
+
+def build_moderation(gen: Generator, mdb):
+    rng = gen.rng
+    args = gen.args
+    mdb.init_moderation_db()
+
+    words = sorted({rng.choice(gen.vocab[200:]) for _ in range(400)})
+    for sev in range(1, 6):
+        mdb.add_bad_words_bulk(words[sev - 1::5], severity=sev, category=f"synthetic_{sev}")
+
+    now = datetime.now()
+    flagged = max(100, args.rows // 500)
+    with mdb.mod_session() as (conn, cursor):
+        cursor.executemany("""
+            INSERT OR IGNORE INTO flagged_messages
+            (message_id, channel_id, channel_name, author_id, author_name,
+             original_content, censored_content, flag_reason, matched_patterns,
+             sentiment_score, toxicity_score, action_taken, flagged_at, auto_deleted)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            (f"fl{i}", *rng.choices(gen.channels, cum_weights=gen.channel_cum)[0],
+             *rng.choices(gen.authors, cum_weights=gen.author_cum)[0][:2],
+             gen.content(), "***", rng.choice(["bad_word", "hate_speech", "toxicity", "slur"]),
+             json.dumps([rng.choice(words)]), -0.5, rng.random(), "deleted",
+             (now - timedelta(seconds=rng.random() * args.days * 86400)).isoformat(), 1)
+            for i in range(flagged)
+        ))
+        cursor.executemany(
+            "INSERT INTO user_offenses (user_id, offense_type, message_id, channel_id, occurred_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (rng.choices(gen.authors, cum_weights=gen.author_cum)[0][0], "bad_word", f"fl{i}",
+                 rng.choice(gen.channels)[0],
+                 (now - timedelta(seconds=rng.random() * args.days * 86400)).isoformat())
+                for i in range(flagged * 2)
+            ),
+        )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO learned_patterns (pattern, pattern_type, confidence, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            ((f"{a} {b}", "phrase", rng.random(), now.isoformat())
+             for a, b in zip(rng.sample(words, 200), rng.sample(words, 200))),
+        )
+        cursor.executemany(
+            "INSERT INTO training_samples (content, label, source, added_at) VALUES (?, ?, ?, ?)",
+            ((gen.content(), rng.choice(["bad", "ok"]), "synthetic", now.isoformat()) for _ in range(2000)),
+        )
+        cursor.executemany(
+            "INSERT OR REPLACE INTO monitored_channels (channel_id, channel_name, monitoring_level, added_at) "
+            "VALUES (?, ?, ?, ?)",
+            ((cid, name, rng.randint(1, 3), now.isoformat()) for cid, name in gen.channels[:10]),
+        )
+        cursor.executemany(
+            "INSERT OR REPLACE INTO scan_progress (channel_id, file_path, last_message_id, "
+            "messages_scanned, messages_flagged, last_updated) VALUES (?, ?, ?, ?, ?, ?)",
+            ((cid, f"{name}.json", "0", 1000, 3, now.isoformat()) for cid, name in gen.channels),
+        )
+    print(f"  moderation: {len(words)} bad words, {flagged:,} flagged, {flagged * 2:,} offenses")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic analytics/moderation archive")
+    parser.add_argument("--data-dir", required=True, help="Output DATA_DIR (must not be the real one)")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Imported messages (default 1M)")
+    parser.add_argument("--live-rows", type=int, default=None, help="Live messages (default rows/20)")
+    parser.add_argument("--users", type=int, default=3000)
+    parser.add_argument("--channels", type=int, default=60)
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--schema", choices=("text", "compact"), default="text",
+                        help="Storage layout of the generated DB (default text)")
+    parser.add_argument("--force", action="store_true", help="Overwrite an existing synthetic DB")
+    args = parser.parse_args()
+    if args.live_rows is None:
+        args.live_rows = args.rows // 20
+
+    data_dir = Path(args.data_dir).resolve()
+    project_data = (Path(__file__).resolve().parent.parent / "data").resolve()
+    if data_dir == project_data:
+        parser.error("refusing to write synthetic data into the project data/ directory")
+
+    db_file = data_dir / "discord_analytics.db"
+    if db_file.exists():
+        if not args.force:
+            parser.error(f"{db_file} already exists (use --force to replace it)")
+        for name in ("discord_analytics.db", "moderation.db"):
+            for suffix in ("", "-wal", "-shm"):
+                path = data_dir / f"{name}{suffix}"
+                if path.exists():
+                    path.unlink()
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    # common.config reads DATA_DIR at import time
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ["ANALYTICS_SCHEMA"] = args.schema
+    from common import db
+    from common import moderation_db as mdb
+    from common.pool import close_all_pools
+
+    print(f"Generating into {data_dir}")
+    print(f"  {args.rows:,} messages, {args.live_rows:,} live, {args.users:,} users, "
+          f"{args.channels} channels over {args.days} days (seed {args.seed})")
+    started = time.time()
+
+    gen = Generator(args)
+    build_analytics(gen, db)
+    build_moderation(gen, mdb)
+    close_all_pools()
+
+    size_mb = db_file.stat().st_size / 1024 / 1024
+    print(f"Done in {time.time() - started:.0f}s, discord_analytics.db is {size_mb:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
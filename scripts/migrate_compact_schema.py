@@ -0,0 +1,73 @@
+"""
+Convert the analytics database to the compact (integer-keyed) layout.
+
+Rewrites messages, live_messages, highlights and message_reply_tracking
+with Discord IDs stored as 8-byte integers and the per-message timestamp
+columns derived from the snowflake instead of stored (see "STORAGE
+SCHEMA" in common/db.py). Reads still return the same str IDs and
+ISO timestamps, so no calling code changes.
+
+Runs online: the bots can keep capturing while rows are copied in small
+batches, and the final swap is a single short transaction. If it is
+interrupted, run it again and it picks up where it stopped. Back up
+data/discord_analytics.db first anyway.
+
+Dropping the old tables leaves their space free inside the file for
+new rows; use --vacuum to give it back to the filesystem (needs about
+the database's size in free disk space, and writers wait while it runs,
+so do that in a quiet period).
+
+Usage:
+    python -m scripts.migrate_compact_schema
+    # or from project root:
+    python scripts/migrate_compact_schema.py [--batch-rows 20000] [--pause 0.05] [--vacuum]
+"""
+
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+# Ensure common/ is importable when running as a standalone script
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.config import ANALYTICS_DB_PATH
+from common.db import migrate_to_compact_schema
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024**2:,.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the analytics DB to the compact layout")
+    parser.add_argument("--batch-rows", type=int, default=20000,
+                        help="Rows copied per write transaction (default 20000)")
+    parser.add_argument("--pause", type=float, default=0.05,
+                        help="Seconds to sleep between batches (default 0.05)")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="VACUUM afterwards to shrink the file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    print(f"Analytics DB: {ANALYTICS_DB_PATH}")
+
+    start = time.time()
+    result = migrate_to_compact_schema(batch_rows=args.batch_rows, pause=args.pause,
+                                       vacuum=args.vacuum)
+    if result.get('already_compact'):
+        print("Already using the compact layout, nothing to do.")
+        return
+
+    print()
+    for table, count in result['copied'].items():
+        print(f"  {table:<24} {count:,} rows copied")
+    before, after = result['before'], result['after']
+    print(f"  {'data (used pages)':<24} {_mb(before['used'])} -> {_mb(after['used'])}")
+    print(f"  {'file size':<24} {_mb(before['file'])} -> {_mb(after['file'])}")
+    print(f"Done in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,52 +12,65 @@ from typing import Optional
 from common import db
 
 
+_EMOJI_RE = re.compile(r'<:\w+:\d+>|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF]')
+
+
 def analyze_user_messages(user_id: str) -> dict:
     """
     Analyze a user's message patterns to understand their style.
+
+    Streams the history once (constant memory); phrases and vocabulary
+    come from the incrementally maintained per-user term counts.
     """
-    messages = db.get_user_messages(user_id)
-    
-    if not messages:
+    total = 0
+    content_count = 0
+    length_hist = Counter()
+    total_chars = 0
+    total_words = 0
+    caps = lowercase = punctuation = emoji = questions = exclamations = 0
+
+    for m in db.iter_user_messages(user_id):
+        total += 1
+        content = m['content']
+        # Filter to actual content (not just links, reactions, etc.)
+        if (not content
+                or len(content) <= 5
+                or content.startswith('http')
+                or re.match(r'^<[a-z]*:\w+:\d+>$', content)):  # Not just an emoji
+            continue
+
+        content_count += 1
+        length_hist[len(content)] += 1
+        total_chars += len(content)
+        total_words += len(content.split())
+        caps += content.isupper()
+        lowercase += content.islower()
+        punctuation += content.count('.') + content.count('!') + content.count('?')
+        emoji += len(_EMOJI_RE.findall(content))
+        questions += content.count('?')
+        exclamations += content.count('!')
+
+    if not total:
         return {"error": "No messages found for this user"}
-    
-    # Filter to actual content (not just links, reactions, etc.)
-    content_messages = [
-        m for m in messages 
-        if m['content'] 
-        and len(m['content']) > 5 
-        and not m['content'].startswith('http')
-        and not re.match(r'^<[a-z]*:\w+:\d+>$', m['content'])  # Not just an emoji
-    ]
-    
-    # Calculate statistics
-    lengths = [len(m['content']) for m in content_messages]
-    word_counts = [len(m['content'].split()) for m in content_messages]
-    
-    # Analyze punctuation and style
-    all_text = ' '.join(m['content'] for m in content_messages)
-    
+
+    n = content_count or 1
     stats = {
-        "total_messages": len(messages),
-        "content_messages": len(content_messages),
-        "avg_length_chars": sum(lengths) / len(lengths) if lengths else 0,
-        "avg_length_words": sum(word_counts) / len(word_counts) if word_counts else 0,
-        "median_length_chars": sorted(lengths)[len(lengths)//2] if lengths else 0,
-        "uses_caps_frequently": sum(1 for m in content_messages if m['content'].isupper()) / len(content_messages) > 0.05,
-        "uses_lowercase": sum(1 for m in content_messages if m['content'].islower()) / len(content_messages) > 0.3,
-        "uses_punctuation": all_text.count('.') + all_text.count('!') + all_text.count('?') > len(content_messages) * 0.5,
-        "emoji_frequency": len(re.findall(r'<:\w+:\d+>|[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF]', all_text)) / len(content_messages),
-        "question_frequency": all_text.count('?') / len(content_messages),
-        "exclamation_frequency": all_text.count('!') / len(content_messages),
+        "total_messages": total,
+        "content_messages": content_count,
+        "avg_length_chars": total_chars / n if content_count else 0,
+        "avg_length_words": total_words / n if content_count else 0,
+        "median_length_chars": _histogram_median(length_hist),
+        "uses_caps_frequently": caps / n > 0.05,
+        "uses_lowercase": lowercase / n > 0.3,
+        "uses_punctuation": punctuation > content_count * 0.5,
+        "emoji_frequency": emoji / n,
+        "question_frequency": questions / n,
+        "exclamation_frequency": exclamations / n,
     }
     
     # Common phrases (2-3 word combinations)
-    words = all_text.lower().split()
-    bigrams = [' '.join(words[i:i+2]) for i in range(len(words)-1)]
-    trigrams = [' '.join(words[i:i+3]) for i in range(len(words)-2)]
-    
-    stats["common_bigrams"] = Counter(bigrams).most_common(20)
-    stats["common_trigrams"] = Counter(trigrams).most_common(15)
+    stats["common_bigrams"] = db.get_user_terms(user_id, 'bigram', top_n=20)
+    stats["common_trigrams"] = db.get_user_terms(user_id, 'trigram', top_n=15)
     
     # Vocabulary
     stats["vocabulary"] = db.get_user_vocabulary(user_id, top_n=30)
@@ -65,6 +78,17 @@ def analyze_user_messages(user_id: str) -> dict:
     return stats
 
 
+def _histogram_median(hist: Counter) -> int:
+    """Upper median of the values counted in hist (same as sorted(values)[n//2])."""
+    target = sum(hist.values()) // 2
+    seen = 0
+    for value in sorted(hist):
+        seen += hist[value]
+        if seen > target:
+            return value
+    return 0
+
+
 def select_representative_messages(user_id: str, count: int = 50, min_length: int = 15, max_length: int = 300) -> list:
     """
     Select diverse, representative messages for few-shot examples.
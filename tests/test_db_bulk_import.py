@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from common import db
+
+
+@pytest.fixture
+def analytics_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'ANALYTICS_DB_PATH', tmp_path / 'analytics.db')
+    db.init_database()
+    return tmp_path / 'analytics.db'
+
+
+def write_export(path, channel_id, message_ids):
+    path.write_text(json.dumps({
+        'guild': {'id': '1', 'name': 'guild'},
+        'channel': {'id': channel_id, 'name': f'channel-{channel_id}', 'category': 'general'},
+        'messages': [
+            {'id': message_id, 'content': 'hello there', 'timestamp': '2024-01-01T00:00:00+00:00',
+             'author': {'id': '42', 'name': 'someone', 'isBot': False}}
+            for message_id in message_ids
+        ],
+    }), encoding='utf-8')
+
+
+def kill_worker(json_path):
+    # Stands in for a worker killed by the OOM killer
+    os._exit(1)
+
+
+def schema(conn):
+    return sorted(tuple(row) for row in conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE tbl_name = 'messages' AND type IN ('index', 'trigger')"
+    ))
+
+
+def test_bulk_import(analytics_db, tmp_path):
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    write_export(exports / 'a.json', '1', ['10', '11'])
+    write_export(exports / 'b.json', '2', ['20'])
+
+    result = db.bulk_import_exports(str(exports), workers=2)
+    assert result['failed_files'] == []
+    assert result['imported'] == 3
+
+
+def test_bulk_import_survives_a_killed_worker(analytics_db, tmp_path, monkeypatch):
+    exports = tmp_path / 'exports'
+    exports.mkdir()
+    write_export(exports / 'a.json', '1', ['10', '11'])
+    with db.read_session() as conn:
+        before = schema(conn)
+
+    monkeypatch.setattr(db, '_bulk_parse_file', kill_worker)
+    result = db.bulk_import_exports(str(exports), workers=1, rebuild_derived=False)
+
+    assert result['failed_files'] == [str(exports / 'a.json')]
+    with db.read_session() as conn:
+        assert schema(conn) == before
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from common import db
+
+
+@pytest.fixture
+def analytics_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, 'ANALYTICS_DB_PATH', tmp_path / 'analytics.db')
+    db.init_database()
+    return tmp_path / 'analytics.db'
+
+
+def insert_messages(timestamps):
+    with db.db_session() as (conn, cursor):
+        cursor.executemany("""
+            INSERT INTO messages (message_id, channel_id, channel_name, author_id,
+                                  author_name, content, timestamp, timestamp_unix)
+            VALUES (?, '1', 'general', ?, 'someone', 'hi', ?, ?)
+        """, [
+            (str(n), str(n % 3), ts.isoformat(), ts.timestamp())
+            for n, ts in enumerate(timestamps)
+        ])
+
+
+def test_daily_activity_rollups_match_raw_scan(analytics_db):
+    now = datetime.now(timezone.utc)
+    first_day = (now - timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0)
+    insert_messages([
+        first_day - timedelta(minutes=1),    # the day before: never counted
+        first_day + timedelta(minutes=1),    # before `now - 7 days` on the first day
+        now - timedelta(days=7) + timedelta(minutes=1),
+        now - timedelta(days=3),
+        now - timedelta(days=3, minutes=5),
+    ])
+
+    from_rollups = db.get_daily_activity(7)
+    with db.db_session() as (conn, cursor):
+        cursor.execute("DELETE FROM db_meta WHERE key = 'rollups_built'")
+    from_scan = db.get_daily_activity(7)
+
+    assert from_rollups == from_scan
+    assert from_scan[-1]['date'] == first_day.strftime('%Y-%m-%d')
+    assert sum(row['message_count'] for row in from_scan) == 4
+
+
+def import_message(message_id, content, timestamp):
+    row = db._process_export_message({
+        'id': message_id, 'content': content, 'timestamp': timestamp.isoformat(),
+        'author': {'id': '42', 'name': 'someone', 'isBot': False},
+    }, '1', 'general')
+    with db.db_session() as (conn, cursor):
+        cursor.execute(db._insert_msg_sql(conn), row)
+
+
+def test_import_replaces_live_copy_in_rollups(analytics_db):
+    sent = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    content = "hello there\nsecond line\nthird"
+    db.insert_live_message({
+        'message_id': '500', 'channel_id': '1', 'author_id': '42', 'author_name': 'someone',
+        'content': content, 'timestamp': sent.isoformat(),
+        # Captured a little later, in the next hour
+        'created_at': (sent + timedelta(hours=1)).timestamp(),
+    })
+    with db.read_session() as conn:
+        assert conn.execute("SELECT word_count FROM rollup_author_channel").fetchone()[0] == 5
+
+    import_message('500', content, sent)
+
+    assert db.check_rollups() == {'ok': True, 'mismatches': {}}
+    with db.read_session() as conn:
+        activity = [tuple(row) for row in conn.execute(
+            "SELECT hour, message_count, word_count FROM rollup_activity")]
+        totals = tuple(conn.execute(
+            "SELECT message_count, word_count FROM rollup_author_channel").fetchone())
+    assert activity == [(12, 1, 5)]
+    assert totals == (1, 5)
+
+
+def test_live_copy_after_import_is_not_counted(analytics_db):
+    sent = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+    import_message('501', 'hi there', sent)
+    db.insert_live_message({
+        'message_id': '501', 'channel_id': '1', 'author_id': '42', 'author_name': 'someone',
+        'content': 'hi there', 'timestamp': sent.isoformat(), 'created_at': sent.timestamp(),
+    })
+
+    assert db.check_rollups() == {'ok': True, 'mismatches': {}}
+    with db.read_session() as conn:
+        assert tuple(conn.execute(
+            "SELECT message_count, word_count FROM rollup_author_channel").fetchone()) == (1, 2)
+
+
+@pytest.mark.parametrize('content', ['', '   ', 'one', '  one  two ', 'a\tb\r\nc\n\n d'])
+def test_live_word_count_matches_split(analytics_db, content):
+    with db.read_session() as conn:
+        sql = db._sql_word_count(':content')
+        assert conn.execute(f"SELECT {sql}", {'content': content}).fetchone()[0] == len(content.split())
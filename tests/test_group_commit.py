@@ -0,0 +1,78 @@
+import sqlite3
+
+from common.group_commit import GroupCommitWriter
+
+
+class TableWriter(GroupCommitWriter):
+    label = "Test row"
+
+    def __init__(self, db_path, **kwargs):
+        super().__init__(**kwargs)
+        self.db_path = db_path
+        self.commits = 0
+
+    def _commit(self, rows):
+        self.commits += 1
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                cursor = conn.executemany("INSERT INTO t (id, body) VALUES (?, ?)", rows)
+                return cursor.rowcount
+        finally:
+            conn.close()
+
+
+def make_writer(tmp_path, **kwargs):
+    db_path = str(tmp_path / "t.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, body TEXT NOT NULL)")
+    conn.close()
+    options = dict(batch_size=100, flush_ms=50, max_queue=100)
+    options.update(kwargs)
+    return TableWriter(db_path, **options)
+
+
+def stored_ids(writer):
+    conn = sqlite3.connect(writer.db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT id FROM t ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_bad_row_only_drops_itself(tmp_path):
+    writer = make_writer(tmp_path)
+    rows = [(i, f"row {i}") for i in range(10)]
+    rows[4] = (4, None)  # NOT NULL -> IntegrityError
+    writer.start()
+    for row in rows:
+        assert writer.submit(row)
+    assert writer.flush()
+    writer.stop()
+
+    assert stored_ids(writer) == [0, 1, 2, 3, 5, 6, 7, 8, 9]
+    stats = writer.stats()
+    assert stats['rows_written'] == 9
+    assert stats['rows_failed'] == 1
+
+
+def test_unbindable_rows_are_isolated(tmp_path):
+    writer = make_writer(tmp_path)
+    rows = [(i, f"row {i}") for i in range(8)]
+    rows[0] = (0, object())  # can't be bound
+    rows[7] = (7, ["not", "a", "string"])
+    writer._write_batch(rows)
+
+    assert stored_ids(writer) == [1, 2, 3, 4, 5, 6]
+    assert writer.stats()['rows_failed'] == 2
+
+
+def test_full_queue_overflows_instead_of_writing_inline(tmp_path):
+    writer = make_writer(tmp_path, max_queue=2, max_overflow=2)
+    results = [writer.submit((i, f"row {i}")) for i in range(5)]
+
+    assert results == [True, True, True, True, False]
+    assert writer.commits == 0
+    writer.stop()  # not started: drains inline, overflow included
+    assert stored_ids(writer) == [0, 1, 2, 3]
+    assert writer.stats()['rows_dropped'] == 1
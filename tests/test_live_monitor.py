@@ -0,0 +1,60 @@
+import asyncio
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("interactions")
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'bots' / 'protector'))
+
+import live_monitor
+from live_monitor import MonitorConfig, _SettingsCache
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+    results = []
+
+    async def get_monitored_channels(timeout=None):
+        calls.append(timeout)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(live_monitor.adb, 'get_monitored_channels', get_monitored_channels)
+    return calls, results
+
+
+def test_failed_first_load_falls_back_to_config(lookups):
+    calls, results = lookups
+    results.append(sqlite3.OperationalError("database is locked"))
+    cache, config = _SettingsCache(), MonitorConfig()
+
+    async def check():
+        first = await cache.get(config)
+        assert await cache.get(config) is first
+        return first
+
+    settings = asyncio.run(check())
+    assert settings.channels == {}
+    assert settings.ignored_channels == frozenset(config.IGNORED_CHANNELS)
+    assert len(calls) == 1
+
+
+def test_failed_refresh_keeps_last_good_settings(lookups):
+    calls, results = lookups
+    results.extend([{'100': 2}, TimeoutError("no pooled connection")])
+    cache, config = _SettingsCache(), MonitorConfig()
+
+    async def check():
+        await cache.get(config)
+        cache.invalidate()
+        settings = await cache.get(config)
+        assert await cache.get(config) is settings
+        return settings
+
+    assert asyncio.run(check()).channels == {'100': 2}
+    assert len(calls) == 2
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+import common.moderation_db as mdb
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'bots' / 'protector'))
+
+
+@pytest.fixture
+def moderation_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(mdb, 'MODERATION_DB_PATH', str(tmp_path / 'moderation.db'))
+    mdb.init_moderation_db()
+    mdb.add_learned_pattern('free nitro', 'phrase', confidence=0.9)
+
+
+def event(message_id, **kwargs):
+    return mdb.moderation_event(
+        message_id=message_id, channel_id='1', channel_name='general', author_id='42',
+        author_name='someone', original_content='free nitro', censored_content='free nitro',
+        flag_reason='learned_pattern', matched_patterns=['free nitro'], **kwargs,
+    )
+
+
+def pattern_stats():
+    with mdb.mod_read_session() as conn:
+        return tuple(conn.execute(
+            "SELECT match_count, last_matched FROM learned_patterns WHERE pattern = 'free nitro'"
+        ).fetchone())
+
+
+def test_events_count_learned_patterns(moderation_db):
+    events = [event('1', counted_patterns=['free nitro']), event('2', counted_patterns=['free nitro']),
+              event('3')]
+    assert mdb.record_moderation_events(events) == 3
+
+    match_count, last_matched = pattern_stats()
+    assert match_count == 2
+    assert last_matched == events[1]['at']
+
+
+def test_analyze_does_not_write_pattern_stats(moderation_db):
+    content_analyzer = pytest.importorskip('content_analyzer')
+    result = content_analyzer.ContentAnalyzer().analyze('get your free nitro here')
+
+    assert result.learned_patterns == ['free nitro']
+    assert pattern_stats() == (0, None)
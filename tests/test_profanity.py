@@ -0,0 +1,27 @@
+import pytest
+
+from bots.trannyverse.extensions.profanity import BAD_WORDS_CRITICAL, contains_bad_word, normalizer
+
+
+@pytest.mark.parametrize('term', BAD_WORDS_CRITICAL)
+def test_every_bad_word_can_match(term):
+    # Terms are matched as written, so one the normalizer would change never fires
+    assert normalizer.normalize(term) == term
+    assert contains_bad_word(term)
+
+
+@pytest.mark.parametrize('text', [
+    'this skill all day',
+    'my phone should die soon',
+])
+def test_ordinary_phrases_do_not_match(text):
+    assert not contains_bad_word(text)
+
+
+@pytest.mark.parametrize('text', ['kys', 'KYS', 'k.y.s', 'kyyys', 'death to them'])
+def test_masked_spellings_match(text):
+    assert contains_bad_word(text)
+
+
+def test_clean_text_does_not_match():
+    assert not contains_bad_word('hello there')
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rag import retriever as rag_retriever
+from rag.retriever import LiveEmbeddingQueue, MessageRetriever
+
+
+@pytest.fixture
+def fresh_singleton(monkeypatch):
+    monkeypatch.setattr(MessageRetriever, '_instance', None)
+    monkeypatch.setattr(rag_retriever, '_retriever', None)
+
+
+def test_concurrent_first_use_loads_once(fresh_singleton, monkeypatch):
+    loads = []
+
+    def slow_load(self):
+        loads.append(self)
+        time.sleep(0.05)
+        self._initialized = True
+
+    monkeypatch.setattr(MessageRetriever, '_load', slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(rag_retriever._get_retriever()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(r is loads[0] for r in results)
+
+
+def test_live_queue_stops_when_retriever_is_unavailable(monkeypatch, caplog):
+    calls = []
+
+    def missing_collection():
+        calls.append(1)
+        raise RuntimeError("collection not found")
+
+    monkeypatch.setattr(rag_retriever, '_get_retriever', missing_collection)
+    live_queue = LiveEmbeddingQueue(batch_size=2, window_ms=10)
+
+    async def chat():
+        assert live_queue.put('1', 'first message', {})
+        for _ in range(50):
+            if live_queue.unavailable:
+                break
+            await asyncio.sleep(0.01)
+        return [live_queue.put(str(n), 'later message', {}) for n in range(2, 5)]
+
+    assert asyncio.run(chat()) == [False, False, False]
+    assert len(calls) == 1
+    stats = live_queue.stats()
+    assert stats['unavailable'] and stats['failed'] == 0 and stats['pending'] == 0
+    assert len([r for r in caplog.records if r.levelname == 'WARNING']) == 1
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import pytest
+
+pytest.importorskip("interactions")
+pytest.importorskip("dotenv")
+os.environ.setdefault("PROTECTOR_BOT_TOKEN", "test")
+
+import common.moderation_db as mdb
+from bots.protector import server_helper
+from bots.protector.server_helper import ContentAnalyzer, should_repost
+
+# Cyrillic е in "jеws"
+HATE_COMBO = "we all hate jеws"
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return ContentAnalyzer()
+
+
+def test_hate_combination_with_homoglyph_is_matched(analyzer):
+    result = analyzer.analyze(HATE_COMBO)
+    assert result.should_delete
+    assert result.matched_words == []
+    assert {category for _, category in result.matched_patterns} == {'hate_combination'}
+
+
+def test_hate_combination_with_homoglyph_is_not_reposted(analyzer):
+    result = analyzer.analyze(HATE_COMBO)
+    assert result.censored_content == HATE_COMBO
+    assert not should_repost(result, HATE_COMBO)
+
+
+def test_censoring_keeps_other_cyrillic_text(analyzer):
+    content = "привет kys"
+    result = analyzer.analyze(content)
+    assert result.matched_words == ['kys']
+    assert result.censored_content.startswith("привет ")
+    assert result.censored_content[len("привет "):] != "kys"
+    assert should_repost(result, content)
+
+
+def test_censoring_a_word_spelled_with_homoglyphs(analyzer):
+    # Cyrillic у in "kуs"
+    content = "just kуs"
+    result = analyzer.analyze(content)
+    assert result.matched_words == ['kys']
+    assert len(result.censored_content) == len(content)
+    assert result.censored_content.startswith("just ")
+
+
+def write_export(path, channel_id, messages):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'guild': {'id': '1', 'name': 'guild'},
+        'channel': {'id': channel_id, 'name': 'general'},
+        'messages': [
+            {'id': message_id, 'content': content, 'timestamp': '2024-01-01T00:00:00+00:00',
+             'author': {'id': '42', 'name': 'someone', 'isBot': False}}
+            for message_id, content in messages
+        ],
+    }, indent=2), encoding='utf-8')
+
+
+def test_export_shards_are_keyed_by_file(tmp_path):
+    first = tmp_path / 'general.json'
+    second = tmp_path / 'older' / 'general [part 2].json'
+    write_export(first, '100', [('1', 'hi')])
+    write_export(second, '100', [('2', 'hi')])
+
+    keys = [shard['key'] for path in (first, second) for shard in server_helper._plan_export_shards(path)]
+    assert keys == [f"{first.resolve()}#0", f"{second.resolve()}#0"]
+
+
+def test_scan_two_exports_of_one_channel(tmp_path, monkeypatch):
+    monkeypatch.setattr(mdb, 'MODERATION_DB_PATH', str(tmp_path / 'moderation.db'))
+    # For the spawned scanner processes
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    exports = tmp_path / 'exports'
+    write_export(exports / 'general.json', '100', [('1', 'hello'), ('2', 'kys'), ('3', 'bye')])
+    write_export(exports / 'older' / 'general [part 2].json', '100', [('4', 'kys'), ('5', 'ok')])
+    output = str(tmp_path / 'flagged_messages.json')
+
+    # Checkpoints must be newer than the files' mtimes to be resumed
+    time.sleep(0.01)
+    results = server_helper.scan_exports_parallel(str(exports), output, workers=1)
+    assert results['failed_shards'] == []
+    assert results['total_messages_scanned'] == 5
+    assert results['total_flagged'] == 2
+    assert sorted((fs['file'], fs['scanned'], fs['flagged']) for fs in results['file_stats']) == [
+        ('general [part 2].json', 2, 1), ('general.json', 3, 1),
+    ]
+    assert len(mdb.get_all_scan_progress()) == 2
+
+    resumed = server_helper.scan_exports_parallel(str(exports), output, workers=1)
+    assert resumed['resumed_shards'] == 2
+    assert resumed['failed_shards'] == []
+    assert resumed['total_messages_scanned'] == 5
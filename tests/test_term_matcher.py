@@ -0,0 +1,30 @@
+from common.term_matcher import TermMatcher
+
+
+def terms(matches):
+    return [term for term, _ in matches]
+
+
+def test_word_boundary_reports_prefix_terms():
+    matcher = TermMatcher(['kill', 'kill yourself', 'yourself'])
+    assert terms(matcher.find_all('go kill yourself')) == ['kill', 'kill yourself', 'yourself']
+
+
+def test_word_boundary_skips_prefix_inside_a_word():
+    matcher = TermMatcher(['kill', 'killer'])
+    assert terms(matcher.find_all('a killer')) == ['killer']
+
+
+def test_substring_reports_prefix_terms():
+    matcher = TermMatcher(['kill', 'kill yourself', 'yourself'], word_boundary=False)
+    assert terms(matcher.find_all('go kill yourself')) == ['kill', 'kill yourself', 'yourself']
+
+
+def test_substring_reports_prefix_inside_a_word():
+    matcher = TermMatcher(['kill', 'killer'], word_boundary=False)
+    assert terms(matcher.find_all('a killer')) == ['kill', 'killer']
+
+
+def test_categories_follow_each_term():
+    matcher = TermMatcher([('kill', 'violence'), ('kill yourself', 'self_harm')], word_boundary=False)
+    assert matcher.find_all('kill yourself') == [('kill', 'violence'), ('kill yourself', 'self_harm')]